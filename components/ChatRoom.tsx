@@ -3,11 +3,11 @@ import { useAuth } from '../App';
 import { useSocket } from '../context/SocketContext';
 import { useMessagesUnread } from '../context/MessagesUnreadContext';
 import {
-    getUserInteractions,
-    getSentInteractions,
+    getInvitations,
+    getInbox,
+    markConversationRead,
     getConversation,
     sendFreelancerMessage,
-    updateInteractionStatus,
     type Interaction,
 } from '../services/freelancerInteractionsApi';
 import { GET_USER_DETAILS_ENDPOINT } from '../services/buyerApi';
@@ -60,39 +60,22 @@ const ChatRoom: React.FC = () => {
         if (!userId) return;
         setLoadingList(true);
         try {
-            const [received, sent] = await Promise.all([
-                getUserInteractions(userId),
-                getSentInteractions(userId),
+            const [received, inbox] = await Promise.all([
+                getInvitations(userId),
+                getInbox(userId),
             ]);
-            const invitationsList = (received.interactions || []).filter((i) => i.type === 'invitation');
-            setInvitations(invitationsList);
+            setInvitations(received.interactions || []);
 
-            const messageInteractions = [
-                ...(received.interactions || []).filter((i) => i.type === 'message'),
-                ...(sent.interactions || []).filter((i) => i.type === 'message'),
-            ];
-            const byOther: Record<string, { last: Interaction; unread: number }> = {};
-            for (const m of messageInteractions) {
-                const other = m.senderId === userId ? m.receiverId! : m.senderId;
-                const existing = byOther[other];
-                const isIncoming = m.receiverId === userId;
-                const unread = isIncoming && (m.status === 'unread' || !m.status) ? 1 : 0;
-                if (!existing || new Date(m.createdAt).getTime() > new Date(existing.last.createdAt).getTime()) {
-                    byOther[other] = { last: m, unread: existing ? existing.unread + unread : unread };
-                } else if (isIncoming && (m.status === 'unread' || !m.status)) {
-                    byOther[other].unread += 1;
-                }
-            }
             const list: ConversationMeta[] = await Promise.all(
-                Object.entries(byOther).map(async ([otherUserId, { last, unread }]) => {
-                    const { name, image } = await resolveUser(otherUserId);
+                inbox.conversations.map(async (c) => {
+                    const { name, image } = await resolveUser(c.otherUserId);
                     return {
-                        otherUserId,
+                        otherUserId: c.otherUserId,
                         otherUserName: name,
                         otherUserImage: image,
-                        lastMessage: last.content || '',
-                        lastAt: last.createdAt,
-                        unreadCount: unread,
+                        lastMessage: c.lastMessage || '',
+                        lastAt: c.lastAt,
+                        unreadCount: c.unreadCount,
                     };
                 })
             );
@@ -164,9 +147,8 @@ const ChatRoom: React.FC = () => {
             try {
                 const { messages: thread } = await getConversation(userId, otherUserId);
                 setMessages(thread);
-                const unreadIds = thread.filter((m) => m.senderId === otherUserId && (m.status === 'unread' || !m.status)).map((m) => m.interactionId);
-                for (const id of unreadIds) {
-                    await updateInteractionStatus(id, 'read');
+                if (thread.some((m) => m.senderId === otherUserId && (m.status === 'unread' || !m.status))) {
+                    await markConversationRead(userId, otherUserId);
                 }
                 setConversations((prev) =>
                     prev.map((c) => (c.otherUserId === otherUserId ? { ...c, unreadCount: 0 } : c))
@@ -546,6 +546,9 @@ const ProblemSolvingView: React.FC<ProblemSolvingViewProps> = ({
   // Discussion state
   const [discussions, setDiscussions] = useState<DiscussionComment[]>([]);
   const [isLoadingDiscussions, setIsLoadingDiscussions] = useState(false);
+  // Cursor for the next page of threads (the API returns 20 per page)
+  const [discussionsCursor, setDiscussionsCursor] = useState<string | null>(null);
+  const [isLoadingMoreDiscussions, setIsLoadingMoreDiscussions] = useState(false);
   const [newComment, setNewComment] = useState('');
   const [replyingTo, setReplyingTo] = useState<string | null>(null);
   const [replyContent, setReplyContent] = useState('');
@@ -767,12 +770,15 @@ const ProblemSolvingView: React.FC<ProblemSolvingViewProps> = ({
     }
   }, [activeTab, question.id]);
 
-  // Fetch discussions from API
-  const fetchDiscussions = async () => {
-    setIsLoadingDiscussions(true);
+  // Fetch discussions from API; with a cursor the next page is appended
+  const fetchDiscussions = async (cursor?: string) => {
+    const setLoading = cursor ? setIsLoadingMoreDiscussions : setIsLoadingDiscussions;
+    setLoading(true);
     try {
-      const url = `${DISCUSSION_API}?questionId=${question.id}${currentUserId ? `&userId=${currentUserId}` : ''}`;
-      const response = await fetch(url, {
+      const params = new URLSearchParams({ questionId: question.id });
+      if (currentUserId) params.set('userId', currentUserId);
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`${DISCUSSION_API}?${params.toString()}`, {
         method: 'GET',
         headers: { 'Content-Type': 'application/json' }
       });
@@ -780,19 +786,30 @@ const ProblemSolvingView: React.FC<ProblemSolvingViewProps> = ({
       if (response.ok) {
         const data = await response.json();
         if (data.success && data.data?.discussions) {
-          setDiscussions(data.data.discussions);
-        } else {
+          const page: DiscussionComment[] = data.data.discussions;
+          setDiscussions(prev => cursor
+            ? [...prev, ...page.filter(d => !prev.some(p => p.commentId === d.commentId))]
+            : page);
+          setDiscussionsCursor(data.data.nextCursor || null);
+        } else if (!cursor) {
           setDiscussions([]);
+          setDiscussionsCursor(null);
         }
       } else {
         console.error('Failed to fetch discussions');
-        setDiscussions([]);
+        if (!cursor) {
+          setDiscussions([]);
+          setDiscussionsCursor(null);
+        }
       }
     } catch (error) {
       console.error('Error fetching discussions:', error);
-      setDiscussions([]);
+      if (!cursor) {
+        setDiscussions([]);
+        setDiscussionsCursor(null);
+      }
     } finally {
-      setIsLoadingDiscussions(false);
+      setLoading(false);
     }
   };
 
@@ -954,9 +971,9 @@ const ProblemSolvingView: React.FC<ProblemSolvingViewProps> = ({
       return d;
     }));
 
-    // Send to API
+    // Send to API (a 409 means the comment is busy - retry once after a short pause)
     try {
-      const response = await fetch(DISCUSSION_API, {
+      const sendVote = () => fetch(DISCUSSION_API, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -966,6 +983,11 @@ const ProblemSolvingView: React.FC<ProblemSolvingViewProps> = ({
           voteType
         })
       });
+      let response = await sendVote();
+      if (response.status === 409) {
+        await new Promise(resolve => setTimeout(resolve, 250 + Math.random() * 250));
+        response = await sendVote();
+      }
 
       if (!response.ok) {
         // Revert on error - refetch discussions
@@ -1615,6 +1637,19 @@ const ProblemSolvingView: React.FC<ProblemSolvingViewProps> = ({
                     </div>
                   </div>
                 ))}
+
+                {/* Load more threads */}
+                {!isLoadingDiscussions && discussionsCursor && (
+                  <div className="flex justify-center pt-2">
+                    <button
+                      onClick={() => fetchDiscussions(discussionsCursor)}
+                      disabled={isLoadingMoreDiscussions}
+                      className="px-4 py-2 text-sm font-medium text-teal-600 dark:text-teal-400 border border-teal-200 dark:border-teal-800 rounded-lg hover:bg-teal-50 dark:hover:bg-teal-900/20 disabled:opacity-50 transition-colors"
+                    >
+                      {isLoadingMoreDiscussions ? 'Loading...' : 'Load more discussions'}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
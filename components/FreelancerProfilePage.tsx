@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth, useNavigation } from '../App';
 import { useDashboard } from '../context/DashboardContext';
-import { GET_USER_DETAILS_ENDPOINT } from '../services/buyerApi';
+import { GET_USER_DETAILS_ENDPOINT, fetchIntegrations } from '../services/buyerApi';
 import { addFreelancerReview, getFreelancerReviews, sendFreelancerMessage, type Interaction } from '../services/freelancerInteractionsApi';
 import verifiedFreelanceSvg from '../lottiefiles/verified_freelance.svg';
 
@@ -85,11 +85,14 @@ const FreelancerProfilePage: React.FC = () => {
       setLoading(true);
       setError(null);
       try {
-        const res = await fetch(GET_USER_DETAILS_ENDPOINT, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ userId: freelancerId }),
-        });
+        const [res, integrations] = await Promise.all([
+          fetch(GET_USER_DETAILS_ENDPOINT, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ userId: freelancerId }),
+          }),
+          fetchIntegrations(freelancerId),
+        ]);
         const data = await res.json();
         const user = data.data || data.user || data;
         if (!user || data.success === false) {
@@ -108,7 +111,10 @@ const FreelancerProfilePage: React.FC = () => {
           profileImage: picture,
           isFreelancer: user.isFreelancer === true,
           skills: Array.isArray(user.skills) ? user.skills : [],
-          freelancerProjects: Array.isArray(user.freelancerProjects) ? user.freelancerProjects : [],
+          // Freelancer projects are stored apart from the profile
+          freelancerProjects: Array.isArray(integrations.freelancerProjects)
+            ? integrations.freelancerProjects
+            : Array.isArray(user.freelancerProjects) ? user.freelancerProjects : [],
         });
         // Always show encoded param in URL so the raw id is never exposed
         if (typeof window !== 'undefined' && window.history.replaceState && freelancerId) {
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import type { BuyerProject } from './BuyerProjectCard';
 import BuyerProjectCard from './BuyerProjectCard';
 import GitHubContributionHeatmap from './GitHubContributionHeatmap';
+import { fetchIntegrations } from '../services/buyerApi';
 
 const GET_USER_DETAILS_ENDPOINT = 'https://5d1gdw7t26.execute-api.ap-south-2.amazonaws.com/default/Get_userdetails_and_His_Projects_By_UserId';
 
@@ -169,6 +170,10 @@ const SellerProfilePage: React.FC<SellerProfilePageProps> = ({ seller, sellerPro
       const data: ApiResponse = await response.json();
 
       if (data.success && data.user) {
+        if (!data.user.githubData) {
+          const integrations = await fetchIntegrations(seller.id);
+          data.user.githubData = integrations.githubData;
+        }
         const mappedSeller = mapApiUserToSeller(data.user);
 
         // Calculate total sales from projects
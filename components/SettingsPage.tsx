@@ -3,6 +3,7 @@ import SkeletonDashboard from './ui/skeleton-dashboard';
 import { useAuth, useNavigation, usePremium } from '../App';
 import GitHubContributionHeatmap from './GitHubContributionHeatmap';
 import verifiedFreelanceSvg from '../lottiefiles/verified_freelance.svg';
+import { fetchIntegrations } from '../services/buyerApi';
 
 const UPDATE_SETTINGS_ENDPOINT = 'https://ydcdsqspm3.execute-api.ap-south-2.amazonaws.com/default/Update_userdetails_in_settings';
 const GET_USER_ENDPOINT = 'https://6omszxa58g.execute-api.ap-south-2.amazonaws.com/default/Get_user_Details_by_his_Id';
@@ -268,17 +269,21 @@ const SettingsPage: React.FC = () => {
             }
 
             try {
-                const response = await fetch(GET_USER_ENDPOINT, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ userId }),
-                });
+                const [response, integrations] = await Promise.all([
+                    fetch(GET_USER_ENDPOINT, {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ userId }),
+                    }),
+                    fetchIntegrations(userId),
+                ]);
 
                 const data = await response.json();
                 console.log('Fetched user data:', data); // Debug log
 
                 // Handle response - check for user data in different formats
-                const user = data.data || data.user || data;
+                // (GitHub / Drive / freelancer projects are stored apart from the profile)
+                const user = { ...(data.data || data.user || data), ...integrations };
 
                 if (user && (data.success !== false)) {
                     // Profile fields
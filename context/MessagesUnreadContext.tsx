@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useCallback, ReactNode } from 'react';
-import { getUserInteractions } from '../services/freelancerInteractionsApi';
+import { getInbox } from '../services/freelancerInteractionsApi';
 
 interface MessagesUnreadContextType {
     unreadMessageCount: number;
@@ -17,11 +17,8 @@ export const MessagesUnreadProvider: React.FC<{ children: ReactNode; userId: str
             return;
         }
         try {
-            const { interactions } = await getUserInteractions(userId);
-            const count = interactions.filter(
-                (i) => i.type === 'message' && (i.status === 'unread' || !i.status)
-            ).length;
-            setUnreadMessageCount(count);
+            const { totalUnread } = await getInbox(userId);
+            setUnreadMessageCount(totalUnread);
         } catch {
             setUnreadMessageCount(0);
         }
@@ -9,10 +9,12 @@ import json
 import boto3
 import urllib.request
 import urllib.error
+from user_profile_cache import UserProfileCache
 
 USERS_TABLE = "Users"
 dynamodb = boto3.resource("dynamodb")
 users_table = dynamodb.Table(USERS_TABLE)
+profile_cache = UserProfileCache()
 
 # Weights for engineering/tech architect ATS (must sum to 100)
 WEIGHTS = {
@@ -41,8 +43,7 @@ def response(status, body):
 def get_user_llm_config(user_id):
     """Returns (keys_dict, models_dict). keys: { openai: 'sk-...', ... }, models: { openai: 'gpt-4o-mini', ... }."""
     try:
-        r = users_table.get_item(Key={"userId": user_id})
-        item = r.get("Item")
+        item = profile_cache.get(users_table, user_id, ("userId", "llmApiKeys", "llmModels"))
         if not item:
             return None, None
         keys = item.get("llmApiKeys") or {}
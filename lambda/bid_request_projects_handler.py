@@ -6,6 +6,19 @@ DynamoDB Table: BidRequestProjects
 Primary Key: projectId (String)
 GSI: buyerId-index (for querying projects by buyer)
 GSI: status-index (for querying by status)
+GSI: status-createdAt-index (PK status, SK createdAt - open feed, newest first)
+GSI: statusCategory-createdAt-index (PK statusCategory = "<status>#<category>", SK createdAt)
+
+DynamoDB Table: BidRequestProjectSkills (skill posting index for open projects)
+Primary Key: skill (String, lowercased), Sort Key: createdAtProjectId (String, "<createdAt>#<projectId>")
+
+DynamoDB Table: BidRequestProjectStats (maintained feed aggregates)
+Primary Key: statKey (String) - item "open" holds maxBudget / maxBudgetStale
+
+Feed keys and the maxBudget aggregate are shared with bids_handler through
+project_feed.py - package it with this function.
+Recommendation scoring is shared with freelancers_handler through
+skill_matching.py - package it as well.
 
 Actions:
 - CREATE_PROJECT: Create a new bid request project (by buyer)
@@ -15,20 +28,38 @@ Actions:
 - UPDATE_PROJECT: Update project details
 - UPDATE_PROJECT_STATUS: Update project status (open/in_progress/completed/cancelled)
 - DELETE_PROJECT: Delete a project
+- RECOMMEND_PROJECTS: Top-N open projects for a freelancer, scored by skill overlap and rate fit
+
+Direct invocation only (not routed from API Gateway):
+- BACKFILL_FEED_INDEXES: Populate statusCategory, skill postings and feed stats for existing projects
 """
 
 import json
+import base64
 import boto3
 import uuid
 import traceback
 from datetime import datetime
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
 from decimal import Decimal
+from project_feed import (
+    STATUS_INDEX, STATUS_CATEGORY_INDEX, OPEN_STATS_KEY,
+    status_category, raise_max_budget, mark_max_budget_stale
+)
+from skill_matching import skill_rarity, rate_fit
 
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 bid_request_projects_table = dynamodb.Table('BidRequestProjects')
 users_table = dynamodb.Table('Users')
+project_skills_table = dynamodb.Table('BidRequestProjectSkills')
+project_stats_table = dynamodb.Table('BidRequestProjectStats')
+
+DEFAULT_MAX_BUDGET = 50000
+MAX_PAGE_SIZE = 100
+BATCH_GET_LIMIT = 100
+DEFAULT_RECOMMENDATIONS = 10
 
 # Helper to convert Decimal to float for JSON serialization
 def decimal_to_float(obj):
@@ -55,6 +86,270 @@ def response(status_code, body):
     }
 
 
+# ---------- FEED INDEX HELPERS ----------
+def normalize_skill(skill):
+    return str(skill).strip().lower()
+
+
+def encode_cursor(key):
+    """Turn a LastEvaluatedKey (or skill-path position) into an opaque cursor"""
+    if not key:
+        return None
+    raw = json.dumps(decimal_to_float(key)).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+class InvalidCursor(ValueError):
+    """A cursor that is malformed or was issued by the other feed path"""
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError, AttributeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(key, dict):
+        raise InvalidCursor(cursor)
+    return key
+
+
+def parse_page_size(value, default=None):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE; ValueError if it is not an integer"""
+    if not value:
+        return default
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError(f"limit must be an integer, got {value!r}")
+
+
+def invalid_limit_response():
+    return response(400, {
+        "success": False,
+        "error": {
+            "code": "VALIDATION_ERROR",
+            "message": "limit must be an integer"
+        }
+    })
+
+
+def posting_sort_key(project):
+    return f"{project.get('createdAt', '')}#{project['projectId']}"
+
+
+def put_skill_postings(project, skills=None):
+    """Add the project to the posting list of each of its skills"""
+    with project_skills_table.batch_writer() as batch:
+        for skill in {normalize_skill(s) for s in (skills if skills is not None else project.get('skills', []))}:
+            batch.put_item(Item={
+                'skill': skill,
+                'createdAtProjectId': posting_sort_key(project),
+                'projectId': project['projectId'],
+                'category': project.get('category', 'General'),
+                'createdAt': project.get('createdAt', ''),
+                # Carried on the posting so recommendations can score without fetching the project
+                'buyerId': project.get('buyerId', ''),
+                'projectType': project.get('projectType', 'fixed'),
+                'currency': project.get('currency', 'USD'),
+                'budgetMin': Decimal(str(project.get('budgetMin', 0))),
+                'budgetMax': Decimal(str(project.get('budgetMax', 0)))
+            })
+
+
+def delete_skill_postings(project, skills=None):
+    """Remove the project from the posting list of each of its skills"""
+    with project_skills_table.batch_writer() as batch:
+        for skill in {normalize_skill(s) for s in (skills if skills is not None else project.get('skills', []))}:
+            batch.delete_item(Key={'skill': skill, 'createdAtProjectId': posting_sort_key(project)})
+
+
+def recompute_max_budget():
+    """Recompute maxBudget from the open-project index (budgetMax projection only)"""
+    max_budget = Decimal('0')
+    query_kwargs = {
+        'IndexName': STATUS_INDEX,
+        'KeyConditionExpression': Key('status').eq('open'),
+        'ProjectionExpression': 'budgetMax'
+    }
+    while True:
+        result = bid_request_projects_table.query(**query_kwargs)
+        for p in result.get('Items', []):
+            max_budget = max(max_budget, Decimal(str(p.get('budgetMax', 0))))
+        if not result.get('LastEvaluatedKey'):
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    
+    project_stats_table.put_item(Item={
+        'statKey': OPEN_STATS_KEY,
+        'maxBudget': max_budget,
+        'maxBudgetStale': False,
+        'updatedAt': datetime.utcnow().isoformat() + "Z"
+    })
+    return max_budget
+
+
+def get_max_budget():
+    """Read the maintained maxBudget aggregate, recomputing it only when stale"""
+    try:
+        stats = project_stats_table.get_item(Key={'statKey': OPEN_STATS_KEY}).get('Item')
+        if not stats or stats.get('maxBudgetStale'):
+            max_budget = recompute_max_budget()
+        else:
+            max_budget = stats.get('maxBudget', 0)
+        return float(max_budget) or DEFAULT_MAX_BUDGET
+    except Exception as e:
+        print(f"Error reading feed stats: {str(e)}")
+        return DEFAULT_MAX_BUDGET
+
+
+def on_project_opened(project):
+    """Feed maintenance when a project enters the open feed"""
+    try:
+        put_skill_postings(project)
+        raise_max_budget(project_stats_table, project.get('budgetMax', 0))
+    except Exception as e:
+        print(f"Error updating feed indexes for {project['projectId']}: {str(e)}")
+
+
+def on_project_closed(project):
+    """Feed maintenance when a project leaves the open feed"""
+    try:
+        delete_skill_postings(project)
+        mark_max_budget_stale(project_stats_table, project.get('budgetMax', 0))
+    except Exception as e:
+        print(f"Error updating feed indexes for {project['projectId']}: {str(e)}")
+
+
+def delete_posting_keys(skills, sort_key):
+    """Drop a project's postings by key when the project itself is gone"""
+    with project_skills_table.batch_writer() as batch:
+        for skill in skills:
+            batch.delete_item(Key={'skill': skill, 'createdAtProjectId': sort_key})
+
+
+def batch_get_postings(skills, sort_keys):
+    """Which (skill, createdAtProjectId) postings exist, via key-only BatchGetItem"""
+    keys = [{'skill': skill, 'createdAtProjectId': sort_key} for skill in skills for sort_key in sort_keys]
+    table_name = project_skills_table.name
+    found = set()
+    for i in range(0, len(keys), BATCH_GET_LIMIT):
+        request = {table_name: {
+            'Keys': keys[i:i + BATCH_GET_LIMIT],
+            'ProjectionExpression': '#skill, createdAtProjectId',
+            'ExpressionAttributeNames': {'#skill': 'skill'}
+        }}
+        while request:
+            result = dynamodb.batch_get_item(RequestItems=request)
+            for item in result.get('Responses', {}).get(table_name, []):
+                found.add((item['skill'], item['createdAtProjectId']))
+            request = result.get('UnprocessedKeys') or None
+    return found
+
+
+def batch_get_projects(project_ids):
+    """Fetch projects by id with BatchGetItem (100 keys per call, unprocessed keys retried)"""
+    projects = {}
+    table_name = bid_request_projects_table.name
+    for i in range(0, len(project_ids), BATCH_GET_LIMIT):
+        request = {table_name: {'Keys': [{'projectId': pid} for pid in project_ids[i:i + BATCH_GET_LIMIT]]}}
+        while request:
+            result = dynamodb.batch_get_item(RequestItems=request)
+            for item in result.get('Responses', {}).get(table_name, []):
+                projects[item['projectId']] = item
+            request = result.get('UnprocessedKeys') or None
+    return projects
+
+
+def query_open_feed(category, limit, cursor):
+    """One page of open projects (newest first) from the status / statusCategory index"""
+    if category:
+        query_kwargs = {
+            'IndexName': STATUS_CATEGORY_INDEX,
+            'KeyConditionExpression': Key('statusCategory').eq(status_category('open', category))
+        }
+    else:
+        query_kwargs = {
+            'IndexName': STATUS_INDEX,
+            'KeyConditionExpression': Key('status').eq('open')
+        }
+    query_kwargs['ScanIndexForward'] = False
+    if cursor:
+        start_key = decode_cursor(cursor)
+        if 'projectId' not in start_key:
+            raise InvalidCursor(cursor)
+        query_kwargs['ExclusiveStartKey'] = start_key
+    
+    projects = []
+    while True:
+        if limit:
+            query_kwargs['Limit'] = limit - len(projects)
+        result = bid_request_projects_table.query(**query_kwargs)
+        projects.extend(result.get('Items', []))
+        last_key = result.get('LastEvaluatedKey')
+        # Without a limit, return the whole feed (existing clients expect it)
+        if not last_key or (limit and len(projects) >= limit):
+            break
+        query_kwargs['ExclusiveStartKey'] = last_key
+    
+    return projects, encode_cursor(last_key)
+
+
+def query_skill_feed(skills, category, limit, cursor):
+    """
+    Open projects having ALL the given skills, newest first, via the skill
+    posting index. The first skill's posting list is walked newest first from
+    the cursor position, a batch at a time; candidates are checked against the
+    other skills with key-only BatchGetItem (postings of one project share a
+    sort key). A page therefore reads about `limit` postings per skill instead
+    of whole posting lists. Only the page of matching projects is fetched.
+    """
+    driver, *others = sorted({normalize_skill(s) for s in skills})
+    key_condition = Key('skill').eq(driver)
+    if cursor:
+        after = decode_cursor(cursor).get('after')
+        if not isinstance(after, str):
+            raise InvalidCursor(cursor)
+        key_condition = key_condition & Key('createdAtProjectId').lt(after)
+    query_kwargs = {
+        'KeyConditionExpression': key_condition,
+        'ScanIndexForward': False,
+        'Limit': limit + 1 if limit and not others else BATCH_GET_LIMIT
+    }
+    if category:
+        query_kwargs['FilterExpression'] = Attr('category').eq(category)
+    
+    matches = []
+    while not (limit and len(matches) > limit):
+        result = project_skills_table.query(**query_kwargs)
+        candidates = result.get('Items', [])
+        if others and candidates:
+            found = batch_get_postings(others, [c['createdAtProjectId'] for c in candidates])
+            candidates = [c for c in candidates if all((s, c['createdAtProjectId']) in found for s in others)]
+        matches.extend(candidates)
+        if not result.get('LastEvaluatedKey'):
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    
+    page = matches[:limit] if limit else matches
+    fetched = batch_get_projects([m['projectId'] for m in page])
+    projects = []
+    for posting in page:
+        project = fetched.get(posting['projectId'])
+        if project and project.get('status') == 'open':
+            projects.append(project)
+        elif project:
+            # Closed elsewhere (e.g. bid accepted) - drop the stale postings
+            delete_skill_postings(project)
+        else:
+            # Deleted without its postings being cleaned up
+            delete_posting_keys([driver, *others], posting['createdAtProjectId'])
+    
+    next_cursor = None
+    if limit and len(matches) > limit:
+        next_cursor = encode_cursor({'after': page[-1]['createdAtProjectId']})
+    return projects, next_cursor
+
+
 # ---------- CREATE PROJECT ----------
 def handle_create_project(body):
     """Create a new bid request project (posted by buyer)"""
@@ -91,6 +386,7 @@ def handle_create_project(body):
         'category': body.get('category', 'General'),
         'attachments': body.get('attachments', []),  # URLs to any attachments
         'status': 'open',  # open, in_progress, completed, cancelled
+        'statusCategory': status_category('open', body.get('category', 'General')),
         'bidsCount': 0,
         'createdAt': timestamp,
         'updatedAt': timestamp,
@@ -100,6 +396,7 @@ def handle_create_project(body):
     
     try:
         bid_request_projects_table.put_item(Item=project_item)
+        on_project_opened(project_item)
         
         return response(201, {
             "success": True,
@@ -123,37 +420,27 @@ def handle_create_project(body):
 
 # ---------- GET ALL PROJECTS (for freelancers to browse) ----------
 def handle_get_all_projects(body):
-    """Get all open bid request projects for freelancers to browse"""
+    """
+    Get open bid request projects for freelancers to browse, newest first.
+    Reads the status / statusCategory index (or the skill posting index when
+    skills are given) instead of scanning. Pass limit to page with nextCursor;
+    without it the whole open feed is returned.
+    """
     try:
-        # Query for open projects
-        scan_params = {
-            'FilterExpression': Attr('status').eq('open')
-        }
-        
-        # Optional: filter by category
-        if body.get('category'):
-            scan_params['FilterExpression'] = scan_params['FilterExpression'] & Attr('category').eq(body['category'])
+        limit = parse_page_size(body.get('limit'))
+    except ValueError:
+        return invalid_limit_response()
+    try:
+        cursor = body.get('cursor')
+        category = body.get('category')
         
-        # Optional: filter by skills
         if body.get('skills') and len(body['skills']) > 0:
-            for skill in body['skills']:
-                scan_params['FilterExpression'] = scan_params['FilterExpression'] & Attr('skills').contains(skill)
-        
-        result = bid_request_projects_table.scan(**scan_params)
-        projects = result.get('Items', [])
-        
-        # Calculate max budget for dynamic filters
-        max_budget = 0
-        for p in projects:
-            p_max = float(p.get('budgetMax', 0))
-            if p_max > max_budget:
-                max_budget = p_max
-        
-        if max_budget == 0:
-            max_budget = 50000
+            projects, next_cursor = query_skill_feed(body['skills'], category, limit, cursor)
+        else:
+            projects, next_cursor = query_open_feed(category, limit, cursor)
         
-        # Sort by createdAt (newest first)
-        projects.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
+        # Max budget for dynamic filters comes from the maintained aggregate
+        max_budget = get_max_budget()
         
         # Calculate time ago for each project
         for project in projects:
@@ -164,7 +451,16 @@ def handle_get_all_projects(body):
             "data": {
                 "projects": projects,
                 "count": len(projects),
-                "maxBudget": max_budget
+                "maxBudget": max_budget,
+                "nextCursor": next_cursor
+            }
+        })
+    except InvalidCursor:
+        return response(400, {
+            "success": False,
+            "error": {
+                "code": "INVALID_CURSOR",
+                "message": "cursor is invalid or belongs to a different feed query"
             }
         })
     except Exception as e:
@@ -365,6 +661,12 @@ def handle_update_project(body):
                 else:
                     expression_values[f":{field}"] = body[field]
         
+        # Keep the statusCategory index key in step with the category
+        if 'category' in body:
+            update_expressions.append("#statusCategory = :statusCategory")
+            expression_names["#statusCategory"] = "statusCategory"
+            expression_values[":statusCategory"] = status_category(project.get('status', 'open'), body['category'])
+        
         # Always update updatedAt
         update_expressions.append("#updatedAt = :updatedAt")
         expression_names["#updatedAt"] = "updatedAt"
@@ -386,6 +688,13 @@ def handle_update_project(body):
             ExpressionAttributeValues=expression_values
         )
         
+        # Re-post skills / adjust the budget aggregate for open projects
+        feed_fields = ['skills', 'category', 'budgetMin', 'budgetMax']
+        if project.get('status', 'open') == 'open' and any(f in body for f in feed_fields):
+            updated = {**project, **{f: body[f] for f in feed_fields if f in body}}
+            on_project_closed(project)
+            on_project_opened(updated)
+        
         return response(200, {
             "success": True,
             "message": "Project updated successfully"
@@ -453,17 +762,25 @@ def handle_update_project_status(body):
         
         bid_request_projects_table.update_item(
             Key={'projectId': project_id},
-            UpdateExpression="SET #status = :status, #updatedAt = :updatedAt",
+            UpdateExpression="SET #status = :status, #statusCategory = :statusCategory, #updatedAt = :updatedAt",
             ExpressionAttributeNames={
                 "#status": "status",
+                "#statusCategory": "statusCategory",
                 "#updatedAt": "updatedAt"
             },
             ExpressionAttributeValues={
                 ":status": new_status,
+                ":statusCategory": status_category(new_status, project.get('category')),
                 ":updatedAt": datetime.utcnow().isoformat() + "Z"
             }
         )
         
+        old_status = project.get('status', 'open')
+        if old_status == 'open' and new_status != 'open':
+            on_project_closed(project)
+        elif old_status != 'open' and new_status == 'open':
+            on_project_opened(project)
+        
         return response(200, {
             "success": True,
             "message": f"Project status updated to {new_status}"
@@ -518,6 +835,8 @@ def handle_delete_project(body):
             })
         
         bid_request_projects_table.delete_item(Key={'projectId': project_id})
+        if project.get('status', 'open') == 'open':
+            on_project_closed(project)
         
         return response(200, {
             "success": True,
@@ -536,7 +855,7 @@ def handle_delete_project(body):
 
 # ---------- INCREMENT BIDS COUNT ----------
 def handle_increment_bids_count(body):
-    """Increment the bids count for a project (called when a new bid is placed)"""
+    """Increment the bids count for a project (CREATE_BID now does this in its own transaction; kept for older clients)"""
     project_id = body.get('projectId')
     
     if not project_id:
@@ -572,7 +891,7 @@ def handle_increment_bids_count(body):
 
 # ---------- DECREMENT BIDS COUNT ----------
 def handle_decrement_bids_count(body):
-    """Decrement the bids count for a project (called when a bid is withdrawn/deleted)"""
+    """Decrement the bids count for a project (DELETE_BID now does this in its own transaction; kept for older clients)"""
     project_id = body.get('projectId')
     
     if not project_id:
@@ -617,6 +936,157 @@ def handle_decrement_bids_count(body):
         })
 
 
+# ---------- BACKFILL FEED INDEXES ----------
+def handle_backfill_feed_indexes(body):
+    """
+    One-off migration for projects created before the feed indexes existed:
+    sets statusCategory, rebuilds skill postings for open projects and
+    recomputes the maxBudget aggregate. Safe to re-run.
+    """
+    try:
+        scan_kwargs = {}
+        updated = 0
+        posted = 0
+        while True:
+            result = bid_request_projects_table.scan(**scan_kwargs)
+            for project in result.get('Items', []):
+                status = project.get('status', 'open')
+                key = status_category(status, project.get('category'))
+                if project.get('statusCategory') != key:
+                    bid_request_projects_table.update_item(
+                        Key={'projectId': project['projectId']},
+                        UpdateExpression="SET #statusCategory = :statusCategory",
+                        ExpressionAttributeNames={"#statusCategory": "statusCategory"},
+                        ExpressionAttributeValues={":statusCategory": key}
+                    )
+                    updated += 1
+                if status == 'open':
+                    put_skill_postings(project)
+                    posted += 1
+            if not result.get('LastEvaluatedKey'):
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        
+        max_budget = recompute_max_budget()
+        
+        return response(200, {
+            "success": True,
+            "message": "Feed indexes backfilled",
+            "data": {
+                "statusCategoryUpdated": updated,
+                "openProjectsPosted": posted,
+                "maxBudget": max_budget
+            }
+        })
+    except Exception as e:
+        print(f"Error backfilling feed indexes: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {
+                "code": "DATABASE_ERROR",
+                "message": "Failed to backfill feed indexes"
+            }
+        })
+
+
+# ---------- RECOMMEND PROJECTS ----------
+def handle_recommend_projects(body):
+    """
+    Recommended open projects for a freelancer. Candidates come from the
+    skill posting lists of the freelancer's skills; each is scored by the
+    rarity-weighted overlap times the hourly-rate fit, and only the top N
+    projects are fetched.
+    """
+    freelancer_id = body.get('freelancerId')
+    if not freelancer_id:
+        return response(400, {
+            "success": False,
+            "error": {
+                "code": "VALIDATION_ERROR",
+                "message": "Missing required field: freelancerId"
+            }
+        })
+    
+    try:
+        limit = parse_page_size(body.get('limit'), DEFAULT_RECOMMENDATIONS)
+    except ValueError:
+        return invalid_limit_response()
+    try:
+        user = users_table.get_item(
+            Key={'userId': freelancer_id},
+            ProjectionExpression='skills, hourlyRate, currency'
+        ).get('Item') or {}
+        
+        skills = body.get('skills') or user.get('skills', [])
+        if isinstance(skills, str):
+            skills = [s.strip() for s in skills.split(',') if s.strip()]
+        hourly_rate = float(user.get('hourlyRate', 0) or 0)
+        currency = user.get('currency', 'USD')
+        
+        scores = {}
+        matched = {}
+        postings = {}
+        for skill in {normalize_skill(s) for s in skills if str(s).strip()}:
+            query_kwargs = {'KeyConditionExpression': Key('skill').eq(skill)}
+            skill_postings = []
+            while True:
+                result = project_skills_table.query(**query_kwargs)
+                skill_postings.extend(result.get('Items', []))
+                if not result.get('LastEvaluatedKey'):
+                    break
+                query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+            
+            weight = skill_rarity(len(skill_postings))
+            for posting in skill_postings:
+                pid = posting['projectId']
+                if posting.get('buyerId') == freelancer_id:
+                    continue
+                scores[pid] = scores.get(pid, 0) + weight
+                matched.setdefault(pid, []).append(skill)
+                postings[pid] = posting
+        
+        for pid in scores:
+            scores[pid] *= rate_fit(hourly_rate, postings[pid], currency)
+        
+        ranked = sorted(scores, key=lambda pid: (scores[pid], posting_sort_key(postings[pid])), reverse=True)
+        # Fetch a little extra in case some candidates closed since they were posted
+        candidates = ranked[:limit * 2]
+        fetched = batch_get_projects(candidates)
+        
+        projects = []
+        for pid in candidates:
+            project = fetched.get(pid)
+            if not project or project.get('status') != 'open':
+                if project:
+                    delete_skill_postings(project)
+                else:
+                    delete_posting_keys(matched[pid], posting_sort_key(postings[pid]))
+                continue
+            project['matchScore'] = round(scores[pid], 4)
+            project['matchedSkills'] = sorted(matched[pid])
+            project['postedTimeAgo'] = calculate_time_ago(project.get('createdAt', ''))
+            projects.append(project)
+            if len(projects) >= limit:
+                break
+        
+        return response(200, {
+            "success": True,
+            "data": {
+                "projects": projects,
+                "count": len(projects)
+            }
+        })
+    except Exception as e:
+        print(f"Error recommending projects: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {
+                "code": "DATABASE_ERROR",
+                "message": "Failed to recommend projects"
+            }
+        })
+
+
 # ---------- MAIN HANDLER ----------
 def lambda_handler(event, context):
     """Main Lambda handler"""
@@ -638,8 +1108,9 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Parse request body
-        body = {}
+        # Parse request body; direct invocations (no API Gateway body) pass the request as the event
+        direct = 'body' not in event
+        body = event if direct else {}
         if event.get('body'):
             body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
         
@@ -657,7 +1128,10 @@ def lambda_handler(event, context):
             'DELETE_PROJECT': handle_delete_project,
             'INCREMENT_BIDS_COUNT': handle_increment_bids_count,
             'DECREMENT_BIDS_COUNT': handle_decrement_bids_count,
+            'RECOMMEND_PROJECTS': handle_recommend_projects,
         }
+        if direct:
+            handlers['BACKFILL_FEED_INDEXES'] = handle_backfill_feed_indexes
         
         handler = handlers.get(action)
         
@@ -7,6 +7,15 @@ Primary Key: bidId (String)
 GSI: projectId-index (for querying bids by project)
 GSI: freelancerId-index (for querying bids by freelancer)
 
+DynamoDB Table: BidMarkers (one bid per freelancer per project)
+Primary Key: markerKey (String, "<freelancerId>#<projectId>") -> bidId
+Written in the same transaction as the bid and the project's bidsCount.
+
+Accepting a bid closes the project in the open feed using the keys in
+project_feed.py - package it with this function.
+Freelancer cards on bid lists are cached with user_profile_cache.py - package
+it (and ttl_cache.py, which it builds on) as well.
+
 Actions:
 - CREATE_BID: Create a new bid/proposal
 - GET_BIDS_BY_PROJECT: Get all bids for a specific project
@@ -15,19 +24,46 @@ Actions:
 - UPDATE_BID_STATUS: Update bid status (accept/reject)
 - DELETE_BID: Delete a bid
 - CHECK_EXISTING_BID: Check if freelancer already bid on a project
+
+Direct invocation only (not routed from API Gateway):
+- BACKFILL_BID_MARKERS: Create markers for existing bids and recount bidsCount per project
 """
 
 import json
+import time
 import boto3
 import uuid
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
 from decimal import Decimal
+from project_feed import status_category, mark_max_budget_stale
+from user_profile_cache import UserProfileCache
 
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 bids_table = dynamodb.Table('Bids')
 users_table = dynamodb.Table('Users')
+bid_request_projects_table = dynamodb.Table('BidRequestProjects')
+project_stats_table = dynamodb.Table('BidRequestProjectStats')
+bid_markers_table = dynamodb.Table('BidMarkers')
+
+# TransactWriteItems accepts at most 100 actions per call
+TRANSACT_CHUNK_SIZE = 100
+REJECT_WORKERS = 8
+TRANSACT_MAX_ATTEMPTS = 5
+
+# Freelancer cards on bid lists: fields read from Users, kept in the shared
+# warm-container profile cache
+BATCH_GET_LIMIT = 100
+PROFILE_FIELDS = ['userId', 'fullName', 'username', 'profilePictureUrl', 'profileImage',
+                  'isVerified', 'reviewCount', 'ratingTotal']
+profile_cache = UserProfileCache()
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
 
 # Helper to convert Decimal to float for JSON serialization
 def decimal_to_float(obj):
@@ -69,6 +105,214 @@ def response(status_code, body):
     }
 
 
+# ---------- BID ACCEPTANCE ----------
+def to_attribute_values(values):
+    """Serialize plain values to low-level DynamoDB attribute values"""
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+
+def marker_key(freelancer_id, project_id):
+    """Key of the one-bid-per-freelancer-per-project marker"""
+    return f"{freelancer_id}#{project_id}"
+
+
+class AcceptConflict(Exception):
+    """Acceptance refused: bid or project missing, project closed, or another bid already accepted"""
+    def __init__(self, status_code, code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+
+def commit_acceptance(bid, timestamp):
+    """
+    Accept the bid and move the project to in_progress in one transaction.
+    Re-running for the same bid succeeds (idempotent); accepting a second bid
+    on the same project, or any bid on a project that is no longer open, is
+    refused.
+    """
+    project_id = bid['projectId']
+    project = bid_request_projects_table.get_item(
+        Key={'projectId': project_id},
+        ProjectionExpression='category, budgetMax'
+    ).get('Item')
+    if not project:
+        raise AcceptConflict(404, "NOT_FOUND", "Project not found")
+    
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Update': {
+                'TableName': bids_table.name,
+                'Key': to_attribute_values({'bidId': bid['bidId']}),
+                'UpdateExpression': "SET #status = :s, updatedAt = :u",
+                'ConditionExpression': "attribute_exists(bidId)",
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': to_attribute_values({':s': 'accepted', ':u': timestamp})
+            }},
+            {'Update': {
+                'TableName': bid_request_projects_table.name,
+                'Key': to_attribute_values({'projectId': project_id}),
+                'UpdateExpression': "SET #status = :s, statusCategory = :sc, updatedAt = :u, acceptedBidId = :bid, acceptedFreelancerId = :freelancer",
+                'ConditionExpression': (
+                    "attribute_exists(projectId) AND ("
+                    "((attribute_not_exists(#status) OR #status = :open) AND attribute_not_exists(acceptedBidId))"
+                    " OR acceptedBidId = :bid)"
+                ),
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': to_attribute_values({
+                    ':s': 'in_progress',
+                    ':open': 'open',
+                    ':sc': status_category('in_progress', project.get('category')),
+                    ':u': timestamp,
+                    ':bid': bid['bidId'],
+                    ':freelancer': bid['freelancerId']
+                }),
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }}
+        ])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or [{}, {}]
+        if reasons[0].get('Code') == 'ConditionalCheckFailed':
+            raise AcceptConflict(404, "NOT_FOUND", "Bid not found")
+        if reasons[1].get('Code') == 'ConditionalCheckFailed':
+            if 'Item' not in reasons[1]:
+                raise AcceptConflict(404, "NOT_FOUND", "Project not found")
+            if 'acceptedBidId' in reasons[1]['Item']:
+                raise AcceptConflict(409, "BID_ALREADY_ACCEPTED", "Another bid has already been accepted for this project")
+            project_status = deserializer.deserialize(reasons[1]['Item']['status'])
+            raise AcceptConflict(400, "PROJECT_CLOSED", f"This project is no longer accepting bids (status: {project_status})")
+        raise
+    
+    # The project left the open feed; if it held the max budget,
+    # have the feed recompute it (skill postings are cleaned lazily)
+    try:
+        mark_max_budget_stale(project_stats_table, project.get('budgetMax', 0))
+    except ClientError as e:
+        print(f"Warning: Could not update feed stats: {str(e)}")
+
+
+def get_pending_bid_ids(project_id, exclude_bid_id):
+    """Ids of the project's still-pending bids (key-only projection, all pages)"""
+    query_kwargs = {
+        'IndexName': 'projectId-index',
+        'KeyConditionExpression': Key('projectId').eq(project_id),
+        'ProjectionExpression': 'bidId, #status',
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+    bid_ids = []
+    while True:
+        result = bids_table.query(**query_kwargs)
+        bid_ids.extend(
+            b['bidId'] for b in result.get('Items', [])
+            if b['bidId'] != exclude_bid_id and b.get('status', 'pending') == 'pending'
+        )
+        if not result.get('LastEvaluatedKey'):
+            break
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    return bid_ids
+
+
+def reject_bid_chunk(bid_ids, timestamp):
+    """
+    Reject up to TRANSACT_CHUNK_SIZE bids in one transaction, each conditioned
+    on still being pending (legacy bids without a status count as pending). Bids that changed meanwhile are dropped from the
+    chunk and the rest retried. Returns the ids actually rejected.
+    """
+    remaining = list(bid_ids)
+    for attempt in range(TRANSACT_MAX_ATTEMPTS):
+        if not remaining:
+            return []
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                {'Update': {
+                    'TableName': bids_table.name,
+                    'Key': to_attribute_values({'bidId': bid_id}),
+                    'UpdateExpression': "SET #status = :s, updatedAt = :u",
+                    'ConditionExpression': "attribute_not_exists(#status) OR #status = :pending",
+                    'ExpressionAttributeNames': {'#status': 'status'},
+                    'ExpressionAttributeValues': to_attribute_values({
+                        ':s': 'rejected', ':u': timestamp, ':pending': 'pending'
+                    })
+                }}
+                for bid_id in remaining
+            ])
+            return remaining
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or []
+            changed = {
+                bid_id for bid_id, reason in zip(remaining, reasons)
+                if reason.get('Code') == 'ConditionalCheckFailed'
+            }
+            remaining = [bid_id for bid_id in remaining if bid_id not in changed]
+            if not changed:
+                # Conflict with a concurrent write - back off and retry the chunk
+                time.sleep(0.05 * (2 ** attempt))
+    raise Exception(f"Could not reject {len(remaining)} bids after {TRANSACT_MAX_ATTEMPTS} attempts")
+
+
+def reject_other_bids(project_id, accepted_bid_id, timestamp):
+    """Reject every other pending bid of the project in concurrent transactional chunks"""
+    bid_ids = get_pending_bid_ids(project_id, accepted_bid_id)
+    chunks = [bid_ids[i:i + TRANSACT_CHUNK_SIZE] for i in range(0, len(bid_ids), TRANSACT_CHUNK_SIZE)]
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(REJECT_WORKERS, len(chunks))) as executor:
+        results = list(executor.map(lambda chunk: reject_bid_chunk(chunk, timestamp), chunks))
+    return [bid_id for rejected in results for bid_id in rejected]
+
+
+# ---------- FREELANCER PROFILES ----------
+def batch_get_profiles(user_ids):
+    """Projected Users items via BatchGetItem (100 keys per call, unprocessed keys retried)"""
+    profiles = {}
+    table_name = users_table.name
+    for i in range(0, len(user_ids), BATCH_GET_LIMIT):
+        request = {table_name: {
+            'Keys': [{'userId': uid} for uid in user_ids[i:i + BATCH_GET_LIMIT]],
+            'ProjectionExpression': ', '.join(f'#f{n}' for n in range(len(PROFILE_FIELDS))),
+            'ExpressionAttributeNames': {f'#f{n}': field for n, field in enumerate(PROFILE_FIELDS)}
+        }}
+        attempt = 0
+        while request:
+            result = dynamodb.batch_get_item(RequestItems=request)
+            for item in result.get('Responses', {}).get(table_name, []):
+                profiles[item['userId']] = item
+            request = result.get('UnprocessedKeys') or None
+            if request:
+                time.sleep(0.05 * (2 ** min(attempt, 4)))
+                attempt += 1
+    return profiles
+
+
+def get_freelancer_profiles(user_ids):
+    """
+    Live freelancer profiles for a bid list. Served from the warm-container
+    cache where fresh; only the misses are fetched, in one batched read.
+    """
+    return profile_cache.get_many(users_table, user_ids, PROFILE_FIELDS, fetch=batch_get_profiles)
+
+
+def freelancer_card(bid, profile):
+    """Freelancer fields of a bid, live from the profile when there is one"""
+    if not profile:
+        return {'freelancerName': bid['freelancerName']}
+    review_count = int(profile.get('reviewCount', 0))
+    rating = float(profile.get('ratingTotal', 0)) / review_count if review_count else 0
+    return {
+        'freelancerName': profile.get('fullName') or bid['freelancerName'],
+        'freelancerUsername': profile.get('username', ''),
+        'freelancerProfileImage': profile.get('profilePictureUrl') or profile.get('profileImage', ''),
+        'freelancerVerified': bool(profile.get('isVerified', False)),
+        'freelancerRating': round(rating, 1),
+        'freelancerReviewsCount': review_count
+    }
+
+
 # ---------- CREATE BID ----------
 def handle_create_bid(body):
     """Create a new bid/proposal for a project"""
@@ -148,35 +392,6 @@ def handle_create_bid(body):
             }
         })
     
-    # Check if freelancer has already bid on this project
-    existing_bid = check_existing_bid(freelancer_id, project_id)
-    if existing_bid:
-        return response(409, {
-            "success": False,
-            "error": {
-                "code": "DUPLICATE_BID",
-                "message": "You have already submitted a bid for this project"
-            },
-            "existingBid": existing_bid
-        })
-    
-    # Check if project is still open for bidding
-    try:
-        bid_request_projects_table = dynamodb.Table('BidRequestProjects')
-        project_result = bid_request_projects_table.get_item(Key={'projectId': project_id})
-        if 'Item' in project_result:
-            project_status = project_result['Item'].get('status', 'open')
-            if project_status != 'open':
-                return response(400, {
-                    "success": False,
-                    "error": {
-                        "code": "PROJECT_CLOSED",
-                        "message": f"This project is no longer accepting bids (status: {project_status})"
-                    }
-                })
-    except Exception as proj_check_error:
-        print(f"Warning: Could not verify project status: {str(proj_check_error)}")
-    
     # Create the bid
     bid_id = str(uuid.uuid4())
     timestamp = datetime.utcnow().isoformat() + "Z"
@@ -198,16 +413,79 @@ def handle_create_bid(body):
     }
     
     try:
-        bids_table.put_item(Item=bid_item)
-        
-        return response(201, {
-            "success": True,
-            "message": "Bid submitted successfully",
-            "data": {
-                "bidId": bid_id,
-                "projectId": project_id,
-                "status": "pending",
-                "submittedAt": timestamp
+        # Uniqueness marker, bid and project bidsCount in one transaction:
+        # duplicates and closed projects are refused by the conditions.
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': bid_markers_table.name,
+                'Item': to_attribute_values({
+                    'markerKey': marker_key(freelancer_id, project_id),
+                    'bidId': bid_id,
+                    'createdAt': timestamp
+                }),
+                'ConditionExpression': "attribute_not_exists(markerKey)",
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }},
+            {'Put': {
+                'TableName': bids_table.name,
+                'Item': to_attribute_values(bid_item),
+                'ConditionExpression': "attribute_not_exists(bidId)"
+            }},
+            {'Update': {
+                'TableName': bid_request_projects_table.name,
+                'Key': to_attribute_values({'projectId': project_id}),
+                'UpdateExpression': "ADD bidsCount :one",
+                'ConditionExpression': "attribute_exists(projectId) AND (attribute_not_exists(#status) OR #status = :open)",
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': to_attribute_values({':one': 1, ':open': 'open'}),
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }}
+        ])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            print(f"Error creating bid: {str(e)}")
+            return response(500, {
+                "success": False,
+                "error": {
+                    "code": "DATABASE_ERROR",
+                    "message": "Failed to submit bid"
+                }
+            })
+        reasons = e.response.get('CancellationReasons') or [{}, {}, {}]
+        if reasons[0].get('Code') == 'ConditionalCheckFailed':
+            existing_bid_id = deserializer.deserialize(reasons[0]['Item']['bidId']) if 'Item' in reasons[0] else None
+            existing_bid = bids_table.get_item(Key={'bidId': existing_bid_id}).get('Item') if existing_bid_id else None
+            return response(409, {
+                "success": False,
+                "error": {
+                    "code": "DUPLICATE_BID",
+                    "message": "You have already submitted a bid for this project"
+                },
+                "existingBid": existing_bid
+            })
+        if reasons[2].get('Code') == 'ConditionalCheckFailed':
+            if 'Item' not in reasons[2]:
+                return response(404, {
+                    "success": False,
+                    "error": {
+                        "code": "NOT_FOUND",
+                        "message": "Project not found"
+                    }
+                })
+            project_status = deserializer.deserialize(reasons[2]['Item'].get('status', {'S': 'open'}))
+            return response(400, {
+                "success": False,
+                "error": {
+                    "code": "PROJECT_CLOSED",
+                    "message": f"This project is no longer accepting bids (status: {project_status})"
+                }
+            })
+        print(f"Error creating bid: {str(e)}")
+        return response(409, {
+            "success": False,
+            "error": {
+                "code": "CONFLICT",
+                "message": "Bid could not be submitted, please retry"
             }
         })
     except Exception as e:
@@ -219,6 +497,17 @@ def handle_create_bid(body):
                 "message": "Failed to submit bid"
             }
         })
+    
+    return response(201, {
+        "success": True,
+        "message": "Bid submitted successfully",
+        "data": {
+            "bidId": bid_id,
+            "projectId": project_id,
+            "status": "pending",
+            "submittedAt": timestamp
+        }
+    })
 
 
 # ---------- GET BIDS BY PROJECT ----------
@@ -247,6 +536,13 @@ def handle_get_bids_by_project(body):
         # Sort by submission date (newest first)
         bids.sort(key=lambda x: x.get('submittedAt', ''), reverse=True)
         
+        # Live freelancer cards (the name on the bid was copied at bid time)
+        try:
+            profiles = get_freelancer_profiles([bid['freelancerId'] for bid in bids])
+        except Exception as profile_error:
+            print(f"Warning: Could not load freelancer profiles: {str(profile_error)}")
+            profiles = {}
+        
         # Map to frontend format
         formatted_bids = []
         for bid in bids:
@@ -262,7 +558,8 @@ def handle_get_bids_by_project(body):
                 'deliveryTimeUnit': bid['deliveryTimeUnit'],
                 'proposal': bid['proposal'],
                 'status': bid.get('status', 'pending'),
-                'submittedAt': bid['submittedAt']
+                'submittedAt': bid['submittedAt'],
+                **freelancer_card(bid, profiles.get(bid['freelancerId']))
             })
         
         return response(200, {
@@ -443,56 +740,32 @@ def handle_update_bid_status(body):
         bid = bid_result['Item']
         project_id = bid['projectId']
         
-        # Update the bid status
-        bids_table.update_item(
-            Key={'bidId': bid_id},
-            UpdateExpression="SET #status = :s, updatedAt = :u",
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':s': new_status,
-                ':u': timestamp
-            }
-        )
-        
-        # If bid is ACCEPTED, reject all other pending bids and update project status
         rejected_bids = []
         if new_status == 'accepted':
-            # Get all other bids for this project
-            other_bids_result = bids_table.query(
-                IndexName='projectId-index',
-                KeyConditionExpression=Key('projectId').eq(project_id)
-            )
-            
-            # Reject all other pending bids
-            for other_bid in other_bids_result.get('Items', []):
-                if other_bid['bidId'] != bid_id and other_bid.get('status') == 'pending':
-                    bids_table.update_item(
-                        Key={'bidId': other_bid['bidId']},
-                        UpdateExpression="SET #status = :s, updatedAt = :u",
-                        ExpressionAttributeNames={'#status': 'status'},
-                        ExpressionAttributeValues={
-                            ':s': 'rejected',
-                            ':u': timestamp
-                        }
-                    )
-                    rejected_bids.append(other_bid['bidId'])
-            
-            # Update project status to 'in_progress'
+            # Commit point: accepted bid + project status in one transaction.
+            # Rejections follow in concurrent chunks; if any chunk fails, the
+            # same request can simply be retried to finish them.
             try:
-                bid_request_projects_table = dynamodb.Table('BidRequestProjects')
-                bid_request_projects_table.update_item(
-                    Key={'projectId': project_id},
-                    UpdateExpression="SET #status = :s, updatedAt = :u, acceptedBidId = :bid, acceptedFreelancerId = :freelancer",
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={
-                        ':s': 'in_progress',
-                        ':u': timestamp,
-                        ':bid': bid_id,
-                        ':freelancer': bid['freelancerId']
+                commit_acceptance(bid, timestamp)
+            except AcceptConflict as conflict:
+                return response(conflict.status_code, {
+                    "success": False,
+                    "error": {
+                        "code": conflict.code,
+                        "message": conflict.message
                     }
-                )
-            except Exception as proj_error:
-                print(f"Warning: Could not update project status: {str(proj_error)}")
+                })
+            rejected_bids = reject_other_bids(project_id, bid_id, timestamp)
+        else:
+            bids_table.update_item(
+                Key={'bidId': bid_id},
+                UpdateExpression="SET #status = :s, updatedAt = :u",
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={
+                    ':s': new_status,
+                    ':u': timestamp
+                }
+            )
         
         return response(200, {
             "success": True,
@@ -518,6 +791,47 @@ def handle_update_bid_status(body):
 
 
 # ---------- DELETE BID ----------
+def delete_bid_with_marker(bid):
+    """
+    Delete a bid together with its uniqueness marker and decrement the
+    project's bidsCount in one transaction. If the project no longer exists
+    (or its count is already 0) the bid and marker are still deleted.
+    """
+    transact_items = [{'Delete': {
+        'TableName': bids_table.name,
+        'Key': to_attribute_values({'bidId': bid['bidId']})
+    }}]
+    if bid.get('projectId'):
+        transact_items.append({'Delete': {
+            'TableName': bid_markers_table.name,
+            'Key': to_attribute_values({'markerKey': marker_key(bid['freelancerId'], bid['projectId'])}),
+            'ConditionExpression': "attribute_not_exists(bidId) OR bidId = :bid",
+            'ExpressionAttributeValues': to_attribute_values({':bid': bid['bidId']})
+        }})
+        transact_items.append({'Update': {
+            'TableName': bid_request_projects_table.name,
+            'Key': to_attribute_values({'projectId': bid['projectId']}),
+            'UpdateExpression': "ADD bidsCount :minusOne",
+            'ConditionExpression': "bidsCount > :zero",
+            'ExpressionAttributeValues': to_attribute_values({':minusOne': -1, ':zero': 0})
+        }})
+    
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or []
+        failed = {i for i, reason in enumerate(reasons) if reason.get('Code') == 'ConditionalCheckFailed'}
+        if not failed or 0 in failed:
+            raise
+        # Marker owned by another (legacy duplicate) bid, or nothing to
+        # decrement - delete what still applies
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[item for i, item in enumerate(transact_items) if i not in failed]
+        )
+
+
 def handle_delete_bid(body):
     """Delete a bid - Only the freelancer who submitted can delete"""
     bid_id = body.get('bidId')
@@ -557,8 +871,8 @@ def handle_delete_bid(body):
                 }
             })
         
-        # Delete the bid
-        bids_table.delete_item(Key={'bidId': bid_id})
+        # Delete the bid, its marker and the project's count together
+        delete_bid_with_marker(bid)
         
         return response(200, {
             "success": True,
@@ -577,17 +891,14 @@ def handle_delete_bid(body):
 
 # ---------- CHECK EXISTING BID ----------
 def check_existing_bid(freelancer_id, project_id):
-    """Helper function to check if freelancer already bid on a project"""
+    """Helper function to check if freelancer already bid on a project (O(1) marker lookup)"""
     try:
-        result = bids_table.query(
-            IndexName='freelancerId-index',
-            KeyConditionExpression=Key('freelancerId').eq(freelancer_id),
-            FilterExpression=Attr('projectId').eq(project_id)
-        )
-        
-        if result.get('Items'):
-            return result['Items'][0]
-        return None
+        marker = bid_markers_table.get_item(
+            Key={'markerKey': marker_key(freelancer_id, project_id)}
+        ).get('Item')
+        if not marker:
+            return None
+        return bids_table.get_item(Key={'bidId': marker['bidId']}).get('Item')
     except Exception as e:
         print(f"Error checking existing bid: {str(e)}")
         return None
@@ -634,6 +945,71 @@ def handle_check_existing_bid(body):
     })
 
 
+# ---------- BACKFILL BID MARKERS ----------
+def handle_backfill_bid_markers(body):
+    """
+    One-off migration for bids created before the markers existed: writes a
+    marker for every bid (the earliest bid wins for legacy duplicates) and
+    sets each project's bidsCount to its exact number of bids. Safe to re-run.
+    """
+    try:
+        bids = []
+        scan_kwargs = {'ProjectionExpression': 'bidId, projectId, freelancerId, submittedAt'}
+        while True:
+            result = bids_table.scan(**scan_kwargs)
+            bids.extend(result.get('Items', []))
+            if not result.get('LastEvaluatedKey'):
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        
+        markers = {}
+        counts = {}
+        for bid in sorted(bids, key=lambda b: b.get('submittedAt', '')):
+            if not bid.get('projectId') or not bid.get('freelancerId'):
+                continue
+            markers.setdefault(marker_key(bid['freelancerId'], bid['projectId']), bid)
+            counts[bid['projectId']] = counts.get(bid['projectId'], 0) + 1
+        
+        with bid_markers_table.batch_writer() as batch:
+            for key, bid in markers.items():
+                batch.put_item(Item={
+                    'markerKey': key,
+                    'bidId': bid['bidId'],
+                    'createdAt': bid.get('submittedAt', '')
+                })
+        
+        for project_id, count in counts.items():
+            try:
+                bid_request_projects_table.update_item(
+                    Key={'projectId': project_id},
+                    UpdateExpression="SET bidsCount = :c",
+                    ConditionExpression="attribute_exists(projectId)",
+                    ExpressionAttributeValues={':c': count}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        
+        return response(200, {
+            "success": True,
+            "message": "Bid markers backfilled",
+            "data": {
+                "markersWritten": len(markers),
+                "duplicateBids": sum(counts.values()) - len(markers),
+                "projectsRecounted": len(counts)
+            }
+        })
+    except Exception as e:
+        print(f"Error backfilling bid markers: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {
+                "code": "DATABASE_ERROR",
+                "message": "Failed to backfill bid markers"
+            }
+        })
+
+
 # ---------- LAMBDA HANDLER ----------
 def lambda_handler(event, context):
     """Main Lambda handler - routes requests to appropriate functions"""
@@ -655,11 +1031,14 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Parse request body
-        if isinstance(event.get('body'), str):
+        # Parse request body; direct invocations (no API Gateway body) pass the request as the event
+        direct = 'body' not in event
+        if direct:
+            body = event
+        elif isinstance(event.get('body'), str):
             body = json.loads(event['body'])
         else:
-            body = event.get('body', {})
+            body = event.get('body') or {}
         
         # For GET requests with query parameters
         if event.get('httpMethod') == 'GET':
@@ -678,6 +1057,8 @@ def lambda_handler(event, context):
             'DELETE_BID': handle_delete_bid,
             'CHECK_EXISTING_BID': handle_check_existing_bid,
         }
+        if direct:
+            action_handlers['BACKFILL_BID_MARKERS'] = handle_backfill_bid_markers
         
         handler = action_handlers.get(action)
         
@@ -1,13 +1,52 @@
 import json
+import math
+import time
+import random
+import base64
 import boto3
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
 
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+BATCH_GET_WORKERS = 4
+BATCH_GET_MAX_RETRIES = 5
+
+# Thread read model:
+# - Top-level comments carry topLevelQuestionId = questionId. The sparse GSI
+#   TopLevelIndex (PK topLevelQuestionId, SK createdAt) therefore holds only
+#   top-level comments, so listing a thread never reads replies.
+# - Parents maintain repliesCount and replyPreviewIds (ids of the first
+#   REPLY_PREVIEW_SIZE replies), which get_discussions inlines with one BatchGetItem.
+THREAD_INDEX = 'TopLevelIndex'
+# Replies by parent (PK parentCommentId, SK createdAt)
+REPLY_INDEX = 'ParentCommentIndex'
+# Same sparse key, sorted by rankScore (Wilson lower bound of the up/down votes)
+RANK_INDEX = 'TopLevelRankIndex'
+SORT_INDEXES = {'new': THREAD_INDEX, 'top': RANK_INDEX}
+WILSON_Z = 1.96  # 95% confidence
+REPLY_PREVIEW_SIZE = 3
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Votes: the vote row change and the comment's counter deltas (ADD) commit in
+# one TransactWriteItems call, conditioned only on the vote the user currently
+# holds, so voters on a hot comment never invalidate each other's counts.
+# rankScore is then written from the committed counts, conditioned on them.
+VOTE_COUNTERS = {'upvote': 'upvotes', 'downvote': 'downvotes'}
+VOTE_MAX_ATTEMPTS = 5
+VOTE_RETRY_BASE_SECONDS = 0.02
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
 # Try to initialize tables - they may not exist
 discussions_table = None
 votes_table = None
@@ -42,6 +81,110 @@ class DecimalEncoder(json.JSONEncoder):
             return int(obj) if obj % 1 == 0 else float(obj)
         return super(DecimalEncoder, self).default(obj)
 
+def batch_get_items(table, keys, projection=None):
+    """
+    Fetch many items with BatchGetItem.
+    Keys are chunked to 100 per call, chunks run concurrently, and
+    UnprocessedKeys are retried with exponential backoff.
+    """
+    if not keys:
+        return []
+    
+    table_name = table.name
+    
+    def fetch_chunk(chunk):
+        items = []
+        request = {table_name: {'Keys': chunk}}
+        if projection:
+            request[table_name]['ProjectionExpression'] = projection
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(0.05 * (2 ** (attempt - 1)))
+            result = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(result.get('Responses', {}).get(table_name, []))
+            request = result.get('UnprocessedKeys') or {}
+            if not request:
+                break
+        else:
+            print(f"BatchGetItem left {len(request[table_name]['Keys'])} keys unprocessed")
+        return items
+    
+    chunks = [keys[i:i + BATCH_GET_LIMIT] for i in range(0, len(keys), BATCH_GET_LIMIT)]
+    if len(chunks) == 1:
+        return fetch_chunk(chunks[0])
+    
+    items = []
+    with ThreadPoolExecutor(max_workers=min(BATCH_GET_WORKERS, len(chunks))) as executor:
+        for chunk_items in executor.map(fetch_chunk, chunks):
+            items.extend(chunk_items)
+    return items
+
+def batch_get_user_votes(votes_tbl, comment_ids, user_id):
+    """Fetch a user's votes for many comments. Returns {commentId: voteType}."""
+    keys = [{'commentId': cid, 'userId': user_id} for cid in dict.fromkeys(comment_ids)]
+    items = batch_get_items(votes_tbl, keys, 'commentId, voteType')
+    return {item['commentId']: item.get('voteType') for item in items}
+
+def apply_user_votes(comments, user_id):
+    """Set hasUpvoted/hasDownvoted on each comment from the user's votes"""
+    votes_tbl = get_votes_table()
+    if not (user_id and comments and votes_tbl):
+        return
+    
+    try:
+        votes = batch_get_user_votes(votes_tbl, [c['commentId'] for c in comments], user_id)
+    except Exception as e:
+        print(f"Error fetching user votes: {str(e)}")
+        votes = {}
+    
+    for comment in comments:
+        vote_type = votes.get(comment['commentId'])
+        comment['hasUpvoted'] = vote_type == 'upvote'
+        comment['hasDownvoted'] = vote_type == 'downvote'
+
+def encode_cursor(last_evaluated_key):
+    """Turn a LastEvaluatedKey into an opaque cursor string"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, cls=DecimalEncoder).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+class InvalidCursor(ValueError):
+    """A cursor that was not issued by encode_cursor"""
+
+def decode_cursor(cursor):
+    """Turn a cursor string back into an ExclusiveStartKey"""
+    try:
+        # rankScore comes back as Decimal, which ExclusiveStartKey requires
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'), parse_float=Decimal)
+    except (ValueError, UnicodeError, AttributeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(key, dict) or 'commentId' not in key:
+        raise InvalidCursor(cursor)
+    return key
+
+def parse_page_size(value):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+
+def inline_reply_previews(table, discussions):
+    """
+    Attach the first replies of every discussion on the page using a single
+    (chunked) BatchGetItem over their replyPreviewIds. Returns the replies.
+    """
+    reply_ids = [rid for d in discussions for rid in d.get('replyPreviewIds', [])]
+    replies = batch_get_items(table, [{'commentId': rid} for rid in dict.fromkeys(reply_ids)])
+    by_id = {r['commentId']: r for r in replies}
+    
+    for discussion in discussions:
+        preview = [by_id[rid] for rid in discussion.pop('replyPreviewIds', []) if rid in by_id]
+        preview.sort(key=lambda r: r.get('createdAt', ''))
+        discussion['replies'] = preview
+    return replies
+
 def create_response(status_code, body):
     """Create standardized API response"""
     return {
@@ -56,14 +199,25 @@ def create_response(status_code, body):
     }
 
 def get_discussions(event):
-    """Get all discussions for a question"""
+    """Get a page of top-level discussions for a question, with the first replies inlined"""
     query_params = event.get('queryStringParameters', {}) or {}
     question_id = query_params.get('questionId')
     user_id = query_params.get('userId')  # Optional - to check if user has voted
+    limit = parse_page_size(query_params.get('limit') or DEFAULT_PAGE_SIZE)
+    cursor = query_params.get('cursor')
+    sort = query_params.get('sort') or 'new'  # 'new' or 'top'
     
     if not question_id:
         return create_response(400, {'success': False, 'error': 'questionId is required'})
     
+    if sort not in SORT_INDEXES:
+        return create_response(400, {'success': False, 'error': 'sort must be new or top'})
+    
+    try:
+        start_key = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        return create_response(400, {'success': False, 'error': 'Invalid cursor'})
+    
     table = get_discussions_table()
     if table is None:
         # Table doesn't exist - return empty discussions
@@ -72,53 +226,38 @@ def get_discussions(event):
             'success': True,
             'data': {
                 'discussions': [],
-                'count': 0
+                'count': 0,
+                'nextCursor': None
             },
             'message': 'Discussion feature not yet configured'
         })
     
     try:
-        # Query discussions for the question (top-level comments only)
-        response = table.query(
-            IndexName='QuestionIndex',
-            KeyConditionExpression=Key('questionId').eq(question_id),
-            FilterExpression='attribute_not_exists(parentCommentId) OR parentCommentId = :empty',
-            ExpressionAttributeValues={':empty': ''},
-            ScanIndexForward=False  # Newest first
-        )
+        # Query top-level comments from the sparse index (replies are not in it)
+        query_kwargs = {
+            'IndexName': SORT_INDEXES[sort],
+            'KeyConditionExpression': Key('topLevelQuestionId').eq(question_id),
+            'ScanIndexForward': False,  # Newest / best first
+            'Limit': limit
+        }
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
         
+        response = table.query(**query_kwargs)
         discussions = response.get('Items', [])
         
+        # Inline the first replies of each thread
+        replies = inline_reply_previews(table, discussions)
+        
         # If user_id provided, check their votes
-        votes_tbl = get_votes_table()
-        if user_id and discussions and votes_tbl:
-            comment_ids = [d['commentId'] for d in discussions]
-            
-            # Batch get user's votes
-            for discussion in discussions:
-                try:
-                    vote_response = votes_tbl.get_item(
-                        Key={
-                            'commentId': discussion['commentId'],
-                            'userId': user_id
-                        }
-                    )
-                    vote = vote_response.get('Item')
-                    if vote:
-                        discussion['hasUpvoted'] = vote.get('voteType') == 'upvote'
-                        discussion['hasDownvoted'] = vote.get('voteType') == 'downvote'
-                    else:
-                        discussion['hasUpvoted'] = False
-                        discussion['hasDownvoted'] = False
-                except:
-                    discussion['hasUpvoted'] = False
-                    discussion['hasDownvoted'] = False
+        apply_user_votes(discussions + replies, user_id)
         
         return create_response(200, {
             'success': True,
             'data': {
                 'discussions': discussions,
-                'count': len(discussions)
+                'count': len(discussions),
+                'nextCursor': encode_cursor(response.get('LastEvaluatedKey'))
             }
         })
         
@@ -129,7 +268,8 @@ def get_discussions(event):
             'success': True,
             'data': {
                 'discussions': [],
-                'count': 0
+                'count': 0,
+                'nextCursor': None
             },
             'error': str(e)
         })
@@ -175,21 +315,22 @@ def add_comment(event):
             'parentCommentId': parent_comment_id,
             'upvotes': 0,
             'downvotes': 0,
+            'rankScore': Decimal('0'),
             'repliesCount': 0,
             'createdAt': timestamp,
             'updatedAt': timestamp
         }
+        if not parent_comment_id:
+            # Only top-level comments enter the sparse thread index
+            comment['topLevelQuestionId'] = question_id
+            comment['replyPreviewIds'] = []
         
         # Save to DynamoDB
         table.put_item(Item=comment)
         
-        # If this is a reply, increment parent's reply count
+        # If this is a reply, increment parent's reply count (and preview it if there is room)
         if parent_comment_id:
-            table.update_item(
-                Key={'commentId': parent_comment_id},
-                UpdateExpression='SET repliesCount = if_not_exists(repliesCount, :zero) + :inc',
-                ExpressionAttributeValues={':inc': 1, ':zero': 0}
-            )
+            increment_reply_count(table, parent_comment_id, comment_id)
         
         return create_response(201, {
             'success': True,
@@ -203,6 +344,205 @@ def add_comment(event):
         print(f"Error adding comment: {str(e)}")
         return create_response(500, {'success': False, 'error': f'Failed to add comment: {str(e)}'})
 
+def increment_reply_count(table, parent_comment_id, reply_id):
+    """Bump repliesCount, appending the reply to replyPreviewIds while the preview has room"""
+    try:
+        table.update_item(
+            Key={'commentId': parent_comment_id},
+            UpdateExpression='SET repliesCount = if_not_exists(repliesCount, :zero) + :inc, '
+                             'replyPreviewIds = list_append(if_not_exists(replyPreviewIds, :empty), :reply)',
+            ConditionExpression='attribute_not_exists(replyPreviewIds) OR size(replyPreviewIds) < :k',
+            ExpressionAttributeValues={
+                ':inc': 1, ':zero': 0, ':empty': [], ':reply': [reply_id], ':k': REPLY_PREVIEW_SIZE
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # Preview is full - only the count changes
+        table.update_item(
+            Key={'commentId': parent_comment_id},
+            UpdateExpression='SET repliesCount = if_not_exists(repliesCount, :zero) + :inc',
+            ExpressionAttributeValues={':inc': 1, ':zero': 0}
+        )
+
+def decrement_reply_count(table, parent_comment_id, reply_id):
+    """Drop repliesCount and, if the reply was previewed, refill the preview"""
+    result = table.update_item(
+        Key={'commentId': parent_comment_id},
+        UpdateExpression='SET repliesCount = if_not_exists(repliesCount, :one) - :dec',
+        ConditionExpression='attribute_exists(commentId)',
+        ExpressionAttributeValues={':dec': 1, ':one': 1},
+        ReturnValues='ALL_NEW'
+    )
+    preview = result.get('Attributes', {}).get('replyPreviewIds', [])
+    
+    if reply_id in preview:
+        refill_reply_preview(table, parent_comment_id, reply_id, preview)
+
+def refill_reply_preview(table, parent_comment_id, removed_id, preview):
+    """
+    Replace replyPreviewIds with the first REPLY_PREVIEW_SIZE replies still in
+    the reply index, so deleting a previewed reply pulls the next one in.
+    The index may briefly still hold the deleted reply, so it is filtered out.
+    Conditioned on the preview we started from: if a concurrent add or delete
+    changed it first, theirs stands (inline_reply_previews skips deleted ids).
+    """
+    result = table.query(
+        IndexName=REPLY_INDEX,
+        KeyConditionExpression=Key('parentCommentId').eq(parent_comment_id),
+        ProjectionExpression='commentId',
+        ScanIndexForward=True,  # Oldest first
+        Limit=REPLY_PREVIEW_SIZE + 1
+    )
+    refreshed = [r['commentId'] for r in result.get('Items', []) if r['commentId'] != removed_id]
+    try:
+        table.update_item(
+            Key={'commentId': parent_comment_id},
+            UpdateExpression='SET replyPreviewIds = :refreshed',
+            ConditionExpression='replyPreviewIds = :preview',
+            ExpressionAttributeValues={':refreshed': refreshed[:REPLY_PREVIEW_SIZE], ':preview': preview}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"Reply preview of {parent_comment_id} changed concurrently; leaving it as is")
+
+def to_attribute_values(values):
+    """Serialize plain values to low-level DynamoDB attribute values"""
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def wilson_lower_bound(upvotes, downvotes):
+    """Lower bound of the Wilson score interval for the share of upvotes"""
+    n = upvotes + downvotes
+    if n <= 0:
+        return Decimal('0')
+    phat = upvotes / n
+    z2 = WILSON_Z * WILSON_Z
+    score = (phat + z2 / (2 * n) - WILSON_Z * math.sqrt((phat * (1 - phat) + z2 / (4 * n)) / n)) / (1 + z2 / n)
+    return Decimal(str(round(score, 6)))
+
+def read_vote_counts(item):
+    """Current counters from a comment item (missing counters are 0)"""
+    return {k: int(item.get(k, 0)) for k in ('upvotes', 'downvotes')}
+
+class VoteConflict(Exception):
+    """The vote kept colliding with concurrent writes; safe for the client to retry"""
+
+def build_vote_transaction(disc_table, votes_tbl, comment_id, user_id, vote_type, old_vote_type):
+    """
+    Build TransactItems that move a user's vote from old_vote_type (None if they
+    have not voted) to vote_type ('upvote', 'downvote' or 'remove').
+    The vote row write is conditioned on old_vote_type, so a stale guess cancels
+    the whole transaction instead of double counting; the counters move by ADD.
+    """
+    vote_key = {'commentId': comment_id, 'userId': user_id}
+    
+    if vote_type == 'remove':
+        action, vote_op = 'Delete', {
+            'TableName': votes_tbl.name,
+            'Key': to_attribute_values(vote_key),
+            'ConditionExpression': 'voteType = :old'
+        }
+    else:
+        action, vote_op = 'Put', {
+            'TableName': votes_tbl.name,
+            'Item': to_attribute_values({
+                **vote_key,
+                'voteType': vote_type,
+                'createdAt': datetime.utcnow().isoformat() + 'Z'
+            }),
+            'ConditionExpression': 'attribute_not_exists(userId)' if old_vote_type is None else 'voteType = :old'
+        }
+    if old_vote_type is not None:
+        vote_op['ExpressionAttributeValues'] = to_attribute_values({':old': old_vote_type})
+    vote_op['ReturnValuesOnConditionCheckFailure'] = 'ALL_OLD'
+    
+    deltas = {'upvotes': 0, 'downvotes': 0}
+    if old_vote_type in VOTE_COUNTERS:
+        deltas[VOTE_COUNTERS[old_vote_type]] -= 1
+    if vote_type in VOTE_COUNTERS:
+        deltas[VOTE_COUNTERS[vote_type]] += 1
+    
+    counter_op = {'Update': {
+        'TableName': disc_table.name,
+        'Key': to_attribute_values({'commentId': comment_id}),
+        'UpdateExpression': 'ADD upvotes :up, downvotes :down',
+        'ConditionExpression': 'attribute_exists(commentId)',
+        'ExpressionAttributeValues': to_attribute_values({':up': deltas['upvotes'], ':down': deltas['downvotes']})
+    }}
+    return [{action: vote_op}, counter_op]
+
+def update_rank_score(disc_table, comment_id, counts):
+    """
+    Store the Wilson score for `counts`, conditioned on the comment still having
+    them. If a later vote moved the counters first, its own update (which reads
+    after its commit) writes the newer score, so the last vote always wins.
+    """
+    try:
+        disc_table.update_item(
+            Key={'commentId': comment_id},
+            UpdateExpression='SET rankScore = :score',
+            ConditionExpression='upvotes = :up AND downvotes = :down',
+            ExpressionAttributeValues={
+                ':score': wilson_lower_bound(counts['upvotes'], counts['downvotes']),
+                ':up': counts['upvotes'],
+                ':down': counts['downvotes']
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+def apply_vote(disc_table, votes_tbl, comment_id, user_id, vote_type):
+    """
+    Apply a vote change atomically, starting from the common-case guess for the
+    user's current vote (none for a new vote, an upvote for a removal). A wrong
+    guess cancels the transaction with the real vote row, and we retry with it;
+    transaction conflicts are retried with jittered backoff.
+    Returns the resulting counts, or None if the comment does not exist.
+    Raises VoteConflict if the vote does not settle in VOTE_MAX_ATTEMPTS.
+    """
+    client = dynamodb.meta.client
+    old_vote_type = 'upvote' if vote_type == 'remove' else None
+    
+    for attempt in range(VOTE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, VOTE_RETRY_BASE_SECONDS * (2 ** attempt)))
+        if old_vote_type == vote_type or (vote_type == 'remove' and old_vote_type is None):
+            break  # Nothing to change
+        
+        try:
+            client.transact_write_items(TransactItems=build_vote_transaction(
+                disc_table, votes_tbl, comment_id, user_id, vote_type, old_vote_type
+            ))
+            break
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or [{}, {}]
+            vote_reason, counter_reason = reasons[0], reasons[1]
+            
+            if counter_reason.get('Code') == 'ConditionalCheckFailed':
+                return None
+            if vote_reason.get('Code') == 'ConditionalCheckFailed':
+                old_item = vote_reason.get('Item')
+                old_vote_type = deserializer.deserialize(old_item['voteType']) if old_item else None
+            # TransactionConflict: another vote on this comment raced us - back off and retry
+    else:
+        raise VoteConflict(f"Vote on {comment_id} did not settle after {VOTE_MAX_ATTEMPTS} attempts")
+    
+    comment = disc_table.get_item(
+        Key={'commentId': comment_id},
+        ProjectionExpression='commentId, upvotes, downvotes',
+        ConsistentRead=True
+    ).get('Item')
+    if not comment:
+        return None
+    counts = read_vote_counts(comment)
+    update_rank_score(disc_table, comment_id, counts)
+    return counts
+
 def vote_comment(event):
     """Upvote or downvote a comment"""
     try:
@@ -233,95 +573,43 @@ def vote_comment(event):
                 'error': 'Discussion feature not yet configured'
             })
         
-        # Check for existing vote (if votes table exists)
-        vote_key = {'commentId': comment_id, 'userId': user_id}
-        existing_vote = None
-        
-        if votes_tbl:
-            try:
-                existing_vote_response = votes_tbl.get_item(Key=vote_key)
-                existing_vote = existing_vote_response.get('Item')
-            except:
-                pass
-        
-        # Calculate vote changes
-        upvote_change = 0
-        downvote_change = 0
-        
-        if existing_vote:
-            old_vote_type = existing_vote.get('voteType')
-            
-            if vote_type == 'remove':
-                # Remove the vote
-                if votes_tbl:
-                    votes_tbl.delete_item(Key=vote_key)
-                if old_vote_type == 'upvote':
-                    upvote_change = -1
-                elif old_vote_type == 'downvote':
-                    downvote_change = -1
-            elif vote_type != old_vote_type:
-                # Change vote type
-                if votes_tbl:
-                    votes_tbl.put_item(Item={
-                        'commentId': comment_id,
-                        'userId': user_id,
-                        'voteType': vote_type,
-                        'createdAt': datetime.utcnow().isoformat() + 'Z'
-                    })
-                if old_vote_type == 'upvote':
-                    upvote_change = -1
-                elif old_vote_type == 'downvote':
-                    downvote_change = -1
-                if vote_type == 'upvote':
-                    upvote_change += 1
-                elif vote_type == 'downvote':
-                    downvote_change += 1
-            # If same vote type, do nothing
+        if votes_tbl is None:
+            # Without a votes table there is nothing to de-duplicate against;
+            # just ADD to the counter and score the counts it returns
+            counts = {}
+            if vote_type in VOTE_COUNTERS:
+                try:
+                    counts = read_vote_counts(disc_table.update_item(
+                        Key={'commentId': comment_id},
+                        UpdateExpression=f'ADD {VOTE_COUNTERS[vote_type]} :one',
+                        ConditionExpression='attribute_exists(commentId)',
+                        ExpressionAttributeValues={':one': 1},
+                        ReturnValues='ALL_NEW'
+                    ).get('Attributes', {}))
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    return create_response(404, {'success': False, 'error': 'Comment not found'})
+                update_rank_score(disc_table, comment_id, counts)
         else:
-            if vote_type != 'remove':
-                # Add new vote
-                if votes_tbl:
-                    votes_tbl.put_item(Item={
-                        'commentId': comment_id,
-                        'userId': user_id,
-                        'voteType': vote_type,
-                        'createdAt': datetime.utcnow().isoformat() + 'Z'
-                    })
-                if vote_type == 'upvote':
-                    upvote_change = 1
-                elif vote_type == 'downvote':
-                    downvote_change = 1
-        
-        # Update comment vote counts
-        update_expression_parts = []
-        expression_values = {}
-        
-        if upvote_change != 0:
-            update_expression_parts.append('upvotes = if_not_exists(upvotes, :zero) + :upvote_change')
-            expression_values[':upvote_change'] = upvote_change
-            expression_values[':zero'] = 0
-        
-        if downvote_change != 0:
-            update_expression_parts.append('downvotes = if_not_exists(downvotes, :zero2) + :downvote_change')
-            expression_values[':downvote_change'] = downvote_change
-            expression_values[':zero2'] = 0
-        
-        if update_expression_parts:
-            disc_table.update_item(
-                Key={'commentId': comment_id},
-                UpdateExpression='SET ' + ', '.join(update_expression_parts),
-                ExpressionAttributeValues=expression_values
-            )
-        
-        # Get updated comment
-        updated_comment = disc_table.get_item(Key={'commentId': comment_id}).get('Item', {})
+            try:
+                counts = apply_vote(disc_table, votes_tbl, comment_id, user_id, vote_type)
+            except VoteConflict as e:
+                print(str(e))
+                return create_response(409, {
+                    'success': False,
+                    'error': 'Too many concurrent votes on this comment, please retry',
+                    'retryable': True
+                })
+            if counts is None:
+                return create_response(404, {'success': False, 'error': 'Comment not found'})
         
         return create_response(200, {
             'success': True,
             'data': {
                 'commentId': comment_id,
-                'upvotes': updated_comment.get('upvotes', 0),
-                'downvotes': updated_comment.get('downvotes', 0),
+                'upvotes': counts.get('upvotes', 0),
+                'downvotes': counts.get('downvotes', 0),
                 'hasUpvoted': vote_type == 'upvote',
                 'hasDownvoted': vote_type == 'downvote'
             },
@@ -335,58 +623,51 @@ def vote_comment(event):
         return create_response(500, {'success': False, 'error': str(e)})
 
 def get_replies(event):
-    """Get replies for a comment"""
+    """Get a page of replies for a comment"""
     query_params = event.get('queryStringParameters', {}) or {}
     parent_comment_id = query_params.get('parentCommentId')
     user_id = query_params.get('userId')
+    limit = parse_page_size(query_params.get('limit') or MAX_PAGE_SIZE)
+    cursor = query_params.get('cursor')
     
     if not parent_comment_id:
         return create_response(400, {'success': False, 'error': 'parentCommentId is required'})
     
+    try:
+        start_key = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        return create_response(400, {'success': False, 'error': 'Invalid cursor'})
+    
     table = get_discussions_table()
     if table is None:
         return create_response(200, {
             'success': True,
-            'data': {'replies': [], 'count': 0}
+            'data': {'replies': [], 'count': 0, 'nextCursor': None}
         })
     
     try:
         # Query replies for the parent comment
-        response = table.query(
-            IndexName='ParentCommentIndex',
-            KeyConditionExpression=Key('parentCommentId').eq(parent_comment_id),
-            ScanIndexForward=True  # Oldest first for replies
-        )
+        query_kwargs = {
+            'IndexName': REPLY_INDEX,
+            'KeyConditionExpression': Key('parentCommentId').eq(parent_comment_id),
+            'ScanIndexForward': True,  # Oldest first for replies
+            'Limit': limit
+        }
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
         
+        response = table.query(**query_kwargs)
         replies = response.get('Items', [])
         
         # If user_id provided, check their votes
-        votes_tbl = get_votes_table()
-        if user_id and replies and votes_tbl:
-            for reply in replies:
-                try:
-                    vote_response = votes_tbl.get_item(
-                        Key={
-                            'commentId': reply['commentId'],
-                            'userId': user_id
-                        }
-                    )
-                    vote = vote_response.get('Item')
-                    if vote:
-                        reply['hasUpvoted'] = vote.get('voteType') == 'upvote'
-                        reply['hasDownvoted'] = vote.get('voteType') == 'downvote'
-                    else:
-                        reply['hasUpvoted'] = False
-                        reply['hasDownvoted'] = False
-                except:
-                    reply['hasUpvoted'] = False
-                    reply['hasDownvoted'] = False
+        apply_user_votes(replies, user_id)
         
         return create_response(200, {
             'success': True,
             'data': {
                 'replies': replies,
-                'count': len(replies)
+                'count': len(replies),
+                'nextCursor': encode_cursor(response.get('LastEvaluatedKey'))
             }
         })
         
@@ -394,7 +675,7 @@ def get_replies(event):
         print(f"Error getting replies: {str(e)}")
         return create_response(200, {
             'success': True,
-            'data': {'replies': [], 'count': 0}
+            'data': {'replies': [], 'count': 0, 'nextCursor': None}
         })
 
 def delete_comment(event):
@@ -435,11 +716,7 @@ def delete_comment(event):
         parent_comment_id = comment.get('parentCommentId')
         if parent_comment_id:
             try:
-                table.update_item(
-                    Key={'commentId': parent_comment_id},
-                    UpdateExpression='SET repliesCount = if_not_exists(repliesCount, :one) - :dec',
-                    ExpressionAttributeValues={':dec': 1, ':one': 1}
-                )
+                decrement_reply_count(table, parent_comment_id, comment_id)
             except:
                 pass  # Ignore if parent doesn't exist
         
@@ -454,6 +731,68 @@ def delete_comment(event):
         print(f"Error deleting comment: {str(e)}")
         return create_response(500, {'success': False, 'error': str(e)})
 
+def backfill_threads(event):
+    """
+    Populate the thread read model for comments created before it existed:
+    sets topLevelQuestionId on top-level comments, recomputes repliesCount
+    and replyPreviewIds on every parent, and rankScore on every comment.
+    Safe to re-run.
+    """
+    table = get_discussions_table()
+    if table is None:
+        return create_response(503, {'success': False, 'error': 'Discussion feature not yet configured'})
+    
+    try:
+        comments = []
+        scan_kwargs = {
+            'ProjectionExpression': 'commentId, questionId, parentCommentId, createdAt, upvotes, downvotes'
+        }
+        while True:
+            result = table.scan(**scan_kwargs)
+            comments.extend(result.get('Items', []))
+            if 'LastEvaluatedKey' not in result:
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        
+        replies_by_parent = {}
+        for c in comments:
+            if c.get('parentCommentId'):
+                replies_by_parent.setdefault(c['parentCommentId'], []).append(c)
+        
+        updated = 0
+        for c in comments:
+            score = wilson_lower_bound(int(c.get('upvotes', 0)), int(c.get('downvotes', 0)))
+            if c.get('parentCommentId'):
+                table.update_item(
+                    Key={'commentId': c['commentId']},
+                    UpdateExpression='SET rankScore = :score',
+                    ExpressionAttributeValues={':score': score}
+                )
+                continue
+            replies = sorted(replies_by_parent.get(c['commentId'], []), key=lambda r: r.get('createdAt', ''))
+            table.update_item(
+                Key={'commentId': c['commentId']},
+                UpdateExpression='SET topLevelQuestionId = :qid, repliesCount = :count, '
+                                 'replyPreviewIds = :preview, rankScore = :score',
+                ExpressionAttributeValues={
+                    ':qid': c['questionId'],
+                    ':count': len(replies),
+                    ':preview': [r['commentId'] for r in replies[:REPLY_PREVIEW_SIZE]],
+                    ':score': score
+                }
+            )
+            updated += 1
+        
+        return create_response(200, {
+            'success': True,
+            'data': {'commentsScanned': len(comments), 'threadsUpdated': updated},
+            'message': 'Thread index backfilled'
+        })
+        
+    except Exception as e:
+        print(f"Error backfilling threads: {str(e)}")
+        return create_response(500, {'success': False, 'error': str(e)})
+
 def lambda_handler(event, context):
     """Main Lambda handler"""
     print(f"Received event: {json.dumps(event)}")
@@ -465,6 +804,11 @@ def lambda_handler(event, context):
     if http_method == 'OPTIONS':
         return create_response(200, {'message': 'CORS OK'})
     
+    # Maintenance: full-table backfill runs on direct invocation only
+    # (API Gateway events always carry a body key)
+    if 'body' not in event and event.get('action') == 'backfill_threads':
+        return backfill_threads(event)
+    
     # Route based on method and action
     try:
         body = {}
@@ -497,6 +841,8 @@ def lambda_handler(event, context):
                 event['queryStringParameters'] = event.get('queryStringParameters', {}) or {}
                 event['queryStringParameters']['parentCommentId'] = body.get('parentCommentId')
                 event['queryStringParameters']['userId'] = body.get('userId')
+                event['queryStringParameters']['limit'] = body.get('limit')
+                event['queryStringParameters']['cursor'] = body.get('cursor')
                 return get_replies(event)
             else:
                 # Default POST is add_comment
@@ -8,6 +8,7 @@ import uuid
 dynamodb = boto3.resource('dynamodb')
 questions_table = dynamodb.Table('CodingQuestions')  # Main questions table
 test_cases_table = dynamodb.Table('CodingTestCases')  # Test cases table (optional, can be embedded)
+catalog_meta_table = dynamodb.Table('CodingQuestionsMeta')  # Catalog version stamp read by progress Lambdas
 
 # Response helper function
 def response(status_code, body):
@@ -23,6 +24,25 @@ def response(status_code, body):
     }
 
 
+def bump_catalog_version():
+    """
+    Bump the question catalog version stamp so warm progress Lambdas
+    reload their in-memory catalog (questionId -> difficulty/topic/companies).
+    Non-fatal: a missed bump only delays the refresh until the next write.
+    """
+    try:
+        catalog_meta_table.update_item(
+            Key={"metaKey": "catalog"},
+            UpdateExpression="ADD version :one SET updatedAt = :updatedAt",
+            ExpressionAttributeValues={
+                ':one': 1,
+                ':updatedAt': datetime.utcnow().isoformat() + "Z"
+            }
+        )
+    except Exception as e:
+        print(f"Error bumping catalog version: {str(e)}")
+
+
 # ========================================
 # CREATE QUESTION
 # ========================================
@@ -96,6 +116,7 @@ def create_question(body):
         
         # Store in DynamoDB
         questions_table.put_item(Item=question_item)
+        bump_catalog_version()
         
         return response(201, {
             "success": True,
@@ -356,6 +377,7 @@ def update_question(question_id, body):
         }
         
         result = questions_table.update_item(**update_kwargs)
+        bump_catalog_version()
         
         return response(200, {
             "success": True,
@@ -406,6 +428,7 @@ def delete_question(question_id):
             })
         
         questions_table.delete_item(Key={"questionId": question_id})
+        bump_catalog_version()
         
         return response(200, {
             "success": True,
@@ -491,6 +514,9 @@ def bulk_import_questions(body):
                         "error": str(e)
                     })
         
+        if created_ids:
+            bump_catalog_version()
+        
         return response(200, {
             "success": True,
             "message": f"Imported {len(created_ids)} questions",
@@ -563,6 +589,7 @@ def update_status(question_id, new_status):
             },
             ReturnValues='ALL_NEW'
         )
+        bump_catalog_version()
         
         return response(200, {
             "success": True,
@@ -826,6 +853,11 @@ AWS SETUP INSTRUCTIONS
      Partition Key: topic (String)
      Sort Key: updatedAt (String)
 
+   Table Name: CodingQuestionsMeta
+   Partition Key: metaKey (String)
+   - Item { "metaKey": "catalog", "version": N } is bumped on every question
+     write so user-progress Lambdas know when to reload their cached catalog.
+
 2. Create Lambda Function:
    - Runtime: Python 3.9+
    - Handler: coding_questions_handler.lambda_handler
@@ -849,7 +881,8 @@ AWS SETUP INSTRUCTIONS
                ],
                "Resource": [
                    "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/CodingQuestions",
-                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/CodingQuestions/index/*"
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/CodingQuestions/index/*",
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/CodingQuestionsMeta"
                ]
            },
            {
@@ -5,19 +5,33 @@ Lambda Function: Course Purchase Handler with Razorpay Integration
 2. Handle payment webhook for course purchases
 3. Store purchase details in DynamoDB
 4. Update course purchase count
+
+Purchased courses are child items of kind "course" in UserCollections (see
+user_collections.py); the legacy Users.purchasedCourses array is still read
+for users the collections migration has not reached yet, and new purchases are
+appended to it as well while the admin course pages read it.
 """
 
 import json
 import os
 import hmac
 import hashlib
+import time
 import boto3
 import uuid
 import urllib.request
 import urllib.error
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer
+from user_profile_cache import UserProfileCache
+from ttl_cache import TTLCache
+from user_collections import USER_COLLECTIONS_TABLE, child_item, has_entry, list_entries
+from order_lookup import find_order, backfill_orders, verify_orders
+from webhook_queue import enqueue, is_queue_batch, process_batch, queue_enabled
 
 # =========================
 # CONFIG
@@ -27,9 +41,31 @@ RAZORPAY_KEY_SECRET = os.environ.get("RAZORPAY_KEY_SECRET", "")
 RAZORPAY_WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET", "")
 
 dynamodb = boto3.resource("dynamodb")
+serializer = TypeSerializer()
 users_table = dynamodb.Table("Users")
+profile_cache = UserProfileCache()
 courses_table = dynamodb.Table("Courses")
+# GSI on CourseOrders: razorpayOrderId-index (Partition: razorpayOrderId), keys only
 course_orders_table = dynamodb.Table("CourseOrders")
+collections_table = dynamodb.Table(USER_COLLECTIONS_TABLE)
+
+# Verified course payments are fulfilled by the queue worker (see webhook_queue)
+COURSE_PAYMENT_EVENT = "course.payment"
+COURSE_PAYMENT_FIELDS = ("razorpay_payment_id", "razorpay_order_id", "userId", "courseId")
+
+# Course cards for GET_PURCHASED_COURSES: BatchGetItem takes 100 keys per call
+BATCH_GET_LIMIT = 100
+BATCH_GET_WORKERS = 4
+BATCH_GET_MAX_RETRIES = 5
+COURSE_CARD_FIELDS = (
+    "courseId", "title", "description", "category", "subCategory", "level", "language",
+    "price", "currency", "isFree", "thumbnailUrl", "promoVideoUrl", "status", "visibility",
+    "likesCount", "purchasesCount", "viewsCount", "createdAt", "updatedAt", "instructor", "content"
+)
+# Warm-container course-card cache keyed by courseId (see ttl_cache.py)
+COURSE_CACHE_TTL_SECONDS = 300
+COURSE_CACHE_MAX_ENTRIES = 1000
+course_cache = TTLCache("ProjectBazaar/CourseCardCache", COURSE_CACHE_TTL_SECONDS, COURSE_CACHE_MAX_ENTRIES)
 
 
 # =========================
@@ -55,6 +91,10 @@ def create_response(status_code: int, body: Dict[str, Any], error: str = None) -
     }
 
 
+def to_attribute_values(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+
 def decimal_to_float(obj):
     """Convert Decimal objects to float for JSON serialization"""
     if isinstance(obj, Decimal):
@@ -66,6 +106,47 @@ def decimal_to_float(obj):
     return obj
 
 
+def batch_get_courses(course_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Course cards (COURSE_CARD_FIELDS) by courseId via BatchGetItem. Keys are
+    chunked to 100 per call, chunks run concurrently, and UnprocessedKeys are
+    retried with exponential backoff.
+    """
+    table_name = courses_table.name
+    names = {f"#c{i}": field for i, field in enumerate(COURSE_CARD_FIELDS)}
+    
+    def fetch_chunk(chunk):
+        items = []
+        request = {table_name: {
+            "Keys": [{"courseId": course_id} for course_id in chunk],
+            "ProjectionExpression": ", ".join(names),
+            "ExpressionAttributeNames": names
+        }}
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            result = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(result.get("Responses", {}).get(table_name, []))
+            request = result.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            if attempt < BATCH_GET_MAX_RETRIES:
+                time.sleep(0.05 * (2 ** attempt))
+        else:
+            print(f"BatchGetItem left {len(request[table_name]['Keys'])} courses unprocessed")
+        return items
+    
+    chunks = [course_ids[i:i + BATCH_GET_LIMIT] for i in range(0, len(course_ids), BATCH_GET_LIMIT)]
+    if not chunks:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(BATCH_GET_WORKERS, len(chunks))) as executor:
+        return {item["courseId"]: item for items in executor.map(fetch_chunk, chunks) for item in items}
+
+
+def get_course_cards(course_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Course cards from the warm-container cache where fresh; the misses in one batched read"""
+    cards = course_cache.get_many(course_ids, batch_get_courses)
+    return {course_id: card for course_id, card in cards.items() if card is not None}
+
+
 # =========================
 # LAMBDA HANDLER
 # =========================
@@ -74,13 +155,21 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Main handler for course purchase operations.
     Supports:
     - CREATE_COURSE_ORDER: Create Razorpay order for course purchase
-    - COURSE_PAYMENT_WEBHOOK: Handle Razorpay webhook for course payment
+    - COURSE_PAYMENT_WEBHOOK: Verify a course payment; fulfilled by the queue worker
+      when WEBHOOK_QUEUE_URL is set (response status "PROCESSING"), inline otherwise
+    - GET_COURSE_ORDER_STATUS: Poll a course order by razorpayOrderId
     - GET_PURCHASED_COURSES: Get user's purchased courses
+    - BACKFILL_RAZORPAY_ORDER_INDEX / VERIFY_RAZORPAY_ORDER_INDEX: Make historical
+      course orders resolvable through razorpayOrderId-index (direct invocation only)
     """
     # Handle CORS preflight
     if event.get("httpMethod") == "OPTIONS":
         return create_response(200, {"ok": True})
     
+    # SQS batch of verified payments queued by COURSE_PAYMENT_WEBHOOK
+    if is_queue_batch(event):
+        return process_batch(event, {COURSE_PAYMENT_EVENT: fulfil_course_payment})
+    
     try:
         # Parse request body
         body = event
@@ -101,10 +190,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return create_course_order(body)
         elif action == "COURSE_PAYMENT_WEBHOOK":
             return handle_course_webhook(event, body)
+        elif action == "GET_COURSE_ORDER_STATUS":
+            return get_course_order_status(body)
         elif action == "GET_PURCHASED_COURSES":
             return get_purchased_courses(body)
         elif action == "ENROLL_FREE_COURSE":
             return enroll_free_course(body)
+        elif action == "BACKFILL_RAZORPAY_ORDER_INDEX" and "body" not in event:
+            return create_response(200, backfill_orders(course_orders_table, "CourseOrderId", body))
+        elif action == "VERIFY_RAZORPAY_ORDER_INDEX" and "body" not in event:
+            return create_response(200, verify_orders(course_orders_table, "CourseOrderId", body))
         else:
             return create_response(400, {}, error=f"Invalid action: {action}")
     
@@ -156,14 +251,8 @@ def create_course_order(body: Dict[str, Any]) -> Dict[str, Any]:
         course_title = course.get("title", "Course Purchase")
         
         # Check if user already purchased this course
-        user_response = users_table.get_item(Key={"userId": user_id})
-        if "Item" in user_response:
-            purchased_courses = user_response["Item"].get("purchasedCourses", [])
-            for pc in purchased_courses:
-                if isinstance(pc, dict) and pc.get("courseId") == course_id:
-                    return create_response(400, {}, error="You have already purchased this course")
-                elif isinstance(pc, str) and pc == course_id:
-                    return create_response(400, {}, error="You have already purchased this course")
+        if user_owns_course(user_id, course_id):
+            return create_response(400, {}, error="You have already purchased this course")
         
         # Generate internal order ID
         order_id = f"COURSE_ORDER_{uuid.uuid4().hex[:12].upper()}"
@@ -304,12 +393,8 @@ def enroll_free_course(body: Dict[str, Any]) -> Dict[str, Any]:
         timestamp = datetime.utcnow().isoformat() + "Z"
         
         # Check if already enrolled
-        user_response = users_table.get_item(Key={"userId": user_id})
-        if "Item" in user_response:
-            purchased_courses = user_response["Item"].get("purchasedCourses", [])
-            for pc in purchased_courses:
-                if isinstance(pc, dict) and pc.get("courseId") == course_id:
-                    return create_response(400, {}, error="You are already enrolled in this course")
+        if user_owns_course(user_id, course_id):
+            return create_response(400, {}, error="You are already enrolled in this course")
         
         # Add course to user's purchased courses
         purchase_item = {
@@ -321,26 +406,8 @@ def enroll_free_course(body: Dict[str, Any]) -> Dict[str, Any]:
             "orderStatus": "SUCCESS"
         }
         
-        users_table.update_item(
-            Key={"userId": user_id},
-            UpdateExpression="""
-                SET purchasedCourses = list_append(if_not_exists(purchasedCourses, :empty), :course),
-                    totalCoursePurchases = if_not_exists(totalCoursePurchases, :zero) + :one
-            """,
-            ExpressionAttributeValues={
-                ":empty": [],
-                ":course": [purchase_item],
-                ":zero": Decimal("0"),
-                ":one": Decimal("1")
-            }
-        )
-        
-        # Increment course purchase count
-        courses_table.update_item(
-            Key={"courseId": course_id},
-            UpdateExpression="SET purchasesCount = if_not_exists(purchasesCount, :zero) + :one",
-            ExpressionAttributeValues={":zero": Decimal("0"), ":one": Decimal("1")}
-        )
+        if not record_course_purchase(user_id, purchase_item):
+            return create_response(400, {}, error="You are already enrolled in this course")
         
         print(f"User {user_id} enrolled in free course {course_id}")
         
@@ -395,6 +462,35 @@ def handle_course_webhook(event: Dict[str, Any], body: Dict[str, Any]) -> Dict[s
             if not hmac.compare_digest(expected_signature, razorpay_signature):
                 return create_response(400, {}, error="Invalid payment signature")
         
+        # Verified: hand fulfilment to the queue worker and answer straight away
+        if queue_enabled():
+            enqueue(COURSE_PAYMENT_EVENT, razorpay_order_id, {field: body.get(field) for field in COURSE_PAYMENT_FIELDS})
+            return create_response(200, {
+                "message": "Payment verified, purchase is being processed",
+                "status": "PROCESSING",
+                "courseId": course_id,
+                "razorpayOrderId": razorpay_order_id
+            })
+        
+        return fulfil_course_payment(body)
+    
+    except Exception as e:
+        print(f"Error handling course webhook: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return create_response(500, {}, error=str(e))
+
+
+def fulfil_course_payment(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Record a verified course payment. Safe to repeat for the same order: the
+    order is only marked SUCCESS after the purchase is recorded.
+    """
+    try:
+        razorpay_payment_id = body.get("razorpay_payment_id")
+        razorpay_order_id = body.get("razorpay_order_id")
+        user_id = body.get("userId")
+        course_id = body.get("courseId")
         timestamp = datetime.utcnow().isoformat() + "Z"
         
         # Find the order
@@ -418,22 +514,6 @@ def handle_course_webhook(event: Dict[str, Any], body: Dict[str, Any]) -> Dict[s
         course_title = course.get("title", "")
         price = Decimal(str(order.get("amount", 0)))
         
-        # Update order status
-        course_orders_table.update_item(
-            Key={"CourseOrderId": order_id},
-            UpdateExpression="""
-                SET #status = :status, 
-                    razorpayPaymentId = :paymentId,
-                    updatedAt = :timestamp
-            """,
-            ExpressionAttributeNames={"#status": "status"},
-            ExpressionAttributeValues={
-                ":status": "SUCCESS",
-                ":paymentId": razorpay_payment_id,
-                ":timestamp": timestamp
-            }
-        )
-        
         # Add course to user's purchased courses
         purchase_item = {
             "courseId": course_id,
@@ -445,29 +525,26 @@ def handle_course_webhook(event: Dict[str, Any], body: Dict[str, Any]) -> Dict[s
             "orderStatus": "SUCCESS"
         }
         
-        users_table.update_item(
-            Key={"userId": user_id},
+        # Recorded together with the user's and the course's counters; a
+        # redelivery finds the child item and leaves the counters alone
+        record_course_purchase(user_id, purchase_item, price)
+        
+        # Update order status
+        course_orders_table.update_item(
+            Key={"CourseOrderId": order_id},
             UpdateExpression="""
-                SET purchasedCourses = list_append(if_not_exists(purchasedCourses, :empty), :course),
-                    totalCoursePurchases = if_not_exists(totalCoursePurchases, :zero) + :one,
-                    totalCourseSpent = if_not_exists(totalCourseSpent, :zero) + :amount
+                SET #status = :status, 
+                    razorpayPaymentId = :paymentId,
+                    updatedAt = :timestamp
             """,
+            ExpressionAttributeNames={"#status": "status"},
             ExpressionAttributeValues={
-                ":empty": [],
-                ":course": [purchase_item],
-                ":zero": Decimal("0"),
-                ":one": Decimal("1"),
-                ":amount": price  # Already a Decimal
+                ":status": "SUCCESS",
+                ":paymentId": razorpay_payment_id,
+                ":timestamp": timestamp
             }
         )
         
-        # Increment course purchase count
-        courses_table.update_item(
-            Key={"courseId": course_id},
-            UpdateExpression="SET purchasesCount = if_not_exists(purchasesCount, :zero) + :one",
-            ExpressionAttributeValues={":zero": Decimal("0"), ":one": Decimal("1")}
-        )
-        
         print(f"Course purchase completed: User {user_id}, Course {course_id}, Payment {razorpay_payment_id}")
         
         return create_response(200, {
@@ -479,12 +556,86 @@ def handle_course_webhook(event: Dict[str, Any], body: Dict[str, Any]) -> Dict[s
         })
     
     except Exception as e:
-        print(f"Error handling course webhook: {str(e)}")
+        print(f"Error fulfilling course payment: {str(e)}")
         import traceback
         traceback.print_exc()
         return create_response(500, {}, error=str(e))
 
 
+def get_course_order_status(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Status of a user's course order, for clients waiting on a queued payment"""
+    razorpay_order_id = body.get("razorpayOrderId")
+    user_id = body.get("userId")
+    if not razorpay_order_id or not user_id:
+        return create_response(400, {}, error="razorpayOrderId and userId are required")
+    
+    order = find_order_by_razorpay_order_id(razorpay_order_id)
+    if not order or order.get("userId") != user_id:
+        return create_response(404, {}, error="Order not found")
+    return create_response(200, {
+        "orderId": order.get("orderId"),
+        "courseId": order.get("courseId"),
+        "status": order.get("status")
+    })
+
+
+# =========================
+# PURCHASED COURSE RECORDS
+# =========================
+def user_owns_course(user_id: str, course_id: str) -> bool:
+    """Course child item lookup, plus the legacy purchasedCourses array until the user is migrated"""
+    legacy = users_table.get_item(
+        Key={"userId": user_id},
+        ProjectionExpression="purchasedCourses"
+    ).get("Item", {}).get("purchasedCourses")
+    return has_entry(collections_table, user_id, "course", course_id, legacy)
+
+
+def record_course_purchase(user_id: str, purchase_item: Dict[str, Any], amount: Decimal = None) -> bool:
+    """
+    Store the purchase as a course child item, append it to the legacy
+    purchasedCourses array and bump the user's and the course's counters, all
+    in one transaction.
+    Returns False (and changes nothing) if the course was already recorded.
+    """
+    update_expression = """
+        SET purchasedCourses = list_append(if_not_exists(purchasedCourses, :empty), :course),
+            totalCoursePurchases = if_not_exists(totalCoursePurchases, :zero) + :one"""
+    values = {":empty": [], ":course": [purchase_item], ":zero": Decimal("0"), ":one": Decimal("1")}
+    if amount is not None:
+        update_expression += ", totalCourseSpent = if_not_exists(totalCourseSpent, :zero) + :amount"
+        values[":amount"] = amount
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {"Put": {
+                "TableName": collections_table.name,
+                "Item": to_attribute_values(child_item(user_id, "course", purchase_item)),
+                "ConditionExpression": "attribute_not_exists(itemKey)"
+            }},
+            {"Update": {
+                "TableName": users_table.name,
+                "Key": to_attribute_values({"userId": user_id}),
+                "UpdateExpression": update_expression,
+                "ExpressionAttributeValues": to_attribute_values(values)
+            }},
+            {"Update": {
+                "TableName": courses_table.name,
+                "Key": to_attribute_values({"courseId": purchase_item["courseId"]}),
+                "UpdateExpression": "SET purchasesCount = if_not_exists(purchasesCount, :zero) + :one",
+                "ExpressionAttributeValues": to_attribute_values({":zero": Decimal("0"), ":one": Decimal("1")})
+            }}
+        ])
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        reasons = e.response.get("CancellationReasons") or []
+        if reasons and reasons[0].get("Code") == "ConditionalCheckFailed":
+            return False
+        raise
+    profile_cache.invalidate(user_id)
+    return True
+
+
 # =========================
 # GET PURCHASED COURSES
 # =========================
@@ -505,32 +656,33 @@ def get_purchased_courses(body: Dict[str, Any]) -> Dict[str, Any]:
             return create_response(400, {}, error="userId is required")
         
         # Get user's purchased courses
-        user_response = users_table.get_item(Key={"userId": user_id})
+        user = profile_cache.get(users_table, user_id, ("userId", "purchasedCourses"))
         
-        if "Item" not in user_response:
+        if user is None:
             return create_response(200, {
                 "purchasedCourses": [],
                 "count": 0
             })
         
-        user = user_response["Item"]
-        purchased_courses_raw = user.get("purchasedCourses", [])
+        purchased_courses_raw = list_entries(collections_table, user_id, "course", user.get("purchasedCourses"))
+        
+        # Course cards for every purchase, fetched together (and cached warm)
+        course_ids = [
+            purchase.get("courseId") if isinstance(purchase, dict) else purchase
+            for purchase in purchased_courses_raw
+        ]
+        cards = get_course_cards([course_id for course_id in course_ids if course_id])
         
-        # Fetch full course details for each purchased course
         purchased_courses = []
-        for purchase in purchased_courses_raw:
-            course_id = purchase.get("courseId") if isinstance(purchase, dict) else purchase
-            
-            if course_id:
-                course_response = courses_table.get_item(Key={"courseId": course_id})
-                if "Item" in course_response:
-                    course = decimal_to_float(course_response["Item"])
-                    # Add purchase metadata
-                    if isinstance(purchase, dict):
-                        course["purchasedAt"] = purchase.get("purchasedAt")
-                        course["priceAtPurchase"] = purchase.get("priceAtPurchase", 0)
-                        course["paymentId"] = purchase.get("paymentId")
-                    purchased_courses.append(course)
+        for purchase, course_id in zip(purchased_courses_raw, course_ids):
+            if course_id in cards:
+                course = decimal_to_float(cards[course_id])
+                # Add purchase metadata
+                if isinstance(purchase, dict):
+                    course["purchasedAt"] = purchase.get("purchasedAt")
+                    course["priceAtPurchase"] = purchase.get("priceAtPurchase", 0)
+                    course["paymentId"] = purchase.get("paymentId")
+                purchased_courses.append(course)
         
         return create_response(200, {
             "purchasedCourses": purchased_courses,
@@ -546,15 +698,6 @@ def get_purchased_courses(body: Dict[str, Any]) -> Dict[str, Any]:
 # HELPER: Find Order
 # =========================
 def find_order_by_razorpay_order_id(razorpay_order_id: str) -> Optional[Dict[str, Any]]:
-    """Find course order by Razorpay order ID"""
-    try:
-        response = course_orders_table.scan(
-            FilterExpression="razorpayOrderId = :r",
-            ExpressionAttributeValues={":r": razorpay_order_id}
-        )
-        items = response.get("Items", [])
-        return items[0] if items else None
-    except Exception as e:
-        print(f"Error finding order: {str(e)}")
-        return None
+    """Find course order by Razorpay order ID through razorpayOrderId-index (errors propagate as 500)"""
+    return find_order(course_orders_table, "CourseOrderId", razorpay_order_id)
 
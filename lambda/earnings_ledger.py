@@ -0,0 +1,81 @@
+"""
+Seller earnings ledger and rollups.
+
+DynamoDB Table: SellerEarnings
+Primary Key: sellerId (String), Sort Key: entryKey (String)
+Items:
+- entry#<soldAt>#<buyerId>#<projectId>  one per sale, append-only (gross, net, fee,
+                                         projectId, buyerId, orderId, soldAt)
+- day#YYYY-MM-DD / month#YYYY-MM        rollups per UTC day / month (gross, net, sales)
+- project#<projectId>                   per-project totals (gross, net, sales)
+
+Entries and rollup increments are written in the same transaction as the sale
+(payment_webhook fulfilment), and the entry put is conditional, so a sale can
+never be counted twice. A chart for any range reads one small item per day or
+month. A buyer buys a project once, so the entry key is stable for a sale and
+the backfill in seller_earnings_handler can safely re-run.
+Package this file with payment_webhook and seller_earnings_handler.
+"""
+
+from decimal import Decimal
+
+SELLER_EARNINGS_TABLE = "SellerEarnings"
+# Seller keeps 85% of the sale price
+SELLER_SHARE = Decimal("0.85")
+PAISE = Decimal("0.01")
+
+
+def entry_key(sold_at, buyer_id, project_id):
+    return f"entry#{sold_at}#{buyer_id}#{project_id}"
+
+
+def ledger_entry(seller_id, buyer_id, project_id, price, sold_at, order_id=None):
+    gross = Decimal(str(price))
+    net = (gross * SELLER_SHARE).quantize(PAISE)
+    entry = {
+        "sellerId": seller_id,
+        "entryKey": entry_key(sold_at, buyer_id, project_id),
+        "kind": "entry",
+        "projectId": project_id,
+        "buyerId": buyer_id,
+        "gross": gross,
+        "net": net,
+        "fee": gross - net,
+        "soldAt": sold_at
+    }
+    if order_id:
+        entry["orderId"] = order_id
+    return entry
+
+
+def rollup_deltas(entries):
+    """{entryKey: {"gross", "net", "sales"}} for the day, month and project rollups the entries touch"""
+    deltas = {}
+    for entry in entries:
+        day = entry["soldAt"][:10]
+        for key in (f"day#{day}", f"month#{day[:7]}", f"project#{entry['projectId']}"):
+            delta = deltas.setdefault(key, {"gross": Decimal("0"), "net": Decimal("0"), "sales": 0})
+            delta["gross"] += entry["gross"]
+            delta["net"] += entry["net"]
+            delta["sales"] += 1
+    return deltas
+
+
+def ledger_actions(table_name, seller_id, entries, to_attribute_values):
+    """TransactWriteItems actions appending one seller's entries and bumping its rollups"""
+    actions = [{"Put": {
+        "TableName": table_name,
+        "Item": to_attribute_values(entry),
+        "ConditionExpression": "attribute_not_exists(entryKey)"
+    }} for entry in entries]
+    for key, delta in rollup_deltas(entries).items():
+        actions.append({"Update": {
+            "TableName": table_name,
+            "Key": to_attribute_values({"sellerId": seller_id, "entryKey": key}),
+            "UpdateExpression": "ADD #g :g, #n :n, #s :s SET #k = :k",
+            "ExpressionAttributeNames": {"#g": "gross", "#n": "net", "#s": "sales", "#k": "kind"},
+            "ExpressionAttributeValues": to_attribute_values({
+                ":g": delta["gross"], ":n": delta["net"], ":s": delta["sales"], ":k": key.split("#", 1)[0]
+            })
+        }})
+    return actions
@@ -4,25 +4,70 @@ Handles messaging, invitations, and reviews between buyers and freelancers.
 
 DynamoDB Table: FreelancerInteractions
 Primary Key: interactionId (String)
-GSI: senderId-index (Partition: senderId, Sort: createdAt)
+GSI: senderId-index (Partition: senderId, Sort: createdAt) - sent interactions
+     only rows with a senderId and a string createdAt are indexed; see BACKFILL_SENDER_INDEX
 GSI: receiverId-index (Partition: receiverId, Sort: createdAt)
 GSI: targetId-index (Partition: targetId, Sort: createdAt) - used for reviews
+GSI: conversationId-createdAt-index (Partition: conversationId, Sort: createdAt) - chat threads
+     conversationId is the sorted user pair "<userA>#<userB>", set on every message
+
+DynamoDB Table: InboxSummaries (one row per user per conversation)
+Primary Key: userId (String), Sort Key: otherUserId (String)
+GSI: userId-lastAt-index (Partition: userId, Sort: lastAt) - inbox sorted by recency
+The row otherUserId = "#total" holds the user's overall unreadCount (no lastAt, so
+it stays out of the index). Rows are updated in the same transaction as sends/reads.
 
 Actions:
 - SEND_MESSAGE: Send a contact message
 - SEND_INVITATION: Send an invitation to bid
 - ADD_REVIEW: Add a review for a freelancer
-- GET_USER_INTERACTIONS: Get messages and invites for a user
+- GET_USER_INTERACTIONS: Interactions sent to a user, newest first (optional type filter and paging)
 - GET_FREELANCER_REVIEWS: Get reviews for a specific freelancer
+- GET_SENT_INTERACTIONS: Interactions sent by a user, newest first, from senderId-index
+- GET_CONVERSATION: Messages between two users, one cursor-paginated index query
+- GET_INBOX: Conversation summaries (last message, unread count), newest first
+- MARK_CONVERSATION_READ: Mark every unread message from another user as read
+
+Direct invocation only (not routed from API Gateway):
+- BACKFILL_REVIEW_COUNTERS: Recompute reviewCount / ratingTotal on Users from existing reviews
+- MIGRATE_CONVERSATION_KEYS: Add conversationId to messages stored before it existed (resumable)
+- BACKFILL_INBOX_SUMMARIES: Build inbox summaries from existing messages
+- BACKFILL_SENDER_INDEX: Fill senderId/createdAt on legacy rows (parallel, resumable, rate-limited)
+- VERIFY_SENDER_INDEX: Count rows senderId-index cannot see (parallel, resumable)
+- DELIVER_NOTIFICATIONS: Post queued socket-server events (async self-invocation, see below)
+
+Socket-server notifications never hold up a response. Inside Lambda the events
+a request queued are handed, after the handler runs, to an asynchronous
+(InvocationType "Event") invocation of NOTIFY_FUNCTION_NAME - this function by
+default. DELIVER_NOTIFICATIONS posts them in batches and raises if the socket
+server keeps failing, so Lambda's async retries (and the function's on-failure
+destination, if configured) take over. Outside Lambda the background dispatcher
+sends them.
+
+GET_SENT_INTERACTIONS only scans the table when the index query fails and
+SENDER_SCAN_FALLBACK is on; turn it off once VERIFY_SENDER_INDEX reports covered.
+
+Users.reviewCount and Users.ratingTotal are maintained in the same transaction as
+each new review, so profile cards can show ratings without reading the reviews.
+The first review for a user without counters initialises them from the stored
+reviews (targetId-index), so counters are correct whether or not
+BACKFILL_REVIEW_COUNTERS has run.
 """
 
 import json
+import time
+import base64
 import boto3
 import uuid
 import os
-import urllib.request
+import threading
+import http.client
+import urllib.parse
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeSerializer
 from botocore.exceptions import ClientError
 from decimal import Decimal
 
@@ -30,6 +75,44 @@ from decimal import Decimal
 dynamodb = boto3.resource('dynamodb')
 interactions_table = dynamodb.Table('FreelancerInteractions')
 users_table = dynamodb.Table('Users')
+inbox_table = dynamodb.Table('InboxSummaries')
+serializer = TypeSerializer()
+
+CONVERSATION_INDEX = 'conversationId-createdAt-index'
+INBOX_INDEX = 'userId-lastAt-index'
+INBOX_TOTAL_KEY = '#total'
+PREVIEW_LENGTH = 200
+MAX_INBOX_PAGE = 100
+# TransactWriteItems takes 100 actions; one is kept for the summary row
+READ_CHUNK_SIZE = 98
+
+# Socket-server notifications
+SOCKET_NOTIFY_TIMEOUT_SECONDS = 2
+NOTIFY_BUFFER_SIZE = 500
+NOTIFY_BATCH_SIZE = 50
+NOTIFY_MAX_ATTEMPTS = 3
+NOTIFY_RETRY_DELAY_SECONDS = 0.2
+# Function that delivers notifications asynchronously; empty outside Lambda
+NOTIFY_FUNCTION_NAME = os.environ.get('NOTIFY_FUNCTION_NAME') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', '')
+MAX_CONVERSATION_PAGE = 200
+MIGRATION_BATCH_SIZE = 500
+
+# Received interactions (invitations list)
+RECEIVER_INDEX = 'receiverId-index'
+MAX_RECEIVED_PAGE = 200
+
+# Sent interactions and the senderId-index backfill
+SENDER_INDEX = 'senderId-index'
+SENDER_SCAN_FALLBACK = os.environ.get('SENDER_SCAN_FALLBACK', 'true').lower() == 'true'
+MAX_SENT_PAGE = 200
+BACKFILL_SEGMENTS = 4
+MAX_BACKFILL_SEGMENTS = 16
+BACKFILL_WRITES_PER_SECOND = 50
+LEGACY_CREATED_AT = '1970-01-01T00:00:00'
+
+# Users.reviewCount / ratingTotal
+REVIEW_INDEX = 'targetId-index'
+REVIEW_COUNTER_ATTEMPTS = 3
 
 def decimal_to_float(obj):
     if isinstance(obj, Decimal):
@@ -64,27 +147,215 @@ def response(status_code, body):
         'body': json.dumps(decimal_to_float(body))
     }
 
-def notify_socket_server(user_id, event, data):
-    """Notify the socket server about an event for a specific user. 404 from server is non-fatal (e.g. Render cold start)."""
-    socket_url = (os.environ.get('SOCKET_SERVER_URL') or 'https://projectbazaarsocketserver.onrender.com').rstrip('/')
-    try:
+# ---------- SOCKET NOTIFICATIONS ----------
+class NotificationDispatcher:
+    """
+    Posts socket-server notifications in batches to /notify over one keep-alive
+    connection that is reused by warm invocations. deliver() sends a batch in
+    the calling thread (DELIVER_NOTIFICATIONS). enqueue() is the fallback when
+    there is no async invocation to hand events to: events go into a bounded
+    buffer (oldest dropped when full) that a background thread sends; failed
+    batches are retried a few times, then dropped. Nothing waits on it.
+    """
+    def __init__(self, base_url):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.netloc
+        self.path = parsed.path.rstrip('/') + '/notify'
+        self.buffer = deque()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.connection = None
+        self.worker = None
+        self.stats = {'sent': 0, 'batches': 0, 'retried': 0, 'dropped': 0}
+
+    def enqueue(self, user_id, event, data):
+        with self.lock:
+            if len(self.buffer) >= NOTIFY_BUFFER_SIZE:
+                self.buffer.popleft()
+                self.stats['dropped'] += 1
+            self.buffer.append({'userId': user_id, 'event': event, 'data': data, 'attempts': 0})
+            self.idle.clear()
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run, daemon=True)
+                self.worker.start()
+        self.wakeup.set()
+
+    def deliver(self, events):
+        """Post events in batches, retrying each batch; raises once a batch keeps failing"""
+        for start in range(0, len(events), NOTIFY_BATCH_SIZE):
+            batch = events[start:start + NOTIFY_BATCH_SIZE]
+            for attempt in range(NOTIFY_MAX_ATTEMPTS):
+                try:
+                    self.post(batch)
+                    break
+                except Exception as e:
+                    print(f"Failed to notify socket server: {str(e)}")
+                    self.close()
+                    if attempt == NOTIFY_MAX_ATTEMPTS - 1:
+                        raise
+                    time.sleep(NOTIFY_RETRY_DELAY_SECONDS * (2 ** attempt))
+            self.stats['sent'] += len(batch)
+            self.stats['batches'] += 1
+
+    def drain(self, timeout):
+        """Wait until everything buffered has been sent or dropped"""
+        return self.idle.wait(timeout)
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            while self.flush():
+                pass
+
+    def flush(self):
+        """Send one batch; returns True while events are still waiting"""
+        with self.lock:
+            batch = [self.buffer.popleft() for _ in range(min(NOTIFY_BATCH_SIZE, len(self.buffer)))]
+        if batch:
+            try:
+                self.post(batch)
+                self.stats['sent'] += len(batch)
+                self.stats['batches'] += 1
+            except Exception as e:
+                print(f"Failed to notify socket server: {str(e)}")
+                self.close()
+                retry = [event for event in batch if event['attempts'] + 1 < NOTIFY_MAX_ATTEMPTS]
+                for event in retry:
+                    event['attempts'] += 1
+                with self.lock:
+                    self.stats['retried'] += len(retry)
+                    self.stats['dropped'] += len(batch) - len(retry)
+                    # Retries go back in front, still within the buffer bound
+                    room = max(NOTIFY_BUFFER_SIZE - len(self.buffer), 0)
+                    self.stats['dropped'] += max(len(retry) - room, 0)
+                    self.buffer.extendleft(reversed(retry[:room]))
+                if retry:
+                    time.sleep(NOTIFY_RETRY_DELAY_SECONDS * (2 ** retry[0]['attempts']))
+        with self.lock:
+            if not self.buffer:
+                self.idle.set()
+                return False
+            return True
+
+    def post(self, batch):
+        if self.connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self.connection = connection_class(self.host, timeout=SOCKET_NOTIFY_TIMEOUT_SECONDS)
         payload = json.dumps({
-            "userId": user_id,
-            "event": event,
-            "data": data
+            'events': [{'userId': e['userId'], 'event': e['event'], 'data': decimal_to_float(e['data'])} for e in batch]
         }).encode('utf-8')
-        
-        req = urllib.request.Request(
-            f"{socket_url}/notify",
-            data=payload,
-            headers={'Content-Type': 'application/json'},
-            method='POST'
-        )
-        
-        with urllib.request.urlopen(req, timeout=2) as res:
-            print(f"Socket server notified: {res.read().decode()}")
-    except Exception as e:
-        print(f"Failed to notify socket server: {str(e)}")
+        self.connection.request('POST', self.path, body=payload, headers={
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive'
+        })
+        res = self.connection.getresponse()
+        res.read()
+        if res.status >= 500:
+            raise Exception(f"Socket server returned {res.status}")
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+
+notification_dispatcher = NotificationDispatcher(
+    (os.environ.get('SOCKET_SERVER_URL') or 'https://projectbazaarsocketserver.onrender.com').rstrip('/')
+)
+
+# Events queued by the request running on this thread, published after it
+notification_outbox = threading.local()
+_lambda_client = None
+
+def lambda_client():
+    global _lambda_client
+    if _lambda_client is None:
+        _lambda_client = boto3.client('lambda')
+    return _lambda_client
+
+def notify_socket_server(user_id, event, data):
+    """Queue a socket-server event for a user; returns immediately (offline users are non-fatal)."""
+    if not NOTIFY_FUNCTION_NAME:
+        notification_dispatcher.enqueue(user_id, event, data)
+        return
+    if not hasattr(notification_outbox, 'events'):
+        notification_outbox.events = []
+    notification_outbox.events.append({'userId': user_id, 'event': event, 'data': decimal_to_float(data)})
+
+def publish_notifications():
+    """
+    Hand the request's queued events to an async DELIVER_NOTIFICATIONS
+    invocation (one per NOTIFY_BATCH_SIZE events). Lambda stores the event
+    before invoke returns; if it cannot be reached the background dispatcher
+    gets them instead.
+    """
+    events = getattr(notification_outbox, 'events', None)
+    notification_outbox.events = []
+    for start in range(0, len(events or []), NOTIFY_BATCH_SIZE):
+        batch = events[start:start + NOTIFY_BATCH_SIZE]
+        try:
+            lambda_client().invoke(
+                FunctionName=NOTIFY_FUNCTION_NAME,
+                InvocationType='Event',
+                Payload=json.dumps({'action': 'DELIVER_NOTIFICATIONS', 'events': batch}).encode('utf-8')
+            )
+        except Exception as e:
+            print(f"Async notification invoke failed, sending in the background: {str(e)}")
+            for queued in batch:
+                notification_dispatcher.enqueue(queued['userId'], queued['event'], queued['data'])
+
+def conversation_id(user_a, user_b):
+    """Canonical key of the conversation between two users (order independent)"""
+    return '#'.join(sorted([user_a, user_b]))
+
+def encode_cursor(key):
+    if not key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+
+def to_attribute_values(values):
+    """Serialize plain values to low-level DynamoDB attribute values"""
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def summary_update(user_id, other_user_id, message, unread_increment):
+    """Transaction action moving one inbox row to the latest message"""
+    return {'Update': {
+        'TableName': inbox_table.name,
+        'Key': to_attribute_values({'userId': user_id, 'otherUserId': other_user_id}),
+        'UpdateExpression': "SET conversationId = :c, lastMessage = :m, lastAt = :t, lastSenderId = :s, "
+                            "lastInteractionId = :i ADD unreadCount :n",
+        'ExpressionAttributeValues': to_attribute_values({
+            ':c': message['conversationId'],
+            ':m': message['content'][:PREVIEW_LENGTH],
+            ':t': message['createdAt'],
+            ':s': message['senderId'],
+            ':i': message['interactionId'],
+            ':n': unread_increment
+        })
+    }}
+
+def unread_update(user_id, other_user_id, delta):
+    """Transaction action adjusting an unread counter (conversation row or #total)"""
+    action = {'Update': {
+        'TableName': inbox_table.name,
+        'Key': to_attribute_values({'userId': user_id, 'otherUserId': other_user_id}),
+        'UpdateExpression': "ADD unreadCount :n",
+        'ExpressionAttributeValues': to_attribute_values({':n': delta})
+    }}
+    if delta < 0:
+        action['Update']['ConditionExpression'] = "unreadCount >= :need"
+        action['Update']['ExpressionAttributeValues'][':need'] = serializer.serialize(-delta)
+    return action
 
 # ---------- SEND MESSAGE ----------
 def handle_send_message(body):
@@ -109,13 +380,20 @@ def handle_send_message(body):
         'type': 'message',
         'senderId': sender_id,
         'receiverId': receiver_id,
+        'conversationId': conversation_id(sender_id, receiver_id),
         'content': sanitize_string(message),
         'status': 'unread',
         'createdAt': timestamp
     }
     
     try:
-        interactions_table.put_item(Item=item)
+        # Message and both users' inbox rows in one transaction
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Put': {'TableName': interactions_table.name, 'Item': to_attribute_values(item)}},
+            summary_update(sender_id, receiver_id, item, 0),
+            summary_update(receiver_id, sender_id, item, 1),
+            unread_update(receiver_id, INBOX_TOTAL_KEY, 1)
+        ])
         
         # Notify recipient via socket server
         notify_socket_server(receiver_id, 'new_message', {
@@ -179,6 +457,61 @@ def handle_send_invitation(body):
 
 
 # ---------- ADD REVIEW ----------
+def review_totals(freelancer_id):
+    """(count, rating total) of the freelancer's stored reviews"""
+    query_kwargs = {
+        'IndexName': REVIEW_INDEX,
+        'KeyConditionExpression': Key('targetId').eq(freelancer_id),
+        'FilterExpression': Attr('type').eq('review'),
+        'ProjectionExpression': 'rating'
+    }
+    count, rating_total = 0, Decimal('0')
+    while True:
+        result = interactions_table.query(**query_kwargs)
+        for review in result.get('Items', []):
+            count += 1
+            rating_total += Decimal(str(review.get('rating', 0)))
+        if not result.get('LastEvaluatedKey'):
+            return count, rating_total
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
+def review_counter_update(freelancer_id, rating):
+    """
+    The Users write for an ADD_REVIEW transaction, or None when there is no
+    Users item. Counters not created yet (reviews from before they existed,
+    not backfilled) are initialised from the stored reviews, so the first
+    review after deploy does not reset a profile's rating to itself. Each
+    branch is conditioned on the counter state it read.
+    """
+    user = users_table.get_item(
+        Key={'userId': freelancer_id},
+        ProjectionExpression='userId, reviewCount'
+    ).get('Item')
+    if not user:
+        return None
+    update = {
+        'TableName': users_table.name,
+        'Key': {'userId': serializer.serialize(freelancer_id)}
+    }
+    if 'reviewCount' in user:
+        update['UpdateExpression'] = "ADD reviewCount :one, ratingTotal :rating"
+        update['ConditionExpression'] = "attribute_exists(reviewCount)"
+        update['ExpressionAttributeValues'] = {
+            ':one': serializer.serialize(1),
+            ':rating': serializer.serialize(rating)
+        }
+    else:
+        count, rating_total = review_totals(freelancer_id)
+        update['UpdateExpression'] = "SET reviewCount = :c, ratingTotal = :t"
+        update['ConditionExpression'] = "attribute_exists(userId) AND attribute_not_exists(reviewCount)"
+        update['ExpressionAttributeValues'] = {
+            ':c': serializer.serialize(count + 1),
+            ':t': serializer.serialize(rating_total + rating)
+        }
+    return {'Update': update}
+
+
 def handle_add_review(body):
     required_fields = ['reviewerId', 'reviewerName', 'freelancerId', 'rating']
     
@@ -220,7 +553,29 @@ def handle_add_review(body):
     }
     
     try:
-        interactions_table.put_item(Item=item)
+        # Review and the freelancer's rating counters in one transaction; a
+        # counter changed since it was read (concurrent review) is re-read
+        for attempt in range(REVIEW_COUNTER_ATTEMPTS):
+            counter_update = review_counter_update(body['freelancerId'], item['rating'])
+            if counter_update is None:
+                # No Users item to count against - store the review alone
+                interactions_table.put_item(Item=item)
+                break
+            try:
+                dynamodb.meta.client.transact_write_items(TransactItems=[
+                    {'Put': {
+                        'TableName': interactions_table.name,
+                        'Item': {k: serializer.serialize(v) for k, v in item.items()}
+                    }},
+                    counter_update
+                ])
+                break
+            except ClientError as e:
+                reasons = e.response.get('CancellationReasons') or [{}, {}]
+                if (e.response['Error']['Code'] != 'TransactionCanceledException'
+                        or reasons[1].get('Code') != 'ConditionalCheckFailed'
+                        or attempt == REVIEW_COUNTER_ATTEMPTS - 1):
+                    raise
         return response(201, {
             "success": True, 
             "message": "Review added successfully",
@@ -273,39 +628,52 @@ def handle_get_freelancer_reviews(body):
 
 # ---------- GET SENT INTERACTIONS (messages/invitations sent by user) ----------
 def handle_get_sent_interactions(body):
+    """
+    Interactions sent by a user, newest first, from senderId-index. With limit,
+    returns one page and a nextCursor; without it every page is read.
+    """
     user_id = body.get('userId')
     if not user_id:
         return response(400, {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "User ID required"}})
     try:
+        limit = body.get('limit')
+        limit = max(1, min(int(limit), MAX_SENT_PAGE)) if limit else None
+        query_kwargs = {
+            'IndexName': SENDER_INDEX,
+            'KeyConditionExpression': Key('senderId').eq(user_id),
+            'ScanIndexForward': False
+        }
+        if body.get('cursor'):
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+        
+        interactions = []
+        last_key = None
         try:
-            result = interactions_table.query(
-                IndexName='senderId-index',
-                KeyConditionExpression=Key('senderId').eq(user_id)
-            )
+            while True:
+                if limit:
+                    query_kwargs['Limit'] = limit - len(interactions)
+                result = interactions_table.query(**query_kwargs)
+                interactions.extend(result.get('Items', []))
+                last_key = result.get('LastEvaluatedKey')
+                if not last_key or (limit and len(interactions) >= limit):
+                    break
+                query_kwargs['ExclusiveStartKey'] = last_key
         except ClientError as e:
-            if e.response['Error']['Code'] == 'ValidationException' and 'senderId-index' in str(e.response.get('Error', {}).get('Message', '')):
-                # Fallback when senderId-index GSI does not exist: scan by senderId
-                result = interactions_table.scan(
-                    FilterExpression=Attr('senderId').eq(user_id)
-                )
-                # Handle pagination for scan
-                items = result.get('Items', [])
-                while 'LastEvaluatedKey' in result:
-                    result = interactions_table.scan(
-                        FilterExpression=Attr('senderId').eq(user_id),
-                        ExclusiveStartKey=result['LastEvaluatedKey']
-                    )
-                    items.extend(result.get('Items', []))
-                result = {'Items': items}
-            else:
+            if not (SENDER_SCAN_FALLBACK and e.response['Error']['Code'] == 'ValidationException'
+                    and SENDER_INDEX in str(e.response.get('Error', {}).get('Message', ''))):
                 raise
-        interactions = result.get('Items', [])
-        interactions.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
+            print(f"senderId-index unavailable, scanning for sender {user_id}")
+            interactions = scan_sent_interactions(user_id)
+            last_key = None
+        
+        if last_key is None:
+            interactions.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
         return response(200, {
             "success": True,
             "data": {
                 "interactions": interactions,
-                "count": len(interactions)
+                "count": len(interactions),
+                "nextCursor": encode_cursor(last_key)
             }
         })
     except Exception as e:
@@ -313,49 +681,58 @@ def handle_get_sent_interactions(body):
         return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to fetch sent interactions"}})
 
 
+def scan_sent_interactions(user_id):
+    """Table scan for a sender's rows; only used while SENDER_SCAN_FALLBACK is on."""
+    scan_kwargs = {'FilterExpression': Attr('senderId').eq(user_id)}
+    items = []
+    while True:
+        result = interactions_table.scan(**scan_kwargs)
+        items.extend(result.get('Items', []))
+        if not result.get('LastEvaluatedKey'):
+            return items
+        scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
 # ---------- GET CONVERSATION (all messages between two users) ----------
 def handle_get_conversation(body):
+    """
+    Messages between two users, oldest first, from the conversation index.
+    With limit, returns the newest page and a nextCursor for older messages;
+    without it the whole thread is returned.
+    """
     user_id = body.get('userId')
     other_user_id = body.get('otherUserId')
     if not user_id or not other_user_id:
         return response(400, {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "userId and otherUserId required"}})
     try:
-        # Messages received from other user (we are receiver) - uses receiverId-index which exists
-        received = interactions_table.query(
-            IndexName='receiverId-index',
-            KeyConditionExpression=Key('receiverId').eq(user_id),
-            FilterExpression=Attr('senderId').eq(other_user_id) & Attr('type').eq('message')
-        )
-        sent_items = []
-        try:
-            sent = interactions_table.query(
-                IndexName='senderId-index',
-                KeyConditionExpression=Key('senderId').eq(user_id),
-                FilterExpression=Attr('receiverId').eq(other_user_id) & Attr('type').eq('message')
-            )
-            sent_items = sent.get('Items', []) or []
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'ValidationException' and 'senderId-index' in str(e.response.get('Error', {}).get('Message', '')):
-                # Fallback when senderId-index does not exist: scan for (senderId=user_id, receiverId=other_user_id, type=message)
-                result = interactions_table.scan(
-                    FilterExpression=Attr('senderId').eq(user_id) & Attr('receiverId').eq(other_user_id) & Attr('type').eq('message')
-                )
-                sent_items = result.get('Items', [])
-                while result.get('LastEvaluatedKey'):
-                    result = interactions_table.scan(
-                        FilterExpression=Attr('senderId').eq(user_id) & Attr('receiverId').eq(other_user_id) & Attr('type').eq('message'),
-                        ExclusiveStartKey=result['LastEvaluatedKey']
-                    )
-                    sent_items.extend(result.get('Items', []))
-            else:
-                raise
-        messages = (received.get('Items', []) or []) + sent_items
-        messages.sort(key=lambda x: x.get('createdAt', ''))
+        limit = body.get('limit')
+        limit = max(1, min(int(limit), MAX_CONVERSATION_PAGE)) if limit else None
+        query_kwargs = {
+            'IndexName': CONVERSATION_INDEX,
+            'KeyConditionExpression': Key('conversationId').eq(conversation_id(user_id, other_user_id)),
+            'ScanIndexForward': False
+        }
+        if body.get('cursor'):
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+        
+        messages = []
+        while True:
+            if limit:
+                query_kwargs['Limit'] = limit - len(messages)
+            result = interactions_table.query(**query_kwargs)
+            messages.extend(result.get('Items', []))
+            last_key = result.get('LastEvaluatedKey')
+            if not last_key or (limit and len(messages) >= limit):
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
+        
+        messages.reverse()
         return response(200, {
             "success": True,
             "data": {
                 "messages": messages,
-                "count": len(messages)
+                "count": len(messages),
+                "nextCursor": encode_cursor(last_key)
             }
         })
     except Exception as e:
@@ -363,26 +740,98 @@ def handle_get_conversation(body):
         return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to fetch conversation"}})
 
 
+# ---------- MIGRATE CONVERSATION KEYS ----------
+def handle_migrate_conversation_keys(body):
+    """
+    Re-key messages stored before conversationId existed. Processes at most
+    `batchSize` scanned items per call and returns `nextStartKey` to resume
+    from; call again until `done` is true. Safe to re-run.
+    """
+    try:
+        batch_size = int(body.get('batchSize', MIGRATION_BATCH_SIZE))
+        scan_kwargs = {
+            'FilterExpression': Attr('type').eq('message') & Attr('conversationId').not_exists(),
+            'ProjectionExpression': 'interactionId, senderId, receiverId'
+        }
+        if body.get('startKey'):
+            scan_kwargs['ExclusiveStartKey'] = decode_cursor(body['startKey'])
+        
+        migrated = 0
+        scanned = 0
+        last_key = None
+        while scanned < batch_size:
+            scan_kwargs['Limit'] = batch_size - scanned
+            result = interactions_table.scan(**scan_kwargs)
+            scanned += result.get('ScannedCount', 0)
+            for item in result.get('Items', []):
+                if not item.get('senderId') or not item.get('receiverId'):
+                    continue
+                interactions_table.update_item(
+                    Key={'interactionId': item['interactionId']},
+                    UpdateExpression="SET conversationId = :c",
+                    ExpressionAttributeValues={':c': conversation_id(item['senderId'], item['receiverId'])}
+                )
+                migrated += 1
+            last_key = result.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            scan_kwargs['ExclusiveStartKey'] = last_key
+        
+        return response(200, {
+            "success": True,
+            "data": {
+                "migrated": migrated,
+                "scanned": scanned,
+                "nextStartKey": encode_cursor(last_key),
+                "done": last_key is None
+            }
+        })
+    except Exception as e:
+        print(f"Error migrating conversation keys: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to migrate conversation keys"}})
+
+
 # ---------- GET USER INTERACTIONS ----------
 def handle_get_user_interactions(body):
+    """
+    Interactions sent to a user, newest first, from receiverId-index. type
+    (e.g. "invitation") filters server-side. With limit, returns one page and
+    a nextCursor; without it every page is read.
+    """
     user_id = body.get('userId')
     if not user_id:
         return response(400, {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "User ID required"}})
         
     try:
-        # Get things sent TO the user
-        result = interactions_table.query(
-            IndexName='receiverId-index',
-            KeyConditionExpression=Key('receiverId').eq(user_id)
-        )
-        interactions = result.get('Items', [])
-        interactions.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
+        limit = body.get('limit')
+        limit = max(1, min(int(limit), MAX_RECEIVED_PAGE)) if limit else None
+        query_kwargs = {
+            'IndexName': RECEIVER_INDEX,
+            'KeyConditionExpression': Key('receiverId').eq(user_id),
+            'ScanIndexForward': False
+        }
+        if body.get('type'):
+            query_kwargs['FilterExpression'] = Attr('type').eq(body['type'])
+        if body.get('cursor'):
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+        
+        interactions = []
+        while True:
+            if limit:
+                query_kwargs['Limit'] = limit - len(interactions)
+            result = interactions_table.query(**query_kwargs)
+            interactions.extend(result.get('Items', []))
+            last_key = result.get('LastEvaluatedKey')
+            if not last_key or (limit and len(interactions) >= limit):
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
         
         return response(200, {
             "success": True,
             "data": {
                 "interactions": interactions,
-                "count": len(interactions)
+                "count": len(interactions),
+                "nextCursor": encode_cursor(last_key)
             }
         })
     except Exception as e:
@@ -399,6 +848,28 @@ def handle_update_interaction_status(body):
         return response(400, {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "Interaction ID and status required"}})
         
     try:
+        interaction = interactions_table.get_item(
+            Key={'interactionId': interaction_id},
+            ProjectionExpression='interactionId, #t, senderId, receiverId, #s',
+            ExpressionAttributeNames={'#t': 'type', '#s': 'status'}
+        ).get('Item')
+        if not interaction:
+            return response(404, {"success": False, "error": {"code": "NOT_FOUND", "message": "Interaction not found"}})
+        
+        # Reading an unread message also decrements the receiver's inbox counters
+        if interaction.get('type') == 'message' and status != 'unread' and interaction.get('status', 'unread') == 'unread':
+            try:
+                mark_messages_read(interaction['receiverId'], interaction['senderId'], [interaction_id], status)
+                return response(200, {
+                    "success": True,
+                    "message": "Status updated successfully",
+                    "data": {'status': status}
+                })
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                # Already read concurrently (or counters not backfilled) - plain update below
+        
         updated = interactions_table.update_item(
             Key={'interactionId': interaction_id},
             UpdateExpression="set #s = :s",
@@ -419,9 +890,379 @@ def handle_update_interaction_status(body):
         return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to update status"}})
 
 
+# ---------- INBOX ----------
+def mark_messages_read(user_id, other_user_id, interaction_ids, status='read'):
+    """Mark unread messages read and decrement both unread counters in one transaction"""
+    dynamodb.meta.client.transact_write_items(TransactItems=[
+        {'Update': {
+            'TableName': interactions_table.name,
+            'Key': to_attribute_values({'interactionId': interaction_id}),
+            'UpdateExpression': "SET #s = :s",
+            'ConditionExpression': "#s = :unread",
+            'ExpressionAttributeNames': {'#s': 'status'},
+            'ExpressionAttributeValues': to_attribute_values({':s': status, ':unread': 'unread'})
+        }}
+        for interaction_id in interaction_ids
+    ] + [
+        unread_update(user_id, other_user_id, -len(interaction_ids)),
+        unread_update(user_id, INBOX_TOTAL_KEY, -len(interaction_ids))
+    ])
+
+def reconcile_unread(user_id, other_user_id):
+    """Recount a conversation's unread messages and fix both counters"""
+    unread = get_unread_message_ids(user_id, other_user_id)
+    row = inbox_table.get_item(Key={'userId': user_id, 'otherUserId': other_user_id}).get('Item') or {}
+    drift = len(unread) - int(row.get('unreadCount', 0))
+    if drift:
+        inbox_table.update_item(
+            Key={'userId': user_id, 'otherUserId': other_user_id},
+            UpdateExpression="SET unreadCount = :c",
+            ExpressionAttributeValues={':c': len(unread)}
+        )
+        inbox_table.update_item(
+            Key={'userId': user_id, 'otherUserId': INBOX_TOTAL_KEY},
+            UpdateExpression="ADD unreadCount :d",
+            ExpressionAttributeValues={':d': drift}
+        )
+
+def get_unread_message_ids(user_id, other_user_id):
+    """Ids of the unread messages other_user_id sent to user_id"""
+    query_kwargs = {
+        'IndexName': CONVERSATION_INDEX,
+        'KeyConditionExpression': Key('conversationId').eq(conversation_id(user_id, other_user_id)),
+        'FilterExpression': Attr('receiverId').eq(user_id) & Attr('status').eq('unread'),
+        'ProjectionExpression': 'interactionId'
+    }
+    ids = []
+    while True:
+        result = interactions_table.query(**query_kwargs)
+        ids.extend(m['interactionId'] for m in result.get('Items', []))
+        if not result.get('LastEvaluatedKey'):
+            return ids
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+def handle_mark_conversation_read(body):
+    user_id = body.get('userId')
+    other_user_id = body.get('otherUserId')
+    if not user_id or not other_user_id:
+        return response(400, {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "userId and otherUserId required"}})
+    try:
+        unread = get_unread_message_ids(user_id, other_user_id)
+        marked = 0
+        for i in range(0, len(unread), READ_CHUNK_SIZE):
+            chunk = unread[i:i + READ_CHUNK_SIZE]
+            try:
+                mark_messages_read(user_id, other_user_id, chunk)
+                marked += len(chunk)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                # Raced with another reader or counters drifted - fix up from the messages
+                for interaction_id in chunk:
+                    interactions_table.update_item(
+                        Key={'interactionId': interaction_id},
+                        UpdateExpression="SET #s = :s",
+                        ExpressionAttributeNames={'#s': 'status'},
+                        ExpressionAttributeValues={':s': 'read'}
+                    )
+                reconcile_unread(user_id, other_user_id)
+                marked += len(chunk)
+        return response(200, {"success": True, "data": {"markedRead": marked}})
+    except Exception as e:
+        print(f"Error marking conversation read: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to mark conversation read"}})
+
+def handle_get_inbox(body):
+    """The user's conversations, most recent first, with last message and unread count"""
+    user_id = body.get('userId')
+    if not user_id:
+        return response(400, {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "User ID required"}})
+    try:
+        limit = max(1, min(int(body.get('limit', MAX_INBOX_PAGE)), MAX_INBOX_PAGE))
+        query_kwargs = {
+            'IndexName': INBOX_INDEX,
+            'KeyConditionExpression': Key('userId').eq(user_id),
+            'ScanIndexForward': False,
+            'Limit': limit
+        }
+        if body.get('cursor'):
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+        result = inbox_table.query(**query_kwargs)
+        conversations = [{
+            'otherUserId': row['otherUserId'],
+            'conversationId': row.get('conversationId'),
+            'lastMessage': row.get('lastMessage', ''),
+            'lastAt': row.get('lastAt'),
+            'lastSenderId': row.get('lastSenderId'),
+            'unreadCount': max(int(row.get('unreadCount', 0)), 0)
+        } for row in result.get('Items', [])]
+        
+        total = inbox_table.get_item(Key={'userId': user_id, 'otherUserId': INBOX_TOTAL_KEY}).get('Item') or {}
+        return response(200, {
+            "success": True,
+            "data": {
+                "conversations": conversations,
+                "count": len(conversations),
+                "totalUnread": max(int(total.get('unreadCount', 0)), 0),
+                "nextCursor": encode_cursor(result.get('LastEvaluatedKey'))
+            }
+        })
+    except Exception as e:
+        print(f"Error fetching inbox: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to fetch inbox"}})
+
+def handle_backfill_inbox_summaries(body):
+    """One-off: rebuild every inbox row and unread total from the stored messages. Safe to re-run."""
+    try:
+        rows = {}
+        totals = {}
+        scan_kwargs = {'FilterExpression': Attr('type').eq('message')}
+        while True:
+            result = interactions_table.scan(**scan_kwargs)
+            for m in result.get('Items', []):
+                if not m.get('senderId') or not m.get('receiverId'):
+                    continue
+                unread = 1 if m.get('status', 'unread') == 'unread' else 0
+                for owner, other in ((m['senderId'], m['receiverId']), (m['receiverId'], m['senderId'])):
+                    row = rows.setdefault((owner, other), {'unreadCount': 0, 'lastAt': ''})
+                    if owner == m['receiverId']:
+                        row['unreadCount'] += unread
+                    if m.get('createdAt', '') >= row['lastAt']:
+                        row.update({
+                            'conversationId': conversation_id(owner, other),
+                            'lastMessage': m.get('content', '')[:PREVIEW_LENGTH],
+                            'lastAt': m.get('createdAt', ''),
+                            'lastSenderId': m['senderId'],
+                            'lastInteractionId': m['interactionId']
+                        })
+                totals[m['receiverId']] = totals.get(m['receiverId'], 0) + unread
+            if not result.get('LastEvaluatedKey'):
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        
+        with inbox_table.batch_writer() as batch:
+            for (owner, other), row in rows.items():
+                batch.put_item(Item={'userId': owner, 'otherUserId': other, **row})
+            for owner in {owner for owner, _ in rows}:
+                batch.put_item(Item={'userId': owner, 'otherUserId': INBOX_TOTAL_KEY, 'unreadCount': totals.get(owner, 0)})
+        
+        return response(200, {"success": True, "data": {"conversationRows": len(rows)}})
+    except Exception as e:
+        print(f"Error backfilling inbox summaries: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to backfill inbox summaries"}})
+
+
+# ---------- SENDER INDEX BACKFILL / VERIFY ----------
+class RateLimiter:
+    """Spaces calls evenly, across threads, to at most `rate` per second."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_at = time.monotonic()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def unindexed_by_sender():
+    """Rows senderId-index cannot see: no senderId, or createdAt missing / not a string."""
+    return (Attr('senderId').not_exists()
+            | Attr('createdAt').not_exists()
+            | ~Attr('createdAt').attribute_type('S'))
+
+
+def legacy_created_at(item):
+    """ISO createdAt for a legacy row: from an epoch number if present, else the epoch."""
+    value = item.get('createdAt')
+    if isinstance(value, str) and value:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        seconds = float(value) / 1000 if value > 1e11 else float(value)
+        return datetime.utcfromtimestamp(seconds).isoformat()
+    return LEGACY_CREATED_AT
+
+
+def scan_segments(body, scan_kwargs, process):
+    """
+    Parallel scan of FreelancerInteractions in `totalSegments` segments. Each segment
+    reads at most `maxItemsPerSegment` items per call; unfinished segments come back in
+    `nextStartKeys` ({segment: cursor}) to pass as `startKeys` on the next call.
+    `process(items)` runs on the worker threads and returns a Counter.
+    """
+    total_segments = max(1, min(int(body.get('totalSegments', BACKFILL_SEGMENTS)), MAX_BACKFILL_SEGMENTS))
+    budget = max(1, int(body.get('maxItemsPerSegment', MIGRATION_BATCH_SIZE)))
+    start_keys = body.get('startKeys')
+    if start_keys is None:
+        segments = {segment: None for segment in range(total_segments)}
+    else:
+        segments = {int(segment): cursor for segment, cursor in start_keys.items()}
+    
+    def run(segment, cursor):
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+        if cursor:
+            kwargs['ExclusiveStartKey'] = decode_cursor(cursor)
+        counts = Counter()
+        last_key = None
+        while counts['scanned'] < budget:
+            kwargs['Limit'] = budget - counts['scanned']
+            result = interactions_table.scan(**kwargs)
+            counts['scanned'] += result.get('ScannedCount', 0)
+            counts.update(process(result.get('Items', [])))
+            last_key = result.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            kwargs['ExclusiveStartKey'] = last_key
+        return segment, counts, last_key
+    
+    totals = Counter()
+    next_start_keys = {}
+    if segments:
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            for segment, counts, last_key in executor.map(lambda s: run(*s), segments.items()):
+                totals.update(counts)
+                if last_key:
+                    next_start_keys[str(segment)] = encode_cursor(last_key)
+    return totals, {
+        "totalSegments": total_segments,
+        "nextStartKeys": next_start_keys,
+        "done": not next_start_keys
+    }
+
+
+def handle_backfill_sender_index(body):
+    """
+    Give legacy rows the senderId (from reviewerId) and string createdAt that
+    senderId-index needs. Resumable via startKeys/nextStartKeys; writes are capped at
+    `maxWritesPerSecond` across all segments. Safe to re-run.
+    """
+    try:
+        limiter = RateLimiter(float(body.get('maxWritesPerSecond', BACKFILL_WRITES_PER_SECOND)))
+        
+        def process(items):
+            counts = Counter()
+            for item in items:
+                sender_id = item.get('senderId') or item.get('reviewerId')
+                if not sender_id:
+                    counts['skipped'] += 1
+                    continue
+                limiter.wait()
+                try:
+                    interactions_table.update_item(
+                        Key={'interactionId': item['interactionId']},
+                        UpdateExpression="SET senderId = :s, createdAt = :c",
+                        ConditionExpression="attribute_exists(interactionId)",
+                        ExpressionAttributeValues={':s': sender_id, ':c': legacy_created_at(item)}
+                    )
+                    counts['updated'] += 1
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+            return counts
+        
+        totals, progress = scan_segments(body, {
+            'FilterExpression': unindexed_by_sender(),
+            'ProjectionExpression': 'interactionId, senderId, reviewerId, createdAt'
+        }, process)
+        return response(200, {
+            "success": True,
+            "data": {
+                "updated": totals['updated'],
+                "skipped": totals['skipped'],
+                "scanned": totals['scanned'],
+                **progress
+            }
+        })
+    except Exception as e:
+        print(f"Error backfilling sender index: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to backfill sender index"}})
+
+
+def handle_verify_sender_index(body):
+    """
+    Count the rows senderId-index cannot see. Accumulate `unindexed` across calls
+    until done; zero means SENDER_SCAN_FALLBACK can be turned off.
+    """
+    try:
+        samples = []
+        
+        def process(items):
+            samples.extend(item['interactionId'] for item in items[:10])
+            return Counter(unindexed=len(items))
+        
+        totals, progress = scan_segments(body, {
+            'FilterExpression': unindexed_by_sender(),
+            'ProjectionExpression': 'interactionId'
+        }, process)
+        return response(200, {
+            "success": True,
+            "data": {
+                "scanned": totals['scanned'],
+                "unindexed": totals['unindexed'],
+                "samples": samples[:10],
+                "covered": progress['done'] and totals['unindexed'] == 0 and body.get('startKeys') is None,
+                **progress
+            }
+        })
+    except Exception as e:
+        print(f"Error verifying sender index: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to verify sender index"}})
+
+
+# ---------- BACKFILL REVIEW COUNTERS ----------
+def handle_backfill_review_counters(body):
+    """One-off: set Users.reviewCount / ratingTotal from the existing reviews. Safe to re-run."""
+    try:
+        totals = {}
+        scan_kwargs = {
+            'FilterExpression': Attr('type').eq('review'),
+            'ProjectionExpression': 'targetId, rating'
+        }
+        while True:
+            result = interactions_table.scan(**scan_kwargs)
+            for review in result.get('Items', []):
+                count, rating_total = totals.get(review['targetId'], (0, Decimal('0')))
+                totals[review['targetId']] = (count + 1, rating_total + Decimal(str(review.get('rating', 0))))
+            if not result.get('LastEvaluatedKey'):
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        
+        updated = 0
+        for user_id, (count, rating_total) in totals.items():
+            try:
+                users_table.update_item(
+                    Key={'userId': user_id},
+                    UpdateExpression="SET reviewCount = :c, ratingTotal = :t",
+                    ConditionExpression="attribute_exists(userId)",
+                    ExpressionAttributeValues={':c': count, ':t': rating_total}
+                )
+                updated += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        
+        return response(200, {"success": True, "data": {"freelancersUpdated": updated}})
+    except Exception as e:
+        print(f"Error backfilling review counters: {str(e)}")
+        return response(500, {"success": False, "error": {"code": "DATABASE_ERROR", "message": "Failed to backfill review counters"}})
+
+
 def lambda_handler(event, context):
     print(f"Received event: {json.dumps(event)}")
     
+    if 'body' not in event and str(event.get('action', '')).upper() == 'DELIVER_NOTIFICATIONS':
+        # Errors propagate so Lambda retries the async invocation
+        events = event.get('events') or []
+        notification_dispatcher.deliver(events)
+        return {'delivered': len(events)}
+    
     http_method = event.get('httpMethod') or event.get('requestContext', {}).get('http', {}).get('method', '')
     if http_method.upper() == 'OPTIONS':
         return {
@@ -431,7 +1272,9 @@ def lambda_handler(event, context):
         }
         
     try:
-        body = {}
+        # Direct invocations (no API Gateway body) pass the request as the event
+        direct = 'body' not in event
+        body = event if direct else {}
         if event.get('body'):
             if isinstance(event.get('body'), str):
                 body = json.loads(event['body'])
@@ -452,11 +1295,22 @@ def lambda_handler(event, context):
             'GET_USER_INTERACTIONS': handle_get_user_interactions,
             'GET_SENT_INTERACTIONS': handle_get_sent_interactions,
             'GET_CONVERSATION': handle_get_conversation,
-            'UPDATE_INTERACTION_STATUS': handle_update_interaction_status
+            'UPDATE_INTERACTION_STATUS': handle_update_interaction_status,
+            'GET_INBOX': handle_get_inbox,
+            'MARK_CONVERSATION_READ': handle_mark_conversation_read,
         }
+        if direct:
+            handlers['BACKFILL_REVIEW_COUNTERS'] = handle_backfill_review_counters
+            handlers['MIGRATE_CONVERSATION_KEYS'] = handle_migrate_conversation_keys
+            handlers['BACKFILL_INBOX_SUMMARIES'] = handle_backfill_inbox_summaries
+            handlers['BACKFILL_SENDER_INDEX'] = handle_backfill_sender_index
+            handlers['VERIFY_SENDER_INDEX'] = handle_verify_sender_index
         
         if handler := handlers.get(action):
-            return handler(body)
+            notification_outbox.events = []
+            result = handler(body)
+            publish_notifications()
+            return result
             
         return response(400, {"success": False, "error": {"code": "INVALID_ACTION", "message": f"Action {action} not supported"}})
         
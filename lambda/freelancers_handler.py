@@ -10,6 +10,14 @@ Actions:
 - GET_FREELANCER_BY_ID: Get a specific freelancer's profile
 - GET_TOP_FREELANCERS: Get top-rated freelancers (for homepage)
 - SEARCH_FREELANCERS: Search freelancers by skills, name, location
+- SUGGEST_FREELANCERS: Top-N freelancers for a bid request project, scored by skill overlap and rate fit
+
+Direct invocation only (not routed from API Gateway):
+- BACKFILL_SKILL_INDEX: Build the FreelancerSkills posting index from existing profiles
+
+DynamoDB Table: FreelancerSkills (skill posting index, maintained by the settings handler)
+Primary Key: skill (String, lowercased), Sort Key: userId (String)
+Scoring and posting helpers live in skill_matching.py - package it with this function.
 """
 
 import json
@@ -17,12 +25,21 @@ import boto3
 from datetime import datetime
 from boto3.dynamodb.conditions import Key, Attr
 from decimal import Decimal
+from user_profile_cache import UserProfileCache
+from skill_matching import profile_skills, skill_posting, skill_rarity, rate_fit
 
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 users_table = dynamodb.Table('Users')
 projects_table = dynamodb.Table('Projects')
 interactions_table = dynamodb.Table('FreelancerInteractions')
+bid_request_projects_table = dynamodb.Table('BidRequestProjects')
+freelancer_skills_table = dynamodb.Table('FreelancerSkills')
+profile_cache = UserProfileCache()
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+BATCH_GET_LIMIT = 100
 
 # Helper to convert Decimal to float for JSON serialization
 def decimal_to_float(obj):
@@ -174,8 +191,16 @@ def format_freelancer(user, include_stats=True):
         successful_projects = min(total_sales, total_projects)
         success_rate = min(99, 85 + (successful_projects / total_projects) * 14)
     
-    # Get actual reviews
-    review_stats = get_freelancer_reviews_stats(user.get('userId'))
+    # Review stats from the counters maintained with each review; users
+    # not yet backfilled fall back to reading their reviews
+    if 'reviewCount' in user:
+        review_count = int(user['reviewCount'])
+        review_stats = {
+            'count': review_count,
+            'averageRating': float(user.get('ratingTotal', 0)) / review_count if review_count else 0
+        }
+    else:
+        review_stats = get_freelancer_reviews_stats(user.get('userId'))
     
     return {
         'id': user.get('userId'),
@@ -290,9 +315,9 @@ def handle_get_freelancer_by_id(body):
         })
     
     try:
-        result = users_table.get_item(Key={'userId': freelancer_id})
+        user = profile_cache.get(users_table, freelancer_id)
         
-        if 'Item' not in result:
+        if user is None:
             return response(404, {
                 "success": False,
                 "error": {
@@ -301,7 +326,6 @@ def handle_get_freelancer_by_id(body):
                 }
             })
         
-        user = result['Item']
         freelancer = format_freelancer(user, include_stats=True)
         
         # Get seller's projects
@@ -499,6 +523,156 @@ def handle_seed_freelancers(body):
     })
 
 
+# ---------- SUGGEST FREELANCERS ----------
+def batch_get_users(user_ids):
+    """Fetch users by id with BatchGetItem (100 keys per call, unprocessed keys retried)"""
+    users = {}
+    table_name = users_table.name
+    for i in range(0, len(user_ids), BATCH_GET_LIMIT):
+        request = {table_name: {'Keys': [{'userId': uid} for uid in user_ids[i:i + BATCH_GET_LIMIT]]}}
+        while request:
+            result = dynamodb.batch_get_item(RequestItems=request)
+            for item in result.get('Responses', {}).get(table_name, []):
+                users[item['userId']] = item
+            request = result.get('UnprocessedKeys') or None
+    return users
+
+
+def delete_skill_postings(user_id, skills):
+    try:
+        with freelancer_skills_table.batch_writer() as batch:
+            for skill in skills:
+                batch.delete_item(Key={'skill': skill, 'userId': user_id})
+    except Exception as e:
+        print(f"Error removing skill postings for {user_id}: {str(e)}")
+
+
+def handle_suggest_freelancers(body):
+    """
+    Suggested freelancers for a bid request project. Candidates come from the
+    FreelancerSkills posting lists of the project's skills; each is scored by
+    the rarity-weighted overlap times the hourly-rate fit, and only the top N
+    profiles are fetched.
+    """
+    project_id = body.get('projectId')
+    if not project_id:
+        return response(400, {
+            "success": False,
+            "error": {
+                "code": "VALIDATION_ERROR",
+                "message": "projectId is required"
+            }
+        })
+    
+    try:
+        limit = max(1, min(int(body.get('limit', DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS))
+        project = bid_request_projects_table.get_item(Key={'projectId': project_id}).get('Item')
+        if not project:
+            return response(404, {
+                "success": False,
+                "error": {
+                    "code": "NOT_FOUND",
+                    "message": "Project not found"
+                }
+            })
+        
+        scores = {}
+        matched = {}
+        rates = {}
+        for skill in {str(s).strip().lower() for s in project.get('skills', []) if str(s).strip()}:
+            query_kwargs = {'KeyConditionExpression': Key('skill').eq(skill)}
+            postings = []
+            while True:
+                result = freelancer_skills_table.query(**query_kwargs)
+                postings.extend(result.get('Items', []))
+                if not result.get('LastEvaluatedKey'):
+                    break
+                query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+            
+            weight = skill_rarity(len(postings))
+            for posting in postings:
+                uid = posting['userId']
+                if uid == project.get('buyerId'):
+                    continue
+                scores[uid] = scores.get(uid, 0) + weight
+                matched.setdefault(uid, []).append(skill)
+                rates[uid] = (float(posting.get('hourlyRate', 0)), posting.get('currency', 'USD'))
+        
+        for uid in scores:
+            scores[uid] *= rate_fit(rates[uid][0], project, rates[uid][1])
+        
+        ranked = sorted(scores, key=lambda uid: (scores[uid], uid), reverse=True)
+        # Fetch a little extra in case some profiles stopped freelancing
+        candidates = ranked[:limit * 2]
+        users = batch_get_users(candidates)
+        
+        freelancers = []
+        for uid in candidates:
+            user = users.get(uid)
+            if not user or not profile_skills(user):
+                # Blocked, deleted or no longer freelancing (possibly changed
+                # by a function that does not sync the index) - drop the postings
+                delete_skill_postings(uid, matched[uid])
+                continue
+            freelancer = format_freelancer(user, include_stats=False)
+            freelancer['matchScore'] = round(scores[uid], 4)
+            freelancer['matchedSkills'] = sorted(matched[uid])
+            freelancers.append(freelancer)
+            if len(freelancers) >= limit:
+                break
+        
+        return response(200, {
+            "success": True,
+            "data": {
+                "freelancers": freelancers,
+                "count": len(freelancers)
+            }
+        })
+    except Exception as e:
+        print(f"Error suggesting freelancers: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {
+                "code": "DATABASE_ERROR",
+                "message": "Failed to suggest freelancers"
+            }
+        })
+
+
+def handle_backfill_skill_index(body):
+    """One-off build of the FreelancerSkills index from existing profiles. Safe to re-run."""
+    try:
+        scan_kwargs = {}
+        indexed = 0
+        with freelancer_skills_table.batch_writer() as batch:
+            while True:
+                result = users_table.scan(**scan_kwargs)
+                for user in result.get('Items', []):
+                    skills = profile_skills(user)
+                    for skill in skills:
+                        batch.put_item(Item=skill_posting(user, skill))
+                    if skills:
+                        indexed += 1
+                if not result.get('LastEvaluatedKey'):
+                    break
+                scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        
+        return response(200, {
+            "success": True,
+            "message": "Freelancer skill index backfilled",
+            "data": {"freelancersIndexed": indexed}
+        })
+    except Exception as e:
+        print(f"Error backfilling skill index: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {
+                "code": "DATABASE_ERROR",
+                "message": "Failed to backfill skill index"
+            }
+        })
+
+
 # ---------- LAMBDA HANDLER ----------
 def lambda_handler(event, context):
     """Main Lambda handler - routes requests to appropriate functions"""
@@ -511,8 +685,9 @@ def lambda_handler(event, context):
                 'body': ''
             }
         
-        # Parse request body
-        body = {}
+        # Parse request body; direct invocations (no API Gateway body) pass the request as the event
+        direct = 'body' not in event
+        body = event if direct else {}
         if event.get('body'):
             if isinstance(event.get('body'), str):
                 body_str = event['body'].strip()
@@ -539,7 +714,10 @@ def lambda_handler(event, context):
             'GET_TOP_FREELANCERS': handle_get_top_freelancers,
             'SEARCH_FREELANCERS': handle_search_freelancers,
             'SEED_FREELANCERS': handle_seed_freelancers,
+            'SUGGEST_FREELANCERS': handle_suggest_freelancers,
         }
+        if direct:
+            action_handlers['BACKFILL_SKILL_INDEX'] = handle_backfill_skill_index
         
         handler = action_handlers.get(action)
         
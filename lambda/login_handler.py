@@ -1,19 +1,34 @@
 import json
 import re
+import time
+import random
 import uuid
 import boto3
 from datetime import datetime
 from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
 from decimal import Decimal
 
 # ---------- CONFIG ----------
 USERS_TABLE = "Users"
+# GSI on Users: email-index (Partition: email), keys only - login lookup
+EMAIL_INDEX = "email-index"
+# One item per registered email (PK email -> userId), written in the same
+# transaction as the user so two signups can never share an email
+USER_EMAILS_TABLE = "UserEmails"
+BACKFILL_BATCH_SIZE = 500
+# Signup transactions cancelled by a concurrent transaction on the same items
+SIGNUP_MAX_ATTEMPTS = 3
+SIGNUP_RETRY_BASE_SECONDS = 0.05
 
 EMAIL_REGEX = r"^[^\s@]+@[^\s@]+\.[^\s@]+$"
 
 # ---------- AWS ----------
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(USERS_TABLE)
+emails_table = dynamodb.Table(USER_EMAILS_TABLE)
+serializer = TypeSerializer()
 
 # ---------- DECIMAL FIX ----------
 def decimal_to_native(obj):
@@ -38,6 +53,34 @@ def response(status, body):
         "body": json.dumps(decimal_to_native(body))
     }
 
+def to_attribute_values(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+# ---------- EMAIL LOOKUP ----------
+def find_user_by_email(email):
+    """email-index query for the userId, then a consistent get of the user"""
+    result = table.query(
+        IndexName=EMAIL_INDEX,
+        KeyConditionExpression=Key("email").eq(email)
+    )
+    user_ids = [item["userId"] for item in result.get("Items", [])]
+    if len(user_ids) > 1:
+        # Legacy duplicates: the UserEmails item says which account owns the email
+        owner = emails_table.get_item(Key={"email": email}).get("Item")
+        user_ids = [owner["userId"]] if owner else user_ids[:1]
+    if not user_ids:
+        return None
+    return table.get_item(Key={"userId": user_ids[0]}, ConsistentRead=True).get("Item")
+
+def email_exists_response():
+    return response(409, {
+        "success": False,
+        "error": {
+            "code": "EMAIL_ALREADY_EXISTS",
+            "message": "Email already registered"
+        }
+    })
+
 # ---------- PASSWORD VALIDATION ----------
 def get_password_error(password):
     if len(password) < 8:
@@ -55,13 +98,17 @@ def get_password_error(password):
 # ---------- MAIN HANDLER ----------
 def lambda_handler(event, context):
     try:
-        body = json.loads(event.get("body", "{}"))
+        # Direct invocations (no API Gateway body) pass the request as the event
+        direct = "body" not in event
+        body = event if direct else json.loads(event["body"] or "{}")
         action = body.get("action")
 
         if action == "signup":
             return handle_signup(body)
         elif action == "login":
             return handle_login(body)
+        elif action == "backfillEmailIndex" and direct:
+            return handle_backfill_email_index(body)
 
         return response(400, {
             "success": False,
@@ -125,24 +172,19 @@ def handle_signup(body):
             }
         })
 
-    # ---------- CHECK EMAIL EXISTS ----------
-    existing = table.scan(
-        FilterExpression=Attr("email").eq(email)
+    # Accounts not yet covered by the UserEmails backfill are only in the index
+    existing = table.query(
+        IndexName=EMAIL_INDEX,
+        KeyConditionExpression=Key("email").eq(email),
+        Limit=1
     )
-
-    if existing["Count"] > 0:
-        return response(409, {
-            "success": False,
-            "error": {
-                "code": "EMAIL_ALREADY_EXISTS",
-                "message": "Email already registered"
-            }
-        })
+    if existing.get("Items"):
+        return email_exists_response()
 
     user_id = str(uuid.uuid4())
     now = datetime.utcnow().isoformat()
 
-    table.put_item(Item={
+    user = {
         "userId": user_id,
         "email": email,
         "phoneNumber": phone,
@@ -165,10 +207,6 @@ def handle_signup(body):
         "totalPurchases": 0,
         "totalSpent": 0,
 
-        "wishlist": [],
-        "cart": [],
-        "purchases": [],
-
         "lastLoginAt": None,
         "loginCount": 0,
 
@@ -179,7 +217,48 @@ def handle_signup(body):
         "createdAt": now,
         "updatedAt": now,
         "createdBy": "self"
-    })
+    }
+
+    transact_items = [
+        {
+            "Put": {
+                "TableName": USER_EMAILS_TABLE,
+                "Item": to_attribute_values({"email": email, "userId": user_id, "createdAt": now}),
+                "ConditionExpression": "attribute_not_exists(email)"
+            }
+        },
+        {
+            "Put": {
+                "TableName": USERS_TABLE,
+                "Item": to_attribute_values(user),
+                "ConditionExpression": "attribute_not_exists(userId)"
+            }
+        }
+    ]
+    for attempt in range(SIGNUP_MAX_ATTEMPTS):
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+            break
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            codes = [r.get("Code") for r in e.response.get("CancellationReasons") or []]
+            # Only the UserEmails condition means the email is taken
+            if codes and codes[0] == "ConditionalCheckFailed":
+                return email_exists_response()
+            if "TransactionConflict" not in codes:
+                raise
+            if attempt < SIGNUP_MAX_ATTEMPTS - 1:
+                time.sleep(random.uniform(0, SIGNUP_RETRY_BASE_SECONDS * (2 ** attempt)))
+    else:
+        return response(503, {
+            "success": False,
+            "error": {
+                "code": "SIGNUP_CONFLICT",
+                "message": "Signup could not be completed, please retry",
+                "retryable": True
+            }
+        })
 
     return response(200, {
         "success": True,
@@ -205,11 +284,9 @@ def handle_login(body):
             }
         })
 
-    result = table.scan(
-        FilterExpression=Attr("email").eq(email)
-    )
+    user = find_user_by_email(email)
 
-    if result["Count"] == 0:
+    if not user:
         return response(404, {
             "success": False,
             "error": {
@@ -218,8 +295,6 @@ def handle_login(body):
             }
         })
 
-    user = result["Items"][0]
-
     if user.get("status") == "blocked":
         return response(403, {
             "success": False,
@@ -272,3 +347,56 @@ def handle_login(body):
             "status": user["status"]
         }
     })
+
+# ---------- BACKFILL EMAIL INDEX ----------
+def handle_backfill_email_index(body):
+    """
+    Write the UserEmails item for users created before it existed. Processes at
+    most batchSize scanned users per call; pass nextStartKey back as startKey
+    until done. The first account seen keeps a shared legacy email. Safe to re-run.
+    """
+    batch_size = int(body.get("batchSize", BACKFILL_BATCH_SIZE))
+    scan_kwargs = {
+        "FilterExpression": Attr("email").exists(),
+        "ProjectionExpression": "userId, email, createdAt"
+    }
+    if body.get("startKey"):
+        scan_kwargs["ExclusiveStartKey"] = body["startKey"]
+
+    written = 0
+    duplicates = []
+    scanned = 0
+    last_key = None
+    while scanned < batch_size:
+        scan_kwargs["Limit"] = batch_size - scanned
+        result = table.scan(**scan_kwargs)
+        scanned += result.get("ScannedCount", 0)
+        for user in result.get("Items", []):
+            email = str(user["email"]).lower().strip()
+            try:
+                emails_table.put_item(
+                    Item={"email": email, "userId": user["userId"], "createdAt": user.get("createdAt")},
+                    ConditionExpression="attribute_not_exists(email) OR userId = :u",
+                    ExpressionAttributeValues={":u": user["userId"]}
+                )
+                written += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                duplicates.append({"email": email, "userId": user["userId"]})
+        last_key = result.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+    return response(200, {
+        "success": True,
+        "message": "Email index backfilled",
+        "data": {
+            "written": written,
+            "scanned": scanned,
+            "duplicates": duplicates,
+            "nextStartKey": last_key,
+            "done": last_key is None
+        }
+    })
@@ -0,0 +1,183 @@
+"""
+razorpayOrderId -> order lookup for the Orders and CourseOrders tables.
+
+Both tables carry GSI razorpayOrderId-index (Partition: razorpayOrderId,
+projection KEYS_ONLY). DynamoDB builds the index over existing rows when it is
+created, but only rows whose razorpayOrderId is a string are indexed:
+backfill_orders() rewrites ids stored as another type and reports rows with no
+id at all, and verify_orders() checks every order resolves through the index.
+An index miss is retried briefly and then reported as not found. Set
+ORDER_SCAN_FALLBACK=true only while verify reports covered: false - it makes
+every miss run a paginated consistent scan of the table.
+Package this file with payment_webhook and course_purchase_handler.
+"""
+
+import os
+import time
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+RAZORPAY_ORDER_INDEX = "razorpayOrderId-index"
+ORDER_SCAN_FALLBACK = os.environ.get("ORDER_SCAN_FALLBACK", "false").lower() == "true"
+# A webhook can arrive before a just-created order reaches the index
+INDEX_RETRY_DELAYS = (0.1, 0.3)
+ORDER_BATCH_SIZE = 500
+SAMPLE_LIMIT = 20
+
+
+def query_order_keys(table, razorpay_order_id):
+    result = table.query(
+        IndexName=RAZORPAY_ORDER_INDEX,
+        KeyConditionExpression=Key("razorpayOrderId").eq(razorpay_order_id)
+    )
+    return result.get("Items", [])
+
+
+def find_order(table, key_name, razorpay_order_id):
+    """
+    The order with this razorpayOrderId, or None. The index gives the key and a
+    consistent get returns the current item, so status checks are never stale.
+    """
+    try:
+        for delay in (0,) + INDEX_RETRY_DELAYS:
+            if delay:
+                time.sleep(delay)
+            keys = query_order_keys(table, razorpay_order_id)
+            if len(keys) > 1:
+                print(f"razorpayOrderId {razorpay_order_id} is shared by {len(keys)} orders; using the first")
+            for key in keys:
+                item = table.get_item(Key={key_name: key[key_name]}, ConsistentRead=True).get("Item")
+                if item:
+                    return item
+    except ClientError as e:
+        # Index not created yet in this environment
+        print(f"{RAZORPAY_ORDER_INDEX} query failed, falling back to scan: {str(e)}")
+
+    if not ORDER_SCAN_FALLBACK:
+        return None
+    return scan_for_order(table, key_name, razorpay_order_id)
+
+
+def scan_for_order(table, key_name, razorpay_order_id):
+    """Every page of the table, not just the first 1 MB"""
+    scan_kwargs = {
+        "FilterExpression": Attr("razorpayOrderId").eq(razorpay_order_id),
+        "ConsistentRead": True
+    }
+    while True:
+        result = table.scan(**scan_kwargs)
+        items = result.get("Items", [])
+        if items:
+            print(f"Order {items[0].get(key_name)} found by scan - run the razorpayOrderId index backfill")
+            return items[0]
+        if not result.get("LastEvaluatedKey"):
+            return None
+        scan_kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+def scan_orders(table, key_name, body, process):
+    """
+    Call process(order) for at most batchSize scanned orders (key, razorpayOrderId
+    and status only). Returns (scanned, nextStartKey); None means the scan is done.
+    """
+    batch_size = int(body.get("batchSize", ORDER_BATCH_SIZE))
+    scan_kwargs = {
+        "ProjectionExpression": "#k, razorpayOrderId, #s",
+        "ExpressionAttributeNames": {"#k": key_name, "#s": "status"}
+    }
+    if body.get("startKey"):
+        scan_kwargs["ExclusiveStartKey"] = body["startKey"]
+
+    scanned = 0
+    last_key = None
+    while scanned < batch_size:
+        scan_kwargs["Limit"] = batch_size - scanned
+        result = table.scan(**scan_kwargs)
+        scanned += result.get("ScannedCount", 0)
+        for order in result.get("Items", []):
+            process(order)
+        last_key = result.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+    return scanned, last_key
+
+
+def sample(samples, value):
+    if len(samples) < SAMPLE_LIMIT:
+        samples.append(value)
+
+
+def backfill_orders(table, key_name, body):
+    """
+    Make historical orders indexable: a razorpayOrderId stored as a number is
+    rewritten as a string. Orders with no razorpayOrderId cannot be indexed and
+    are reported. Resumable (batchSize / startKey -> nextStartKey) and safe to re-run.
+    """
+    counts = {"indexable": 0, "rewritten": 0, "missingRazorpayOrderId": 0}
+    missing = []
+
+    def process(order):
+        razorpay_order_id = order.get("razorpayOrderId")
+        if isinstance(razorpay_order_id, str) and razorpay_order_id:
+            counts["indexable"] += 1
+        elif razorpay_order_id in (None, ""):
+            counts["missingRazorpayOrderId"] += 1
+            sample(missing, order[key_name])
+        else:
+            try:
+                table.update_item(
+                    Key={key_name: order[key_name]},
+                    UpdateExpression="SET razorpayOrderId = :s",
+                    ConditionExpression="razorpayOrderId = :old",
+                    ExpressionAttributeValues={":s": str(razorpay_order_id), ":old": razorpay_order_id}
+                )
+                counts["rewritten"] += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+
+    scanned, last_key = scan_orders(table, key_name, body, process)
+    return {
+        **counts,
+        "missingSamples": missing,
+        "scanned": scanned,
+        "nextStartKey": last_key,
+        "done": last_key is None
+    }
+
+
+def verify_orders(table, key_name, body):
+    """
+    Report how many orders resolve through the index. notIndexed orders have a
+    string id the index does not return yet (re-check after the backfill or
+    index build settles); duplicates are ids shared by more than one order.
+    """
+    counts = {"indexed": 0, "notIndexed": 0, "unindexable": 0, "duplicates": 0}
+    samples = {"notIndexed": [], "unindexable": [], "duplicates": []}
+
+    def process(order):
+        razorpay_order_id = order.get("razorpayOrderId")
+        if not isinstance(razorpay_order_id, str) or not razorpay_order_id:
+            counts["unindexable"] += 1
+            sample(samples["unindexable"], order[key_name])
+            return
+        keys = [key[key_name] for key in query_order_keys(table, razorpay_order_id)]
+        if order[key_name] not in keys:
+            counts["notIndexed"] += 1
+            sample(samples["notIndexed"], order[key_name])
+            return
+        counts["indexed"] += 1
+        if len(keys) > 1:
+            counts["duplicates"] += 1
+            sample(samples["duplicates"], {"razorpayOrderId": razorpay_order_id, "orders": keys})
+
+    scanned, last_key = scan_orders(table, key_name, body, process)
+    return {
+        **counts,
+        "samples": samples,
+        "covered": counts["notIndexed"] == 0 and counts["unindexable"] == 0,
+        "scanned": scanned,
+        "nextStartKey": last_key,
+        "done": last_key is None
+    }
@@ -2,9 +2,16 @@ import json
 import os
 import hmac
 import hashlib
+import time
 import boto3
 from datetime import datetime
 from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from user_collections import USER_COLLECTIONS_TABLE, child_item, entry_id, item_key
+from order_lookup import find_order, backfill_orders, verify_orders
+from webhook_queue import enqueue, is_queue_batch, process_batch, queue_enabled
+from earnings_ledger import SELLER_EARNINGS_TABLE, ledger_entry, ledger_actions
 
 # ---------- CONFIG ----------
 WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET")
@@ -13,9 +20,29 @@ if not WEBHOOK_SECRET:
     raise ValueError("RAZORPAY_WEBHOOK_SECRET environment variable is not set")
 
 dynamodb = boto3.resource("dynamodb")
+# GSI on Orders: razorpayOrderId-index (Partition: razorpayOrderId), keys only
 orders_table = dynamodb.Table("Orders")
 users_table = dynamodb.Table("Users")
 projects_table = dynamodb.Table("Projects")
+# Buyer purchases and cart entries are child items (kinds "purchase" / "cart");
+# purchases are also appended to Users.purchases, which buyerApi still reads
+collections_table = dynamodb.Table(USER_COLLECTIONS_TABLE)
+# Append-only seller earnings ledger with day / month / project rollups
+earnings_table = dynamodb.Table(SELLER_EARNINGS_TABLE)
+serializer = TypeSerializer()
+
+BATCH_GET_LIMIT = 100
+BATCH_GET_MAX_RETRIES = 5
+# Fulfilment is committed in chunks of projects, one transaction each. A chunk
+# writes 5 items per project (purchase, project counter, cart entry, ledger
+# entry, project rollup), 3 per seller (totals, day and month rollups), the
+# buyer totals and the order marker: 5 * 12 + 3 * 12 + 2 <= 100.
+PROJECTS_PER_TRANSACTION = 12
+# fulfilledChunks holds chunk indexes, which only identify projects at the size
+# they were committed with, so the marker also stores chunkSize. Orders
+# partly fulfilled before it was stored used 24.
+LEGACY_PROJECTS_PER_TRANSACTION = 24
+TRANSACTION_MAX_ATTEMPTS = 3
 
 
 # ---------- HELPER FUNCTIONS ----------
@@ -58,58 +85,31 @@ def verify_razorpay_signature(payload, received_signature):
 
 def find_order_by_razorpay_order_id(razorpay_order_id):
     """
-    Find order by razorpayOrderId.
-    Uses scan as fallback (consider adding GSI on razorpayOrderId for better performance).
+    Find order by razorpayOrderId through razorpayOrderId-index (see order_lookup).
+    Lookup errors propagate, so the webhook answers 500 and is retried.
     """
-    try:
-        # Try to scan for the order
-        response = orders_table.scan(
-            FilterExpression="razorpayOrderId = :r",
-            ExpressionAttributeValues={":r": razorpay_order_id}
-        )
-        
-        items = response.get("Items", [])
-        if not items:
-            return None
-        
-        # Should only be one order with this razorpayOrderId
-        return items[0]
-    except Exception as e:
-        print(f"Error finding order: {str(e)}")
-        return None
+    return find_order(orders_table, "orderId", razorpay_order_id)
 
 
-def clear_user_cart(user_id, project_ids):
+def clear_legacy_cart(user_id, project_ids):
     """
-    Remove purchased projects from user's cart.
+    Remove purchased projects from the legacy Users.cart array for users the
+    collections migration has not reached (cart child items are deleted in the
+    fulfilment transactions).
     """
     try:
-        # Get current cart
-        user_response = users_table.get_item(Key={"userId": user_id})
-        if "Item" not in user_response:
-            print(f"User {user_id} not found")
-            return False
-        
-        cart = user_response["Item"].get("cart", [])
+        # Only the cart attribute is read
+        user_response = users_table.get_item(Key={"userId": user_id}, ProjectionExpression="cart")
+        cart = user_response.get("Item", {}).get("cart", [])
         if not cart:
-            # Cart already empty or doesn't exist
             return True
         
-        # Filter out purchased project IDs
         # Cart items can be strings (projectIds) or objects with projectId field
-        new_cart = []
         purchased_set = set(project_ids)
+        new_cart = [item for item in cart if entry_id("cart", item) and entry_id("cart", item) not in purchased_set]
+        if len(new_cart) == len(cart):
+            return True
         
-        for item in cart:
-            if isinstance(item, str):
-                if item not in purchased_set:
-                    new_cart.append(item)
-            elif isinstance(item, dict):
-                project_id = item.get("projectId") or item.get("id")
-                if project_id and project_id not in purchased_set:
-                    new_cart.append(item)
-        
-        # Update cart
         users_table.update_item(
             Key={"userId": user_id},
             UpdateExpression="SET cart = :new_cart",
@@ -122,13 +122,188 @@ def clear_user_cart(user_id, project_ids):
         return False
 
 
+def to_attribute_values(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+
+def batch_get_projects(project_ids):
+    """{projectId: {projectId, price, sellerId}} in BatchGetItem calls of 100 keys"""
+    projects = {}
+    for start in range(0, len(project_ids), BATCH_GET_LIMIT):
+        request = {projects_table.name: {
+            "Keys": [{"projectId": project_id} for project_id in project_ids[start:start + BATCH_GET_LIMIT]],
+            "ProjectionExpression": "projectId, price, sellerId"
+        }}
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            result = dynamodb.batch_get_item(RequestItems=request)
+            for project in result.get("Responses", {}).get(projects_table.name, []):
+                projects[project["projectId"]] = project
+            request = result.get("UnprocessedKeys")
+            if not request:
+                break
+            if attempt == BATCH_GET_MAX_RETRIES:
+                raise RuntimeError(f"Projects still unprocessed after {BATCH_GET_MAX_RETRIES} retries")
+            time.sleep(0.05 * (2 ** attempt))
+    return projects
+
+
+def fulfilment_chunk(order, chunk_index, chunk_size, project_ids, projects, payment_id, timestamp, last,
+                     recorded=()):
+    """
+    Transaction items for one chunk of an order, and the purchases they record.
+    User totals and seller rollups are aggregated so each item is written once
+    per chunk; every sale is appended to the seller's earnings ledger.
+    The order update is the marker: it fails if the chunk was already applied,
+    or if earlier chunks were committed with a different chunk size.
+    """
+    user_id = order["userId"]
+    actions = []
+    purchases = []
+    user_deltas = {user_id: {}}
+    purchase_items = []
+    seller_entries = {}
+    for project_id in project_ids:
+        actions.append({"Delete": {
+            "TableName": collections_table.name,
+            "Key": to_attribute_values({"userId": user_id, "itemKey": item_key("cart", project_id)})
+        }})
+        if project_id in recorded:
+            continue
+        project = projects.get(project_id)
+        if not project or not project.get("sellerId"):
+            print(f"Project {project_id} not found or missing sellerId, skipping")
+            continue
+        price = Decimal(str(project.get("price", 0)))
+        purchases.append({"projectId": project_id, "price": price, "sellerId": project["sellerId"]})
+        
+        # One child item per purchased project; a retry can never add it twice
+        purchase_item = {
+            "projectId": project_id,
+            "priceAtPurchase": price,
+            "purchasedAt": timestamp,
+            "paymentId": payment_id,
+            "orderId": order["orderId"],
+            "orderStatus": "SUCCESS"
+        }
+        purchase_items.append(purchase_item)
+        actions.append({"Put": {
+            "TableName": collections_table.name,
+            "Item": to_attribute_values(child_item(user_id, "purchase", purchase_item)),
+            "ConditionExpression": "attribute_not_exists(itemKey)"
+        }})
+        actions.append({"Update": {
+            "TableName": projects_table.name,
+            "Key": to_attribute_values({"projectId": project_id}),
+            "UpdateExpression": "ADD purchasesCount :one",
+            "ExpressionAttributeValues": to_attribute_values({":one": 1})
+        }})
+        buyer = user_deltas[user_id]
+        buyer["totalPurchases"] = buyer.get("totalPurchases", 0) + 1
+        buyer["totalSpent"] = buyer.get("totalSpent", Decimal("0")) + price
+        entry = ledger_entry(project["sellerId"], user_id, project_id, price, timestamp, order["orderId"])
+        seller_entries.setdefault(project["sellerId"], []).append(entry)
+        seller = user_deltas.setdefault(project["sellerId"], {})
+        seller["totalEarnings"] = seller.get("totalEarnings", Decimal("0")) + entry["net"]
+    
+    for uid, deltas in user_deltas.items():
+        if not deltas:
+            continue
+        names = {f"#f{i}": field for i, field in enumerate(deltas)}
+        update_expression = "ADD " + ", ".join(f"{name} :{name[1:]}" for name in names)
+        values = {f":{name[1:]}": deltas[field] for name, field in names.items()}
+        if uid == user_id:
+            # Legacy array, appended in the same transaction as the child items
+            update_expression += " SET purchases = list_append(if_not_exists(purchases, :empty), :purchases)"
+            values.update({":empty": [], ":purchases": purchase_items})
+        actions.append({"Update": {
+            "TableName": users_table.name,
+            "Key": to_attribute_values({"userId": uid}),
+            "UpdateExpression": update_expression,
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": to_attribute_values(values)
+        }})
+    
+    for seller_id, entries in seller_entries.items():
+        actions.extend(ledger_actions(earnings_table.name, seller_id, entries, to_attribute_values))
+    
+    marker_values = {":chunk": {chunk_index}, ":index": chunk_index, ":size": chunk_size,
+                     ":success": "SUCCESS", ":u": timestamp}
+    update_expression = "ADD fulfilledChunks :chunk SET updatedAt = :u, chunkSize = :size"
+    if last:
+        update_expression += ", #s = :success, paymentId = :p, fulfilledAt = :u"
+        marker_values[":p"] = payment_id
+    actions.append({"Update": {
+        "TableName": orders_table.name,
+        "Key": to_attribute_values({"orderId": order["orderId"]}),
+        "UpdateExpression": update_expression,
+        "ConditionExpression": "#s <> :success AND NOT contains(fulfilledChunks, :index)"
+                               " AND (attribute_not_exists(chunkSize) OR chunkSize = :size)",
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ExpressionAttributeValues": to_attribute_values(marker_values),
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD"
+    }})
+    return actions, purchases
+
+
+def commit_chunk(order, chunk_index, chunk_size, project_ids, projects, payment_id, timestamp, last):
+    """
+    Apply one chunk atomically. Returns the purchases it recorded, or None when
+    the order marker shows the chunk (or the whole order) was already applied.
+    Raises when another delivery committed chunks of a different size, so the
+    webhook is redelivered and resumes with the stored size.
+    Purchases recorded before fulfilment was transactional are left out and the
+    chunk is retried without them.
+    """
+    recorded = set()
+    for attempt in range(TRANSACTION_MAX_ATTEMPTS):
+        actions, purchases = fulfilment_chunk(
+            order, chunk_index, chunk_size, project_ids, projects, payment_id, timestamp, last, recorded
+        )
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=actions)
+            return purchases
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response.get("CancellationReasons") or []
+            failed = [i for i, r in enumerate(reasons) if r.get("Code") == "ConditionalCheckFailed"]
+            marker = next((i for i in failed if actions[i].get("Update", {}).get("TableName") == orders_table.name), None)
+            if marker is not None:
+                stored_size = reasons[marker].get("Item", {}).get("chunkSize", {}).get("N")
+                if stored_size is not None and int(stored_size) != chunk_size:
+                    raise RuntimeError(f"Order {order['orderId']} was partly fulfilled in chunks of {stored_size}")
+                return None
+            already = {actions[i]["Put"]["Item"]["projectId"]["S"] for i in failed if "Put" in actions[i]}
+            if already:
+                print(f"Purchases already recorded for order {order['orderId']}: {sorted(already)}")
+                recorded |= already
+            elif not any(r.get("Code") == "TransactionConflict" for r in reasons):
+                raise
+            time.sleep(0.05 * (2 ** attempt))
+    raise RuntimeError(f"Chunk {chunk_index} of order {order['orderId']} did not commit")
+
+
 # ---------- HANDLER ----------
 def lambda_handler(event, context):
     """
     Handle Razorpay payment webhooks.
     Verifies signature and processes payment.captured or payment.failed events.
+    With WEBHOOK_QUEUE_URL set, verified events are queued and acknowledged at
+    once; the same function then receives them as SQS batches (see webhook_queue).
+    Direct invocations (no API Gateway body) may run the order index maintenance
+    actions BACKFILL_RAZORPAY_ORDER_INDEX / VERIFY_RAZORPAY_ORDER_INDEX.
     """
+    if is_queue_batch(event):
+        return process_batch(event, EVENT_HANDLERS)
+    
     try:
+        if "body" not in event:
+            action = event.get("action")
+            if action == "BACKFILL_RAZORPAY_ORDER_INDEX":
+                return create_response(200, backfill_orders(orders_table, "orderId", event))
+            if action == "VERIFY_RAZORPAY_ORDER_INDEX":
+                return create_response(200, verify_orders(orders_table, "orderId", event))
+        
         # Get payload and headers
         # API Gateway might stringify the body, so handle both cases
         if isinstance(event.get("body"), str):
@@ -162,6 +337,11 @@ def lambda_handler(event, context):
         
         event_type = data.get("event")
         
+        payment_entity = data.get("payload", {}).get("payment", {}).get("entity", {})
+        if event_type in EVENT_HANDLERS and payment_entity and queue_enabled():
+            message_id = enqueue(event_type, payment_entity.get("order_id"), payment_entity)
+            return create_response(200, {"message": f"Event {event_type} queued", "messageId": message_id})
+        
         # Handle different event types
         if event_type == "payment.captured":
             payment_entity = data.get("payload", {}).get("payment", {}).get("entity", {})
@@ -197,7 +377,8 @@ def lambda_handler(event, context):
 def handle_success(payment):
     """
     Handle payment.captured event.
-    Updates order status, creates purchases, updates counters, and clears cart.
+    Creates purchases, updates counters and earnings, clears the cart and marks
+    the order SUCCESS in chunked transactions, so a retried webhook is a no-op.
     """
     try:
         razorpay_order_id = payment.get("order_id")
@@ -231,111 +412,36 @@ def handle_success(payment):
         if not project_ids:
             return create_response(400, {}, error="Order missing projectIds")
         
-        # 3️⃣ Update Order Status to SUCCESS
-        try:
-            orders_table.update_item(
-                Key={"orderId": order_id},
-                UpdateExpression="SET #s = :s, updatedAt = :u",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={
-                    ":s": "SUCCESS",
-                    ":u": timestamp
-                }
-            )
-            print(f"Order {order_id} status updated to SUCCESS")
-        except Exception as e:
-            print(f"Error updating order status: {str(e)}")
-            return create_response(500, {}, error=f"Failed to update order status: {str(e)}")
-        
-        # Process each project in the order
-        total_purchase_amount = 0
-        
-        for project_id in project_ids:
-            try:
-                # Get project details
-                project_response = projects_table.get_item(Key={"projectId": project_id})
-                if "Item" not in project_response:
-                    print(f"Project {project_id} not found, skipping")
-                    continue
-                
-                project = project_response["Item"]
-                price = float(project.get("price", 0))
-                seller_id = project.get("sellerId")
-                
-                if not seller_id:
-                    print(f"Project {project_id} missing sellerId, skipping")
-                    continue
-                
-                total_purchase_amount += price
-                
-                # 6️⃣ Add Purchase to Buyer's purchases array
-                purchase_item = {
-                    "projectId": project_id,
-                    "priceAtPurchase": price,
-                    "purchasedAt": timestamp,
-                    "paymentId": payment.get("id"),
-                    "orderStatus": "SUCCESS"
-                }
-                
-                try:
-                    users_table.update_item(
-                        Key={"userId": user_id},
-                        UpdateExpression="""
-                            SET purchases = list_append(if_not_exists(purchases, :e), :p),
-                                totalPurchases = if_not_exists(totalPurchases, :z) + :i,
-                                totalSpent = if_not_exists(totalSpent, :z) + :amt
-                        """,
-                        ExpressionAttributeValues={
-                            ":e": [],
-                            ":p": [purchase_item],
-                            ":i": 1,
-                            ":amt": price,
-                            ":z": 0
-                        }
-                    )
-                    print(f"Purchase added for user {user_id}, project {project_id}")
-                except Exception as e:
-                    print(f"Error adding purchase for project {project_id}: {str(e)}")
-                    # Continue processing other projects
-                
-                # 7️⃣ Increment Project Purchase Count
-                try:
-                    projects_table.update_item(
-                        Key={"projectId": project_id},
-                        UpdateExpression="SET purchasesCount = if_not_exists(purchasesCount, :z) + :i",
-                        ExpressionAttributeValues={":i": 1, ":z": 0}
-                    )
-                    print(f"Purchase count incremented for project {project_id}")
-                except Exception as e:
-                    print(f"Error incrementing purchase count for project {project_id}: {str(e)}")
-                
-                # 7️⃣ Update Seller Earnings (85% of price)
-                seller_earning = price * 0.85
-                try:
-                    users_table.update_item(
-                        Key={"userId": seller_id},
-                        UpdateExpression="SET totalEarnings = if_not_exists(totalEarnings, :z) + :e",
-                        ExpressionAttributeValues={
-                            ":e": seller_earning,
-                            ":z": 0
-                        }
-                    )
-                    print(f"Earnings updated for seller {seller_id}: +{seller_earning}")
-                except Exception as e:
-                    print(f"Error updating seller earnings for {seller_id}: {str(e)}")
-            
-            except Exception as e:
-                print(f"Error processing project {project_id}: {str(e)}")
-                # Continue with next project
+        # 3️⃣ Fetch every project in one batched read
+        project_ids = list(dict.fromkeys(project_ids))
+        projects = batch_get_projects(project_ids)
+        
+        # 4️⃣ Commit purchases, counters, earnings and cart removal chunk by chunk;
+        # the last chunk marks the order SUCCESS. Chunks listed in the order's
+        # fulfilledChunks were committed by an earlier delivery, with the order's
+        # chunkSize, and are skipped.
+        done_chunks = {int(c) for c in order.get("fulfilledChunks", set())}
+        chunk_size = int(order.get("chunkSize", LEGACY_PROJECTS_PER_TRANSACTION if done_chunks
+                                   else PROJECTS_PER_TRANSACTION))
+        chunks = [project_ids[i:i + chunk_size] for i in range(0, len(project_ids), chunk_size)]
+        purchases = []
+        for chunk_index, chunk_ids in enumerate(chunks):
+            if chunk_index in done_chunks:
+                continue
+            recorded = commit_chunk(order, chunk_index, chunk_size, chunk_ids, projects, payment.get("id"),
+                                    timestamp, chunk_index == len(chunks) - 1)
+            if recorded is None:
+                print(f"Chunk {chunk_index} of order {order_id} already applied")
                 continue
+            purchases.extend(recorded)
+        print(f"Order {order_id} fulfilled: {len(purchases)} purchases recorded")
         
-        # 9️⃣ Clear Cart (Remove purchased items)
-        cart_cleared = clear_user_cart(user_id, project_ids)
-        if cart_cleared:
-            print(f"Cart cleared for user {user_id}")
-        else:
+        # 5️⃣ Legacy cart array, for users not yet migrated to cart child items
+        if not clear_legacy_cart(user_id, project_ids):
             print(f"Warning: Could not clear cart for user {user_id}")
         
+        total_purchase_amount = float(sum((p["price"] for p in purchases), Decimal("0")))
+        
         return create_response(
             200,
             {
@@ -415,3 +521,9 @@ def handle_failure(payment):
         traceback.print_exc()
         return create_response(500, {}, error=f"Error processing payment failure: {str(e)}")
 
+
+# Queued event kinds -> fulfilment
+EVENT_HANDLERS = {
+    "payment.captured": handle_success,
+    "payment.failed": handle_failure,
+}
@@ -0,0 +1,56 @@
+"""
+Open-project feed keys and aggregates shared by the bid Lambdas.
+
+Package this file with bid_request_projects_handler and bids_handler (as
+portfolio_templates is packaged with generate_portfolio). Both change project
+status, so both must write the same statusCategory key and mark the open-feed
+maxBudget aggregate stale the same way. Tables are passed on every call so
+handlers keep their module-level table handles.
+
+BidRequestProjects GSI statusCategory-createdAt-index: PK statusCategory = "<status>#<category>"
+BidRequestProjectStats: statKey "open" holds maxBudget / maxBudgetStale
+"""
+
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+STATUS_INDEX = 'status-createdAt-index'
+STATUS_CATEGORY_INDEX = 'statusCategory-createdAt-index'
+OPEN_STATS_KEY = 'open'
+
+
+def status_category(status, category):
+    """Composite key for the statusCategory-createdAt-index"""
+    return f"{status}#{category or 'General'}"
+
+
+def raise_max_budget(stats_table, budget_max):
+    """Raise the open-feed maxBudget aggregate if this budget is higher"""
+    try:
+        stats_table.update_item(
+            Key={'statKey': OPEN_STATS_KEY},
+            UpdateExpression="SET maxBudget = :b",
+            ConditionExpression="attribute_not_exists(maxBudget) OR maxBudget < :b",
+            ExpressionAttributeValues={':b': Decimal(str(budget_max))}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def mark_max_budget_stale(stats_table, budget_max):
+    """
+    Called when an open project leaves the feed (or lowers its budget).
+    Only if it could have been the maximum is the aggregate marked for
+    recomputation on the next feed read.
+    """
+    try:
+        stats_table.update_item(
+            Key={'statKey': OPEN_STATS_KEY},
+            UpdateExpression="SET maxBudgetStale = :t",
+            ConditionExpression="maxBudget <= :b",
+            ExpressionAttributeValues={':t': True, ':b': Decimal(str(budget_max))}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
@@ -0,0 +1,333 @@
+"""
+Seller Earnings Handler Lambda Function
+Earnings charts, per-project breakdowns and the sale-by-sale ledger for sellers.
+
+DynamoDB Table: SellerEarnings (see earnings_ledger.py)
+Primary Key: sellerId (String), Sort Key: entryKey (String)
+entry#<soldAt>#<buyerId>#<projectId> items are appended by payment_webhook in the
+fulfilment transaction; day#YYYY-MM-DD, month#YYYY-MM and project#<projectId>
+rollups are incremented in the same transaction. Days are UTC.
+
+Actions:
+- GET_EARNINGS_SERIES: gross / net / sales per day or month for a range, zero-filled
+  (one rollup item per period)
+- GET_PROJECT_EARNINGS: Totals per project, highest net first
+- GET_EARNINGS_LEDGER: Individual sales in a range, newest first, cursor-paginated
+- BACKFILL_EARNINGS_LEDGER: Ledger entries and rollups for purchases made before the
+  ledger existed, from UserCollections purchase items (direct invocation only,
+  resumable, safe to re-run; run migrateUserCollections first)
+"""
+
+import json
+import time
+import base64
+import boto3
+from datetime import datetime, date, timedelta
+from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from decimal import Decimal
+from earnings_ledger import SELLER_EARNINGS_TABLE, ledger_entry, ledger_actions
+from user_collections import USER_COLLECTIONS_TABLE
+
+dynamodb = boto3.resource('dynamodb')
+earnings_table = dynamodb.Table(SELLER_EARNINGS_TABLE)
+collections_table = dynamodb.Table(USER_COLLECTIONS_TABLE)
+projects_table = dynamodb.Table('Projects')
+serializer = TypeSerializer()
+
+DEFAULT_DAYS = 30
+DEFAULT_MONTHS = 6
+MAX_SERIES_POINTS = 366
+DEFAULT_LEDGER_LIMIT = 50
+MAX_LEDGER_LIMIT = 200
+BACKFILL_BATCH_SIZE = 500
+BATCH_GET_LIMIT = 100
+BATCH_GET_MAX_RETRIES = 5
+
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+    'Access-Control-Max-Age': '86400'
+}
+
+
+# ---------- HELPERS ----------
+def decimal_to_float(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, dict):
+        return {k: decimal_to_float(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [decimal_to_float(i) for i in obj]
+    return obj
+
+def response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': CORS_HEADERS,
+        'body': json.dumps(decimal_to_float(body))
+    }
+
+def error_response(status_code, code, message):
+    return response(status_code, {"success": False, "error": {"code": code, "message": message}})
+
+def encode_cursor(key):
+    if not key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+
+def to_attribute_values(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def query_all(**query_kwargs):
+    items = []
+    while True:
+        result = earnings_table.query(**query_kwargs)
+        items.extend(result.get('Items', []))
+        if not result.get('LastEvaluatedKey'):
+            return items
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+def month_start(day, months_back=0):
+    month_index = day.year * 12 + day.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def periods(granularity, start, end):
+    """Period labels from start to end inclusive ("YYYY-MM-DD" or "YYYY-MM")"""
+    if granularity == 'day':
+        return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    labels = []
+    current = month_start(start)
+    while current <= end:
+        labels.append(current.isoformat()[:7])
+        current = month_start(current, -1)
+    return labels
+
+def parse_range(body, granularity):
+    """(start, end) dates from body from/to, defaulting to the last 30 days / 6 months"""
+    today = datetime.utcnow().date()
+    end = date.fromisoformat(body['to'][:10] if granularity == 'day' else body['to'][:7] + '-01') \
+        if body.get('to') else today
+    if body.get('from'):
+        start = date.fromisoformat(body['from'][:10] if granularity == 'day' else body['from'][:7] + '-01')
+    elif granularity == 'day':
+        start = end - timedelta(days=DEFAULT_DAYS - 1)
+    else:
+        start = month_start(end, DEFAULT_MONTHS - 1)
+    return start, end
+
+
+# ---------- GET EARNINGS SERIES ----------
+def handle_get_earnings_series(body):
+    seller_id = body.get('sellerId')
+    granularity = body.get('granularity', 'day')
+    if not seller_id:
+        return error_response(400, "VALIDATION_ERROR", "sellerId is required")
+    if granularity not in ('day', 'month'):
+        return error_response(400, "VALIDATION_ERROR", "granularity must be day or month")
+    try:
+        start, end = parse_range(body, granularity)
+    except ValueError:
+        return error_response(400, "VALIDATION_ERROR", "from / to must be ISO dates")
+    labels = periods(granularity, start, end)
+    if not labels or len(labels) > MAX_SERIES_POINTS:
+        return error_response(400, "VALIDATION_ERROR", f"Range must cover 1 to {MAX_SERIES_POINTS} periods")
+
+    try:
+        rollups = query_all(
+            KeyConditionExpression=Key('sellerId').eq(seller_id) &
+                                   Key('entryKey').between(f"{granularity}#{labels[0]}", f"{granularity}#{labels[-1]}")
+        )
+        by_period = {item['entryKey'].split('#', 1)[1]: item for item in rollups}
+        series = [{
+            "period": label,
+            "gross": by_period.get(label, {}).get('gross', 0),
+            "net": by_period.get(label, {}).get('net', 0),
+            "sales": by_period.get(label, {}).get('sales', 0)
+        } for label in labels]
+        return response(200, {
+            "success": True,
+            "data": {
+                "granularity": granularity,
+                "series": series,
+                "totals": {
+                    "gross": sum(Decimal(str(p['gross'])) for p in series),
+                    "net": sum(Decimal(str(p['net'])) for p in series),
+                    "sales": sum(int(p['sales']) for p in series)
+                }
+            }
+        })
+    except Exception as e:
+        print(f"Error reading earnings series: {str(e)}")
+        return error_response(500, "DATABASE_ERROR", "Failed to load earnings")
+
+
+# ---------- GET PROJECT EARNINGS ----------
+def handle_get_project_earnings(body):
+    seller_id = body.get('sellerId')
+    if not seller_id:
+        return error_response(400, "VALIDATION_ERROR", "sellerId is required")
+    try:
+        items = query_all(KeyConditionExpression=Key('sellerId').eq(seller_id) & Key('entryKey').begins_with('project#'))
+        projects = sorted(({
+            "projectId": item['entryKey'].split('#', 1)[1],
+            "gross": item.get('gross', 0),
+            "net": item.get('net', 0),
+            "sales": item.get('sales', 0)
+        } for item in items), key=lambda p: p['net'], reverse=True)
+        return response(200, {"success": True, "data": {"projects": projects, "count": len(projects)}})
+    except Exception as e:
+        print(f"Error reading project earnings: {str(e)}")
+        return error_response(500, "DATABASE_ERROR", "Failed to load project earnings")
+
+
+# ---------- GET EARNINGS LEDGER ----------
+def handle_get_earnings_ledger(body):
+    seller_id = body.get('sellerId')
+    if not seller_id:
+        return error_response(400, "VALIDATION_ERROR", "sellerId is required")
+    try:
+        limit = max(1, min(int(body.get('limit', DEFAULT_LEDGER_LIMIT)), MAX_LEDGER_LIMIT))
+    except (ValueError, TypeError):
+        return error_response(400, "VALIDATION_ERROR", "limit must be an integer")
+    # soldAt is an ISO timestamp, so entry keys sort by time; "~" sorts after every timestamp
+    low = f"entry#{body.get('from', '')}"
+    high = f"entry#{body['to']}~" if body.get('to') else "entry#~"
+    query_kwargs = {
+        'KeyConditionExpression': Key('sellerId').eq(seller_id) & Key('entryKey').between(low, high),
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    try:
+        if body.get('cursor'):
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(body['cursor'])
+    except (ValueError, TypeError):
+        return error_response(400, "VALIDATION_ERROR", "Invalid cursor")
+    try:
+        result = earnings_table.query(**query_kwargs)
+        return response(200, {
+            "success": True,
+            "data": {
+                "entries": result.get('Items', []),
+                "nextCursor": encode_cursor(result.get('LastEvaluatedKey'))
+            }
+        })
+    except Exception as e:
+        print(f"Error reading earnings ledger: {str(e)}")
+        return error_response(500, "DATABASE_ERROR", "Failed to load earnings ledger")
+
+
+# ---------- BACKFILL EARNINGS LEDGER ----------
+def project_sellers(project_ids):
+    """{projectId: sellerId} via BatchGetItem; UnprocessedKeys are retried with exponential backoff"""
+    sellers = {}
+    project_ids = list(project_ids)
+    for start in range(0, len(project_ids), BATCH_GET_LIMIT):
+        request = {projects_table.name: {
+            'Keys': [{'projectId': pid} for pid in project_ids[start:start + BATCH_GET_LIMIT]],
+            'ProjectionExpression': 'projectId, sellerId'
+        }}
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            result = dynamodb.batch_get_item(RequestItems=request)
+            for project in result.get('Responses', {}).get(projects_table.name, []):
+                if project.get('sellerId'):
+                    sellers[project['projectId']] = project['sellerId']
+            request = result.get('UnprocessedKeys')
+            if not request:
+                break
+            if attempt == BATCH_GET_MAX_RETRIES:
+                raise RuntimeError(f"Projects still unprocessed after {BATCH_GET_MAX_RETRIES} retries")
+            time.sleep(0.05 * (2 ** attempt))
+    return sellers
+
+def handle_backfill_earnings_ledger(body):
+    """
+    Append ledger entries (and their rollups) for purchase child items made before
+    the ledger existed. Each sale is one transaction whose entry put is conditional,
+    so sales already in the ledger are skipped. Processes at most batchSize scanned
+    items per call; pass nextStartKey back as startKey until done.
+    """
+    batch_size = int(body.get('batchSize', BACKFILL_BATCH_SIZE))
+    scan_kwargs = {'FilterExpression': Attr('kind').eq('purchase')}
+    if body.get('startKey'):
+        scan_kwargs['ExclusiveStartKey'] = body['startKey']
+
+    counts = {"written": 0, "alreadyLedgered": 0, "skipped": 0}
+    scanned = 0
+    last_key = None
+    try:
+        while scanned < batch_size:
+            scan_kwargs['Limit'] = batch_size - scanned
+            result = collections_table.scan(**scan_kwargs)
+            scanned += result.get('ScannedCount', 0)
+            purchases = result.get('Items', [])
+            sellers = project_sellers({p['projectId'] for p in purchases if p.get('projectId')})
+            for purchase in purchases:
+                seller_id = sellers.get(purchase.get('projectId'))
+                if not seller_id or not purchase.get('purchasedAt'):
+                    counts["skipped"] += 1
+                    continue
+                entry = ledger_entry(seller_id, purchase['userId'], purchase['projectId'],
+                                     purchase.get('priceAtPurchase', 0), purchase['purchasedAt'],
+                                     purchase.get('orderId'))
+                try:
+                    dynamodb.meta.client.transact_write_items(
+                        TransactItems=ledger_actions(earnings_table.name, seller_id, [entry], to_attribute_values)
+                    )
+                    counts["written"] += 1
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'TransactionCanceledException':
+                        raise
+                    counts["alreadyLedgered"] += 1
+            last_key = result.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            scan_kwargs['ExclusiveStartKey'] = last_key
+    except Exception as e:
+        print(f"Error backfilling earnings ledger: {str(e)}")
+        return error_response(500, "DATABASE_ERROR", "Failed to backfill earnings ledger")
+
+    return response(200, {
+        "success": True,
+        "message": "Earnings ledger backfilled",
+        "data": {**counts, "scanned": scanned, "nextStartKey": last_key, "done": last_key is None}
+    })
+
+
+# ---------- HANDLER ----------
+def lambda_handler(event, context):
+    http_method = event.get('httpMethod') or event.get('requestContext', {}).get('http', {}).get('method', '')
+    if http_method.upper() == 'OPTIONS':
+        return {'statusCode': 200, 'headers': CORS_HEADERS, 'body': json.dumps({"message": "CORS preflight"})}
+
+    try:
+        # Direct invocations (no API Gateway body) pass the request as the event
+        direct = 'body' not in event
+        body = event if direct else event['body'] or {}
+        if isinstance(body, str):
+            body = json.loads(body)
+        if http_method.upper() == 'GET':
+            body = {**body, **(event.get('queryStringParameters') or {})}
+
+        action = body.get('action', '').upper()
+        handlers = {
+            'GET_EARNINGS_SERIES': handle_get_earnings_series,
+            'GET_PROJECT_EARNINGS': handle_get_project_earnings,
+            'GET_EARNINGS_LEDGER': handle_get_earnings_ledger
+        }
+        if direct:
+            handlers['BACKFILL_EARNINGS_LEDGER'] = handle_backfill_earnings_ledger
+        if action not in handlers:
+            return error_response(400, "INVALID_ACTION", f"Invalid action: {action}")
+        return handlers[action](body)
+    except json.JSONDecodeError:
+        return error_response(400, "INVALID_JSON", "Invalid JSON in request body")
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        return error_response(500, "INTERNAL_ERROR", "Internal server error")
@@ -0,0 +1,89 @@
+"""
+Skill matching shared by the freelancer / project recommendation Lambdas.
+
+Package this file with freelancers_handler, bid_request_projects_handler and
+update_userdetails_in_settings (as portfolio_templates is packaged with
+generate_portfolio). SUGGEST_FREELANCERS and RECOMMEND_PROJECTS score with the
+same rarity weight and rate fit, and the FreelancerSkills postings written by
+the settings handler and the backfill must agree on who is indexed and what a
+posting carries. The skills table is passed on every call so handlers keep
+their module-level table handles.
+
+DynamoDB Table: FreelancerSkills
+Primary Key: skill (String, lowercased), Sort Key: userId (String)
+"""
+
+import math
+from decimal import Decimal
+
+MIN_RATE_FIT = 0.5
+
+# Users attributes that decide a user's FreelancerSkills postings. Any function
+# writing one of them should call sync_freelancer_skills with the old and new item.
+INDEXED_USER_FIELDS = ("skills", "hourlyRate", "currency", "isFreelancer", "role", "status")
+
+
+def profile_skills(user):
+    """Lowercased skill set of a user, empty unless they are an active freelancer"""
+    if not user or user.get("status", "active") in ["blocked", "deleted"]:
+        return set()
+    if not (user.get("isFreelancer") in [True, "true"] or user.get("role") in ["seller", "freelancer"]):
+        return set()
+    skills = user.get("skills") or []
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return {str(s).strip().lower() for s in skills if str(s).strip()}
+
+
+def skill_posting(user, skill):
+    """FreelancerSkills item for one of the user's skills"""
+    return {
+        "skill": skill,
+        "userId": user["userId"],
+        "hourlyRate": Decimal(str(user.get("hourlyRate") or 0)),
+        "currency": user.get("currency", "USD")
+    }
+
+
+def sync_freelancer_skills(skills_table, old_user, new_user):
+    """
+    Keep the FreelancerSkills postings in step with a profile change: drop
+    postings for removed skills (all of them when the user is blocked, deleted
+    or stops freelancing) and (re)write the rest so they carry the current
+    hourly rate and currency.
+    """
+    old_skills = profile_skills(old_user)
+    new_skills = profile_skills(new_user)
+    rate_changed = (old_user.get("hourlyRate") != new_user.get("hourlyRate")
+                    or old_user.get("currency") != new_user.get("currency"))
+    to_put = new_skills if rate_changed else new_skills - old_skills
+    to_delete = old_skills - new_skills
+    if not to_put and not to_delete:
+        return
+
+    user_id = new_user.get("userId") or old_user["userId"]
+    with skills_table.batch_writer() as batch:
+        for skill in to_delete:
+            batch.delete_item(Key={"skill": skill, "userId": user_id})
+        for skill in to_put:
+            batch.put_item(Item=skill_posting(new_user, skill))
+
+
+def skill_rarity(posting_count):
+    """Weight of a skill match: rarer skills (shorter posting lists) count more"""
+    return 1 / math.log2(1 + max(posting_count, 1))
+
+
+def rate_fit(hourly_rate, project, currency):
+    """
+    How well a freelancer's hourly rate fits the project's budget, in
+    [MIN_RATE_FIT, 1]. `project` is a project or a project skill posting.
+    Only hourly projects in the same currency are comparable; anything else
+    is neutral.
+    """
+    if project.get("projectType") != "hourly" or not hourly_rate or project.get("currency", "USD") != currency:
+        return 1.0
+    budget_max = float(project.get("budgetMax", 0))
+    if not budget_max or hourly_rate <= budget_max:
+        return 1.0
+    return max(MIN_RATE_FIT, budget_max / hourly_rate)
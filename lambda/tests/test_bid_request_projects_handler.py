@@ -16,6 +16,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 class MockDynamoDBTable:
     """Mock DynamoDB table for testing"""
+    name = 'BidRequestProjects'
+    
     def __init__(self):
         self.items = {}
     
@@ -23,7 +25,7 @@ class MockDynamoDBTable:
         self.items[Item.get('projectId')] = Item
         return {'ResponseMetadata': {'HTTPStatusCode': 200}}
     
-    def get_item(self, Key):
+    def get_item(self, Key, **kwargs):
         project_id = Key.get('projectId')
         if project_id in self.items:
             return {'Item': self.items[project_id]}
@@ -48,12 +50,105 @@ class MockDynamoDBTable:
         return {'ResponseMetadata': {'HTTPStatusCode': 200}}
 
 
+class MockSkillsTable:
+    """Mock skill posting table (skill + createdAtProjectId key) honouring range, order, Limit and paging"""
+    name = 'BidRequestProjectSkills'
+    
+    def __init__(self):
+        self.items = {}
+        self.read = 0
+    
+    def batch_writer(self):
+        return MockBatchWriter(self)
+    
+    def query(self, KeyConditionExpression, ScanIndexForward=True, Limit=None,
+              ExclusiveStartKey=None, FilterExpression=None, **kwargs):
+        condition = KeyConditionExpression.get_expression()
+        before = None
+        if condition['operator'] == 'AND':
+            condition, range_condition = (c.get_expression() for c in condition['values'])
+            before = range_condition['values'][1]
+        skill = condition['values'][1]
+        keys = sorted((k for s, k in self.items if s == skill), reverse=not ScanIndexForward)
+        if before is not None:
+            keys = [k for k in keys if k < before]
+        if ExclusiveStartKey:
+            start = ExclusiveStartKey['createdAtProjectId']
+            keys = [k for k in keys if (k < start if not ScanIndexForward else k > start)]
+        page = keys[:Limit] if Limit else keys
+        self.read += len(page)
+        items = [self.items[(skill, k)] for k in page]
+        if FilterExpression is not None:
+            category = FilterExpression.get_expression()['values'][1]
+            items = [i for i in items if i.get('category') == category]
+        result = {'Items': items}
+        if Limit and len(keys) > Limit:
+            result['LastEvaluatedKey'] = {'skill': skill, 'createdAtProjectId': page[-1]}
+        return result
+
+
+class MockBatchWriter:
+    def __init__(self, table):
+        self.table = table
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        return False
+    
+    def put_item(self, Item):
+        self.table.items[(Item['skill'], Item['createdAtProjectId'])] = Item
+    
+    def delete_item(self, Key):
+        self.table.items.pop((Key['skill'], Key['createdAtProjectId']), None)
+
+
+class MockStatsTable:
+    """Mock feed stats table; conditional updates always apply"""
+    def __init__(self):
+        self.items = {}
+    
+    def get_item(self, Key):
+        if Key['statKey'] in self.items:
+            return {'Item': self.items[Key['statKey']]}
+        return {}
+    
+    def put_item(self, Item):
+        self.items[Item['statKey']] = Item
+    
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs):
+        item = self.items.setdefault(Key['statKey'], {'statKey': Key['statKey']})
+        if ':b' in ExpressionAttributeValues and 'maxBudgetStale' not in kwargs['UpdateExpression']:
+            item['maxBudget'] = max(item.get('maxBudget', Decimal('0')), ExpressionAttributeValues[':b'])
+        else:
+            item['maxBudgetStale'] = True
+
+
 @pytest.fixture
 def mock_dynamodb():
     """Fixture to mock DynamoDB tables"""
     mock_table = MockDynamoDBTable()
+    skills_table = MockSkillsTable()
+    
+    def batch_get_item(RequestItems):
+        responses = {}
+        for name, req in RequestItems.items():
+            if name == skills_table.name:
+                keys = [(k['skill'], k['createdAtProjectId']) for k in req['Keys']]
+                responses[name] = [skills_table.items[k] for k in keys if k in skills_table.items]
+            else:
+                responses[name] = [mock_table.items[k['projectId']] for k in req['Keys'] if k['projectId'] in mock_table.items]
+        return {'Responses': responses}
+    
+    mock_resource = MagicMock()
+    mock_resource.batch_get_item.side_effect = batch_get_item
+    mock_table.skills_table = skills_table
     with patch('bid_request_projects_handler.bid_request_projects_table', mock_table), \
-         patch('bid_request_projects_handler.users_table', MockDynamoDBTable()):
+         patch('bid_request_projects_handler.users_table', MockDynamoDBTable()), \
+         patch('bid_request_projects_handler.project_skills_table', skills_table), \
+         patch('bid_request_projects_handler.project_stats_table', MockStatsTable()), \
+         patch('bid_request_projects_handler.dynamodb', mock_resource):
         yield mock_table
 
 
@@ -200,6 +295,197 @@ class TestGetAllProjects:
         assert response['statusCode'] == 200
         assert body['data']['count'] == 0
 
+    
+    def test_get_all_projects_by_skills(self, mock_dynamodb):
+        """Should return only open projects having every requested skill, from the posting index"""
+        from bid_request_projects_handler import lambda_handler
+        
+        def create(title, skills, budget_max):
+            event = {'body': json.dumps({
+                'action': 'CREATE_PROJECT',
+                'buyerId': 'buyer-1',
+                'buyerEmail': 'buyer@example.com',
+                'title': title,
+                'description': 'Feed index project',
+                'projectType': 'fixed',
+                'budgetMin': 100,
+                'budgetMax': budget_max,
+                'skills': skills,
+                'category': 'Web Development'
+            })}
+            return json.loads(lambda_handler(event, {})['body'])['data']['projectId']
+        
+        both = create('Both skills', ['React', 'Node.js'], 9000)
+        create('React only', ['React'], 4000)
+        closed = create('Closed', ['react', 'node.js'], 7000)
+        mock_dynamodb.items[closed]['status'] = 'in_progress'
+        
+        event = {'body': json.dumps({
+            'action': 'GET_ALL_PROJECTS',
+            'skills': ['react', 'NODE.JS']
+        })}
+        response = lambda_handler(event, {})
+        body = json.loads(response['body'])
+        
+        assert response['statusCode'] == 200
+        assert [p['projectId'] for p in body['data']['projects']] == [both]
+        assert body['data']['maxBudget'] == 9000
+
+    def test_get_all_projects_skills_paginated(self, mock_dynamodb):
+        """Should page the skill feed newest first with nextCursor"""
+        from bid_request_projects_handler import lambda_handler, put_skill_postings
+        
+        for i in range(5):
+            project = {
+                'projectId': f'project-{i}',
+                'status': 'open',
+                'skills': ['Python'],
+                'category': 'General',
+                'createdAt': f'2024-01-0{i + 1}T00:00:00Z'
+            }
+            mock_dynamodb.items[project['projectId']] = project
+            put_skill_postings(project)
+        
+        seen = []
+        cursor = None
+        while True:
+            request = {'action': 'GET_ALL_PROJECTS', 'skills': ['Python'], 'limit': 2}
+            if cursor:
+                request['cursor'] = cursor
+            body = json.loads(lambda_handler({'body': json.dumps(request)}, {})['body'])
+            seen.extend(p['projectId'] for p in body['data']['projects'])
+            cursor = body['data']['nextCursor']
+            if not cursor:
+                break
+        
+        assert seen == [f'project-{i}' for i in range(4, -1, -1)]
+    
+    def test_skill_feed_reads_a_page_not_the_posting_list(self, mock_dynamodb):
+        """The driver list is walked from the cursor; other skills are checked by key"""
+        from bid_request_projects_handler import lambda_handler, put_skill_postings
+        
+        for i in range(300):
+            project = {
+                'projectId': f'project-{i:03d}', 'status': 'open', 'category': 'General',
+                'skills': ['Python', 'Django'] if i % 2 else ['Python'],
+                'createdAt': f'2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z'
+            }
+            mock_dynamodb.items[project['projectId']] = project
+            put_skill_postings(project)
+        
+        request = {'action': 'GET_ALL_PROJECTS', 'skills': ['Python', 'Django'], 'limit': 3}
+        body = json.loads(lambda_handler({'body': json.dumps(request)}, {})['body'])
+        
+        assert [p['projectId'] for p in body['data']['projects']] == ['project-299', 'project-297', 'project-295']
+        assert body['data']['nextCursor']
+        assert mock_dynamodb.skills_table.read < 150
+    
+    def test_cursor_from_other_feed_path_is_rejected(self, mock_dynamodb):
+        """Feeding an open-feed cursor to the skill feed (or vice versa) is a 400, not a 500"""
+        from bid_request_projects_handler import lambda_handler, encode_cursor
+        
+        open_cursor = encode_cursor({'projectId': 'p1', 'status': 'open', 'createdAt': '2024-01-01'})
+        skill_cursor = encode_cursor({'after': '2024-01-01#p1'})
+        for request in (
+            {'action': 'GET_ALL_PROJECTS', 'skills': ['Python'], 'cursor': open_cursor},
+            {'action': 'GET_ALL_PROJECTS', 'cursor': skill_cursor},
+            {'action': 'GET_ALL_PROJECTS', 'cursor': 'not-a-cursor'}
+        ):
+            response = lambda_handler({'body': json.dumps(request)}, {})
+            assert response['statusCode'] == 400
+            assert json.loads(response['body'])['error']['code'] == 'INVALID_CURSOR'
+
+    def test_bad_limit_is_rejected_and_large_limit_clamped(self, mock_dynamodb):
+        """A non-integer limit is a 400, not a 500; an oversized one is clamped"""
+        from bid_request_projects_handler import lambda_handler, parse_page_size, MAX_PAGE_SIZE
+
+        for limit in ('ten', [5], {'n': 5}):
+            for request in (
+                {'action': 'GET_ALL_PROJECTS', 'limit': limit},
+                {'action': 'GET_ALL_PROJECTS', 'skills': ['Python'], 'limit': limit}
+            ):
+                response = lambda_handler({'body': json.dumps(request)}, {})
+                assert response['statusCode'] == 400
+                assert json.loads(response['body'])['error']['code'] == 'VALIDATION_ERROR'
+
+        assert parse_page_size('5000') == MAX_PAGE_SIZE
+        assert parse_page_size(None) is None
+
+    def test_postings_of_deleted_projects_are_removed(self, mock_dynamodb):
+        """A posting whose project no longer exists is dropped when the feed reads it"""
+        from bid_request_projects_handler import lambda_handler, put_skill_postings
+        
+        project = {'projectId': 'gone', 'status': 'open', 'skills': ['Python', 'Go'],
+                   'category': 'General', 'createdAt': '2024-01-01T00:00:00Z'}
+        put_skill_postings(project)
+        
+        request = {'action': 'GET_ALL_PROJECTS', 'skills': ['Python', 'Go']}
+        body = json.loads(lambda_handler({'body': json.dumps(request)}, {})['body'])
+        
+        assert body['data']['projects'] == []
+        assert mock_dynamodb.skills_table.items == {}
+    
+    def test_backfill_is_direct_invocation_only(self, mock_dynamodb):
+        from bid_request_projects_handler import lambda_handler
+        
+        response = lambda_handler({'body': json.dumps({'action': 'BACKFILL_FEED_INDEXES'})}, {})
+        assert response['statusCode'] == 400
+        
+        response = lambda_handler({'action': 'BACKFILL_FEED_INDEXES'}, {})
+        assert response['statusCode'] == 200
+
+
+class TestRecommendProjects:
+    """Tests for RECOMMEND_PROJECTS action"""
+    
+    def test_recommend_projects_scored_by_overlap(self, mock_dynamodb):
+        """Should rank open projects by weighted skill overlap and skip the freelancer's own"""
+        from bid_request_projects_handler import lambda_handler, put_skill_postings
+        
+        projects = [
+            ('project-both', 'buyer-1', ['Python', 'Django']),
+            ('project-python', 'buyer-1', ['Python']),
+            ('project-own', 'freelancer-1', ['Python', 'Django']),
+            ('project-other', 'buyer-2', ['Go'])
+        ]
+        for pid, buyer_id, skills in projects:
+            project = {
+                'projectId': pid, 'buyerId': buyer_id, 'status': 'open', 'skills': skills,
+                'category': 'General', 'createdAt': '2024-01-01T00:00:00Z', 'budgetMax': 1000
+            }
+            mock_dynamodb.items[pid] = project
+            put_skill_postings(project)
+        
+        event = {'body': json.dumps({
+            'action': 'RECOMMEND_PROJECTS',
+            'freelancerId': 'freelancer-1',
+            'skills': ['python', 'django']
+        })}
+        response = lambda_handler(event, {})
+        body = json.loads(response['body'])
+        
+        assert response['statusCode'] == 200
+        assert [p['projectId'] for p in body['data']['projects']] == ['project-both', 'project-python']
+    
+    def test_recommend_projects_missing_freelancer(self, mock_dynamodb):
+        """Should require freelancerId"""
+        from bid_request_projects_handler import lambda_handler
+        
+        response = lambda_handler({'body': json.dumps({'action': 'RECOMMEND_PROJECTS'})}, {})
+
+        assert response['statusCode'] == 400
+
+    def test_recommend_projects_bad_limit(self, mock_dynamodb):
+        """A non-integer limit is a 400, not a 500"""
+        from bid_request_projects_handler import lambda_handler
+
+        response = lambda_handler({'body': json.dumps({
+            'action': 'RECOMMEND_PROJECTS', 'freelancerId': 'f1', 'limit': 'ten'
+        })}, {})
+
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error']['code'] == 'VALIDATION_ERROR'
+
 
 class TestGetProject:
     """Tests for GET_PROJECT action"""
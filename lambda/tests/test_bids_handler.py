@@ -5,17 +5,27 @@ Covers all CRUD operations and edge cases
 
 import pytest
 import json
+import re
+import time
+import threading
 from unittest.mock import patch, MagicMock
 from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from user_profile_cache import UserProfileCache
+
 
 class MockDynamoDBTable:
     """Mock DynamoDB table for testing"""
+    name = 'Bids'
+    key_name = 'bidId'
+    
     def __init__(self):
         self.items = {}
     
@@ -23,7 +33,7 @@ class MockDynamoDBTable:
         self.items[Item.get('bidId')] = Item
         return {'ResponseMetadata': {'HTTPStatusCode': 200}}
     
-    def get_item(self, Key):
+    def get_item(self, Key, **kwargs):
         bid_id = Key.get('bidId')
         if bid_id in self.items:
             return {'Item': self.items[bid_id]}
@@ -58,12 +68,134 @@ class MockDynamoDBTable:
         return {'ResponseMetadata': {'HTTPStatusCode': 200}}
 
 
+class MockKeyedTable:
+    """Mock table keyed by a single attribute"""
+    def __init__(self, name, key_name):
+        self.name = name
+        self.key_name = key_name
+        self.items = {}
+    
+    def get_item(self, Key, **kwargs):
+        if Key[self.key_name] in self.items:
+            return {'Item': self.items[Key[self.key_name]]}
+        return {}
+
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def plain(values):
+    return {k: deserializer.deserialize(v) for k, v in values.items()}
+
+
+# The conditions bids_handler puts on its transactional writes
+CONDITIONS = {
+    None: lambda item, v: True,
+    "attribute_exists(bidId)": lambda item, v: item is not None,
+    "attribute_not_exists(bidId)": lambda item, v: item is None,
+    "attribute_not_exists(markerKey)": lambda item, v: item is None,
+    "attribute_exists(projectId) AND (((attribute_not_exists(#status) OR #status = :open) AND attribute_not_exists(acceptedBidId)) OR acceptedBidId = :bid)":
+        lambda item, v: item is not None and (
+            (item.get('status', v[':open']) == v[':open'] and 'acceptedBidId' not in item)
+            or item.get('acceptedBidId') == v[':bid']
+        ),
+    "attribute_exists(projectId) AND (attribute_not_exists(#status) OR #status = :open)":
+        lambda item, v: item is not None and item.get('status', v[':open']) == v[':open'],
+    "attribute_not_exists(bidId) OR bidId = :bid": lambda item, v: item is None or item.get('bidId') == v[':bid'],
+    "bidsCount > :zero": lambda item, v: item is not None and item.get('bidsCount', 0) > v[':zero'],
+    "attribute_not_exists(#status) OR #status = :pending":
+        lambda item, v: item is not None and item.get('status', v[':pending']) == v[':pending'],
+}
+
+
+class MockTransactClient:
+    """TransactWriteItems emulation over the mock tables (all-or-nothing, per-item reasons)"""
+    def __init__(self, tables, latency=0):
+        self.tables = {table.name: table for table in tables}
+        self.latency = latency
+        self.calls = 0
+        self.fail_calls = set()
+        self.lock = threading.Lock()
+    
+    def transact_write_items(self, TransactItems):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            if self.calls in self.fail_calls:
+                raise ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'injected'}}, 'TransactWriteItems')
+            
+            reasons = []
+            for op in TransactItems:
+                action, write = next(iter(op.items()))
+                table = self.tables[write['TableName']]
+                key = plain(write['Item'] if action == 'Put' else write['Key'])[table.key_name]
+                item = table.items.get(key)
+                values = plain(write.get('ExpressionAttributeValues', {}))
+                if CONDITIONS[write.get('ConditionExpression')](item, values):
+                    reasons.append({'Code': 'None'})
+                else:
+                    reason = {'Code': 'ConditionalCheckFailed'}
+                    if item and write.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                        reason['Item'] = {k: serializer.serialize(v) for k, v in item.items()}
+                    reasons.append(reason)
+            if any(r['Code'] != 'None' for r in reasons):
+                raise ClientError({
+                    'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+                    'CancellationReasons': reasons
+                }, 'TransactWriteItems')
+            
+            for op in TransactItems:
+                action, write = next(iter(op.items()))
+                table = self.tables[write['TableName']]
+                if action == 'Put':
+                    item = plain(write['Item'])
+                    table.items[item[table.key_name]] = item
+                    continue
+                key = plain(write['Key'])[table.key_name]
+                if action == 'Delete':
+                    table.items.pop(key, None)
+                    continue
+                item = table.items.setdefault(key, {table.key_name: key})
+                values = plain(write['ExpressionAttributeValues'])
+                names = write.get('ExpressionAttributeNames', {})
+                expression = write['UpdateExpression']
+                if expression.startswith('ADD '):
+                    name, value = expression[4:].split()
+                    item[name] = item.get(name, 0) + values[value]
+                    continue
+                for name, value in re.findall(r'([#\w]+) = (:\w+)', expression[4:]):
+                    item[names.get(name, name)] = values[value]
+
+
 @pytest.fixture
 def mock_dynamodb():
     """Fixture to mock DynamoDB tables"""
     mock_table = MockDynamoDBTable()
+    projects = MockKeyedTable('BidRequestProjects', 'projectId')
+    markers = MockKeyedTable('BidMarkers', 'markerKey')
+    users = MockKeyedTable('Users', 'userId')
+    for project_id in ['project-1', 'project-123']:
+        projects.items[project_id] = {'projectId': project_id, 'status': 'open', 'category': 'General'}
+    client = MockTransactClient([mock_table, projects, markers])
+    mock_resource = MagicMock()
+    mock_resource.meta.client = client
+    mock_resource.batch_get_item.side_effect = lambda RequestItems: {'Responses': {
+        'Users': [users.items[k['userId']] for k in RequestItems['Users']['Keys'] if k['userId'] in users.items]
+    }}
+    mock_resource.Table.side_effect = lambda name: projects if name == 'BidRequestProjects' else MagicMock()
+    mock_table.projects = projects
+    mock_table.markers = markers
+    mock_table.users = users
+    mock_table.client = client
+    mock_table.batch_get_item = mock_resource.batch_get_item
     with patch('bids_handler.bids_table', mock_table), \
-         patch('bids_handler.users_table', MockDynamoDBTable()):
+         patch('bids_handler.users_table', users), \
+         patch('bids_handler.profile_cache', UserProfileCache()), \
+         patch('bids_handler.bid_request_projects_table', projects), \
+         patch('bids_handler.project_stats_table', MagicMock()), \
+         patch('bids_handler.bid_markers_table', markers), \
+         patch('bids_handler.dynamodb', mock_resource):
         yield mock_table
 
 
@@ -165,6 +297,101 @@ class TestCreateBid:
         assert body['success'] == True
 
 
+class TestBidUniqueness:
+    """Tests for the freelancer#project marker and bidsCount maintenance"""
+    
+    @staticmethod
+    def create_event(freelancer_id='freelancer-1', project_id='project-1'):
+        return {'body': json.dumps({
+            'action': 'CREATE_BID',
+            'projectId': project_id,
+            'freelancerId': freelancer_id,
+            'freelancerName': 'Jane Doe',
+            'freelancerEmail': 'jane@example.com',
+            'bidAmount': 500,
+            'deliveryTime': 5,
+            'deliveryTimeUnit': 'days',
+            'proposal': 'A detailed proposal covering scope, milestones, testing and delivery for this project. ' * 2
+        })}
+    
+    def test_double_submit_creates_one_bid(self, mock_dynamodb):
+        """Concurrent duplicate submissions should produce one bid and bidsCount == 1"""
+        from bids_handler import lambda_handler
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = [r['statusCode'] for r in executor.map(
+                lambda _: lambda_handler(self.create_event(), {}), range(8)
+            )]
+        
+        assert statuses.count(201) == 1
+        assert statuses.count(409) == 7
+        assert len(mock_dynamodb.items) == 1
+        assert mock_dynamodb.projects.items['project-1']['bidsCount'] == 1
+    
+    def test_duplicate_returns_existing_bid(self, mock_dynamodb):
+        """Should return the existing bid on a duplicate submission"""
+        from bids_handler import lambda_handler
+        
+        created = json.loads(lambda_handler(self.create_event(), {})['body'])
+        response = lambda_handler(self.create_event(), {})
+        body = json.loads(response['body'])
+        
+        assert response['statusCode'] == 409
+        assert body['error']['code'] == 'DUPLICATE_BID'
+        assert body['existingBid']['bidId'] == created['data']['bidId']
+    
+    def test_bid_on_closed_project(self, mock_dynamodb):
+        """Should refuse bids once the project is no longer open"""
+        from bids_handler import lambda_handler
+        
+        mock_dynamodb.projects.items['project-1']['status'] = 'in_progress'
+        response = lambda_handler(self.create_event(), {})
+        
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error']['code'] == 'PROJECT_CLOSED'
+        assert mock_dynamodb.markers.items == {}
+    
+    def test_bid_on_project_without_status(self, mock_dynamodb):
+        """Legacy projects with no status attribute are treated as open"""
+        from bids_handler import lambda_handler
+        
+        del mock_dynamodb.projects.items['project-1']['status']
+        response = lambda_handler(self.create_event(), {})
+        
+        assert response['statusCode'] == 201
+        assert mock_dynamodb.projects.items['project-1']['bidsCount'] == 1
+    
+    def test_backfill_is_direct_invocation_only(self, mock_dynamodb):
+        from bids_handler import lambda_handler
+        
+        with patch('bids_handler.handle_backfill_bid_markers', return_value={'statusCode': 200}) as backfill:
+            response = lambda_handler({'body': json.dumps({'action': 'BACKFILL_BID_MARKERS'})}, {})
+            assert response['statusCode'] == 400
+            backfill.assert_not_called()
+            
+            assert lambda_handler({'action': 'BACKFILL_BID_MARKERS'}, {})['statusCode'] == 200
+            backfill.assert_called_once()
+    
+    def test_delete_releases_marker_and_count(self, mock_dynamodb):
+        """Deleting a bid should decrement bidsCount and allow bidding again"""
+        from bids_handler import lambda_handler
+        
+        lambda_handler(self.create_event('freelancer-1'), {})
+        created = json.loads(lambda_handler(self.create_event('freelancer-2'), {})['body'])
+        assert mock_dynamodb.projects.items['project-1']['bidsCount'] == 2
+        
+        response = lambda_handler({'body': json.dumps({
+            'action': 'DELETE_BID',
+            'bidId': created['data']['bidId'],
+            'freelancerId': 'freelancer-2'
+        })}, {})
+        
+        assert response['statusCode'] == 200
+        assert mock_dynamodb.projects.items['project-1']['bidsCount'] == 1
+        assert lambda_handler(self.create_event('freelancer-2'), {})['statusCode'] == 201
+
+
 class TestGetBidsByProject:
     """Tests for GET_BIDS_BY_PROJECT action"""
     
@@ -220,6 +447,44 @@ class TestGetBidsByProject:
         assert body['error']['code'] == 'VALIDATION_ERROR'
 
 
+class TestBidFreelancerCards:
+    """Tests for live freelancer profiles on bid lists"""
+    
+    def test_bids_enriched_from_batched_profiles(self, mock_dynamodb):
+        """Should show the current profile and counter-based rating, one batched read per cache miss"""
+        from bids_handler import lambda_handler
+        
+        for i in range(3):
+            mock_dynamodb.items[f'bid-{i}'] = {
+                'bidId': f'bid-{i}', 'projectId': 'project-1', 'freelancerId': f'freelancer-{i % 2}',
+                'freelancerName': 'Old Name', 'freelancerEmail': 'f@example.com', 'bidAmount': Decimal('100'),
+                'deliveryTime': 3, 'deliveryTimeUnit': 'days', 'proposal': 'Proposal',
+                'submittedAt': f'2024-01-0{i + 1}T00:00:00Z'
+            }
+        mock_dynamodb.users.items['freelancer-0'] = {
+            'userId': 'freelancer-0', 'fullName': 'New Name', 'profilePictureUrl': 'https://img/0.png',
+            'reviewCount': Decimal('4'), 'ratingTotal': Decimal('18')
+        }
+        event = {'body': json.dumps({'action': 'GET_BIDS_BY_PROJECT', 'projectId': 'project-1'})}
+        
+        body = json.loads(lambda_handler(event, {})['body'])
+        cards = {b['id']: b for b in body['data']['bids']}
+        
+        assert cards['bid-0']['freelancerName'] == 'New Name'
+        assert cards['bid-0']['freelancerProfileImage'] == 'https://img/0.png'
+        assert cards['bid-0']['freelancerRating'] == 4.5
+        assert cards['bid-0']['freelancerReviewsCount'] == 4
+        # No Users item: keep the name copied at bid time
+        assert cards['bid-1']['freelancerName'] == 'Old Name'
+        assert mock_dynamodb.batch_get_item.call_count == 1
+        
+        # Warm container: cached profiles are not re-read, only the missing user is
+        lambda_handler(event, {})
+        assert mock_dynamodb.batch_get_item.call_count == 2
+        second = mock_dynamodb.batch_get_item.call_args.kwargs['RequestItems']['Users']['Keys']
+        assert second == [{'userId': 'freelancer-1'}]
+
+
 class TestGetBidsByFreelancer:
     """Tests for GET_BIDS_BY_FREELANCER action"""
     
@@ -300,6 +565,121 @@ class TestUpdateBidStatus:
         assert body['success'] == True
         assert body['data']['status'] == 'accepted'
     
+    def test_accept_second_bid_conflicts(self, mock_dynamodb):
+        """Should refuse to accept a second bid once the project has one"""
+        from bids_handler import lambda_handler
+        
+        for bid_id in ['bid-1', 'bid-2']:
+            mock_dynamodb.items[bid_id] = {
+                'bidId': bid_id, 'projectId': 'project-1',
+                'freelancerId': f'freelancer-{bid_id}', 'status': 'pending'
+            }
+        
+        def accept(bid_id):
+            return lambda_handler({'body': json.dumps({
+                'action': 'UPDATE_BID_STATUS', 'bidId': bid_id, 'status': 'accepted'
+            })}, {})
+        
+        assert accept('bid-1')['statusCode'] == 200
+        response = accept('bid-2')
+        
+        assert response['statusCode'] == 409
+        assert json.loads(response['body'])['error']['code'] == 'BID_ALREADY_ACCEPTED'
+        assert mock_dynamodb.items['bid-2']['status'] == 'rejected'
+        assert mock_dynamodb.projects.items['project-1']['acceptedBidId'] == 'bid-1'
+
+    def test_accept_on_closed_project_is_refused(self, mock_dynamodb):
+        """Should not reopen a cancelled project by accepting one of its bids"""
+        from bids_handler import lambda_handler
+
+        mock_dynamodb.items['bid-1'] = {
+            'bidId': 'bid-1', 'projectId': 'project-1',
+            'freelancerId': 'freelancer-1', 'status': 'pending'
+        }
+        mock_dynamodb.projects.items['project-1']['status'] = 'cancelled'
+
+        response = lambda_handler({'body': json.dumps({
+            'action': 'UPDATE_BID_STATUS', 'bidId': 'bid-1', 'status': 'accepted'
+        })}, {})
+
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error']['code'] == 'PROJECT_CLOSED'
+        assert mock_dynamodb.items['bid-1']['status'] == 'pending'
+        assert mock_dynamodb.projects.items['project-1']['status'] == 'cancelled'
+
+    def test_accept_rejects_legacy_bids_without_status(self, mock_dynamodb):
+        """Bids stored before status existed count as pending and are rejected"""
+        from bids_handler import lambda_handler
+
+        mock_dynamodb.items['bid-1'] = {
+            'bidId': 'bid-1', 'projectId': 'project-1',
+            'freelancerId': 'freelancer-1', 'status': 'pending'
+        }
+        mock_dynamodb.items['bid-2'] = {
+            'bidId': 'bid-2', 'projectId': 'project-1', 'freelancerId': 'freelancer-2'
+        }
+
+        response = lambda_handler({'body': json.dumps({
+            'action': 'UPDATE_BID_STATUS', 'bidId': 'bid-1', 'status': 'accepted'
+        })}, {})
+
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['data']['rejectedBids'] == ['bid-2']
+        assert mock_dynamodb.items['bid-2']['status'] == 'rejected'
+
+    def test_accept_with_hundreds_of_bids(self, mock_dynamodb):
+        """Benchmark: 500 bids are settled in a handful of concurrent transactions"""
+        from bids_handler import lambda_handler
+        
+        for i in range(500):
+            mock_dynamodb.items[f'bid-{i}'] = {
+                'bidId': f'bid-{i}', 'projectId': 'project-1',
+                'freelancerId': f'freelancer-{i}', 'status': 'pending'
+            }
+        # 20ms per write round trip: sequential per-bid updates would take ~10s
+        mock_dynamodb.client.latency = 0.02
+        
+        started = time.perf_counter()
+        response = lambda_handler({'body': json.dumps({
+            'action': 'UPDATE_BID_STATUS', 'bidId': 'bid-0', 'status': 'accepted'
+        })}, {})
+        elapsed = time.perf_counter() - started
+        body = json.loads(response['body'])
+        
+        assert response['statusCode'] == 200
+        assert len(body['data']['rejectedBids']) == 499
+        # 1 acceptance transaction + ceil(499 / 100) rejection chunks
+        assert mock_dynamodb.client.calls == 6
+        assert elapsed < 1.0
+        statuses = [b['status'] for b in mock_dynamodb.items.values()]
+        assert statuses.count('accepted') == 1 and statuses.count('rejected') == 499
+    
+    def test_accept_is_idempotent_after_partial_failure(self, mock_dynamodb):
+        """Should finish the remaining rejections when a failed acceptance is retried"""
+        from bids_handler import lambda_handler
+        
+        for i in range(250):
+            mock_dynamodb.items[f'bid-{i}'] = {
+                'bidId': f'bid-{i}', 'projectId': 'project-1',
+                'freelancerId': f'freelancer-{i}', 'status': 'pending'
+            }
+        # Acceptance commits, then one of the three rejection chunks fails
+        mock_dynamodb.client.fail_calls = {3}
+        event = {'body': json.dumps({
+            'action': 'UPDATE_BID_STATUS', 'bidId': 'bid-0', 'status': 'accepted'
+        })}
+        
+        assert lambda_handler(event, {})['statusCode'] == 500
+        assert mock_dynamodb.projects.items['project-1']['status'] == 'in_progress'
+        
+        response = lambda_handler(event, {})
+        body = json.loads(response['body'])
+        
+        assert response['statusCode'] == 200
+        assert 0 < len(body['data']['rejectedBids']) < 249
+        statuses = [b['status'] for b in mock_dynamodb.items.values()]
+        assert statuses.count('accepted') == 1 and statuses.count('rejected') == 249
+    
     def test_update_bid_status_rejected(self, mock_dynamodb):
         """Should update bid status to rejected"""
         from bids_handler import lambda_handler
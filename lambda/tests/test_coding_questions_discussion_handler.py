@@ -0,0 +1,549 @@
+"""
+Test cases for Coding Questions Discussion Handler Lambda Function
+Covers voting, batched vote lookup, threaded discussion reads and reply previews
+"""
+
+import pytest
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def plain(values):
+    return {k: deserializer.deserialize(v) for k, v in values.items()}
+
+
+def condition_holds(expression, item, values):
+    """Evaluate the AND-joined conditions the handler emits"""
+    for part in expression.split(' AND '):
+        if part.startswith('attribute_exists('):
+            ok = item is not None and part[17:-1] in item
+        elif part.startswith('attribute_not_exists('):
+            ok = item is None or part[21:-1] not in item
+        else:
+            attr, placeholder = part.split(' = ')
+            ok = item is not None and item.get(attr) == values[placeholder]
+        if not ok:
+            return False
+    return True
+
+
+class MockDynamoDBTable:
+    """Mock DynamoDB table backed by the shared MockDynamoDB store"""
+    def __init__(self, name, db, key_fields):
+        self.name = name
+        self.db = db
+        self.key_fields = key_fields
+        self.items = {}
+
+    def key_of(self, item):
+        return tuple(item[k] for k in self.key_fields)
+
+    def get_item(self, Key, **kwargs):
+        with self.db.lock:
+            item = self.items.get(self.key_of(Key))
+            return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item, **kwargs):
+        with self.db.lock:
+            self.items[self.key_of(Item)] = dict(Item)
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ConditionExpression=None, ReturnValues=None):
+        """The rank-score write and the no-votes-table counter ADD"""
+        with self.db.lock:
+            item = self.items.get(self.key_of(Key))
+            if ConditionExpression and not condition_holds(ConditionExpression, item, ExpressionAttributeValues):
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}},
+                                  'UpdateItem')
+            if UpdateExpression == 'SET rankScore = :score':
+                item['rankScore'] = ExpressionAttributeValues[':score']
+            else:
+                field = UpdateExpression.split(' ')[1]
+                item[field] = item.get(field, 0) + ExpressionAttributeValues[':one']
+            return {'Attributes': dict(item)} if ReturnValues else {}
+
+    def query(self, **kwargs):
+        items = [dict(i) for i in self.items.values() if i.get('topLevelQuestionId')]
+        sort_key = 'rankScore' if kwargs.get('IndexName') == 'TopLevelRankIndex' else 'createdAt'
+        items.sort(key=lambda i: i.get(sort_key, 0), reverse=not kwargs.get('ScanIndexForward', True))
+        self.last_query = kwargs
+        return {'Items': items[:kwargs.get('Limit', len(items))]}
+
+
+class MockDynamoDB:
+    """
+    Mock DynamoDB resource/client pair. transact_write_items is serialized
+    with a lock, evaluates the vote-row and comment-counter conditions,
+    and cancels with CancellationReasons like the real service.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.comments = MockDynamoDBTable('CodingQuestionsDiscussions', self, ['commentId'])
+        self.votes = MockDynamoDBTable('CodingQuestionsDiscussionVotes', self, ['commentId', 'userId'])
+        self.meta = SimpleNamespace(client=self)
+        self.transactions = 0
+
+    def transact_write_items(self, TransactItems):
+        with self.lock:
+            self.transactions += 1
+            action, vote_op = next(iter(TransactItems[0].items()))
+            counter_op = TransactItems[1]['Update']
+
+            vote_key = plain(vote_op['Item'] if action == 'Put' else vote_op['Key'])
+            existing = self.votes.items.get((vote_key['commentId'], vote_key['userId']))
+            vote_ok = condition_holds(
+                vote_op['ConditionExpression'], existing, plain(vote_op.get('ExpressionAttributeValues', {}))
+            )
+
+            comment_id = plain(counter_op['Key'])['commentId']
+            comment = self.comments.items.get((comment_id,))
+            counter_values = plain(counter_op['ExpressionAttributeValues'])
+            counter_ok = condition_holds(counter_op['ConditionExpression'], comment, counter_values)
+
+            reasons = [{'Code': 'None'}, {'Code': 'None'}]
+            for index, ok, old in ((0, vote_ok, existing), (1, counter_ok, comment)):
+                if not ok:
+                    reasons[index] = {'Code': 'ConditionalCheckFailed'}
+                    if old:
+                        reasons[index]['Item'] = {k: serializer.serialize(v) for k, v in old.items()}
+            if not (vote_ok and counter_ok):
+                raise ClientError({
+                    'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+                    'CancellationReasons': reasons
+                }, 'TransactWriteItems')
+
+            if action == 'Put':
+                self.votes.items[(vote_key['commentId'], vote_key['userId'])] = plain(vote_op['Item'])
+            else:
+                del self.votes.items[(vote_key['commentId'], vote_key['userId'])]
+            assert counter_op['UpdateExpression'] == 'ADD upvotes :up, downvotes :down'
+            comment['upvotes'] = comment.get('upvotes', 0) + counter_values[':up']
+            comment['downvotes'] = comment.get('downvotes', 0) + counter_values[':down']
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.comments if name == self.comments.name else self.votes
+            responses[name] = [
+                dict(table.items[table.key_of(k)]) for k in request['Keys']
+                if table.key_of(k) in table.items
+            ]
+        return {'Responses': responses}
+
+
+@pytest.fixture
+def mock_dynamodb():
+    """Fixture to mock DynamoDB tables"""
+    db = MockDynamoDB()
+    db.comments.put_item(Item={'commentId': 'c1', 'questionId': 'q1', 'upvotes': 0, 'downvotes': 0})
+    with patch('coding_questions_discussion_handler.dynamodb', db), \
+         patch('coding_questions_discussion_handler.discussions_table', db.comments), \
+         patch('coding_questions_discussion_handler.votes_table', db.votes):
+        yield db
+
+
+def vote(comment_id, user_id, vote_type):
+    from coding_questions_discussion_handler import lambda_handler
+
+    event = {
+        'httpMethod': 'POST',
+        'body': json.dumps({
+            'action': 'vote',
+            'commentId': comment_id,
+            'userId': user_id,
+            'voteType': vote_type
+        })
+    }
+    return lambda_handler(event, {})
+
+
+class TestVoteComment:
+    """Tests for the vote action"""
+
+    def test_first_upvote_is_single_transaction(self, mock_dynamodb):
+        """Should record a first vote with one transaction"""
+        response = vote('c1', 'u1', 'upvote')
+        body = json.loads(response['body'])
+
+        assert response['statusCode'] == 200
+        assert body['data']['upvotes'] == 1
+        assert body['data']['downvotes'] == 0
+        assert mock_dynamodb.transactions == 1
+
+    def test_vote_updates_rank_score(self, mock_dynamodb):
+        """Should store the Wilson lower bound with the new counts"""
+        from coding_questions_discussion_handler import wilson_lower_bound
+
+        vote('c1', 'u1', 'upvote')
+        vote('c1', 'u2', 'upvote')
+        vote('c1', 'u3', 'downvote')
+
+        comment = mock_dynamodb.comments.items[('c1',)]
+        assert comment['rankScore'] == wilson_lower_bound(2, 1)
+        assert 0 < comment['rankScore'] < Decimal('0.6667')
+
+    def test_switch_vote_moves_counts(self, mock_dynamodb):
+        """Should move the count from upvotes to downvotes"""
+        vote('c1', 'u1', 'upvote')
+        body = json.loads(vote('c1', 'u1', 'downvote')['body'])
+
+        assert body['data']['upvotes'] == 0
+        assert body['data']['downvotes'] == 1
+        assert body['data']['hasDownvoted'] == True
+
+    def test_repeat_vote_is_noop(self, mock_dynamodb):
+        """Should not double count the same vote"""
+        vote('c1', 'u1', 'upvote')
+        body = json.loads(vote('c1', 'u1', 'upvote')['body'])
+
+        assert body['data']['upvotes'] == 1
+
+    def test_remove_downvote(self, mock_dynamodb):
+        """Should find the real vote when removing a downvote"""
+        vote('c1', 'u1', 'downvote')
+        body = json.loads(vote('c1', 'u1', 'remove')['body'])
+
+        assert body['data']['downvotes'] == 0
+        assert ('c1', 'u1') not in mock_dynamodb.votes.items
+
+    def test_remove_without_vote(self, mock_dynamodb):
+        """Should leave counts unchanged when there is nothing to remove"""
+        body = json.loads(vote('c1', 'u1', 'remove')['body'])
+
+        assert body['data']['upvotes'] == 0
+        assert body['data']['downvotes'] == 0
+
+    def test_vote_on_missing_comment(self, mock_dynamodb):
+        """Should return 404 and write nothing for an unknown comment"""
+        response = vote('missing', 'u1', 'upvote')
+
+        assert response['statusCode'] == 404
+        assert mock_dynamodb.votes.items == {}
+
+    def test_invalid_vote_type(self, mock_dynamodb):
+        """Should reject unknown vote types"""
+        response = vote('c1', 'u1', 'sideways')
+
+        assert response['statusCode'] == 400
+
+
+class TestConcurrentVotes:
+    """Parallel votes must leave exact counts"""
+
+    def test_parallel_double_clicks(self, mock_dynamodb):
+        """Many parallel upvotes from the same user count once"""
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(lambda _: vote('c1', 'u1', 'upvote'), range(40)))
+
+        comment = mock_dynamodb.comments.items[('c1',)]
+        assert comment['upvotes'] == 1
+        assert comment['downvotes'] == 0
+
+    def test_parallel_votes_from_many_users(self, mock_dynamodb):
+        """Every user's final vote is counted exactly once"""
+        def user_flow(i):
+            user_id = f'user-{i}'
+            vote('c1', user_id, 'upvote')
+            vote('c1', user_id, 'upvote')
+            if i % 3 == 0:
+                vote('c1', user_id, 'downvote')
+            if i % 5 == 0:
+                vote('c1', user_id, 'remove')
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(user_flow, range(60)))
+
+        from coding_questions_discussion_handler import wilson_lower_bound
+
+        expected_up = len([i for i in range(60) if i % 3 != 0 and i % 5 != 0])
+        expected_down = len([i for i in range(60) if i % 3 == 0 and i % 5 != 0])
+        comment = mock_dynamodb.comments.items[('c1',)]
+        assert comment['upvotes'] == expected_up
+        assert comment['downvotes'] == expected_down
+        assert comment['rankScore'] == wilson_lower_bound(expected_up, expected_down)
+        assert len(mock_dynamodb.votes.items) == expected_up + expected_down
+
+    def test_other_voters_do_not_cancel_each_other(self, mock_dynamodb):
+        """Counter deltas are unconditional, so first votes from distinct users each commit once"""
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(lambda i: vote('c1', f'user-{i}', 'upvote'), range(50)))
+
+        assert {r['statusCode'] for r in results} == {200}
+        assert mock_dynamodb.transactions == 50
+        assert mock_dynamodb.comments.items[('c1',)]['upvotes'] == 50
+
+    def test_transaction_conflicts_back_off_then_return_409(self, mock_dynamodb):
+        """Persistent TransactionConflict ends in a retryable 409 after jittered backoff"""
+        import coding_questions_discussion_handler as module
+
+        def conflict(TransactItems):
+            raise ClientError({
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+                'CancellationReasons': [{'Code': 'None'}, {'Code': 'TransactionConflict'}]
+            }, 'TransactWriteItems')
+
+        with patch.object(mock_dynamodb, 'transact_write_items', conflict), \
+             patch('coding_questions_discussion_handler.time.sleep') as sleep:
+            response = vote('c1', 'u1', 'upvote')
+
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 409
+        assert body['retryable'] == True
+        assert sleep.call_count == module.VOTE_MAX_ATTEMPTS - 1
+        assert all(0 <= c.args[0] <= module.VOTE_RETRY_BASE_SECONDS * 2 ** module.VOTE_MAX_ATTEMPTS
+                   for c in sleep.call_args_list)
+
+
+class TestVoteWithoutVotesTable:
+    """Counter-only voting when CodingQuestionsDiscussionVotes is absent"""
+
+    def test_counts_and_score_come_from_the_update(self, mock_dynamodb):
+        from coding_questions_discussion_handler import wilson_lower_bound
+
+        with patch('coding_questions_discussion_handler.get_votes_table', return_value=None):
+            vote('c1', 'u1', 'upvote')
+            body = json.loads(vote('c1', 'u2', 'downvote')['body'])
+            missing = vote('nope', 'u1', 'upvote')
+
+        assert (body['data']['upvotes'], body['data']['downvotes']) == (1, 1)
+        assert mock_dynamodb.comments.items[('c1',)]['rankScore'] == wilson_lower_bound(1, 1)
+        assert missing['statusCode'] == 404
+        assert ('nope',) not in mock_dynamodb.comments.items
+
+
+class TestGetDiscussions:
+    """Tests for threaded discussion reads"""
+
+    def test_inlines_replies_and_votes(self, mock_dynamodb):
+        """Should inline previewed replies and mark the user's votes"""
+        from coding_questions_discussion_handler import lambda_handler
+
+        mock_dynamodb.comments.put_item(Item={
+            'commentId': 'c2', 'questionId': 'q1', 'topLevelQuestionId': 'q1',
+            'createdAt': '2025-01-01T00:00:00Z', 'repliesCount': 1, 'replyPreviewIds': ['r1']
+        })
+        mock_dynamodb.comments.put_item(Item={
+            'commentId': 'r1', 'questionId': 'q1', 'parentCommentId': 'c2',
+            'createdAt': '2025-01-02T00:00:00Z'
+        })
+        mock_dynamodb.votes.put_item(Item={'commentId': 'r1', 'userId': 'u1', 'voteType': 'upvote'})
+
+        event = {
+            'httpMethod': 'GET',
+            'queryStringParameters': {'questionId': 'q1', 'userId': 'u1'}
+        }
+        body = json.loads(lambda_handler(event, {})['body'])
+
+        discussions = body['data']['discussions']
+        assert [d['commentId'] for d in discussions] == ['c2']
+        assert discussions[0]['hasUpvoted'] == False
+        assert discussions[0]['replies'][0]['commentId'] == 'r1'
+        assert discussions[0]['replies'][0]['hasUpvoted'] == True
+        assert body['data']['nextCursor'] is None
+
+    def test_top_sort_uses_rank_index(self, mock_dynamodb):
+        """Should order by rankScore from the rank index when sort=top"""
+        from coding_questions_discussion_handler import lambda_handler
+
+        mock_dynamodb.comments.put_item(Item={
+            'commentId': 'old-good', 'questionId': 'q1', 'topLevelQuestionId': 'q1',
+            'createdAt': '2025-01-01T00:00:00Z', 'rankScore': Decimal('0.8')
+        })
+        mock_dynamodb.comments.put_item(Item={
+            'commentId': 'new-bad', 'questionId': 'q1', 'topLevelQuestionId': 'q1',
+            'createdAt': '2025-02-01T00:00:00Z', 'rankScore': Decimal('0.1')
+        })
+
+        event = {'httpMethod': 'GET', 'queryStringParameters': {'questionId': 'q1', 'sort': 'top'}}
+        top = json.loads(lambda_handler(event, {})['body'])['data']['discussions']
+        event['queryStringParameters']['sort'] = 'new'
+        new = json.loads(lambda_handler(event, {})['body'])['data']['discussions']
+
+        assert [d['commentId'] for d in top] == ['old-good', 'new-bad']
+        assert [d['commentId'] for d in new] == ['new-bad', 'old-good']
+        assert mock_dynamodb.comments.last_query['IndexName'] == 'TopLevelIndex'
+
+    def test_invalid_sort(self, mock_dynamodb):
+        """Should reject unknown sort orders"""
+        from coding_questions_discussion_handler import lambda_handler
+
+        event = {'httpMethod': 'GET', 'queryStringParameters': {'questionId': 'q1', 'sort': 'random'}}
+        assert lambda_handler(event, {})['statusCode'] == 400
+
+    def test_malformed_cursor_is_rejected(self, mock_dynamodb):
+        """Should return 400 for a cursor it did not issue instead of an empty page"""
+        from coding_questions_discussion_handler import lambda_handler, encode_cursor, decode_cursor
+
+        key = {'commentId': 'c1', 'topLevelQuestionId': 'q1', 'rankScore': Decimal('0.4312')}
+        assert decode_cursor(encode_cursor(key)) == key
+        assert isinstance(decode_cursor(encode_cursor(key))['rankScore'], Decimal)
+        foreign = encode_cursor({'projectId': 'p1'})
+        for cursor in ['not-base64!', foreign]:
+            threads = {'httpMethod': 'GET', 'queryStringParameters': {'questionId': 'q1', 'cursor': cursor}}
+            replies = {'httpMethod': 'GET', 'queryStringParameters': {'parentCommentId': 'c1', 'cursor': cursor}}
+            assert lambda_handler(threads, {})['statusCode'] == 400
+            assert lambda_handler(replies, {})['statusCode'] == 400
+
+
+class TestBatchedVoteLookup:
+    """Tests for batch_get_user_votes / apply_user_votes"""
+
+    def test_one_batch_per_hundred_unique_comments(self, mock_dynamodb):
+        """Should de-duplicate ids and chunk keys to 100 per BatchGetItem"""
+        from coding_questions_discussion_handler import batch_get_user_votes
+
+        for i in range(0, 150, 3):
+            mock_dynamodb.votes.put_item(Item={'commentId': f'c{i}', 'userId': 'u1', 'voteType': 'downvote'})
+        calls = []
+        real = mock_dynamodb.batch_get_item
+
+        def counting(RequestItems):
+            calls.append(len(RequestItems['CodingQuestionsDiscussionVotes']['Keys']))
+            return real(RequestItems)
+
+        with patch.object(mock_dynamodb, 'batch_get_item', counting):
+            votes = batch_get_user_votes(mock_dynamodb.votes, [f'c{i}' for i in range(150)] * 2, 'u1')
+
+        assert sorted(calls) == [50, 100]
+        assert len(votes) == 50 and set(votes.values()) == {'downvote'}
+
+    def test_unprocessed_keys_retry_without_a_trailing_sleep(self, mock_dynamodb):
+        """Should back off only between attempts, never after the last one"""
+        import coding_questions_discussion_handler as module
+
+        def throttled(RequestItems):
+            return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+
+        with patch.object(mock_dynamodb, 'batch_get_item', throttled), \
+             patch('coding_questions_discussion_handler.time.sleep') as sleep:
+            assert module.batch_get_user_votes(mock_dynamodb.votes, ['c1'], 'u1') == {}
+
+        assert sleep.call_count == module.BATCH_GET_MAX_RETRIES
+        assert [c.args[0] for c in sleep.call_args_list][:2] == [0.05, 0.1]
+
+    def test_apply_user_votes_degrades_to_no_votes_on_error(self, mock_dynamodb):
+        """Should still mark every comment when the vote lookup fails"""
+        from coding_questions_discussion_handler import apply_user_votes
+
+        comments = [{'commentId': 'c1'}, {'commentId': 'c2'}]
+        with patch.object(mock_dynamodb, 'batch_get_item', side_effect=Exception('throttled')):
+            apply_user_votes(comments, 'u1')
+
+        assert [(c['hasUpvoted'], c['hasDownvoted']) for c in comments] == [(False, False), (False, False)]
+
+
+class MockThreadTable(MockDynamoDBTable):
+    """Comments table with the reply-count/preview updates and the reply index"""
+    def __init__(self, db):
+        super().__init__('CodingQuestionsDiscussions', db, ['commentId'])
+
+    def delete_item(self, Key):
+        self.items.pop(self.key_of(Key), None)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ConditionExpression=None, ReturnValues=None):
+        item = self.items.get(self.key_of(Key))
+        values = ExpressionAttributeValues
+        preview = item.get('replyPreviewIds') if item else None
+        failed = (
+            (ConditionExpression == 'attribute_exists(commentId)' and item is None)
+            or (ConditionExpression and 'size(replyPreviewIds)' in ConditionExpression
+                and preview is not None and len(preview) >= values[':k'])
+            or (ConditionExpression == 'replyPreviewIds = :preview' and preview != values[':preview'])
+        )
+        if failed:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}}, 'UpdateItem')
+        if 'repliesCount' in UpdateExpression:
+            delta = values[':inc'] if ':inc' in values else -values[':dec']
+            item['repliesCount'] = item.get('repliesCount', 0) + delta
+        if ':reply' in values:
+            item['replyPreviewIds'] = (preview or []) + values[':reply']
+        if ':refreshed' in values:
+            item['replyPreviewIds'] = values[':refreshed']
+        return {'Attributes': dict(item)} if ReturnValues else {}
+
+    def query(self, **kwargs):
+        if kwargs.get('IndexName') != 'ParentCommentIndex':
+            return super().query(**kwargs)
+        parent = kwargs['KeyConditionExpression'].get_expression()['values'][1]
+        replies = sorted((i for i in self.items.values() if i.get('parentCommentId') == parent),
+                         key=lambda i: i['createdAt'])
+        return {'Items': [{'commentId': r['commentId']} for r in replies[:kwargs.get('Limit')]]}
+
+
+@pytest.fixture
+def thread_table():
+    db = MockDynamoDB()
+    table = MockThreadTable(db)
+    with patch('coding_questions_discussion_handler.dynamodb', db), \
+         patch('coding_questions_discussion_handler.discussions_table', table), \
+         patch('coding_questions_discussion_handler.votes_table', db.votes):
+        yield table
+
+
+def post(action, **body):
+    from coding_questions_discussion_handler import lambda_handler
+    return lambda_handler({'httpMethod': 'POST', 'body': json.dumps({'action': action, **body})}, {})
+
+
+def add_reply(parent_id, n):
+    result = post('add_comment', questionId='q1', userId='u1', userName='U', content=f'reply {n}',
+                  parentCommentId=parent_id)
+    return json.loads(result['body'])['data']['commentId']
+
+
+def build_thread(table, reply_count):
+    """A top-level comment with replies created one day apart; returns (parentId, replyIds)"""
+    body = json.loads(post('add_comment', questionId='q1', userId='u1', userName='U', content='top')['body'])
+    parent_id = body['data']['commentId']
+    assert body['data']['topLevelQuestionId'] == 'q1'
+    replies = []
+    with patch('coding_questions_discussion_handler.datetime') as clock:
+        for n in range(reply_count):
+            clock.utcnow.return_value.isoformat.return_value = f'2025-01-0{n + 1}T00:00:00'
+            replies.append(add_reply(parent_id, n))
+    return parent_id, replies
+
+
+class TestThreadReadModel:
+    """Tests for repliesCount / replyPreviewIds maintenance"""
+
+    def test_preview_holds_the_first_replies_only(self, thread_table):
+        parent_id, replies = build_thread(thread_table, 5)
+
+        parent = thread_table.items[(parent_id,)]
+        assert parent['repliesCount'] == 5
+        assert parent['replyPreviewIds'] == replies[:3]
+        assert 'topLevelQuestionId' not in thread_table.items[(replies[0],)]
+
+    def test_deleting_a_previewed_reply_refills_the_preview(self, thread_table):
+        parent_id, replies = build_thread(thread_table, 5)
+
+        assert post('delete', commentId=replies[1], userId='u1')['statusCode'] == 200
+        parent = thread_table.items[(parent_id,)]
+        assert parent['repliesCount'] == 4
+        assert parent['replyPreviewIds'] == [replies[0], replies[2], replies[3]]
+
+        post('delete', commentId=replies[4], userId='u1')
+        assert thread_table.items[(parent_id,)]['replyPreviewIds'] == [replies[0], replies[2], replies[3]]
+
+    def test_backfill_is_direct_invocation_only(self, thread_table):
+        from coding_questions_discussion_handler import lambda_handler
+        thread_table.scan = lambda **kwargs: {'Items': []}
+
+        assert post('backfill_threads')['statusCode'] == 400
+        result = lambda_handler({'action': 'backfill_threads'}, {})
+        assert json.loads(result['body'])['data'] == {'commentsScanned': 0, 'threadsUpdated': 0}
@@ -0,0 +1,183 @@
+"""
+Test cases for Course Purchase Handler Lambda Function
+Covers purchased-course listing with batched, cached course hydration and queued payments
+"""
+
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class MockDynamoResource:
+    """batch_get_item over an in-memory Courses table; optionally withholds keys once (or always)"""
+    def __init__(self, courses):
+        self.courses = courses
+        self.calls = []
+        self.unprocess_first = 0
+        self.unprocess_always = False
+
+    def batch_get_item(self, RequestItems):
+        request = RequestItems['Courses']
+        keys = request['Keys']
+        self.calls.append(len(keys))
+        assert len(keys) <= 100
+        fields = set(request['ExpressionAttributeNames'].values())
+        served, withheld = keys, []
+        if self.unprocess_always:
+            served, withheld = [], keys
+        elif self.unprocess_first:
+            served, withheld = keys[self.unprocess_first:], keys[:self.unprocess_first]
+            self.unprocess_first = 0
+        result = {'Responses': {'Courses': [
+            {k: v for k, v in self.courses[key['courseId']].items() if k in fields}
+            for key in served if key['courseId'] in self.courses
+        ]}}
+        if withheld:
+            result['UnprocessedKeys'] = {'Courses': {**request, 'Keys': withheld}}
+        return result
+
+
+@pytest.fixture
+def handler():
+    import course_purchase_handler
+    courses = {
+        f'c{i}': {'courseId': f'c{i}', 'title': f'Course {i}', 'price': Decimal('499'),
+                  'content': {'videos': [{'title': 'v', 'url': 'u'}]}, 'reviews': ['large'] * 50}
+        for i in range(250)
+    }
+    resource = MockDynamoResource(courses)
+    courses_table = MagicMock()
+    courses_table.name = 'Courses'
+    with patch.object(course_purchase_handler, 'dynamodb', resource), \
+         patch.object(course_purchase_handler, 'courses_table', courses_table), \
+         patch.object(course_purchase_handler, 'profile_cache') as profile_cache, \
+         patch.object(course_purchase_handler, 'list_entries') as list_entries, \
+         patch.object(course_purchase_handler, 'course_cache', course_purchase_handler.TTLCache('test', 300, 1000)), \
+         patch.object(course_purchase_handler, 'BATCH_GET_MAX_RETRIES', 2), \
+         patch('course_purchase_handler.time.sleep'):
+        profile_cache.get.return_value = {'userId': 'u1'}
+        yield course_purchase_handler, resource, list_entries
+
+
+def purchased(handler_module):
+    result = handler_module.get_purchased_courses({'userId': 'u1'})
+    return json.loads(result['body'])
+
+
+class TestGetPurchasedCourses:
+    def test_forty_courses_in_one_batched_read(self, handler):
+        """Should hydrate every purchase with one BatchGetItem and keep the purchase order"""
+        module, resource, list_entries = handler
+        list_entries.return_value = [
+            {'courseId': f'c{i}', 'purchasedAt': f't{i}', 'priceAtPurchase': Decimal('499')} for i in range(39, -1, -1)
+        ] + ['missing-course']
+
+        body = purchased(module)
+
+        assert resource.calls == [41]
+        assert body['count'] == 40
+        assert [c['courseId'] for c in body['purchasedCourses']][:3] == ['c39', 'c38', 'c37']
+        assert body['purchasedCourses'][0]['purchasedAt'] == 't39'
+        assert 'reviews' not in body['purchasedCourses'][0]
+        assert body['purchasedCourses'][0]['content']['videos']
+
+    def test_chunks_and_retries_unprocessed_keys(self, handler):
+        """Should split >100 keys into chunks and retry keys DynamoDB did not process"""
+        module, resource, list_entries = handler
+        list_entries.return_value = [f'c{i}' for i in range(250)]
+        resource.unprocess_first = 10
+
+        body = purchased(module)
+
+        assert body['count'] == 250
+        assert sorted(resource.calls) == [10, 50, 100, 100]
+
+    def test_no_backoff_after_the_last_attempt(self, handler):
+        """Keys still unprocessed after the final retry are given up on without sleeping again"""
+        module, resource, list_entries = handler
+        list_entries.return_value = ['c1', 'c2']
+        resource.unprocess_always = True
+
+        body = purchased(module)
+
+        assert body['count'] == 0
+        assert resource.calls == [2, 2, 2]
+        assert module.time.sleep.call_count == 2
+
+    def test_repeat_reads_are_served_from_the_course_cache(self, handler):
+        module, resource, list_entries = handler
+        list_entries.return_value = ['c1', 'c2']
+        purchased(module)
+        list_entries.return_value = ['c1', 'c2', 'c3']
+
+        body = purchased(module)
+
+        assert resource.calls == [2, 1]
+        assert [c['courseId'] for c in body['purchasedCourses']] == ['c1', 'c2', 'c3']
+
+
+class TestCoursePaymentQueue:
+    def test_verified_payment_is_queued_and_fulfilled_by_the_worker(self):
+        """With a queue configured the client gets PROCESSING; the SQS batch runs fulfilment"""
+        import course_purchase_handler as module
+        body = {'action': 'COURSE_PAYMENT_WEBHOOK', 'razorpay_payment_id': 'pay_1', 'razorpay_order_id': 'order_1',
+                'razorpay_signature': 'sig', 'userId': 'u1', 'courseId': 'c1'}
+        with patch.object(module, 'RAZORPAY_KEY_SECRET', ''), \
+             patch.object(module, 'queue_enabled', return_value=True), \
+             patch.object(module, 'enqueue') as enqueue, \
+             patch.object(module, 'fulfil_course_payment', return_value={'statusCode': 200}) as fulfil:
+            result = module.lambda_handler({'body': json.dumps(body)}, None)
+            assert json.loads(result['body'])['status'] == 'PROCESSING'
+            fulfil.assert_not_called()
+
+            kind, order_key, payload = enqueue.call_args[0]
+            message = {'kind': kind, 'orderKey': order_key, 'payload': payload}
+            records = [{'messageId': f'm{i}', 'body': json.dumps(message), 'eventSource': 'aws:sqs'} for i in range(2)]
+            assert module.lambda_handler({'Records': records}, None) == {'batchItemFailures': []}
+            fulfil.assert_called_once_with({k: body[k] for k in module.COURSE_PAYMENT_FIELDS})
+
+
+class TestRecordCoursePurchase:
+    def record(self, transact):
+        import course_purchase_handler as module
+        resource = MagicMock()
+        resource.meta.client.transact_write_items.side_effect = transact
+        with patch.object(module, 'dynamodb', resource), \
+             patch.object(module, 'profile_cache') as profile_cache:
+            recorded = module.record_course_purchase(
+                'u1', {'courseId': 'c1', 'priceAtPurchase': Decimal('499')}, Decimal('499')
+            )
+        return recorded, resource.meta.client.transact_write_items, profile_cache
+
+    def test_child_item_and_both_counters_commit_together(self):
+        """The child put, the Users counters and Courses.purchasesCount are one transaction"""
+        recorded, transact, profile_cache = self.record(None)
+
+        assert recorded is True
+        actions = transact.call_args.kwargs['TransactItems']
+        assert [next(iter(a)) for a in actions] == ['Put', 'Update', 'Update']
+        assert actions[0]['Put']['ConditionExpression'] == 'attribute_not_exists(itemKey)'
+        assert actions[1]['Update']['Key'] == {'userId': {'S': 'u1'}}
+        assert 'totalCourseSpent' in actions[1]['Update']['UpdateExpression']
+        assert actions[2]['Update']['Key'] == {'courseId': {'S': 'c1'}}
+        profile_cache.invalidate.assert_called_once_with('u1')
+
+    def test_already_recorded_course_changes_nothing(self):
+        """A redelivery that finds the child item returns False and bumps no counter"""
+        from botocore.exceptions import ClientError
+        cancelled = ClientError({
+            'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+            'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}, {'Code': 'None'}, {'Code': 'None'}]
+        }, 'TransactWriteItems')
+
+        recorded, transact, profile_cache = self.record(cancelled)
+
+        assert recorded is False
+        assert transact.call_count == 1
+        profile_cache.invalidate.assert_not_called()
@@ -17,6 +17,7 @@ from freelancers_handler import (
     handle_get_freelancer_by_id,
     handle_get_top_freelancers,
     handle_search_freelancers,
+    handle_suggest_freelancers,
     format_freelancer,
     get_seller_stats,
     decimal_to_float,
@@ -24,6 +25,14 @@ from freelancers_handler import (
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_profile_cache():
+    """Each test mocks its own Users table; don't serve profiles cached by another"""
+    from freelancers_handler import profile_cache
+    profile_cache.clear()
+    yield
+
+
 class TestDecimalToFloat:
     """Test the decimal_to_float helper function"""
 
@@ -594,6 +603,88 @@ class TestSearchFreelancers:
         assert body['error']['code'] == 'DATABASE_ERROR'
 
 
+class TestSuggestFreelancers:
+    """Test SUGGEST_FREELANCERS action"""
+
+    @patch('freelancers_handler.get_freelancer_reviews_stats', return_value={'averageRating': 0, 'count': 0})
+    @patch('freelancers_handler.dynamodb')
+    @patch('freelancers_handler.freelancer_skills_table')
+    @patch('freelancers_handler.bid_request_projects_table')
+    @patch('freelancers_handler.users_table')
+    def test_suggest_ranks_rare_skills_and_rate_fit(self, mock_users_table, mock_projects_table,
+                                                    mock_skills_table, mock_dynamodb, mock_reviews):
+        mock_users_table.name = 'Users'
+        mock_projects_table.get_item.return_value = {'Item': {
+            'projectId': 'project-1', 'buyerId': 'buyer-1', 'skills': ['React', 'Rust'],
+            'projectType': 'hourly', 'budgetMax': Decimal('40'), 'currency': 'USD'
+        }}
+        postings = {
+            'react': [{'userId': f'user-{i}', 'hourlyRate': Decimal('30'), 'currency': 'USD'} for i in range(4)],
+            'rust': [
+                {'userId': 'user-0', 'hourlyRate': Decimal('30'), 'currency': 'USD'},
+                {'userId': 'user-9', 'hourlyRate': Decimal('50'), 'currency': 'USD'}
+            ]
+        }
+        mock_skills_table.query.side_effect = lambda KeyConditionExpression: {
+            'Items': postings[KeyConditionExpression.get_expression()['values'][1]]
+        }
+        mock_dynamodb.batch_get_item.side_effect = lambda RequestItems: {'Responses': {'Users': [
+            {'userId': k['userId'], 'fullName': k['userId'], 'email': f"{k['userId']}@example.com",
+             'role': 'freelancer', 'skills': ['React']}
+            for k in RequestItems['Users']['Keys']
+        ]}}
+
+        result = handle_suggest_freelancers({'projectId': 'project-1', 'limit': 3})
+        body = json.loads(result['body'])
+
+        assert result['statusCode'] == 200
+        ids = [f['id'] for f in body['data']['freelancers']]
+        # Both skills first, then the rare-skill match (rate slightly over budget), then React-only
+        assert ids[0] == 'user-0'
+        assert ids[1] == 'user-9'
+        assert body['data']['freelancers'][0]['matchedSkills'] == ['react', 'rust']
+
+    @patch('freelancers_handler.dynamodb')
+    @patch('freelancers_handler.freelancer_skills_table')
+    @patch('freelancers_handler.bid_request_projects_table')
+    @patch('freelancers_handler.users_table')
+    def test_suggest_drops_postings_of_blocked_users(self, mock_users_table, mock_projects_table,
+                                                    mock_skills_table, mock_dynamodb):
+        """A user blocked by a function that did not sync the index is skipped and unindexed"""
+        mock_users_table.name = 'Users'
+        mock_projects_table.get_item.return_value = {'Item': {
+            'projectId': 'project-1', 'buyerId': 'buyer-1', 'skills': ['Rust']
+        }}
+        mock_skills_table.query.return_value = {'Items': [{'userId': 'user-1', 'hourlyRate': Decimal('30')}]}
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'Users': [
+            {'userId': 'user-1', 'role': 'freelancer', 'skills': ['Rust'], 'status': 'blocked'}
+        ]}}
+        batch = mock_skills_table.batch_writer.return_value.__enter__.return_value
+
+        result = handle_suggest_freelancers({'projectId': 'project-1'})
+
+        assert json.loads(result['body'])['data']['freelancers'] == []
+        batch.delete_item.assert_called_once_with(Key={'skill': 'rust', 'userId': 'user-1'})
+
+    def test_suggest_requires_project_id(self):
+        result = handle_suggest_freelancers({})
+        assert result['statusCode'] == 400
+
+    @patch('freelancers_handler.freelancer_skills_table')
+    @patch('freelancers_handler.users_table')
+    def test_backfill_is_direct_invocation_only(self, mock_users_table, mock_skills_table):
+        mock_users_table.scan.return_value = {'Items': [
+            {'userId': 'user-1', 'role': 'freelancer', 'skills': ['Rust']}
+        ]}
+
+        result = lambda_handler({'body': json.dumps({'action': 'BACKFILL_SKILL_INDEX'})}, None)
+        assert result['statusCode'] == 400
+        mock_users_table.scan.assert_not_called()
+
+        result = lambda_handler({'action': 'BACKFILL_SKILL_INDEX'}, None)
+        assert json.loads(result['body'])['data'] == {'freelancersIndexed': 1}
+
+
 class TestLambdaHandler:
     """Test the main lambda_handler function"""
 
@@ -0,0 +1,211 @@
+"""
+Test cases for Login Handler Lambda Function
+Covers signup uniqueness, index-backed login and the email backfill
+"""
+
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+deserializer = TypeDeserializer()
+
+PASSWORD = 'Secret#123'
+
+
+def conditional_failure(operation):
+    return ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}}, operation)
+
+
+class MockUsersTable:
+    """Users table with the email-index GSI; counts scans so tests can assert none happen"""
+    def __init__(self):
+        self.items = {}
+        self.scans = 0
+
+    def query(self, IndexName, KeyConditionExpression, Limit=None, **kwargs):
+        assert IndexName == 'email-index'
+        email = KeyConditionExpression.get_expression()['values'][1]
+        items = [{'userId': u['userId'], 'email': u['email']} for u in self.items.values() if u.get('email') == email]
+        return {'Items': items[:Limit] if Limit else items}
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key['userId'])
+        return {'Item': dict(item)} if item else {}
+
+    def update_item(self, Key, **kwargs):
+        self.items[Key['userId']]['loginCount'] = self.items[Key['userId']].get('loginCount', 0) + 1
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, **kwargs):
+        self.scans += 1
+        users = sorted(self.items.values(), key=lambda u: u['userId'])
+        if ExclusiveStartKey:
+            users = [u for u in users if u['userId'] > ExclusiveStartKey['userId']]
+        page = users[:Limit] if Limit else users
+        result = {'Items': [dict(u) for u in page], 'ScannedCount': len(page)}
+        if Limit and len(users) > Limit:
+            result['LastEvaluatedKey'] = {'userId': page[-1]['userId']}
+        return result
+
+
+class MockEmailsTable:
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key['email'])
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        existing = self.items.get(Item['email'])
+        if existing and existing['userId'] != ExpressionAttributeValues[':u']:
+            raise conditional_failure('PutItem')
+        self.items[Item['email']] = dict(Item)
+
+
+def cancelled(*codes):
+    return ClientError({'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                        'CancellationReasons': [{'Code': code} for code in codes]}, 'TransactWriteItems')
+
+
+class MockTransactClient:
+    def __init__(self, users, emails):
+        self.users = users
+        self.emails = emails
+        # Codes to cancel the next calls with, as if another transaction held the items
+        self.conflicts = []
+        self.calls = 0
+
+    def transact_write_items(self, TransactItems):
+        self.calls += 1
+        if self.conflicts:
+            raise cancelled(*self.conflicts.pop(0))
+        marker, user = [{k: deserializer.deserialize(v) for k, v in op['Put']['Item'].items()} for op in TransactItems]
+        if marker['email'] in self.emails.items or user['userId'] in self.users.items:
+            raise cancelled('ConditionalCheckFailed' if marker['email'] in self.emails.items else 'None',
+                            'ConditionalCheckFailed' if user['userId'] in self.users.items else 'None')
+        self.emails.items[marker['email']] = marker
+        self.users.items[user['userId']] = user
+
+
+@pytest.fixture
+def tables():
+    users = MockUsersTable()
+    emails = MockEmailsTable()
+    resource = MagicMock()
+    resource.meta.client = MockTransactClient(users, emails)
+    with patch('login_handler.table', users), \
+         patch('login_handler.emails_table', emails), \
+         patch('login_handler.dynamodb', resource), \
+         patch('login_handler.SIGNUP_RETRY_BASE_SECONDS', 0):
+        yield users, emails
+
+
+def call(action, **body):
+    from login_handler import lambda_handler
+    result = lambda_handler({'body': json.dumps({'action': action, **body})}, {})
+    return result['statusCode'], json.loads(result['body'])
+
+
+def invoke(action, **body):
+    """Direct Lambda invocation, as used for the backfill"""
+    from login_handler import lambda_handler
+    result = lambda_handler({'action': action, **body}, {})
+    return result['statusCode'], json.loads(result['body'])
+
+
+def signup(email):
+    return call('signup', email=email, phoneNumber='9999999999', password=PASSWORD, confirmPassword=PASSWORD)
+
+
+class TestEmailLookup:
+    """Tests for the email -> userId access path"""
+
+    def test_signup_then_login_without_scans(self, tables):
+        """Login should find the user through the index and a get"""
+        users, emails = tables
+        status, body = signup('Ada@Example.com')
+        assert status == 200
+        assert emails.items['ada@example.com']['userId'] == body['data']['userId']
+
+        status, body = call('login', email='ada@example.com', password=PASSWORD)
+        assert status == 200
+        assert body['data']['email'] == 'ada@example.com'
+        assert users.scans == 0
+
+        assert call('login', email='nobody@example.com', password=PASSWORD)[0] == 404
+
+    def test_duplicate_signup_is_rejected_atomically(self, tables):
+        """A signup racing past the index check should still lose to the email item"""
+        users, emails = tables
+        assert signup('ada@example.com')[0] == 200
+        assert signup('ada@example.com')[0] == 409
+
+        with patch.object(users, 'query', return_value={'Items': []}):
+            status, body = signup('ada@example.com')
+        assert status == 409
+        assert body['error']['code'] == 'EMAIL_ALREADY_EXISTS'
+        assert len(users.items) == 1
+
+    def test_transaction_conflict_is_retried_not_reported_as_duplicate(self, tables):
+        """Only the UserEmails condition failing means the email is taken"""
+        from login_handler import dynamodb
+        users, emails = tables
+        dynamodb.meta.client.conflicts = [('TransactionConflict', 'None')]
+
+        status, body = signup('ada@example.com')
+
+        assert status == 200
+        assert dynamodb.meta.client.calls == 2
+        assert emails.items['ada@example.com']['userId'] == body['data']['userId']
+
+    def test_persistent_conflict_is_a_retryable_server_error(self, tables):
+        from login_handler import dynamodb
+        users, emails = tables
+        dynamodb.meta.client.conflicts = [('None', 'TransactionConflict')] * 3
+
+        status, body = signup('ada@example.com')
+
+        assert status == 503
+        assert body['error']['code'] == 'SIGNUP_CONFLICT'
+        assert body['error']['retryable'] is True
+        assert users.items == {}
+
+    def test_backfill_is_resumable_and_keeps_first_owner(self, tables):
+        """Should write one email item per legacy user, reporting shared emails"""
+        users, emails = tables
+        for i in range(7):
+            users.items[f'u{i}'] = {'userId': f'u{i}', 'email': f'user{i}@example.com'}
+        users.items['u7'] = {'userId': 'u7', 'email': 'user0@example.com'}
+
+        assert call('backfillEmailIndex', batchSize=3)[0] == 400
+        assert users.scans == 0
+
+        progress = {'batchSize': 3}
+        calls = 0
+        duplicates = []
+        while True:
+            status, body = invoke('backfillEmailIndex', **progress)
+            assert status == 200
+            calls += 1
+            duplicates.extend(body['data']['duplicates'])
+            if body['data']['done']:
+                break
+            progress['startKey'] = body['data']['nextStartKey']
+
+        assert calls == 3
+        assert len(emails.items) == 7
+        assert emails.items['user0@example.com']['userId'] == 'u0'
+        assert duplicates == [{'email': 'user0@example.com', 'userId': 'u7'}]
+
+        users.items['u0']['passwordHash'] = PASSWORD
+        users.items['u0'].update(role='user', credits=0, status='active')
+        status, body = call('login', email='user0@example.com', password=PASSWORD)
+        assert status == 200
+        assert body['data']['userId'] == 'u0'
@@ -0,0 +1,125 @@
+"""
+Test cases for the razorpayOrderId index lookup, backfill and verification
+"""
+
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import order_lookup
+from order_lookup import find_order, backfill_orders, verify_orders
+
+
+class MockOrdersTable:
+    """Orders keyed by orderId with a keys-only razorpayOrderId-index; scans page 2 items at a time"""
+    PAGE = 2
+
+    def __init__(self, orders):
+        self.items = {o['orderId']: dict(o) for o in orders}
+        self.scans = 0
+        self.lagging = set()
+
+    def query(self, IndexName, KeyConditionExpression):
+        assert IndexName == 'razorpayOrderId-index'
+        razorpay_order_id = KeyConditionExpression.get_expression()['values'][1]
+        return {'Items': [
+            {'orderId': o['orderId'], 'razorpayOrderId': razorpay_order_id}
+            for o in sorted(self.items.values(), key=lambda o: o['orderId'])
+            if o.get('razorpayOrderId') == razorpay_order_id and isinstance(razorpay_order_id, str)
+            and o['orderId'] not in self.lagging
+        ]}
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get(Key['orderId'])
+        return {'Item': dict(item)} if item else {}
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, FilterExpression=None, **kwargs):
+        self.scans += 1
+        orders = sorted(self.items.values(), key=lambda o: o['orderId'])
+        if ExclusiveStartKey:
+            orders = [o for o in orders if o['orderId'] > ExclusiveStartKey['orderId']]
+        page = orders[:min(Limit or self.PAGE, self.PAGE)]
+        items = page
+        if FilterExpression is not None:
+            wanted = FilterExpression.get_expression()['values'][1]
+            items = [o for o in page if o.get('razorpayOrderId') == wanted]
+        result = {'Items': [dict(o) for o in items], 'ScannedCount': len(page)}
+        if len(orders) > len(page):
+            result['LastEvaluatedKey'] = {'orderId': page[-1]['orderId']}
+        return result
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression, ExpressionAttributeValues):
+        order = self.items[Key['orderId']]
+        assert order['razorpayOrderId'] == ExpressionAttributeValues[':old']
+        order['razorpayOrderId'] = ExpressionAttributeValues[':s']
+
+
+@pytest.fixture
+def orders():
+    table = MockOrdersTable(
+        [{'orderId': f'o{i}', 'razorpayOrderId': f'order_{i}', 'status': 'PENDING'} for i in range(6)] +
+        [{'orderId': 'o6', 'razorpayOrderId': 12345, 'status': 'PENDING'},
+         {'orderId': 'o7', 'status': 'PENDING'}]
+    )
+    with patch('order_lookup.time.sleep'):
+        yield table
+
+
+def run_to_completion(action, table, batch_size=3):
+    progress = {'batchSize': batch_size}
+    pages = []
+    while True:
+        data = action(table, 'orderId', progress)
+        pages.append(data)
+        if data['done']:
+            return pages
+        progress['startKey'] = data['nextStartKey']
+
+
+class TestOrderLookup:
+    def test_lookup_uses_the_index_not_a_scan(self, orders):
+        """Should resolve through the index and a consistent get of the current item"""
+        orders.items['o5']['status'] = 'SUCCESS'
+        assert find_order(orders, 'orderId', 'order_5')['status'] == 'SUCCESS'
+        assert orders.scans == 0
+
+    def test_missing_order_scans_every_page(self, orders):
+        """The fallback scan must page past the first page instead of reporting 'not found'"""
+        orders.lagging.add('o5')
+        with patch.object(order_lookup, 'ORDER_SCAN_FALLBACK', True):
+            assert find_order(orders, 'orderId', 'order_5')['orderId'] == 'o5'
+        assert orders.scans == 3
+
+    def test_index_miss_does_not_scan_by_default(self, orders):
+        """Without ORDER_SCAN_FALLBACK a miss is 'not found', never a table scan"""
+        orders.lagging.add('o5')
+        assert find_order(orders, 'orderId', 'order_5') is None
+        assert orders.scans == 0
+
+    def test_backfill_then_verify_covers_historical_orders(self, orders):
+        """Numeric ids are rewritten; rows without an id are reported, not guessed"""
+        before = run_to_completion(verify_orders, orders)
+        assert sum(p['indexed'] for p in before) == 6
+        assert sum(p['unindexable'] for p in before) == 2
+
+        pages = run_to_completion(backfill_orders, orders)
+        assert len(pages) == 3
+        assert sum(p['rewritten'] for p in pages) == 1
+        assert [s for p in pages for s in p['missingSamples']] == ['o7']
+        assert orders.items['o6']['razorpayOrderId'] == '12345'
+        assert find_order(orders, 'orderId', '12345')['orderId'] == 'o6'
+
+        after = run_to_completion(verify_orders, orders)
+        assert sum(p['indexed'] for p in after) == 7
+        assert sum(p['unindexable'] for p in after) == 1
+        assert not all(p['covered'] for p in after)
+
+    def test_verify_reports_shared_ids(self, orders):
+        orders.items['o8'] = {'orderId': 'o8', 'razorpayOrderId': 'order_1'}
+        pages = run_to_completion(verify_orders, orders, batch_size=10)
+        assert pages[0]['duplicates'] == 2
+        assert pages[0]['samples']['duplicates'][0] == {'razorpayOrderId': 'order_1', 'orders': ['o1', 'o8']}
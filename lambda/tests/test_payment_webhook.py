@@ -0,0 +1,290 @@
+"""
+Test cases for Payment Webhook Lambda Function
+Covers batched, transactional fulfilment of captured payments
+"""
+
+import pytest
+import re
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('RAZORPAY_WEBHOOK_SECRET', 'test-secret')
+
+deserializer = TypeDeserializer()
+serializer = TypeSerializer()
+
+
+def plain(values):
+    return {k: deserializer.deserialize(v) for k, v in values.items()}
+
+
+def cancelled(reasons):
+    error = ClientError({'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'}},
+                       'TransactWriteItems')
+    error.response['CancellationReasons'] = reasons
+    return error
+
+
+class MockStore:
+    """Orders / Users / Projects / UserCollections / SellerEarnings in memory behind batch_get_item and transact_write_items"""
+    def __init__(self):
+        self.orders = {}
+        self.users = {}
+        self.projects = {}
+        self.collections = {}
+        self.earnings = {}
+        self.batch_gets = 0
+        self.transactions = 0
+        self.fail_next = None
+
+    def batch_get_item(self, RequestItems):
+        self.batch_gets += 1
+        keys = RequestItems['Projects']['Keys']
+        assert len(keys) <= 100
+        return {'Responses': {'Projects': [
+            {k: self.projects[key['projectId']][k] for k in ('projectId', 'price', 'sellerId')}
+            for key in keys if key['projectId'] in self.projects
+        ]}}
+
+    def transact_write_items(self, TransactItems):
+        assert len(TransactItems) <= 100
+        if self.fail_next:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        reasons = [self.check(action) for action in TransactItems]
+        if any(reasons):
+            raise cancelled([r or {'Code': 'None'} for r in reasons])
+        self.transactions += 1
+        for action in TransactItems:
+            self.apply(action)
+
+    def table(self, name):
+        return {'Orders': self.orders, 'Users': self.users, 'Projects': self.projects,
+                'UserCollections': self.collections, 'SellerEarnings': self.earnings}[name]
+
+    @staticmethod
+    def key_of(key):
+        values = tuple(key.values())
+        return values[0] if len(values) == 1 else values
+
+    def put_key(self, put):
+        item = plain(put['Item'])
+        return (item['userId'], item['itemKey']) if put['TableName'] == 'UserCollections' \
+            else (item['sellerId'], item['entryKey'])
+
+    def check(self, action):
+        """The cancellation reason for one action, or None if its condition holds"""
+        failed = {'Code': 'ConditionalCheckFailed'}
+        if 'Put' in action:
+            put = action['Put']
+            return failed if self.put_key(put) in self.table(put['TableName']) else None
+        update = action.get('Update', {})
+        if update.get('TableName') == 'Orders':
+            values = plain(update['ExpressionAttributeValues'])
+            order = self.orders[plain(update['Key'])['orderId']]
+            if order.get('status') == 'SUCCESS' or values[':index'] in order.get('fulfilledChunks', set()) \
+                    or order.get('chunkSize', values[':size']) != values[':size']:
+                if update.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                    failed['Item'] = {k: serializer.serialize(v) for k, v in order.items()}
+                return failed
+        return None
+
+    def apply(self, action):
+        if 'Delete' in action:
+            key = plain(action['Delete']['Key'])
+            self.collections.pop((key['userId'], key['itemKey']), None)
+        elif 'Put' in action:
+            put = action['Put']
+            self.table(put['TableName'])[self.put_key(put)] = plain(put['Item'])
+        else:
+            update = action['Update']
+            key = plain(update['Key'])
+            values = plain(update['ExpressionAttributeValues'])
+            names = update.get('ExpressionAttributeNames', {})
+            item = self.table(update['TableName']).setdefault(self.key_of(key), dict(key))
+            add, _, sets = update['UpdateExpression'][len('ADD '):].partition(' SET ')
+            for clause in add.split(', '):
+                field, value = clause.split(' ')
+                field = names.get(field, field)
+                current = item.get(field)
+                item[field] = (current or set()) | values[value] if isinstance(values[value], set) \
+                    else (current or 0) + values[value]
+            # Split on top-level commas only: list_append(if_not_exists(f, :e), :v)
+            for clause in filter(None, re.split(r', (?![^(]*\))', sets)):
+                field, value = clause.split(' = ')
+                field = names.get(field, field)
+                if value.startswith('list_append('):
+                    item[field] = item.get(field, []) + values[value.rstrip(')').split(', ')[-1]]
+                else:
+                    item[field] = values[value]
+
+
+@pytest.fixture
+def store():
+    import payment_webhook
+    store = MockStore()
+    resource = MagicMock()
+    resource.batch_get_item = store.batch_get_item
+    resource.meta.client.transact_write_items = store.transact_write_items
+    tables = {}
+    for attr, name in (('orders_table', 'Orders'), ('users_table', 'Users'),
+                       ('projects_table', 'Projects'), ('collections_table', 'UserCollections'),
+                       ('earnings_table', 'SellerEarnings')):
+        tables[attr] = MagicMock()
+        tables[attr].name = name
+    tables['users_table'].get_item.side_effect = lambda Key, **kwargs: (
+        {'Item': {'cart': store.users[Key['userId']]['cart']}} if 'cart' in store.users.get(Key['userId'], {}) else {}
+    )
+
+    def set_cart(Key, UpdateExpression, ExpressionAttributeValues):
+        store.users[Key['userId']]['cart'] = ExpressionAttributeValues[':new_cart']
+    tables['users_table'].update_item.side_effect = set_cart
+
+    with patch.object(payment_webhook, 'dynamodb', resource), \
+         patch.multiple(payment_webhook, **tables), \
+         patch.object(payment_webhook, 'find_order_by_razorpay_order_id',
+                      lambda rid: next((dict(o) for o in store.orders.values() if o['razorpayOrderId'] == rid), None)), \
+         patch('payment_webhook.time.sleep'):
+        yield payment_webhook, store
+
+
+def seed(store, count, sellers=2):
+    for i in range(count):
+        store.projects[f'p{i}'] = {'projectId': f'p{i}', 'price': Decimal('100'), 'sellerId': f's{i % sellers}'}
+        store.collections[('buyer', f'cart#p{i}')] = {'userId': 'buyer', 'itemKey': f'cart#p{i}', 'value': f'p{i}'}
+    store.users['buyer'] = {'userId': 'buyer', 'cart': ['p0', 'other']}
+    store.orders['o1'] = {'orderId': 'o1', 'razorpayOrderId': 'order_1', 'userId': 'buyer',
+                          'status': 'PENDING', 'projectIds': [f'p{i}' for i in range(count)] + ['gone']}
+
+
+def purchases(store):
+    return [k for k in store.collections if k[1].startswith('purchase#')]
+
+
+class TestHandleSuccess:
+    def test_ten_item_cart_in_one_read_and_one_transaction(self, store):
+        """Should batch the project reads and commit every effect atomically"""
+        module, store = store
+        seed(store, 10)
+
+        result = module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})
+
+        assert result['statusCode'] == 200
+        assert (store.batch_gets, store.transactions) == (1, 1)
+        assert store.orders['o1']['status'] == 'SUCCESS'
+        assert store.orders['o1']['paymentId'] == 'pay_1'
+        assert len(purchases(store)) == 10
+        assert store.users['buyer']['totalPurchases'] == 10
+        assert store.users['buyer']['totalSpent'] == Decimal('1000')
+        assert [p['projectId'] for p in store.users['buyer']['purchases']] == [f'p{i}' for i in range(10)]
+        assert 'purchases' not in store.users['s0']
+        assert store.users['s0']['totalEarnings'] == Decimal('425')
+        assert len([k for k in store.earnings if k[1].startswith('entry#')]) == 10
+        day = store.orders['o1']['fulfilledAt'][:10]
+        assert store.earnings[('s0', f'day#{day}')] == {
+            'sellerId': 's0', 'entryKey': f'day#{day}', 'kind': 'day',
+            'gross': Decimal('500'), 'net': Decimal('425.00'), 'sales': 5
+        }
+        assert store.earnings[('s1', f'month#{day[:7]}')]['sales'] == 5
+        assert store.earnings[('s1', 'project#p3')]['net'] == Decimal('85.00')
+        assert store.projects['p3']['purchasesCount'] == 1
+        assert not [k for k in store.collections if k[1].startswith('cart#')]
+        assert store.users['buyer']['cart'] == ['other']
+
+    def test_redelivery_is_a_no_op(self, store):
+        module, store = store
+        seed(store, 10)
+        module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})
+
+        result = module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})
+
+        assert result['statusCode'] == 200
+        assert store.transactions == 1
+        assert store.users['buyer']['totalPurchases'] == 10
+        assert len(store.users['buyer']['purchases']) == 10
+
+    def test_failed_chunk_resumes_without_double_counting(self, store):
+        """A delivery failing mid-order leaves committed chunks marked; the retry finishes the rest"""
+        module, store = store
+        seed(store, 60)
+        real = store.transact_write_items
+        calls = []
+
+        def fail_second_chunk(TransactItems):
+            calls.append(1)
+            if len(calls) == 2:
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}},
+                                  'TransactWriteItems')
+            return real(TransactItems)
+        module.dynamodb.meta.client.transact_write_items = fail_second_chunk
+
+        assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 500
+        assert store.orders['o1']['status'] == 'PENDING'
+        assert store.orders['o1']['fulfilledChunks'] == {0}
+        assert store.orders['o1']['chunkSize'] == 12
+
+        assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 200
+        assert store.transactions == 6
+        assert store.orders['o1']['status'] == 'SUCCESS'
+        assert len(purchases(store)) == 60
+        assert store.users['buyer']['totalPurchases'] == 60
+        assert len(store.users['buyer']['purchases']) == 60
+        assert store.users['s1']['totalEarnings'] == Decimal('2550')
+        assert len([k for k in store.earnings if k[1].startswith('entry#')]) == 60
+        assert sum(v['sales'] for k, v in store.earnings.items() if k[1].startswith('day#')) == 60
+
+    def test_stale_order_read_does_not_reapply_a_chunk(self, store):
+        """Two deliveries racing on the same order: the marker rejects the second"""
+        module, store = store
+        seed(store, 5)
+        stale = dict(store.orders['o1'])
+        module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})
+
+        with patch.object(module, 'find_order_by_razorpay_order_id', return_value=stale):
+            assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 200
+        assert store.transactions == 1
+        assert store.users['buyer']['totalPurchases'] == 5
+
+    def test_purchases_recorded_before_transactions_are_not_counted_again(self, store):
+        module, store = store
+        seed(store, 3)
+        store.collections[('buyer', 'purchase#p1')] = {'userId': 'buyer', 'itemKey': 'purchase#p1', 'projectId': 'p1'}
+
+        assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 200
+        assert store.users['buyer']['totalPurchases'] == 2
+        assert [p['projectId'] for p in store.users['buyer']['purchases']] == ['p0', 'p2']
+        assert 'purchasesCount' not in store.projects['p1']
+        assert ('buyer', 'cart#p1') not in store.collections
+
+    def test_orders_resume_with_the_chunk_size_they_started_with(self, store):
+        """Chunk indexes committed before chunkSize was stored used chunks of 24"""
+        module, store = store
+        seed(store, 30)
+        store.orders['o1']['fulfilledChunks'] = {0}
+
+        assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 200
+        assert store.transactions == 1
+        assert sorted(k[1] for k in purchases(store)) == sorted(f'purchase#p{i}' for i in range(24, 30))
+        assert store.orders['o1']['status'] == 'SUCCESS'
+        assert store.orders['o1']['chunkSize'] == 24
+
+    def test_stale_read_never_mixes_chunk_sizes(self, store):
+        """A delivery that read the order before chunks of another size were committed is retried"""
+        module, store = store
+        seed(store, 30)
+        stale = dict(store.orders['o1'])
+        store.orders['o1'].update({'fulfilledChunks': {0}, 'chunkSize': 24})
+
+        with patch.object(module, 'find_order_by_razorpay_order_id', return_value=stale):
+            assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 500
+        assert store.transactions == 0
+
+        assert module.handle_success({'order_id': 'order_1', 'id': 'pay_1'})['statusCode'] == 200
+        assert len(purchases(store)) == 6
+        assert store.orders['o1']['status'] == 'SUCCESS'
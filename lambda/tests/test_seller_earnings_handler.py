@@ -0,0 +1,178 @@
+"""
+Test cases for Seller Earnings Handler Lambda Function
+Covers rollup-backed earnings series, project breakdowns, the ledger and its backfill
+"""
+
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.test_payment_webhook import MockStore
+from earnings_ledger import ledger_entry, ledger_actions
+
+SALES = [
+    ('s1', 'b1', 'p1', '100', '2026-09-15T10:00:00Z'),
+    ('s1', 'b2', 'p1', '100', '2026-10-01T09:00:00Z'),
+    ('s1', 'b3', 'p2', '300', '2026-10-01T18:30:00Z'),
+    ('s1', 'b4', 'p2', '300', '2026-10-03T08:00:00Z'),
+    ('s2', 'b1', 'p9', '999', '2026-10-02T12:00:00Z'),
+]
+
+
+class MockEarningsTable:
+    """Key-condition queries over MockStore.earnings; counts queries"""
+    name = 'SellerEarnings'
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = 0
+
+    def query(self, KeyConditionExpression, ScanIndexForward=True, Limit=None, ExclusiveStartKey=None):
+        self.queries += 1
+        seller_condition, range_condition = KeyConditionExpression.get_expression()['values']
+        seller_id = seller_condition.get_expression()['values'][1]
+        expression = range_condition.get_expression()
+        if expression['operator'] == 'BETWEEN':
+            _, low, high = expression['values']
+            in_range = lambda key: low <= key <= high
+        else:
+            prefix = expression['values'][1]
+            in_range = lambda key: key.startswith(prefix)
+        items = sorted((item for (sid, key), item in self.store.earnings.items() if sid == seller_id and in_range(key)),
+                       key=lambda item: item['entryKey'], reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            keys = [item['entryKey'] for item in items]
+            items = items[keys.index(ExclusiveStartKey['entryKey']) + 1:]
+        page = items[:Limit] if Limit else items
+        result = {'Items': [dict(item) for item in page]}
+        if Limit and len(items) > Limit:
+            result['LastEvaluatedKey'] = {'sellerId': seller_id, 'entryKey': items[Limit - 1]['entryKey']}
+        return result
+
+
+@pytest.fixture
+def earnings():
+    import seller_earnings_handler
+    store = MockStore()
+    for seller_id, buyer_id, project_id, price, sold_at in SALES:
+        entry = ledger_entry(seller_id, buyer_id, project_id, price, sold_at)
+        store.transact_write_items(
+            ledger_actions('SellerEarnings', seller_id, [entry], seller_earnings_handler.to_attribute_values)
+        )
+    table = MockEarningsTable(store)
+    resource = MagicMock()
+    resource.meta.client.transact_write_items = store.transact_write_items
+    projects_table = MagicMock()
+    projects_table.name = 'Projects'
+    with patch.object(seller_earnings_handler, 'earnings_table', table), \
+         patch.object(seller_earnings_handler, 'projects_table', projects_table), \
+         patch.object(seller_earnings_handler, 'dynamodb', resource):
+        yield seller_earnings_handler, store, table, resource
+
+
+def call(module, action, api=True, **body):
+    event = {'body': json.dumps({'action': action, **body})} if api else {'action': action, **body}
+    result = module.lambda_handler(event, None)
+    return result['statusCode'], json.loads(result['body'])
+
+
+class TestEarningsReads:
+    def test_daily_series_reads_one_item_per_day(self, earnings):
+        """Should zero-fill missing days and total the range from rollups only"""
+        module, store, table, _ = earnings
+        status, body = call(module, 'GET_EARNINGS_SERIES', sellerId='s1', granularity='day',
+                            **{'from': '2026-10-01', 'to': '2026-10-03'})
+
+        assert status == 200
+        series = body['data']['series']
+        assert [p['period'] for p in series] == ['2026-10-01', '2026-10-02', '2026-10-03']
+        assert [p['sales'] for p in series] == [2, 0, 1]
+        assert series[0]['net'] == 340.0
+        assert body['data']['totals'] == {'gross': 700.0, 'net': 595.0, 'sales': 3}
+        assert table.queries == 1
+
+    def test_monthly_series_and_project_breakdown(self, earnings):
+        module, _, _, _ = earnings
+        status, body = call(module, 'GET_EARNINGS_SERIES', sellerId='s1', granularity='month',
+                            **{'from': '2026-09', 'to': '2026-10'})
+        assert status == 200
+        assert [(p['period'], p['sales']) for p in body['data']['series']] == [('2026-09', 1), ('2026-10', 3)]
+
+        status, body = call(module, 'GET_PROJECT_EARNINGS', sellerId='s1')
+        assert [(p['projectId'], p['sales'], p['net']) for p in body['data']['projects']] == [
+            ('p2', 2, 510.0), ('p1', 2, 170.0)
+        ]
+
+        assert call(module, 'GET_EARNINGS_SERIES', sellerId='s1', granularity='day',
+                    **{'from': '2020-01-01', 'to': '2026-01-01'})[0] == 400
+
+    def test_ledger_is_newest_first_and_paginated(self, earnings):
+        module, _, _, _ = earnings
+        status, body = call(module, 'GET_EARNINGS_LEDGER', sellerId='s1', limit=3)
+        assert status == 200
+        assert [e['soldAt'][:10] for e in body['data']['entries']] == ['2026-10-03', '2026-10-01', '2026-10-01']
+
+        status, body = call(module, 'GET_EARNINGS_LEDGER', sellerId='s1', limit=3, cursor=body['data']['nextCursor'])
+        assert [e['buyerId'] for e in body['data']['entries']] == ['b1']
+        assert body['data']['nextCursor'] is None
+
+    def test_ledger_rejects_a_non_numeric_limit(self, earnings):
+        module, _, _, _ = earnings
+        status, body = call(module, 'GET_EARNINGS_LEDGER', sellerId='s1', limit='ten')
+        assert status == 400
+        assert body['error']['code'] == 'VALIDATION_ERROR'
+
+
+class TestEarningsBackfill:
+    def test_backfill_is_idempotent_and_direct_only(self, earnings):
+        """Purchases already in the ledger are skipped; rollups are not double counted"""
+        module, store, _, resource = earnings
+        purchases = [
+            {'userId': 'b1', 'itemKey': 'purchase#p1', 'kind': 'purchase', 'projectId': 'p1',
+             'priceAtPurchase': Decimal('100'), 'purchasedAt': '2026-09-15T10:00:00Z'},
+            {'userId': 'b7', 'itemKey': 'purchase#p1', 'kind': 'purchase', 'projectId': 'p1',
+             'priceAtPurchase': Decimal('80'), 'purchasedAt': '2026-08-20T10:00:00Z'},
+            {'userId': 'b8', 'itemKey': 'purchase#px', 'kind': 'purchase', 'projectId': 'px',
+             'priceAtPurchase': Decimal('50'), 'purchasedAt': '2026-08-21T10:00:00Z'},
+        ]
+        collections = MagicMock()
+        collections.scan.return_value = {'Items': purchases, 'ScannedCount': 5}
+        resource.batch_get_item.return_value = {'Responses': {'Projects': [{'projectId': 'p1', 'sellerId': 's1'}]}}
+
+        assert call(module, 'BACKFILL_EARNINGS_LEDGER', sellerId='s1')[0] == 400
+        with patch.object(module, 'collections_table', collections):
+            status, body = call(module, 'BACKFILL_EARNINGS_LEDGER', api=False)
+            assert (status, body['data']['done']) == (200, True)
+            assert {k: body['data'][k] for k in ('written', 'alreadyLedgered', 'skipped')} == \
+                {'written': 1, 'alreadyLedgered': 1, 'skipped': 1}
+
+            status, body = call(module, 'BACKFILL_EARNINGS_LEDGER', api=False)
+            assert body['data']['written'] == 0
+
+        assert store.earnings[('s1', 'month#2026-08')]['net'] == Decimal('68.00')
+        assert store.earnings[('s1', 'month#2026-09')]['sales'] == 1
+        assert store.earnings[('s1', 'project#p1')]['sales'] == 3
+
+    def test_unprocessed_project_keys_back_off_and_give_up(self, earnings):
+        """UnprocessedKeys are retried with backoff, then the lookup fails instead of spinning"""
+        module, _, _, resource = earnings
+        withheld = {'Projects': {'Keys': [{'projectId': 'p2'}], 'ProjectionExpression': 'projectId, sellerId'}}
+        resource.batch_get_item.side_effect = [
+            {'Responses': {'Projects': [{'projectId': 'p1', 'sellerId': 's1'}]}, 'UnprocessedKeys': withheld},
+            {'Responses': {'Projects': [{'projectId': 'p2', 'sellerId': 's2'}]}},
+        ]
+        with patch('seller_earnings_handler.time.sleep') as sleep:
+            assert module.project_sellers(['p1', 'p2']) == {'p1': 's1', 'p2': 's2'}
+            assert sleep.call_count == 1
+
+            resource.batch_get_item.side_effect = None
+            resource.batch_get_item.return_value = {'Responses': {}, 'UnprocessedKeys': withheld}
+            with pytest.raises(RuntimeError):
+                module.project_sellers(['p2'])
+            assert sleep.call_count == 1 + module.BATCH_GET_MAX_RETRIES
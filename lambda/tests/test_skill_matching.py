@@ -0,0 +1,91 @@
+"""
+Test cases for the shared skill matching helpers and FreelancerSkills sync
+"""
+
+import pytest
+from decimal import Decimal
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skill_matching import profile_skills, sync_freelancer_skills, skill_rarity, rate_fit
+
+
+class MockBatch:
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def put_item(self, Item):
+        self.table.items[(Item['skill'], Item['userId'])] = Item
+
+    def delete_item(self, Key):
+        self.table.items.pop((Key['skill'], Key['userId']), None)
+
+
+class MockSkillsTable:
+    def __init__(self):
+        self.items = {}
+
+    def batch_writer(self):
+        return MockBatch(self)
+
+
+@pytest.fixture
+def freelancer():
+    return {'userId': 'u1', 'isFreelancer': True, 'skills': ['React', ' Go '],
+            'hourlyRate': Decimal('40'), 'currency': 'USD'}
+
+
+@pytest.fixture
+def skills_table(freelancer):
+    table = MockSkillsTable()
+    sync_freelancer_skills(table, {}, freelancer)
+    return table
+
+
+class TestProfileSkills:
+    def test_only_active_freelancers_are_indexed(self, freelancer):
+        assert profile_skills(freelancer) == {'react', 'go'}
+        assert profile_skills({**freelancer, 'status': 'blocked'}) == set()
+        assert profile_skills({**freelancer, 'isFreelancer': False}) == set()
+        assert profile_skills({'role': 'seller', 'skills': 'Python, SQL'}) == {'python', 'sql'}
+        assert profile_skills(None) == set()
+
+
+class TestSyncFreelancerSkills:
+    def test_new_freelancer_gets_a_posting_per_skill(self, skills_table):
+        assert set(skills_table.items) == {('react', 'u1'), ('go', 'u1')}
+        assert skills_table.items[('go', 'u1')]['hourlyRate'] == Decimal('40')
+
+    def test_blocking_removes_every_posting(self, skills_table, freelancer):
+        sync_freelancer_skills(skills_table, freelancer, {**freelancer, 'status': 'blocked'})
+        assert skills_table.items == {}
+
+        sync_freelancer_skills(skills_table, {**freelancer, 'status': 'blocked'}, freelancer)
+        assert len(skills_table.items) == 2
+
+    def test_currency_change_rewrites_postings(self, skills_table, freelancer):
+        sync_freelancer_skills(skills_table, freelancer, {**freelancer, 'currency': 'INR'})
+        assert {p['currency'] for p in skills_table.items.values()} == {'INR'}
+
+
+class TestScoring:
+    def test_rarer_skills_weigh_more(self):
+        assert skill_rarity(1) > skill_rarity(10) > skill_rarity(1000)
+        assert skill_rarity(0) == skill_rarity(1)
+
+    def test_rate_fit_only_compares_hourly_projects_in_the_same_currency(self):
+        project = {'projectType': 'hourly', 'budgetMax': Decimal('40'), 'currency': 'USD'}
+        assert rate_fit(30, project, 'USD') == 1.0
+        assert rate_fit(50, project, 'USD') == 0.8
+        assert rate_fit(500, project, 'USD') == 0.5
+        assert rate_fit(500, project, 'INR') == 1.0
+        assert rate_fit(500, {**project, 'projectType': 'fixed'}, 'USD') == 1.0
@@ -0,0 +1,49 @@
+"""
+Test cases for the shared warm-container TTL cache
+"""
+
+import json
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    def test_get_many_reads_only_the_misses_and_skips_missing_keys(self):
+        cache = TTLCache('Test/Cache', ttl_seconds=60, max_entries=10)
+        batches = []
+
+        def fetch(keys):
+            batches.append(keys)
+            return {key: key.upper() for key in keys if key != 'gone'}
+
+        assert cache.get_many(['a', 'b', 'gone', 'a'], fetch) == {'a': 'A', 'b': 'B', 'gone': None}
+        assert cache.get_many(['b', 'c', 'gone'], fetch) == {'b': 'B', 'c': 'C', 'gone': None}
+        assert batches == [['a', 'b', 'gone'], ['c', 'gone']]
+        assert cache.get('a', lambda: 'stale') == 'A'
+        assert cache.stats['hits'] == 2 and cache.stats['misses'] == 5
+
+    def test_expiry_eviction_and_invalidation(self):
+        cache = TTLCache('Test/Cache', ttl_seconds=60, max_entries=2)
+        for key in ['a', 'b', 'c']:
+            cache.get(key, lambda: 1)
+        assert list(cache.entries) == ['b', 'c']
+        assert cache.stats['evictions'] == 1
+
+        assert cache.invalidate(lambda key: key == 'b') == 1
+        with patch('ttl_cache.time.monotonic', return_value=10 ** 9):
+            assert cache.get('c', lambda: 2) == 2
+
+    def test_metrics_use_the_cache_namespace(self, capsys):
+        cache = TTLCache('Test/Cache', ttl_seconds=60, max_entries=10)
+        cache.get('a', lambda: 1)
+        cache.emit_metrics()
+
+        record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        assert record['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'Test/Cache'
+        assert record['Misses'] == 1 and record['Entries'] == 1
@@ -0,0 +1,178 @@
+"""
+Test cases for the UserCollections child items and the online migration
+"""
+
+import pytest
+import json
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_collections import (
+    child_item, list_entries, has_entry, delete_entries,
+    get_integrations, put_integrations, migrate_user
+)
+
+
+class MockBatch:
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def put_item(self, Item):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key):
+        self.table.items.pop((Key['userId'], Key['itemKey']), None)
+
+
+class MockCollectionsTable:
+    def __init__(self):
+        self.items = {}
+
+    def batch_writer(self, **kwargs):
+        return MockBatch(self)
+
+    def put_item(self, Item, ConditionExpression=None):
+        key = (Item['userId'], Item['itemKey'])
+        if ConditionExpression and key in self.items:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'exists'}}, 'PutItem')
+        self.items[key] = dict(Item)
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get((Key['userId'], Key['itemKey']))
+        return {'Item': dict(item)} if item else {}
+
+    def query(self, KeyConditionExpression, **kwargs):
+        user_condition, key_condition = KeyConditionExpression.get_expression()['values']
+        user_id = user_condition.get_expression()['values'][1]
+        prefix = key_condition.get_expression()['values'][1]
+        return {'Items': [dict(item) for (uid, key), item in sorted(self.items.items())
+                          if uid == user_id and key.startswith(prefix)]}
+
+
+class MockUsersTable:
+    def __init__(self, users):
+        self.users = users
+        self.updates = []
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+        user = self.users[Key['userId']]
+        for name, field in ExpressionAttributeNames.items():
+            if user.get(field) != ExpressionAttributeValues[':' + name[1:]]:
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'changed'}}, 'UpdateItem')
+        for field in ExpressionAttributeNames.values():
+            user.pop(field, None)
+        self.updates.append(Key['userId'])
+
+
+@pytest.fixture
+def collections():
+    return MockCollectionsTable()
+
+
+class TestUserCollections:
+    def test_entries_round_trip_and_merge_legacy(self, collections):
+        """Child items come back in the legacy shape; unmigrated legacy entries are merged in"""
+        collections.put_item(Item=child_item('u1', 'wishlist', 'p1'))
+        collections.put_item(Item=child_item('u1', 'purchase', {'projectId': 'p2', 'priceAtPurchase': 10}))
+
+        assert list_entries(collections, 'u1', 'wishlist', legacy=['p1', 'p3']) == ['p1', 'p3']
+        assert list_entries(collections, 'u1', 'purchase') == [{'projectId': 'p2', 'priceAtPurchase': 10}]
+        assert has_entry(collections, 'u1', 'purchase', 'p2')
+        assert has_entry(collections, 'u1', 'course', 'c1', legacy=[{'courseId': 'c1'}])
+        assert not has_entry(collections, 'u1', 'course', 'c1')
+
+        delete_entries(collections, 'u1', 'wishlist', ['p1'])
+        assert list_entries(collections, 'u1', 'wishlist') == []
+
+    def test_integrations_put_and_disconnect(self, collections):
+        put_integrations(collections, 'u1', {'githubData': {'username': 'ada'}, 'driveData': {'folder': 'x'}}, 'now')
+        put_integrations(collections, 'u1', {'driveData': None}, 'later')
+        assert get_integrations(collections, 'u1') == {'githubData': {'username': 'ada'}}
+
+    def test_migration_keeps_arrays_still_read_from_the_user_row(self, collections):
+        """By default only integration blobs leave the row; dual-written arrays are copied"""
+        user = {
+            'userId': 'u1',
+            'cart': ['p1'],
+            'wishlist': ['p2'],
+            'purchases': [{'projectId': 'p4'}],
+            'purchasedCourses': ['c1'],
+            'githubData': {'username': 'ada'}
+        }
+        users = MockUsersTable({'u1': dict(user)})
+
+        assert migrate_user(users, collections, user, 'now') == 'migrated'
+        assert users.users['u1'] == {k: v for k, v in user.items() if k != 'githubData'}
+        assert list_entries(collections, 'u1', 'purchase') == [{'projectId': 'p4'}]
+        assert list_entries(collections, 'u1', 'course') == ['c1']
+        assert list_entries(collections, 'u1', 'cart') == []
+        assert list_entries(collections, 'u1', 'wishlist') == []
+
+        assert migrate_user(users, collections, {'userId': 'u2', 'cart': ['p1']}, 'now') == 'skipped'
+
+    def test_migration_moves_arrays_off_the_user_row(self, collections):
+        """Legacy arrays become child items and the Users row keeps only the profile"""
+        user = {
+            'userId': 'u1', 'fullName': 'Ada',
+            'cart': [{'projectId': 'p1', 'addedAt': 't'}, 'p2'],
+            'wishlist': ['p3'],
+            'purchases': [{'projectId': 'p4', 'priceAtPurchase': 5}],
+            'purchasedCourses': ['c1', {'courseId': 'c2'}],
+            'githubData': {'username': 'ada'}
+        }
+        users = MockUsersTable({'u1': dict(user)})
+
+        assert migrate_user(users, collections, user, 'now', remove_arrays=True) == 'migrated'
+        assert users.users['u1'] == {'userId': 'u1', 'fullName': 'Ada'}
+        assert list_entries(collections, 'u1', 'cart') == [{'projectId': 'p1', 'addedAt': 't'}, 'p2']
+        assert list_entries(collections, 'u1', 'course') == ['c1', {'courseId': 'c2'}]
+        assert get_integrations(collections, 'u1') == {'githubData': {'username': 'ada'}}
+
+        assert migrate_user(users, collections, users.users['u1'], 'now', remove_arrays=True) == 'skipped'
+
+    def test_migration_leaves_rows_changed_meanwhile(self, collections):
+        """A write landing between read and migrate keeps the row for the next pass"""
+        snapshot = {'userId': 'u1', 'cart': ['p1']}
+        users = MockUsersTable({'u1': {'userId': 'u1', 'cart': ['p1', 'p2']}})
+
+        assert migrate_user(users, collections, snapshot, 'now', remove_arrays=True) == 'conflict'
+        assert users.users['u1']['cart'] == ['p1', 'p2']
+
+        assert migrate_user(users, collections, dict(users.users['u1']), 'now', remove_arrays=True) == 'migrated'
+        assert list_entries(collections, 'u1', 'cart') == ['p1', 'p2']
+
+    def test_migration_keeps_newer_integration_blob(self, collections):
+        put_integrations(collections, 'u1', {'githubData': {'username': 'new'}}, 'later')
+        user = {'userId': 'u1', 'githubData': {'username': 'old'}}
+        users = MockUsersTable({'u1': dict(user)})
+
+        assert migrate_user(users, collections, user, 'now') == 'migrated'
+        assert get_integrations(collections, 'u1') == {'githubData': {'username': 'new'}}
+
+
+class TestMigrateUserCollectionsAction:
+    def test_migration_is_direct_invocation_only(self, collections):
+        import update_userdetails_in_settings as handler
+        users = MockUsersTable({'u1': {'userId': 'u1', 'cart': ['p1'], 'githubData': {'username': 'ada'}}})
+        users.scan = MagicMock(return_value={'Items': [dict(users.users['u1'])], 'ScannedCount': 1})
+
+        with patch.object(handler, 'table', users), patch.object(handler, 'collections_table', collections):
+            public = handler.lambda_handler({'body': json.dumps({'action': 'migrateUserCollections'})}, None)
+            assert public['statusCode'] == 400
+            assert not users.scan.called
+
+            direct = handler.lambda_handler({'action': 'migrateUserCollections'}, None)
+        assert direct['statusCode'] == 200
+        assert json.loads(direct['body'])['data']['migrated'] == 1
+        assert users.users['u1'] == {'userId': 'u1', 'cart': ['p1']}
@@ -0,0 +1,107 @@
+"""
+Test cases for the warm-container Users profile cache
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_profile_cache import UserProfileCache
+
+
+class MockUsersTable:
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None):
+        self.calls.append(ProjectionExpression)
+        item = self.items.get(Key['userId'])
+        if item is None:
+            return {}
+        if ExpressionAttributeNames:
+            item = {k: v for k, v in item.items() if k in ExpressionAttributeNames.values()}
+        return {'Item': dict(item)}
+
+
+@pytest.fixture
+def table():
+    return MockUsersTable({
+        'u1': {'userId': 'u1', 'fullName': 'Ada', 'cart': ['p1'], 'llmApiKeys': {'openai': 'sk-1'}},
+        'u2': {'userId': 'u2', 'fullName': 'Grace'}
+    })
+
+
+class TestUserProfileCache:
+    def test_read_through_with_projection_entries(self, table):
+        """Each projection is fetched once; a full item also answers projected reads"""
+        cache = UserProfileCache()
+        assert cache.get(table, 'u1', ('userId', 'llmApiKeys')) == {'userId': 'u1', 'llmApiKeys': {'openai': 'sk-1'}}
+        assert cache.get(table, 'u1', ('llmApiKeys', 'userId'))['llmApiKeys'] == {'openai': 'sk-1'}
+        assert len(table.calls) == 1
+
+        assert cache.get(table, 'u2')['fullName'] == 'Grace'
+        assert cache.get(table, 'u2', ('fullName',)) == {'fullName': 'Grace'}
+        assert len(table.calls) == 2
+        assert cache.stats['hits'] == 2 and cache.stats['misses'] == 2
+
+    def test_missing_users_are_not_cached(self, table):
+        cache = UserProfileCache()
+        assert cache.get(table, 'nobody') is None
+        table.items['nobody'] = {'userId': 'nobody'}
+        assert cache.get(table, 'nobody') == {'userId': 'nobody'}
+
+    def test_invalidate_and_ttl(self, table):
+        """Writes invalidate every projection of the user; entries also expire"""
+        cache = UserProfileCache(ttl_seconds=60)
+        cache.get(table, 'u1', ('fullName',))
+        cache.get(table, 'u1', ('cart',))
+        table.items['u1']['cart'] = []
+
+        cache.invalidate('u1')
+        assert cache.get(table, 'u1', ('cart',)) == {'cart': []}
+        assert cache.stats['invalidations'] == 2
+
+        with patch('ttl_cache.time.monotonic', return_value=10 ** 9):
+            table.items['u1']['cart'] = ['p2']
+            assert cache.get(table, 'u1', ('cart',)) == {'cart': ['p2']}
+
+    def test_get_many_fetches_only_the_misses_in_one_call(self, table):
+        cache = UserProfileCache()
+        cache.get(table, 'u1')
+        batches = []
+
+        def fetch(user_ids):
+            batches.append(user_ids)
+            return {uid: table.items[uid] for uid in user_ids if uid in table.items}
+
+        profiles = cache.get_many(table, ['u1', 'u2', 'nobody', 'u2'], ('fullName',), fetch=fetch)
+
+        assert profiles == {'u1': {'fullName': 'Ada'}, 'u2': table.items['u2'], 'nobody': None}
+        assert batches == [['u2', 'nobody']]
+        assert cache.get_many(table, ['u2'], ('fullName',), fetch=fetch)['u2']['fullName'] == 'Grace'
+        assert len(batches) == 1
+
+    def test_bounded_size(self, table):
+        cache = UserProfileCache(max_entries=2)
+        for projection in [('userId',), ('cart',), ('fullName',)]:
+            cache.get(table, 'u1', projection)
+        assert len(cache.entries) == 2
+        assert cache.stats['evictions'] == 1
+
+    def test_metrics_are_emitted_as_emf(self, table, capsys):
+        cache = UserProfileCache()
+        cache.get(table, 'u1')
+        cache.get(table, 'u1')
+        counts = cache.emit_metrics()
+
+        record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        assert counts['hits'] == 1 and counts['misses'] == 1
+        assert record['Hits'] == 1 and record['Misses'] == 1 and record['Entries'] == 1
+        assert record['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'ProjectBazaar/UserProfileCache'
+        assert cache.stats['hits'] == 0
@@ -0,0 +1,279 @@
+"""
+Test cases for User Question Progress Handler Lambda Function
+Covers the question catalog cache, the daily activity bitmap and submission code lookup
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class MockMetaTable:
+    """CodingQuestionsMeta with the version stamp kept in memory"""
+    def __init__(self):
+        self.version = 1
+        self.reads = 0
+
+    def get_item(self, Key):
+        self.reads += 1
+        return {'Item': {'metaKey': 'catalog', 'version': self.version}}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
+        assert UpdateExpression.startswith('ADD version :one')
+        self.version += ExpressionAttributeValues[':one']
+
+
+@pytest.fixture
+def catalog():
+    import user_question_progress_handler as module
+    meta = MockMetaTable()
+    questions = MagicMock()
+    questions.scan.return_value = {'Items': [
+        {'questionId': 'q1', 'difficulty': 'Easy', 'topic': 'Arrays', 'status': 'published'},
+        {'questionId': 'q2', 'difficulty': 'Hard', 'topic': 'Graphs', 'status': 'published'},
+        {'questionId': 'q3', 'difficulty': 'Hard', 'topic': 'Graphs', 'status': 'draft'},
+    ]}
+    with patch.object(module, 'catalog_meta_table', meta), \
+         patch.object(module, 'questions_table', questions), \
+         patch.multiple(module, _question_catalog={}, _catalog_totals={'byDifficulty': {}, 'byTopic': {}},
+                        _catalog_version=None, _catalog_checked_at=0.0):
+        yield module, meta, questions
+
+
+def expire_check(module):
+    module._catalog_checked_at -= module.CATALOG_CHECK_INTERVAL_SECONDS
+
+
+class TestQuestionCatalogCache:
+    def test_warm_hit_skips_meta_and_scan(self, catalog):
+        """Within the check interval the cached catalog answers without any reads"""
+        module, meta, questions = catalog
+        module.get_question_catalog()
+        module.get_question_catalog()
+
+        assert (meta.reads, questions.scan.call_count) == (1, 1)
+        by_difficulty, by_topic = module.build_breakdowns([
+            {'questionId': 'q1', 'status': 'solved'}, {'questionId': 'q2', 'status': 'attempted'},
+            {'questionId': 'unknown', 'status': 'solved'}
+        ])
+        assert by_difficulty['Easy'] == {'solved': 1, 'attempted': 0, 'total': 1}
+        assert by_difficulty['Hard'] == {'solved': 0, 'attempted': 1, 'total': 1}
+        assert by_topic['Graphs']['total'] == 1
+
+    def test_unchanged_version_does_not_rescan(self, catalog):
+        module, meta, questions = catalog
+        module.get_question_catalog()
+        expire_check(module)
+
+        module.get_question_catalog()
+
+        assert (meta.reads, questions.scan.call_count) == (2, 1)
+
+    def test_question_write_bumps_version_and_reloads_catalog(self, catalog):
+        """A write in the questions Lambda makes warm progress containers reload"""
+        import coding_questions_handler
+        module, meta, questions = catalog
+        module.get_question_catalog()
+
+        with patch.object(coding_questions_handler, 'questions_table', MagicMock()), \
+             patch.object(coding_questions_handler, 'catalog_meta_table', meta):
+            result = coding_questions_handler.create_question({'title': 'New', 'description': 'd', 'difficulty': 'Easy'})
+        assert result['statusCode'] == 201
+        assert meta.version == 2
+
+        questions.scan.return_value = {'Items': questions.scan.return_value['Items'] + [
+            {'questionId': 'q4', 'difficulty': 'Easy', 'topic': 'Arrays', 'status': 'published'}
+        ]}
+        assert 'q4' not in module.get_question_catalog()
+        expire_check(module)
+
+        assert 'q4' in module.get_question_catalog()
+        assert questions.scan.call_count == 2
+        assert module._catalog_totals['byDifficulty']['Easy'] == 2
+
+    def test_meta_read_failure_keeps_serving_the_cached_catalog(self, catalog):
+        module, meta, questions = catalog
+        module.get_question_catalog()
+        expire_check(module)
+        meta.get_item = MagicMock(side_effect=Exception('throttled'))
+
+        assert set(module.get_question_catalog()) == {'q1', 'q2', 'q3'}
+        assert questions.scan.call_count == 1
+
+
+class MockActivityTable:
+    """UserCodingActivity honouring the version condition on put_item"""
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, Key):
+        item = self.items.get(Key['userId'])
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression, ExpressionAttributeValues):
+        current = self.items.get(Item['userId'])
+        if current and current['version'] != ExpressionAttributeValues[':v']:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'stale'}}, 'PutItem')
+        self.items[Item['userId']] = dict(Item)
+
+
+def day_ago(days):
+    return (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%dT10:00:00Z')
+
+
+@pytest.fixture
+def activity():
+    import user_question_progress_handler as module
+    table = MockActivityTable()
+    progress = MagicMock()
+    # Solved on five consecutive days ending yesterday, plus one a month ago
+    progress.query.return_value = {'Items': [
+        {'userId': 'u1', 'questionId': f'q{i}', 'status': 'solved', 'solvedAt': day_ago(i)} for i in (1, 2, 3, 4, 5, 30)
+    ] + [{'userId': 'u1', 'questionId': 'qa', 'status': 'attempted'}]}
+    progress.scan.return_value = progress.query.return_value
+    with patch.object(module, 'activity_table', table), patch.object(module, 'progress_table', progress):
+        yield module, table, progress
+
+
+def activity_data(module, **body):
+    event = {'httpMethod': 'POST', 'body': json.dumps({'action': 'get_activity', 'userId': 'u1', **body})}
+    result = module.lambda_handler(event, None)
+    return result['statusCode'], json.loads(result['body'])
+
+
+class TestActivityBitmap:
+    def test_first_solve_after_deploy_keeps_existing_streaks(self, activity):
+        """The bitmap created by the first solve is seeded from solvedAt history"""
+        module, table, progress = activity
+        module.record_activity_day('u1', day_ago(0))
+
+        status, body = activity_data(module)
+
+        assert status == 200
+        assert body['data']['currentStreak'] == 6
+        assert body['data']['longestStreak'] == 6
+        assert len(body['data']['activeDays']) == 7
+        assert progress.query.call_count == 1
+
+        module.record_activity_day('u1', day_ago(0))
+        assert progress.query.call_count == 1
+
+    def test_read_without_bitmap_derives_and_persists_history(self, activity):
+        module, table, progress = activity
+        status, body = activity_data(module, days=10)
+
+        assert body['data']['longestStreak'] == 5
+        assert len(body['data']['activeDays']) == 5
+        assert 'u1' in table.items
+
+    def test_bad_days_is_a_validation_error(self, activity):
+        module, _, _ = activity
+        assert activity_data(module, days='lots')[0] == 400
+        assert activity_data(module, days=-3)[0] == 400
+
+    def test_full_backfill_is_direct_invocation_only(self, activity):
+        module, table, progress = activity
+        result = module.lambda_handler({'httpMethod': 'POST', 'body': json.dumps({'action': 'backfill_activity'})}, None)
+        assert result['statusCode'] == 400
+        progress.scan.assert_not_called()
+
+        result = module.lambda_handler({'action': 'backfill_activity'}, None)
+        assert result['statusCode'] == 200
+        assert json.loads(result['body'])['data'] == {'usersScanned': 1, 'usersWritten': 1}
+        assert progress.scan.call_count == 1
+
+
+class MockProgressTable:
+    """UserQuestionProgress items keyed by (userId, questionId)"""
+    def __init__(self):
+        self.items = {}
+        self.queries = 0
+
+    def get_item(self, Key, ProjectionExpression=None):
+        item = self.items.get((Key['userId'], Key['questionId']))
+        return {'Item': dict(item)} if item else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
+        item = self.items.setdefault((Key['userId'], Key['questionId']), dict(Key))
+        item['submissions'] = ExpressionAttributeValues[':subs']
+
+    def query(self, KeyConditionExpression, ProjectionExpression=None, **kwargs):
+        self.queries += 1
+        user_id = KeyConditionExpression.get_expression()['values'][1]
+        return {'Items': [dict(v) for (uid, _), v in self.items.items() if uid == user_id]}
+
+
+class MockCodeTable:
+    def __init__(self):
+        self.items = {}
+        self.puts = 0
+
+    def put_item(self, Item, ConditionExpression):
+        self.puts += 1
+        self.items.setdefault(Item['codeHash'], Item)
+
+    def get_item(self, Key):
+        item = self.items.get(Key['codeHash'])
+        return {'Item': item} if item else {}
+
+
+@pytest.fixture
+def submissions():
+    """No UserSubmissions table: every submission lands on the progress item"""
+    import user_question_progress_handler as module
+    missing = ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': 'no table'}}, 'PutItem')
+    submissions_table = MagicMock()
+    submissions_table.put_item.side_effect = missing
+    submissions_table.get_item.side_effect = missing
+    submissions_table.query.side_effect = missing
+    progress, code = MockProgressTable(), MockCodeTable()
+    with patch.object(module, 'submissions_table', submissions_table), \
+         patch.object(module, 'progress_table', progress), \
+         patch.object(module, 'submission_code_table', code), \
+         patch.object(module, '_stored_code_hashes', set()), \
+         patch.object(module, 'update_question_status'):
+        yield module, progress, code
+
+
+def submit(module, code, question_id='q1'):
+    result = module.record_submission('u1', question_id, {'code': code, 'language': 'python', 'passed': True})
+    assert result['statusCode'] == 201
+    return json.loads(result['body'])['data']['submissionId']
+
+
+def fetch_code(module, submission_id, user_id='u1', question_id=None):
+    result = module.get_submission_code(user_id, submission_id, question_id)
+    return result['statusCode'], json.loads(result['body'])
+
+
+class TestSubmissionCodeFallback:
+    def test_code_is_recoverable_without_user_submissions_table(self, submissions):
+        module, progress, code = submissions
+        first = submit(module, 'print(1)')
+        submit(module, 'print(1)', question_id='q2')
+
+        assert code.puts == 1
+        listed = json.loads(module.get_submissions('u1', 'q1')['body'])['data']['submissions']
+        assert [s['submissionId'] for s in listed] == [first]
+        assert 'code' not in listed[0]
+
+        assert fetch_code(module, first, question_id='q1')[1]['data']['code'] == 'print(1)'
+        assert progress.queries == 0
+        assert fetch_code(module, first)[1]['data']['code'] == 'print(1)'
+        assert fetch_code(module, first, user_id='u2')[0] == 404
+
+    def test_inline_code_is_kept_when_hash_storage_fails(self, submissions):
+        module, progress, code = submissions
+        code.put_item = MagicMock(side_effect=Exception('throttled'))
+        submission_id = submit(module, 'print(2)')
+
+        listed = json.loads(module.get_submissions('u1', 'q1')['body'])['data']['submissions']
+        assert 'code' not in listed[0] and listed[0]['codeHash'] is None
+        assert fetch_code(module, submission_id, question_id='q1')[1]['data']['code'] == 'print(2)'
@@ -0,0 +1,267 @@
+"""
+Test cases for acknowledge-fast payment webhooks
+Covers enqueue-and-ack, the queue worker (batching, per-order idempotency,
+dead-lettering) and a burst harness for acknowledgement latency
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+import pytest
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('RAZORPAY_WEBHOOK_SECRET', 'test-secret')
+
+from tests.test_payment_webhook import MockStore
+
+QUEUE_URL = 'https://sqs.local/webhooks'
+DLQ_URL = 'https://sqs.local/webhooks-dlq'
+
+
+class LocalSQS:
+    """
+    SQS stand-in: a main queue and a DLQ by URL. run_worker() delivers batches
+    like the Lambda event source mapping - failed items become visible again and
+    are redriven to the DLQ after max_receives.
+    """
+    def __init__(self, send_latency=0.0, max_receives=3):
+        self.queues = {QUEUE_URL: deque(), DLQ_URL: deque()}
+        self.send_latency = send_latency
+        self.max_receives = max_receives
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None):
+        time.sleep(self.send_latency)
+        with self.lock:
+            self.sent += 1
+            message_id = f'm{self.sent}'
+            self.queues[QueueUrl].append({'messageId': message_id, 'body': MessageBody, 'receives': 0,
+                                          'attributes': MessageAttributes or {}})
+        return {'MessageId': message_id}
+
+    def run_worker(self, handler, batch_size=10):
+        queue = self.queues[QUEUE_URL]
+        batches = 0
+        while queue:
+            batch = [queue.popleft() for _ in range(min(batch_size, len(queue)))]
+            for message in batch:
+                message['receives'] += 1
+            result = handler({'Records': [
+                {'messageId': m['messageId'], 'body': m['body'], 'eventSource': 'aws:sqs'} for m in batch
+            ]}, None)
+            failed = {f['itemIdentifier'] for f in result['batchItemFailures']}
+            for message in batch:
+                if message['messageId'] in failed:
+                    target = DLQ_URL if message['receives'] >= self.max_receives else QUEUE_URL
+                    self.queues[target].append(message)
+            batches += 1
+        return batches
+
+
+@pytest.fixture
+def webhook():
+    """payment_webhook over MockStore tables with the queue pointed at a LocalSQS"""
+    import payment_webhook
+    import webhook_queue
+    store = MockStore()
+    resource = MagicMock()
+    resource.batch_get_item = store.batch_get_item
+    resource.meta.client.transact_write_items = lambda TransactItems: store.transact_write_items(TransactItems)
+    tables = {}
+    for attr, name in (('orders_table', 'Orders'), ('users_table', 'Users'),
+                       ('projects_table', 'Projects'), ('collections_table', 'UserCollections'),
+                       ('earnings_table', 'SellerEarnings')):
+        tables[attr] = MagicMock()
+        tables[attr].name = name
+    tables['users_table'].get_item.return_value = {}
+    by_razorpay_id = {}
+
+    def find(razorpay_order_id):
+        order_id = by_razorpay_id.get(razorpay_order_id)
+        return dict(store.orders[order_id]) if order_id else None
+
+    sqs = LocalSQS()
+    with patch.object(payment_webhook, 'dynamodb', resource), \
+         patch.multiple(payment_webhook, **tables), \
+         patch.object(payment_webhook, 'find_order_by_razorpay_order_id', find), \
+         patch.object(webhook_queue, 'WEBHOOK_QUEUE_URL', QUEUE_URL), \
+         patch.object(webhook_queue, 'WEBHOOK_DLQ_URL', DLQ_URL), \
+         patch.object(webhook_queue, '_sqs', sqs):
+        yield payment_webhook, store, sqs, by_razorpay_id
+
+
+def seed_orders(store, by_razorpay_id, count):
+    for i in range(count):
+        store.projects[f'p{i}'] = {'projectId': f'p{i}', 'price': Decimal('100'), 'sellerId': f's{i % 5}'}
+        store.orders[f'o{i}'] = {'orderId': f'o{i}', 'razorpayOrderId': f'order_{i}', 'userId': f'b{i % 50}',
+                                 'status': 'PENDING', 'projectIds': [f'p{i}']}
+        by_razorpay_id[f'order_{i}'] = f'o{i}'
+
+
+def signed_event(module, razorpay_order_id, event_type='payment.captured'):
+    payload = json.dumps({'event': event_type, 'payload': {'payment': {'entity': {
+        'id': f'pay_{razorpay_order_id}', 'order_id': razorpay_order_id
+    }}}})
+    signature = hmac.new(module.WEBHOOK_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+    return {'body': payload, 'headers': {'x-razorpay-signature': signature}}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class TestWebhookQueue:
+    def test_ack_queues_without_touching_dynamodb(self, webhook):
+        module, store, sqs, by_razorpay_id = webhook
+        seed_orders(store, by_razorpay_id, 1)
+
+        result = module.lambda_handler(signed_event(module, 'order_0'), None)
+
+        assert result['statusCode'] == 200
+        assert json.loads(result['body'])['messageId'] == 'm1'
+        assert (store.batch_gets, store.transactions) == (0, 0)
+        assert len(sqs.queues[QUEUE_URL]) == 1
+
+        bad = signed_event(module, 'order_0')
+        bad['headers']['x-razorpay-signature'] = 'forged'
+        assert module.lambda_handler(bad, None)['statusCode'] == 400
+        assert len(sqs.queues[QUEUE_URL]) == 1
+
+    def test_worker_is_idempotent_per_order_and_dead_letters(self, webhook):
+        """Duplicates apply once; transient failures retry; permanent ones go to the DLQ"""
+        module, store, sqs, by_razorpay_id = webhook
+        seed_orders(store, by_razorpay_id, 3)
+        for razorpay_order_id in ('order_0', 'order_0', 'order_1', 'order_missing', 'order_2', 'order_0'):
+            module.lambda_handler(signed_event(module, razorpay_order_id), None)
+        sqs.send_message(QueueUrl=QUEUE_URL, MessageBody='not json')
+
+        real = store.transact_write_items
+        throttled = []
+
+        def throttle_order_1(TransactItems):
+            if 'o1' in json.dumps(TransactItems) and not throttled:
+                throttled.append(1)
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}},
+                                  'TransactWriteItems')
+            return real(TransactItems)
+        store.transact_write_items = throttle_order_1
+
+        sqs.run_worker(module.lambda_handler, batch_size=4)
+
+        assert all(store.orders[f'o{i}']['status'] == 'SUCCESS' for i in range(3))
+        assert store.transactions == 3
+        assert store.users['b0']['totalPurchases'] == 1
+        assert throttled == [1]
+        assert len(sqs.queues[QUEUE_URL]) == 0
+        dead = sorted(m['body'] if m['body'] == 'not json' else json.loads(m['body'])['orderKey']
+                      for m in sqs.queues[DLQ_URL])
+        assert dead == ['not json', 'order_missing']
+
+    def test_missing_order_and_lookup_errors_are_retried(self, webhook):
+        """A 404 or a failing lookup is retried, so an order that shows up later is fulfilled"""
+        module, store, sqs, by_razorpay_id = webhook
+        seed_orders(store, by_razorpay_id, 2)
+        lagging = by_razorpay_id.pop('order_0')
+        module.lambda_handler(signed_event(module, 'order_0'), None)
+        module.lambda_handler(signed_event(module, 'order_1'), None)
+
+        find = module.find_order_by_razorpay_order_id
+        calls = []
+
+        def flaky_find(razorpay_order_id):
+            calls.append(razorpay_order_id)
+            if razorpay_order_id == 'order_0' and calls.count('order_0') == 2:
+                by_razorpay_id['order_0'] = lagging
+            if razorpay_order_id == 'order_1' and calls.count('order_1') == 1:
+                raise ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'boom'}}, 'Query')
+            return find(razorpay_order_id)
+
+        with patch.object(module, 'find_order_by_razorpay_order_id', flaky_find):
+            sqs.run_worker(module.lambda_handler)
+
+        assert store.orders['o0']['status'] == 'SUCCESS'
+        assert store.orders['o1']['status'] == 'SUCCESS'
+        assert len(sqs.queues[DLQ_URL]) == 0
+
+
+# Wall-clock assertions only hold on an idle machine; the default run checks
+# acknowledgement and fulfilment on a small burst and leaves latency to RUN_BENCHMARKS=1
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS') == '1'
+
+
+class TestWebhookBurst:
+    """
+    Acknowledgement latency for a burst of signed webhooks, against slow DynamoDB.
+    Latency is only asserted with RUN_BENCHMARKS=1. Tune with WEBHOOK_BENCH_EVENTS,
+    WEBHOOK_BENCH_CONCURRENCY and WEBHOOK_BENCH_DB_LATENCY_MS; run with -s to see the report.
+    """
+
+    def test_p99_ack_latency_stays_flat_under_a_burst(self, webhook):
+        module, store, sqs, by_razorpay_id = webhook
+        events = int(os.environ.get('WEBHOOK_BENCH_EVENTS', 1000 if RUN_BENCHMARKS else 100))
+        concurrency = int(os.environ.get('WEBHOOK_BENCH_CONCURRENCY', 32 if RUN_BENCHMARKS else 8))
+        db_latency = float(os.environ.get('WEBHOOK_BENCH_DB_LATENCY_MS', 50 if RUN_BENCHMARKS else 5)) / 1000
+        seed_orders(store, by_razorpay_id, events)
+        sqs.send_latency = 0.002
+
+        real = store.transact_write_items
+
+        def slow_transaction(TransactItems):
+            time.sleep(db_latency)
+            return real(TransactItems)
+
+        def deliver(i):
+            started = time.perf_counter()
+            result = module.lambda_handler(signed_event(module, f'order_{i}'), None)
+            assert result['statusCode'] == 200
+            return time.perf_counter() - started
+
+        # Inline baseline: the webhook waits for fulfilment against slow DynamoDB
+        with patch('webhook_queue.WEBHOOK_QUEUE_URL', ''), \
+             patch.object(store, 'transact_write_items', slow_transaction):
+            inline = [deliver(i) for i in range(events - 20, events)]
+        for i in range(events - 20, events):
+            store.orders[f'o{i}']['status'] = 'PENDING'
+            store.orders[f'o{i}'].pop('fulfilledChunks', None)
+            for key in [k for k in store.collections if k[1] == f'purchase#p{i}']:
+                del store.collections[key]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(deliver, range(events)))
+        acked = time.perf_counter() - started
+        deciles = [percentile(latencies[i:i + events // 10], 0.99) for i in range(0, events, events // 10)]
+
+        worker_started = time.perf_counter()
+        batches = sqs.run_worker(module.lambda_handler)
+        report = {
+            'events': events,
+            'concurrency': concurrency,
+            'ack_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'ack_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'ack_p99_by_decile_ms': [round(d * 1000, 2) for d in deciles],
+            'inline_p50_ms': round(percentile(inline, 0.50) * 1000, 2),
+            'acked_s': round(acked, 3),
+            'worker_batches': batches,
+            'worker_s': round(time.perf_counter() - worker_started, 3)
+        }
+        print(f"\nwebhook burst: {json.dumps(report)}")
+
+        if RUN_BENCHMARKS:
+            # Flat: no slice of the burst gets anywhere near the cost of fulfilling inline
+            assert max(deciles) < percentile(inline, 0.50)
+        assert batches == events // 10
+        assert sum(o['status'] == 'SUCCESS' for o in store.orders.values()) == events
+        assert not sqs.queues[DLQ_URL]
@@ -0,0 +1,147 @@
+"""
+Warm-container read-through TTL cache.
+
+Package this file with any handler that imports it, directly or through
+user_profile_cache (as portfolio_templates is packaged with generate_portfolio).
+Each warm Lambda container keeps its own entries for ttl_seconds and at most
+max_entries of them (expired entries are dropped first, then the oldest
+inserted). Missing items (fetch returns None) are not cached. Call
+invalidate() after writing an item in the same function - other functions'
+containers catch up within the TTL.
+
+Hits, misses, evictions and invalidations are emitted at most once per
+CACHE_METRICS_INTERVAL_SECONDS as CloudWatch Embedded Metric Format log lines
+(the cache's namespace, dimension FunctionName).
+"""
+
+import os
+import json
+import time
+import threading
+
+CACHE_METRICS_INTERVAL_SECONDS = 60
+
+
+class TTLCache:
+    def __init__(self, namespace, ttl_seconds, max_entries):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self.last_emit = time.monotonic()
+
+    def get(self, key, fetch):
+        """The value for key, read with fetch() on a miss; None when it does not exist"""
+        return self._read_many([key], lambda keys: {key: fetch()})[key]
+
+    def get_many(self, keys, fetch):
+        """
+        {key: value or None} for several keys. Fresh entries are served from
+        the cache; the misses are read in one go by fetch(missing_keys),
+        which returns {key: value} and leaves out keys that do not exist.
+        """
+        return self._read_many(keys, fetch)
+
+    def invalidate(self, matches):
+        """Drop every entry whose key satisfies matches(key); returns how many were dropped"""
+        return self._invalidate(matches)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _read_many(self, keys, fetch):
+        now = time.monotonic()
+        values = {}
+        missing = []
+        with self.lock:
+            for key in dict.fromkeys(keys):
+                value = self._lookup(key, now)
+                if value is None:
+                    missing.append(key)
+                else:
+                    values[key] = value
+            self.stats["hits"] += len(values)
+            self.stats["misses"] += len(missing)
+        self.maybe_emit_metrics()
+        if not missing:
+            return values
+
+        fetched = fetch(missing)
+        with self.lock:
+            for key in missing:
+                value = fetched.get(key)
+                values[key] = value
+                if value is None:
+                    continue
+                if len(self.entries) >= self.max_entries:
+                    self._evict(now)
+                self.entries[key] = (now + self.ttl_seconds, value)
+        return values
+
+    def _invalidate(self, matches):
+        with self.lock:
+            keys = [key for key in self.entries if matches(key)]
+            for key in keys:
+                del self.entries[key]
+            self.stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def _lookup(self, key, now):
+        """Fresh value for key or None; called with the lock held"""
+        return self._fresh(key, now)
+
+    def _fresh(self, key, now):
+        entry = self.entries.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        return None
+
+    def _evict(self, now):
+        """Drop expired entries, then the oldest inserted until there is room"""
+        expired = [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+        evicted = len(expired)
+        while len(self.entries) >= self.max_entries:
+            del self.entries[next(iter(self.entries))]
+            evicted += 1
+        self.stats["evictions"] += evicted
+
+    def maybe_emit_metrics(self):
+        if time.monotonic() - self.last_emit >= CACHE_METRICS_INTERVAL_SECONDS:
+            self.emit_metrics()
+
+    def emit_metrics(self):
+        """Print the counters since the last emit as an EMF record, then reset them"""
+        with self.lock:
+            counts = dict(self.stats)
+            for name in self.stats:
+                self.stats[name] = 0
+            size = len(self.entries)
+            self.last_emit = time.monotonic()
+        print(json.dumps({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [
+                        {"Name": "Hits", "Unit": "Count"},
+                        {"Name": "Misses", "Unit": "Count"},
+                        {"Name": "Evictions", "Unit": "Count"},
+                        {"Name": "Invalidations", "Unit": "Count"},
+                        {"Name": "Entries", "Unit": "Count"}
+                    ]
+                }]
+            },
+            "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+            "Hits": counts["hits"],
+            "Misses": counts["misses"],
+            "Evictions": counts["evictions"],
+            "Invalidations": counts["invalidations"],
+            "Entries": size
+        }))
+        return counts
@@ -6,15 +6,28 @@ import urllib.error
 from datetime import datetime
 from decimal import Decimal
 from botocore.config import Config
+from boto3.dynamodb.conditions import Attr
+from user_profile_cache import UserProfileCache
+from skill_matching import INDEXED_USER_FIELDS, sync_freelancer_skills
+from user_collections import (
+    USER_COLLECTIONS_TABLE, ARRAY_KINDS, INTEGRATION_FIELDS,
+    get_integrations, put_integrations, migrate_user
+)
 
 # ---------- CONFIG ----------
 USERS_TABLE = "Users"
+FREELANCER_SKILLS_TABLE = "FreelancerSkills"
 S3_BUCKET = "project-bazaar-users-profile-images"
 S3_REGION = "ap-south-2"
 
 # ---------- AWS ----------
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(USERS_TABLE)
+freelancer_skills_table = dynamodb.Table(FREELANCER_SKILLS_TABLE)
+# githubData / driveData / freelancerProjects live here, not on the Users row
+collections_table = dynamodb.Table(USER_COLLECTIONS_TABLE)
+MIGRATION_BATCH_SIZE = 200
+profile_cache = UserProfileCache()
 s3 = boto3.client(
     "s3",
     region_name=S3_REGION,
@@ -181,12 +194,12 @@ def handle_get_llm_keys_status(body):
         return response(400, {"success": False, "message": "userId is required"})
 
     try:
-        existing = table.get_item(Key={"userId": user_id})
+        existing = profile_cache.get(table, user_id, ("userId", "llmApiKeys", "llmModels"))
     except Exception as e:
         print(f"DynamoDB get_item error: {e}")
         return response(500, {"success": False, "message": str(e)})
 
-    if "Item" not in existing:
+    if existing is None:
         providers = [
             {"id": p["id"], "name": p["name"], "hasKey": False}
             for p in LLM_PROVIDERS
@@ -200,10 +213,10 @@ def handle_get_llm_keys_status(body):
             "savedModels": {},
         })
 
-    keys = existing["Item"].get("llmApiKeys") or {}
+    keys = existing.get("llmApiKeys") or {}
     if not isinstance(keys, dict):
         keys = {}
-    models = existing["Item"].get("llmModels") or {}
+    models = existing.get("llmModels") or {}
     if not isinstance(models, dict):
         models = {}
     has_openai = bool(keys.get("openai"))
@@ -393,6 +406,21 @@ def handle_update_settings(body):
 
     updates["updatedAt"] = datetime.utcnow().isoformat()
 
+    # Integration blobs go to UserCollections; any legacy copy on the row is removed
+    integrations = {k: updates.pop(k) for k in INTEGRATION_FIELDS if k in updates}
+    if integrations:
+        try:
+            put_integrations(collections_table, user_id, integrations, updates["updatedAt"])
+        except Exception as e:
+            print(f"Integration write error: {e}")
+            return response(500, {
+                "success": False,
+                "message": f"Database update error: {str(e)}"
+            })
+        for k in integrations:
+            if k in current_user:
+                updates[k] = None
+
     update_expr = []
     expr_attr_values = {}
     expr_attr_names = {}
@@ -435,6 +463,7 @@ def handle_update_settings(body):
             update_params["ExpressionAttributeValues"] = expr_attr_values
         
         result = table.update_item(**update_params)
+        profile_cache.invalidate(user_id)
         print("Update successful")
     except Exception as e:
         print(f"DynamoDB update_item error: {e}")
@@ -443,10 +472,98 @@ def handle_update_settings(body):
             "message": f"Database update error: {str(e)}"
         })
 
+    # Keep skill-match recommendations current (don't let this fail the update)
+    if any(k in updates for k in INDEXED_USER_FIELDS):
+        try:
+            sync_freelancer_skills(freelancer_skills_table, current_user, result["Attributes"])
+        except Exception as e:
+            print(f"Freelancer skill index update failed (non-fatal): {e}")
+
     return response(200, {
         "success": True,
         "message": "Settings updated successfully",
-        "data": result["Attributes"]
+        "data": {**result["Attributes"], **{k: v for k, v in integrations.items() if v is not None}}
+    })
+
+# ---------- ACTION: GET INTEGRATIONS ----------
+def handle_get_integrations(body):
+    """githubData / driveData / freelancerProjects, read only when a page needs them"""
+    user_id = body.get("userId")
+    if not user_id:
+        return response(400, {"success": False, "message": "userId is required"})
+
+    try:
+        integrations = get_integrations(collections_table, user_id)
+        # Users the collections migration has not reached yet
+        legacy = table.get_item(
+            Key={"userId": user_id},
+            ProjectionExpression=", ".join(f"#{k}" for k in INTEGRATION_FIELDS),
+            ExpressionAttributeNames={f"#{k}": k for k in INTEGRATION_FIELDS}
+        ).get("Item", {})
+    except Exception as e:
+        print(f"Get integrations error: {e}")
+        return response(500, {"success": False, "message": str(e)})
+
+    return response(200, {
+        "success": True,
+        "data": {**legacy, **integrations}
+    })
+
+# ---------- ACTION: MIGRATE USER COLLECTIONS ----------
+def handle_migrate_user_collections(body):
+    """
+    Move the integration blobs off Users rows into UserCollections while the
+    site is live, and copy purchases / purchasedCourses into child items.
+    cart / wishlist / purchases / purchasedCourses are only removed from the
+    rows with removeArrays: true, once the buyerApi readers use UserCollections.
+    Processes at most batchSize scanned users per call; pass nextStartKey back
+    as startKey until done. Rows written to meanwhile are reported as conflicts
+    and picked up by the next full pass. Safe to re-run. Direct invocation only.
+    """
+    fields = list(ARRAY_KINDS) + list(INTEGRATION_FIELDS)
+    batch_size = int(body.get("batchSize", MIGRATION_BATCH_SIZE))
+    remove_arrays = body.get("removeArrays") is True
+    condition = Attr(fields[0]).exists()
+    for field in fields[1:]:
+        condition = condition | Attr(field).exists()
+    scan_kwargs = {
+        "FilterExpression": condition,
+        "ProjectionExpression": ", ".join(["userId"] + [f"#{k}" for k in fields]),
+        "ExpressionAttributeNames": {f"#{k}": k for k in fields}
+    }
+    if body.get("startKey"):
+        scan_kwargs["ExclusiveStartKey"] = body["startKey"]
+
+    counts = {"migrated": 0, "conflict": 0, "skipped": 0}
+    scanned = 0
+    last_key = None
+    now = datetime.utcnow().isoformat()
+    try:
+        while scanned < batch_size:
+            scan_kwargs["Limit"] = batch_size - scanned
+            result = table.scan(**scan_kwargs)
+            scanned += result.get("ScannedCount", 0)
+            for user in result.get("Items", []):
+                outcome = migrate_user(table, collections_table, user, now, remove_arrays)
+                counts[outcome] += 1
+                profile_cache.invalidate(user["userId"])
+            last_key = result.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            scan_kwargs["ExclusiveStartKey"] = last_key
+    except Exception as e:
+        print(f"Collections migration error: {e}")
+        return response(500, {"success": False, "message": str(e)})
+
+    return response(200, {
+        "success": True,
+        "data": {
+            "migrated": counts["migrated"],
+            "conflicts": counts["conflict"],
+            "scanned": scanned,
+            "nextStartKey": last_key,
+            "done": last_key is None
+        }
     })
 
 # ---------- ENTRY ----------
@@ -455,7 +572,9 @@ def lambda_handler(event, context):
         if event.get("httpMethod") == "OPTIONS":
             return response(200, {})
 
-        body = event.get("body")
+        # Direct invocations (no API Gateway body) pass the request as the event
+        direct = "body" not in event
+        body = event if direct else event.get("body")
         if isinstance(body, str):
             body = json.loads(body)
 
@@ -473,6 +592,12 @@ def lambda_handler(event, context):
         if action == "getLlmKeysStatus":
             return handle_get_llm_keys_status(body)
 
+        if action == "getIntegrations":
+            return handle_get_integrations(body)
+
+        if action == "migrateUserCollections" and direct:
+            return handle_migrate_user_collections(body)
+
         return response(400, {
             "success": False,
             "message": "Invalid action"
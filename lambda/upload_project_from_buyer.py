@@ -5,6 +5,7 @@ import traceback
 from datetime import datetime
 from decimal import Decimal
 from botocore.config import Config
+from user_profile_cache import UserProfileCache
 
 # ================= CONFIG =================
 PROJECTS_TABLE = "Projects"
@@ -23,6 +24,7 @@ dynamodb = boto3.resource("dynamodb", region_name=S3_REGION)
 
 projects_table = dynamodb.Table(PROJECTS_TABLE)
 users_table = dynamodb.Table(USERS_TABLE)
+profile_cache = UserProfileCache()
 notifications_table = dynamodb.Table(NOTIFICATIONS_TABLE)
 
 sqs = boto3.client("sqs", region_name=S3_REGION)
@@ -139,8 +141,7 @@ def lambda_handler(event, context):
             })
 
         # Validate user
-        user = users_table.get_item(Key={"userId": seller_id})
-        if "Item" not in user:
+        if profile_cache.get(users_table, seller_id, ("userId",)) is None:
             return response(404, {
                 "success": False,
                 "message": "User not found"
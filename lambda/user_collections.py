@@ -0,0 +1,177 @@
+"""
+Per-user collections kept out of the Users item.
+
+DynamoDB Table: UserCollections
+Primary Key: userId (String), Sort Key: itemKey (String, "<kind>#<id>")
+Kinds: purchase (projects bought), course (courses bought), cart, wishlist,
+       integration (githubData / driveData / freelancerProjects blobs, id = field name)
+
+Users rows used to hold these as unbounded arrays/blobs. migrate_user() moves
+one user's legacy attributes into child items while the site is live; until a
+user is migrated, readers pass the legacy array in and get both merged.
+The cart / wishlist / user-details Lambdas behind buyerApi still read (and the
+first two still write) the Users arrays, so by default the arrays stay on the
+row: purchases and purchasedCourses are copied (their writers dual-write new
+entries), cart and wishlist are left alone. Only once those readers use this
+module should a migration pass remove_arrays=True.
+Package this file with any handler that imports it (like user_profile_cache).
+"""
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+USER_COLLECTIONS_TABLE = "UserCollections"
+
+# Users attribute -> collection kind
+ARRAY_KINDS = {
+    "purchases": "purchase",
+    "purchasedCourses": "course",
+    "cart": "cart",
+    "wishlist": "wishlist",
+}
+INTEGRATION_KIND = "integration"
+INTEGRATION_FIELDS = ("githubData", "driveData", "freelancerProjects")
+# Arrays every writer appends to both the Users row and the child items
+DUAL_WRITTEN_FIELDS = ("purchases", "purchasedCourses")
+CHILD_KEYS = ("userId", "itemKey", "kind")
+
+
+def item_key(kind, entry_id):
+    return f"{kind}#{entry_id}"
+
+
+def entry_id(kind, entry):
+    """The id an entry is stored under: its project/course id, or the entry itself for plain strings"""
+    if isinstance(entry, dict):
+        return entry.get("courseId" if kind == "course" else "projectId") or entry.get("id")
+    return entry
+
+
+def child_item(user_id, kind, entry):
+    item = {"userId": user_id, "itemKey": item_key(kind, entry_id(kind, entry)), "kind": kind}
+    if isinstance(entry, dict):
+        item.update({k: v for k, v in entry.items() if k not in CHILD_KEYS})
+    else:
+        item["value"] = entry
+    return item
+
+
+def to_entry(item):
+    """A child item back in the shape the legacy array used"""
+    if "value" in item:
+        return item["value"]
+    return {k: v for k, v in item.items() if k not in CHILD_KEYS}
+
+
+def query_kind(table, user_id, kind):
+    query_kwargs = {
+        "KeyConditionExpression": Key("userId").eq(user_id) & Key("itemKey").begins_with(f"{kind}#")
+    }
+    items = []
+    while True:
+        result = table.query(**query_kwargs)
+        items.extend(result.get("Items", []))
+        if not result.get("LastEvaluatedKey"):
+            return items
+        query_kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+def list_entries(table, user_id, kind, legacy=None):
+    """Every entry of one kind for a user; legacy array entries not yet migrated are included"""
+    entries = [to_entry(item) for item in query_kind(table, user_id, kind)]
+    seen = {entry_id(kind, entry) for entry in entries}
+    for entry in legacy or []:
+        if entry_id(kind, entry) not in seen:
+            entries.append(entry)
+    return entries
+
+
+def has_entry(table, user_id, kind, entry_id_value, legacy=None):
+    """One consistent get; falls back to scanning the legacy array if one is passed"""
+    result = table.get_item(Key={"userId": user_id, "itemKey": item_key(kind, entry_id_value)}, ConsistentRead=True)
+    if "Item" in result:
+        return True
+    return any(entry_id(kind, entry) == entry_id_value for entry in legacy or [])
+
+
+def delete_entries(table, user_id, kind, entry_ids):
+    with table.batch_writer() as batch:
+        for value in entry_ids:
+            batch.delete_item(Key={"userId": user_id, "itemKey": item_key(kind, value)})
+
+
+def get_integrations(table, user_id):
+    """{field: data} for the integration blobs a user has connected"""
+    return {item["itemKey"].split("#", 1)[1]: item.get("data") for item in query_kind(table, user_id, INTEGRATION_KIND)}
+
+
+def put_integrations(table, user_id, values, timestamp):
+    """Write integration blobs; a None value disconnects (deletes) the integration"""
+    with table.batch_writer() as batch:
+        for field, data in values.items():
+            key = {"userId": user_id, "itemKey": item_key(INTEGRATION_KIND, field)}
+            if data is None:
+                batch.delete_item(Key=key)
+            else:
+                batch.put_item(Item={**key, "kind": INTEGRATION_KIND, "data": data, "updatedAt": timestamp})
+
+
+def migrate_user(users_table, table, user, timestamp, remove_arrays=False):
+    """
+    Copy one user's legacy arrays and integration blobs into child items, then
+    remove them from the Users row - only if they are unchanged since `user`
+    was read. Unless remove_arrays is set, only the dual-written arrays are
+    copied and no array is removed (see the module docstring).
+    Returns "migrated", "skipped" (nothing to move) or "conflict" (the row
+    changed meanwhile; migrate it again on the next pass).
+    """
+    user_id = user["userId"]
+    copy_fields = [f for f in (ARRAY_KINDS if remove_arrays else DUAL_WRITTEN_FIELDS) if f in user]
+    fields = [f for f in INTEGRATION_FIELDS if f in user]
+    if not copy_fields and not fields:
+        return "skipped"
+
+    with table.batch_writer(overwrite_by_pkeys=["userId", "itemKey"]) as batch:
+        for field in copy_fields:
+            kind = ARRAY_KINDS[field]
+            for entry in user[field] or []:
+                if entry_id(kind, entry):
+                    batch.put_item(Item=child_item(user_id, kind, entry))
+    for field in fields:
+        if user[field] is None:
+            continue
+        # A blob saved through the new path since `user` was read is newer - keep it
+        try:
+            table.put_item(
+                Item={
+                    "userId": user_id,
+                    "itemKey": item_key(INTEGRATION_KIND, field),
+                    "kind": INTEGRATION_KIND,
+                    "data": user[field],
+                    "updatedAt": timestamp
+                },
+                ConditionExpression="attribute_not_exists(itemKey)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    if remove_arrays:
+        fields = copy_fields + fields
+    if not fields:
+        return "migrated"
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    values = {f":f{i}": user[field] for i, field in enumerate(fields)}
+    try:
+        users_table.update_item(
+            Key={"userId": user_id},
+            UpdateExpression=f"REMOVE {', '.join(names)}",
+            ConditionExpression=" AND ".join(f"{name} = :{name[1:]}" for name in names),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return "conflict"
+    return "migrated"
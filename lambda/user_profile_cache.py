@@ -0,0 +1,76 @@
+"""
+Warm-container read-through cache for Users items.
+
+Package this file and ttl_cache.py with any handler that imports it (as
+portfolio_templates is packaged with generate_portfolio). Entries are keyed by
+(userId, projection) and kept for PROFILE_CACHE_TTL_SECONDS; a fresh full item
+also answers projected lookups. Call invalidate() after writing a user in the
+same function - other functions' containers catch up within the TTL.
+The Users table is passed on every call so handlers keep their module-level
+table handle as the single source of truth.
+
+Metrics are emitted by ttl_cache under namespace ProjectBazaar/UserProfileCache.
+"""
+
+import os
+from ttl_cache import TTLCache
+
+PROFILE_CACHE_TTL_SECONDS = float(os.environ.get("PROFILE_CACHE_TTL_SECONDS", 30))
+PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", 2000))
+METRICS_NAMESPACE = "ProjectBazaar/UserProfileCache"
+
+
+class UserProfileCache(TTLCache):
+    def __init__(self, ttl_seconds=PROFILE_CACHE_TTL_SECONDS, max_entries=PROFILE_CACHE_MAX_ENTRIES):
+        super().__init__(METRICS_NAMESPACE, ttl_seconds, max_entries)
+
+    def get(self, table, user_id, projection=None):
+        """
+        The Users item (or just the `projection` attributes) for user_id, or
+        None when the user does not exist. Missing users are not cached.
+        """
+        fields = tuple(sorted(projection)) if projection else None
+        key = (user_id, fields)
+        item = self._read_many([key], lambda keys: {key: self._fetch(table, user_id, fields)})[key]
+        return dict(item) if item is not None else None
+
+    def get_many(self, table, user_ids, projection=None, fetch=None):
+        """
+        {userId: item or None} for several users. Fresh entries are served
+        from the cache; the misses are read in one go by `fetch(missing_ids)`
+        (e.g. a BatchGetItem helper returning {userId: item}), or one
+        get_item each when no fetch is given.
+        """
+        fields = tuple(sorted(projection)) if projection else None
+
+        def fetch_missing(keys):
+            user_ids = [user_id for user_id, _ in keys]
+            if fetch:
+                fetched = fetch(user_ids)
+            else:
+                fetched = {user_id: self._fetch(table, user_id, fields) for user_id in user_ids}
+            return {(user_id, fields): fetched.get(user_id) for user_id in user_ids}
+
+        items = self._read_many([(user_id, fields) for user_id in user_ids], fetch_missing)
+        return {user_id: dict(item) if item is not None else None for (user_id, _), item in items.items()}
+
+    def invalidate(self, user_id):
+        """Drop every cached projection of user_id (call after writing the user)"""
+        return self._invalidate(lambda key: key[0] == user_id)
+
+    def _lookup(self, key, now):
+        item = self._fresh(key, now)
+        user_id, fields = key
+        if item is None and fields:
+            full = self._fresh((user_id, None), now)
+            if full is not None:
+                item = {k: full[k] for k in fields if k in full}
+        return item
+
+    def _fetch(self, table, user_id, fields):
+        kwargs = {"Key": {"userId": user_id}}
+        if fields:
+            names = {f"#p{i}": field for i, field in enumerate(fields)}
+            kwargs["ProjectionExpression"] = ", ".join(names)
+            kwargs["ExpressionAttributeNames"] = names
+        return table.get_item(**kwargs).get("Item")
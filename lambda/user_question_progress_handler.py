@@ -1,12 +1,44 @@
 import json
+import time
+import zlib
+import hashlib
 import boto3
-from datetime import datetime
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
 import uuid
 
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 progress_table = dynamodb.Table('UserQuestionProgress')  # Per-question progress
 submissions_table = dynamodb.Table('UserSubmissions')  # Submission history (optional)
+questions_table = dynamodb.Table('CodingQuestions')  # Source for the question catalog
+catalog_meta_table = dynamodb.Table('CodingQuestionsMeta')  # Catalog version stamp
+activity_table = dynamodb.Table('UserCodingActivity')  # Per-user daily activity bitmap
+submission_code_table = dynamodb.Table('UserSubmissionCode')  # Compressed code bodies keyed by content hash
+
+# Question catalog cached per warm container:
+# questionId -> (difficulty, topic, companies, status)
+CATALOG_CHECK_INTERVAL_SECONDS = 60
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+_question_catalog = {}
+_catalog_totals = {"byDifficulty": {}, "byTopic": {}}
+_catalog_version = None
+_catalog_checked_at = 0.0
+
+# Daily activity bitmap: bit i is set when the user solved something on day baseDay + i
+EPOCH_DATE = datetime(1970, 1, 1)
+ACTIVITY_WRITE_RETRIES = 3
+HEATMAP_DEFAULT_DAYS = 365
+
+# Submission listings return metadata only; code is fetched lazily by hash.
+# userId-questionId-index must project these attributes (INCLUDE or ALL):
+# a GSI query silently omits attributes the index does not project.
+SUBMISSION_METADATA_FIELDS = [
+    'submissionId', 'userId', 'questionId', 'codeHash', 'codeSize', 'language',
+    'passed', 'testsPassed', 'testsTotal', 'runtime', 'memory', 'submittedAt'
+]
+STORED_HASH_CACHE_LIMIT = 1000
+_stored_code_hashes = set()  # Hashes this container already knows are stored
 
 # Response helper function
 def response(status_code, body):
@@ -22,6 +54,366 @@ def response(status_code, body):
     }
 
 
+# ========================================
+# QUESTION CATALOG (WARM CONTAINER CACHE)
+# ========================================
+def load_question_catalog():
+    """
+    Scan CodingQuestions with a narrow projection and build the compact catalog
+    plus published-question totals per difficulty and topic.
+    """
+    catalog = {}
+    totals = {"byDifficulty": {}, "byTopic": {}}
+    scan_kwargs = {
+        'ProjectionExpression': "questionId, difficulty, topic, companies, #st",
+        'ExpressionAttributeNames': {'#st': 'status'}
+    }
+    
+    while True:
+        result = questions_table.scan(**scan_kwargs)
+        for q in result.get('Items', []):
+            difficulty = q.get('difficulty', 'Medium')
+            topic = q.get('topic', 'General')
+            status = q.get('status', 'draft')
+            catalog[q['questionId']] = (difficulty, topic, tuple(q.get('companies', [])), status)
+            
+            if status == 'published':
+                totals['byDifficulty'][difficulty] = totals['byDifficulty'].get(difficulty, 0) + 1
+                totals['byTopic'][topic] = totals['byTopic'].get(topic, 0) + 1
+        
+        if 'LastEvaluatedKey' not in result:
+            break
+        scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    
+    return catalog, totals
+
+
+def get_question_catalog():
+    """
+    Return the cached question catalog, reloading it only when the
+    CodingQuestionsMeta version stamp has changed. The stamp itself is
+    checked at most once per CATALOG_CHECK_INTERVAL_SECONDS.
+    """
+    global _question_catalog, _catalog_totals, _catalog_version, _catalog_checked_at
+    
+    now = time.time()
+    if _catalog_version is not None and now - _catalog_checked_at < CATALOG_CHECK_INTERVAL_SECONDS:
+        return _question_catalog
+    _catalog_checked_at = now
+    
+    try:
+        meta = catalog_meta_table.get_item(Key={'metaKey': 'catalog'}).get('Item', {})
+        version = int(meta.get('version', 0))
+    except Exception as e:
+        print(f"Error reading catalog version: {str(e)}")
+        if _catalog_version is not None:
+            return _question_catalog
+        version = 0
+    
+    if version == _catalog_version:
+        return _question_catalog
+    
+    try:
+        _question_catalog, _catalog_totals = load_question_catalog()
+        _catalog_version = version
+        print(f"Loaded question catalog v{version}: {len(_question_catalog)} questions")
+    except Exception as e:
+        print(f"Error loading question catalog: {str(e)}")
+    
+    return _question_catalog
+
+
+def build_breakdowns(items):
+    """
+    Build per-difficulty and per-topic solved/attempted counts for a user's
+    progress items using the cached catalog (no per-question reads).
+    """
+    catalog = get_question_catalog()
+    
+    by_difficulty = {
+        d: {"solved": 0, "attempted": 0, "total": _catalog_totals['byDifficulty'].get(d, 0)}
+        for d in DIFFICULTIES
+    }
+    by_topic = {}
+    
+    for item in items:
+        status = item.get('status')
+        if status not in ('solved', 'attempted'):
+            continue
+        entry = catalog.get(item.get('questionId'))
+        if not entry:
+            continue
+        difficulty, topic = entry[0], entry[1]
+        
+        if difficulty not in by_difficulty:
+            by_difficulty[difficulty] = {
+                "solved": 0, "attempted": 0,
+                "total": _catalog_totals['byDifficulty'].get(difficulty, 0)
+            }
+        by_difficulty[difficulty][status] += 1
+        
+        if topic not in by_topic:
+            by_topic[topic] = {
+                "solved": 0, "attempted": 0,
+                "total": _catalog_totals['byTopic'].get(topic, 0)
+            }
+        by_topic[topic][status] += 1
+    
+    return by_difficulty, by_topic
+
+
+# ========================================
+# DAILY ACTIVITY BITMAP
+# ========================================
+def to_epoch_day(timestamp):
+    """Convert an ISO timestamp ('2025-01-20T10:35:00Z') to days since 1970-01-01."""
+    return (datetime.strptime(timestamp.split('T')[0], '%Y-%m-%d') - EPOCH_DATE).days
+
+
+def from_epoch_day(day):
+    """Convert days since 1970-01-01 back to a 'YYYY-MM-DD' string."""
+    return (EPOCH_DATE + timedelta(days=day)).strftime('%Y-%m-%d')
+
+
+def decode_activity(item):
+    """Return (baseDay, bits, version) from a UserCodingActivity item."""
+    if not item:
+        return None, 0, 0
+    raw = item.get('bitmap') or b''
+    raw = getattr(raw, 'value', raw)  # boto3 returns Binary wrappers
+    bits = int.from_bytes(bytes(raw), 'little')
+    return int(item.get('baseDay', 0)), bits, int(item.get('version', 0))
+
+
+def set_activity_day(base_day, bits, day):
+    """Set the bit for a day, rebasing the bitmap if the day predates baseDay."""
+    if base_day is None:
+        return day, 1
+    if day < base_day:
+        return day, (bits << (base_day - day)) | 1
+    return base_day, bits | (1 << (day - base_day))
+
+
+def build_activity_bits(days):
+    """Build (baseDay, bits) from an iterable of epoch days."""
+    base_day, bits = None, 0
+    for day in sorted(set(days)):
+        base_day, bits = set_activity_day(base_day, bits, day)
+    return base_day, bits
+
+
+def current_streak_from_bits(base_day, bits, today=None):
+    """Count consecutive active days ending today."""
+    if base_day is None or not bits:
+        return 0
+    if today is None:
+        today = (datetime.utcnow() - EPOCH_DATE).days
+    index = today - base_day
+    streak = 0
+    while index >= 0 and (bits >> index) & 1:
+        streak += 1
+        index -= 1
+    return streak
+
+
+def longest_streak_from_bits(bits):
+    """Length of the longest run of set bits (each pass shortens every run by one)."""
+    longest = 0
+    while bits:
+        bits &= bits << 1
+        longest += 1
+    return longest
+
+
+def active_days_from_bits(base_day, bits, days=HEATMAP_DEFAULT_DAYS, today=None):
+    """List active dates within the last `days` days for the contribution heatmap."""
+    if base_day is None or not bits:
+        return []
+    if today is None:
+        today = (datetime.utcnow() - EPOCH_DATE).days
+    start = max(base_day, today - days + 1)
+    return [
+        from_epoch_day(day) for day in range(start, today + 1)
+        if (bits >> (day - base_day)) & 1
+    ]
+
+
+def write_activity(user_id, base_day, bits, expected_version):
+    """Conditionally write the bitmap; returns False if another writer got there first."""
+    item = {
+        'userId': user_id,
+        'baseDay': base_day,
+        'bitmap': bits.to_bytes(max(1, (bits.bit_length() + 7) // 8), 'little'),
+        'version': expected_version + 1,
+        'updatedAt': datetime.utcnow().isoformat() + "Z"
+    }
+    try:
+        activity_table.put_item(
+            Item=item,
+            ConditionExpression="attribute_not_exists(userId) OR version = :v",
+            ExpressionAttributeValues={':v': expected_version}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def record_activity_day(user_id, timestamp):
+    """
+    Mark the day of `timestamp` as active. Skips the write when the bit is
+    already set, so repeat solves on the same day cost a single read.
+    The first write for a user seeds the bitmap from their solvedAt history,
+    so existing streaks survive the switch to bitmaps.
+    """
+    day = to_epoch_day(timestamp)
+    history = None
+    for _ in range(ACTIVITY_WRITE_RETRIES):
+        item = activity_table.get_item(Key={'userId': user_id}).get('Item')
+        base_day, bits, version = decode_activity(item)
+        if base_day is not None and day >= base_day and (bits >> (day - base_day)) & 1:
+            return
+        if base_day is None:
+            if history is None:
+                history = load_solved_days(user_id)
+            base_day, bits = build_activity_bits(history)
+        base_day, bits = set_activity_day(base_day, bits, day)
+        if write_activity(user_id, base_day, bits, version):
+            return
+    print(f"Gave up recording activity for {user_id} after {ACTIVITY_WRITE_RETRIES} attempts")
+
+
+def get_activity_bits(user_id, solved_items=None):
+    """
+    Read the user's activity bitmap. If none exists yet, derive it from the
+    solvedAt values of `solved_items` (or the user's progress items when not
+    given) and persist it (lazy backfill).
+    """
+    item = activity_table.get_item(Key={'userId': user_id}).get('Item')
+    if item:
+        base_day, bits, _ = decode_activity(item)
+        return base_day, bits
+    
+    days = solved_day_list(solved_items) if solved_items is not None else load_solved_days(user_id)
+    base_day, bits = build_activity_bits(days)
+    if base_day is not None:
+        write_activity(user_id, base_day, bits, 0)
+    return base_day, bits
+
+
+def load_solved_days(user_id):
+    """Epoch days of every solvedAt in the user's progress items (narrow projection, paginated)."""
+    query_kwargs = {
+        'KeyConditionExpression': boto3.dynamodb.conditions.Key('userId').eq(user_id),
+        'ProjectionExpression': "userId, #st, solvedAt",
+        'ExpressionAttributeNames': {'#st': 'status'}
+    }
+    days = []
+    while True:
+        result = progress_table.query(**query_kwargs)
+        days.extend(solved_day_list(result.get('Items', [])))
+        if 'LastEvaluatedKey' not in result:
+            return days
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
+def solved_day_list(items):
+    """Epoch days of all solvedAt values in the given progress items."""
+    days = []
+    for item in items:
+        if item.get('status') == 'solved' and item.get('solvedAt'):
+            try:
+                days.append(to_epoch_day(item['solvedAt']))
+            except ValueError:
+                pass
+    return days
+
+
+def backfill_activity(user_id=None):
+    """
+    Derive activity bitmaps from existing solvedAt values.
+    With a userId, rebuilds that user only; otherwise scans UserQuestionProgress
+    (narrow projection, paginated) and rebuilds every user with solved items.
+    """
+    if user_id:
+        days_by_user = {user_id: load_solved_days(user_id)}
+    else:
+        days_by_user = {}
+        scan_kwargs = {
+            'ProjectionExpression': "userId, #st, solvedAt",
+            'ExpressionAttributeNames': {'#st': 'status'}
+        }
+        while True:
+            result = progress_table.scan(**scan_kwargs)
+            for item in result.get('Items', []):
+                days_by_user.setdefault(item['userId'], []).extend(solved_day_list([item]))
+            if 'LastEvaluatedKey' not in result:
+                break
+            scan_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    
+    written = 0
+    for uid, days in days_by_user.items():
+        base_day, bits = build_activity_bits(days)
+        if base_day is None:
+            continue
+        # Merge with any bitmap already written so days recorded by
+        # update_question_status are never dropped.
+        current = activity_table.get_item(Key={'userId': uid}).get('Item')
+        cur_base, cur_bits, version = decode_activity(current)
+        if cur_base is not None:
+            for day in range(cur_base, cur_base + cur_bits.bit_length()):
+                if (cur_bits >> (day - cur_base)) & 1:
+                    base_day, bits = set_activity_day(base_day, bits, day)
+        if write_activity(uid, base_day, bits, version):
+            written += 1
+    
+    return response(200, {
+        "success": True,
+        "message": f"Backfilled activity for {written} users",
+        "data": {"usersScanned": len(days_by_user), "usersWritten": written}
+    })
+
+
+def get_activity(user_id, days=HEATMAP_DEFAULT_DAYS):
+    """
+    Get streaks and contribution-heatmap data from the activity bitmap.
+    """
+    if not user_id:
+        return response(400, {
+            "success": False,
+            "error": {"code": "VALIDATION_ERROR", "message": "User ID is required"}
+        })
+    
+    try:
+        days = int(days)
+        if days < 1:
+            raise ValueError(days)
+    except (TypeError, ValueError):
+        return response(400, {
+            "success": False,
+            "error": {"code": "VALIDATION_ERROR", "message": "days must be a positive integer"}
+        })
+    
+    try:
+        base_day, bits = get_activity_bits(user_id)
+        return response(200, {
+            "success": True,
+            "data": {
+                "currentStreak": current_streak_from_bits(base_day, bits),
+                "longestStreak": longest_streak_from_bits(bits),
+                "activeDays": active_days_from_bits(base_day, bits, days)
+            }
+        })
+        
+    except Exception as e:
+        print(f"Error getting activity: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {"code": "INTERNAL_ERROR", "message": "Failed to get activity"}
+        })
+
+
 # ========================================
 # GET USER PROGRESS FOR ALL QUESTIONS
 # ========================================
@@ -47,6 +439,7 @@ def get_user_progress(user_id):
         solved_count = len([i for i in items if i.get('status') == 'solved'])
         attempted_count = len([i for i in items if i.get('status') == 'attempted'])
         bookmarked_count = len([i for i in items if i.get('isBookmarked')])
+        by_difficulty, by_topic = build_breakdowns(items)
         
         return response(200, {
             "success": True,
@@ -56,7 +449,9 @@ def get_user_progress(user_id):
                     "solved": solved_count,
                     "attempted": attempted_count,
                     "bookmarked": bookmarked_count,
-                    "total": len(items)
+                    "total": len(items),
+                    "byDifficulty": by_difficulty,
+                    "byTopic": by_topic
                 }
             }
         })
@@ -163,6 +558,12 @@ def update_question_status(user_id, question_id, new_status):
             ReturnValues='ALL_NEW'
         )
         
+        if new_status == 'solved':
+            try:
+                record_activity_day(user_id, timestamp)
+            except Exception as e:
+                print(f"Error recording activity: {str(e)}")
+        
         return response(200, {
             "success": True,
             "message": f"Status updated to {new_status}",
@@ -414,6 +815,60 @@ def toggle_dislike(user_id, question_id):
         })
 
 
+# ========================================
+# CONTENT-ADDRESSED SUBMISSION CODE
+# ========================================
+def code_hash(code):
+    """SHA-256 of the code body, used as the UserSubmissionCode key."""
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def store_submission_code(code):
+    """
+    Store a zlib-compressed code body under its content hash.
+    Identical code is written once: a warm-container hash set skips known
+    bodies, and the conditional put makes concurrent duplicates a no-op.
+    Returns the hash.
+    """
+    digest = code_hash(code)
+    if digest in _stored_code_hashes:
+        return digest
+    
+    try:
+        submission_code_table.put_item(
+            Item={
+                'codeHash': digest,
+                'code': zlib.compress(code.encode('utf-8')),
+                'size': len(code),
+                'createdAt': datetime.utcnow().isoformat() + "Z"
+            },
+            ConditionExpression="attribute_not_exists(codeHash)"
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    
+    if len(_stored_code_hashes) >= STORED_HASH_CACHE_LIMIT:
+        _stored_code_hashes.clear()
+    _stored_code_hashes.add(digest)
+    return digest
+
+
+def load_submission_code(digest):
+    """Fetch and decompress a code body by hash. Returns None if missing."""
+    item = submission_code_table.get_item(Key={'codeHash': digest}).get('Item')
+    if not item:
+        return None
+    raw = item.get('code') or b''
+    raw = getattr(raw, 'value', raw)  # boto3 returns Binary wrappers
+    return zlib.decompress(bytes(raw)).decode('utf-8')
+
+
+def to_submission_metadata(submission):
+    """Drop inline code from legacy submission items before listing them."""
+    return {k: v for k, v in submission.items() if k != 'code'}
+
+
 # ========================================
 # RECORD SUBMISSION
 # ========================================
@@ -431,12 +886,21 @@ def record_submission(user_id, question_id, submission_data):
     try:
         timestamp = datetime.utcnow().isoformat() + "Z"
         submission_id = str(uuid.uuid4())
+        code = submission_data.get('code', '')
+        
+        # Code bodies live in UserSubmissionCode; submissions only reference them
+        digest = None
+        try:
+            digest = store_submission_code(code)
+        except Exception as code_error:
+            print(f"UserSubmissionCode storage failed: {str(code_error)}")
         
         submission = {
             "submissionId": submission_id,
             "userId": user_id,
             "questionId": question_id,
-            "code": submission_data.get('code', ''),
+            "codeHash": digest,
+            "codeSize": len(code),
             "language": submission_data.get('language', 'python'),
             "passed": submission_data.get('passed', False),
             "testsPassed": submission_data.get('testsPassed', 0),
@@ -445,6 +909,9 @@ def record_submission(user_id, question_id, submission_data):
             "memory": submission_data.get('memory'),
             "submittedAt": timestamp
         }
+        if digest is None:
+            # Keep the code inline (legacy layout) rather than losing it
+            submission["code"] = code
         
         # Try to save to UserSubmissions table
         try:
@@ -464,12 +931,15 @@ def record_submission(user_id, question_id, submission_data):
                 # Add new submission (keep last 20)
                 submission_for_progress = {
                     "submissionId": submission_id,
+                    "codeHash": digest,
                     "passed": submission_data.get('passed', False),
                     "runtime": submission_data.get('runtime'),
                     "memory": submission_data.get('memory'),
                     "language": submission_data.get('language', 'python'),
                     "submittedAt": timestamp
                 }
+                if digest is None:
+                    submission_for_progress["code"] = code
                 existing_submissions.insert(0, submission_for_progress)
                 existing_submissions = existing_submissions[:20]  # Keep only last 20
                 
@@ -497,6 +967,7 @@ def record_submission(user_id, question_id, submission_data):
             "message": "Submission recorded",
             "data": {
                 "submissionId": submission_id,
+                "codeHash": digest,
                 "passed": submission_data.get('passed', False)
             }
         })
@@ -514,7 +985,8 @@ def record_submission(user_id, question_id, submission_data):
 # ========================================
 def get_submissions(user_id, question_id):
     """
-    Get all submissions for a user on a specific question.
+    Get all submissions for a user on a specific question (metadata only;
+    use get_submission_code to fetch a body).
     Tries UserSubmissions table first, falls back to UserQuestionProgress.submissions array.
     """
     if not user_id or not question_id:
@@ -531,9 +1003,11 @@ def get_submissions(user_id, question_id):
             IndexName='userId-questionId-index',
             KeyConditionExpression=boto3.dynamodb.conditions.Key('userId').eq(user_id) & 
                                    boto3.dynamodb.conditions.Key('questionId').eq(question_id),
+            ProjectionExpression=', '.join(f"#f{i}" for i in range(len(SUBMISSION_METADATA_FIELDS))),
+            ExpressionAttributeNames={f"#f{i}": f for i, f in enumerate(SUBMISSION_METADATA_FIELDS)},
             ScanIndexForward=False  # Most recent first
         )
-        submissions = result.get('Items', [])
+        submissions = [to_submission_metadata(i) for i in result.get('Items', [])]
         print(f"Found {len(submissions)} submissions in UserSubmissions table")
     except Exception as e:
         print(f"UserSubmissions table query failed (might not exist or no GSI): {str(e)}")
@@ -547,7 +1021,7 @@ def get_submissions(user_id, question_id):
             item = progress_result.get('Item', {})
             fallback_submissions = item.get('submissions', [])
             if fallback_submissions:
-                submissions = fallback_submissions
+                submissions = [to_submission_metadata(i) for i in fallback_submissions]
                 print(f"Found {len(submissions)} submissions in UserQuestionProgress (fallback)")
         except Exception as fallback_error:
             print(f"Fallback query also failed: {str(fallback_error)}")
@@ -561,6 +1035,82 @@ def get_submissions(user_id, question_id):
     })
 
 
+# ========================================
+# GET CODE FOR A SINGLE SUBMISSION
+# ========================================
+def find_progress_submission(user_id, submission_id, question_id=None):
+    """Find a submission in the UserQuestionProgress.submissions fallback arrays."""
+    if question_id:
+        item = progress_table.get_item(
+            Key={'userId': user_id, 'questionId': question_id},
+            ProjectionExpression='submissions'
+        ).get('Item', {})
+        candidates = item.get('submissions', [])
+    else:
+        query_kwargs = {
+            'KeyConditionExpression': boto3.dynamodb.conditions.Key('userId').eq(user_id),
+            'ProjectionExpression': 'submissions'
+        }
+        candidates = []
+        while True:
+            result = progress_table.query(**query_kwargs)
+            for item in result.get('Items', []):
+                candidates.extend(item.get('submissions', []))
+            if 'LastEvaluatedKey' not in result:
+                break
+            query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    return next((s for s in candidates if s.get('submissionId') == submission_id), None)
+
+
+def get_submission_code(user_id, submission_id, question_id=None):
+    """
+    Lazily fetch the code body of one submission.
+    Handles both hashed submissions and legacy items with inline code. When
+    the submission is not in UserSubmissions (or that table does not exist),
+    falls back to the UserQuestionProgress.submissions arrays - the item for
+    question_id when given, otherwise the user's progress items.
+    """
+    if not user_id or not submission_id:
+        return response(400, {
+            "success": False,
+            "error": {"code": "VALIDATION_ERROR", "message": "User ID and Submission ID are required"}
+        })
+    
+    try:
+        item = None
+        try:
+            item = submissions_table.get_item(Key={'submissionId': submission_id}).get('Item')
+        except Exception as e:
+            print(f"UserSubmissions read failed (might not exist): {str(e)}")
+        if not item:
+            item = find_progress_submission(user_id, submission_id, question_id)
+        if not item or item.get('userId', user_id) != user_id:
+            return response(404, {
+                "success": False,
+                "error": {"code": "NOT_FOUND", "message": "Submission not found"}
+            })
+        
+        code = item.get('code')
+        if code is None and item.get('codeHash'):
+            code = load_submission_code(item['codeHash'])
+        
+        return response(200, {
+            "success": True,
+            "data": {
+                "submissionId": submission_id,
+                "language": item.get('language'),
+                "code": code or ''
+            }
+        })
+        
+    except Exception as e:
+        print(f"Error getting submission code: {str(e)}")
+        return response(500, {
+            "success": False,
+            "error": {"code": "INTERNAL_ERROR", "message": "Failed to get submission code"}
+        })
+
+
 # ========================================
 # GET USER STATISTICS
 # ========================================
@@ -586,13 +1136,25 @@ def get_user_stats(user_id):
         solved = [i for i in items if i.get('status') == 'solved']
         attempted = [i for i in items if i.get('status') == 'attempted']
         
-        # Count by difficulty (would need to join with questions table in production)
+        # Count by difficulty/topic from the cached question catalog
+        by_difficulty, by_topic = build_breakdowns(items)
+        
+        # Streaks come from the activity bitmap rather than the solved items
+        try:
+            base_day, bits = get_activity_bits(user_id, solved)
+        except Exception as e:
+            print(f"Error reading activity bitmap: {str(e)}")
+            base_day, bits = build_activity_bits(solved_day_list(solved))
+        
         stats = {
             "totalSolved": len(solved),
             "totalAttempted": len(attempted),
             "totalBookmarked": len([i for i in items if i.get('isBookmarked')]),
             "totalAttempts": sum(i.get('attempts', 0) for i in items),
-            "streak": calculate_streak(solved),  # Days streak
+            "streak": current_streak_from_bits(base_day, bits),  # Days streak
+            "longestStreak": longest_streak_from_bits(bits),
+            "byDifficulty": by_difficulty,
+            "byTopic": by_topic,
             "recentActivity": get_recent_activity(items)
         }
         
@@ -609,42 +1171,6 @@ def get_user_stats(user_id):
         })
 
 
-def calculate_streak(solved_items):
-    """Calculate consecutive days streak."""
-    if not solved_items:
-        return 0
-    
-    # Get unique solved dates
-    dates = set()
-    for item in solved_items:
-        if item.get('solvedAt'):
-            try:
-                date_str = item['solvedAt'].split('T')[0]
-                dates.add(date_str)
-            except:
-                pass
-    
-    if not dates:
-        return 0
-    
-    # Sort dates and count consecutive days from today
-    sorted_dates = sorted(dates, reverse=True)
-    today = datetime.utcnow().strftime('%Y-%m-%d')
-    
-    streak = 0
-    current_date = datetime.strptime(today, '%Y-%m-%d')
-    
-    for date_str in sorted_dates:
-        check_date = current_date.strftime('%Y-%m-%d')
-        if date_str == check_date:
-            streak += 1
-            current_date = current_date.replace(day=current_date.day - 1)
-        else:
-            break
-    
-    return streak
-
-
 def get_recent_activity(items):
     """Get recent activity summary."""
     # Sort by update time
@@ -672,6 +1198,11 @@ def lambda_handler(event, context):
         if http_method == 'OPTIONS':
             return response(200, {})
         
+        # Maintenance: rebuild every user's activity bitmap. Direct invocation
+        # only - API Gateway events always carry a body key.
+        if 'body' not in event and event.get('action', '').lower() == 'backfill_activity':
+            return backfill_activity(event.get('userId'))
+        
         # Parse request body
         body = {}
         if isinstance(event.get('body'), str):
@@ -731,15 +1262,34 @@ def lambda_handler(event, context):
         if action == 'get_submissions':
             return get_submissions(user_id, question_id)
         
+        # Get code for one submission
+        if action == 'get_submission_code':
+            submission_id = body.get('submissionId') or query_params.get('submissionId')
+            return get_submission_code(user_id, submission_id, question_id)
+        
         # Get user statistics
         if action == 'get_stats':
             return get_user_stats(user_id)
         
+        # Get streaks and heatmap data
+        if action == 'get_activity':
+            days = body.get('days') or query_params.get('days') or HEATMAP_DEFAULT_DAYS
+            return get_activity(user_id, days)
+        
+        # Rebuild one user's activity bitmap from solvedAt (all users: direct invocation only)
+        if action == 'backfill_activity':
+            if not user_id:
+                return response(400, {
+                    "success": False,
+                    "error": {"code": "VALIDATION_ERROR", "message": "User ID is required"}
+                })
+            return backfill_activity(user_id)
+        
         return response(400, {
             "success": False,
             "error": {
                 "code": "INVALID_ACTION",
-                "message": f"Invalid action: {action}. Supported: get_progress, get_question_progress, update_status, mark_solved, mark_attempted, toggle_bookmark, submit, get_submissions, get_stats"
+                "message": f"Invalid action: {action}. Supported: get_progress, get_question_progress, update_status, mark_solved, mark_attempted, toggle_bookmark, submit, get_submissions, get_submission_code, get_stats, get_activity, backfill_activity"
             }
         })
             
@@ -772,6 +1322,30 @@ AWS SETUP INSTRUCTIONS
    - GSI: userId-questionId-index
      - Partition Key: userId (String)
      - Sort Key: questionId (String)
+     - Projection: INCLUDE codeHash, codeSize, language, passed, testsPassed,
+       testsTotal, runtime, memory, submittedAt (or ALL). get_submissions
+       lists these fields straight from the index.
+   - Without this table, submissions (with codeHash, or inline code when the
+     hash could not be stored) are kept on the UserQuestionProgress item and
+     get_submission_code reads them from there.
+
+   Read-only (owned by coding_questions_handler):
+   - CodingQuestions: scanned with a narrow projection to build the in-memory
+     question catalog used for difficulty/topic breakdowns.
+   - CodingQuestionsMeta: { "metaKey": "catalog", "version": N }. The catalog
+     is reloaded only when this version changes (checked at most once a minute).
+
+   Table 3: UserCodingActivity (daily activity bitmap for streaks/heatmap)
+   - Partition Key: userId (String)
+   - Attributes: baseDay (Number, days since 1970-01-01), bitmap (Binary,
+     little-endian, bit i = baseDay + i), version (Number), updatedAt
+   - Bitmaps are seeded from solvedAt on a user's first solve or stats read.
+     To populate every user up front, invoke the function directly (console /
+     CLI, not API Gateway) with { "action": "backfill_activity" }
+
+   Table 4: UserSubmissionCode (compressed, deduplicated code bodies)
+   - Partition Key: codeHash (String, SHA-256 of the code)
+   - Attributes: code (Binary, zlib), size (Number), createdAt
 
 2. Create Lambda Function:
    - Function name: user-question-progress-service
@@ -796,7 +1370,11 @@ AWS SETUP INSTRUCTIONS
                "Resource": [
                    "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/UserQuestionProgress",
                    "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/UserSubmissions",
-                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/UserSubmissions/index/*"
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/UserSubmissions/index/*",
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/CodingQuestions",
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/CodingQuestionsMeta",
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/UserCodingActivity",
+                   "arn:aws:dynamodb:REGION:ACCOUNT_ID:table/UserSubmissionCode"
                ]
            }
        ]
@@ -815,6 +1393,9 @@ AWS SETUP INSTRUCTIONS
    
    POST /user-progress
    Body: { "action": "submit", "userId": "user123", "questionId": "q1", "code": "...", "passed": true }
+   
+   POST /user-progress
+   Body: { "action": "get_activity", "userId": "user123", "days": 365 }
 
 ========================================
 DATA SCHEMA
@@ -839,7 +1420,8 @@ UserSubmissions:
     "submissionId": "uuid",        // Partition Key
     "userId": "user123",
     "questionId": "q1",
-    "code": "def solution()...",
+    "codeHash": "sha256...",       // Key into UserSubmissionCode
+    "codeSize": 512,
     "language": "python",
     "passed": true,
     "testsPassed": 5,
@@ -849,5 +1431,13 @@ UserSubmissions:
     "submittedAt": "2025-01-20T10:35:00Z"
 }
 
+UserSubmissionCode:
+{
+    "codeHash": "sha256...",       // Partition Key
+    "code": <zlib-compressed bytes>,
+    "size": 512,
+    "createdAt": "2025-01-20T10:35:00Z"
+}
+
 ========================================
 """
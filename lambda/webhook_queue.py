@@ -0,0 +1,113 @@
+"""
+Acknowledge-fast payment webhooks: verify, enqueue, return; a worker fulfils.
+
+The webhook Lambdas (payment_webhook, course_purchase_handler) verify the
+Razorpay signature, put the event on the SQS queue at WEBHOOK_QUEUE_URL and
+acknowledge at once. The same Lambdas are subscribed to that queue (batch size
+up to 10, ReportBatchItemFailures on) and receive {"Records": [...]} batches.
+With WEBHOOK_QUEUE_URL unset, events are fulfilled inline as before.
+
+Queue setup: visibility timeout >= 6x the Lambda timeout and a redrive policy
+(maxReceiveCount 5) to the dead-letter queue at WEBHOOK_DLQ_URL. Transient
+failures (5xx / exceptions, and 404 - the order may not be readable yet) are
+returned as batchItemFailures and retried until redrive moves them; permanent
+ones (other 4xx, malformed bodies) go straight to the DLQ with the reason and
+are acknowledged (left to redrive if no DLQ is set).
+Fulfilment is idempotent per order, and duplicate events for one order within
+a batch are processed once.
+Package this file with payment_webhook and course_purchase_handler.
+"""
+
+import os
+import json
+import time
+import boto3
+
+WEBHOOK_QUEUE_URL = os.environ.get("WEBHOOK_QUEUE_URL", "")
+WEBHOOK_DLQ_URL = os.environ.get("WEBHOOK_DLQ_URL", "")
+# Order not found: a just-created order can lag the index, so retry until redrive
+RETRYABLE_STATUSES = (404,)
+
+_sqs = None
+
+
+def sqs_client():
+    global _sqs
+    if _sqs is None:
+        _sqs = boto3.client("sqs")
+    return _sqs
+
+
+def queue_enabled():
+    return bool(WEBHOOK_QUEUE_URL)
+
+
+def enqueue(kind, order_key, payload):
+    """Durably queue one event; returns the SQS MessageId once SQS has stored it"""
+    result = sqs_client().send_message(
+        QueueUrl=WEBHOOK_QUEUE_URL,
+        MessageBody=json.dumps({
+            "kind": kind,
+            "orderKey": order_key,
+            "payload": payload,
+            "receivedAt": int(time.time() * 1000)
+        }, default=str),
+        MessageAttributes={"kind": {"DataType": "String", "StringValue": kind}}
+    )
+    return result["MessageId"]
+
+
+def is_queue_batch(event):
+    records = event.get("Records") or []
+    return bool(records) and all(r.get("eventSource") == "aws:sqs" for r in records)
+
+
+def dead_letter(record, reason):
+    """Move a message that can never succeed to the DLQ; False if there is none configured"""
+    print(f"Dead-lettering message {record.get('messageId')}: {reason}")
+    if not WEBHOOK_DLQ_URL:
+        return False
+    sqs_client().send_message(
+        QueueUrl=WEBHOOK_DLQ_URL,
+        MessageBody=record.get("body", ""),
+        MessageAttributes={"reason": {"DataType": "String", "StringValue": str(reason)[:256]}}
+    )
+    return True
+
+
+def process_batch(event, handlers):
+    """
+    Run one SQS batch. handlers maps an event kind to fn(payload) -> Lambda
+    response dict. Returns the partial batch response SQS expects.
+    """
+    failures = []
+    groups = {}
+    for record in event["Records"]:
+        try:
+            message = json.loads(record["body"])
+            handler = handlers[message["kind"]]
+        except (KeyError, TypeError, ValueError) as e:
+            if not dead_letter(record, f"Malformed message: {str(e)}"):
+                failures.append({"itemIdentifier": record["messageId"]})
+            continue
+        # One run per order and kind; later duplicates share its outcome
+        groups.setdefault((message["kind"], message.get("orderKey") or record["messageId"]), []).append(
+            (record, message, handler)
+        )
+
+    for group in groups.values():
+        record, message, handler = group[0]
+        try:
+            result = handler(message["payload"])
+            status = result.get("statusCode", 500)
+        except Exception as e:
+            print(f"Error processing {message['kind']} for {message.get('orderKey')}: {str(e)}")
+            status, result = 500, {"body": str(e)}
+        if status >= 500 or status in RETRYABLE_STATUSES:
+            failures.extend({"itemIdentifier": r["messageId"]} for r, _, _ in group)
+        elif status >= 400:
+            for r, _, _ in group:
+                if not dead_letter(r, result.get("body")):
+                    # No DLQ configured: let the redrive policy retire it
+                    failures.append({"itemIdentifier": r["messageId"]})
+    return {"batchItemFailures": failures}
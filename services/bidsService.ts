@@ -4,7 +4,6 @@
  */
 
 import type { Bid, BidFormData } from '../types/bids';
-import { incrementBidCount, decrementBidCount } from './bidRequestProjectsApi';
 
 // API Endpoint for Bids Lambda
 const BIDS_API_ENDPOINT = 'https://3bi4qyp5r3.execute-api.ap-south-2.amazonaws.com/default/bids_handler';
@@ -231,11 +230,9 @@ export const saveBidAsync = async (
     if (response.success && response.data) {
       bid.id = response.data.bidId;
       bid.submittedAt = response.data.submittedAt;
+      // The project's bidsCount is incremented by CREATE_BID itself
       saveLocalBid(bid);
       
-      // Increment bid count on the project
-      await incrementBidCount(projectId);
-      
       return { success: true, bid };
     }
 
@@ -312,23 +309,8 @@ export const deleteBid = (bidId: string): void => {
  */
 export const deleteBidAsync = async (
   bidId: string,
-  freelancerId?: string,
-  projectId?: string
+  freelancerId?: string
 ): Promise<{ success: boolean; error?: string }> => {
-  // Get the bid to find the projectId if not provided
-  let bidProjectId = projectId;
-  if (!bidProjectId) {
-    const bid = getFreelancerBidOnProject(freelancerId || '', '');
-    if (!bid) {
-      // Try to get from all local bids
-      const allBids = getLocalBids();
-      const foundBid = allBids.find(b => b.id === bidId);
-      if (foundBid) {
-        bidProjectId = foundBid.projectId;
-      }
-    }
-  }
-
   if (!USE_API) {
     deleteLocalBid(bidId);
     return { success: true };
@@ -338,13 +320,9 @@ export const deleteBidAsync = async (
     const response = await apiRequest<void>('DELETE_BID', { bidId, freelancerId });
 
     if (response.success) {
+      // The project's bidsCount is decremented by DELETE_BID itself
       deleteLocalBid(bidId);
       
-      // Decrement bid count on the project
-      if (bidProjectId) {
-        await decrementBidCount(bidProjectId);
-      }
-      
       return { success: true };
     }
 
@@ -9,6 +9,7 @@ const REPORT_PROJECT_ENDPOINT = 'https://r6tuhoyrr2.execute-api.ap-south-2.amazo
 const UPDATE_PROJECT_ENDPOINT = 'https://dihvjwfsk0.execute-api.ap-south-2.amazonaws.com/default/Update_projectDetils_and_likescounts_by_projectId';
 const CREATE_PAYMENT_INTENT_ENDPOINT = 'https://cuzvm2pbdl.execute-api.ap-south-2.amazonaws.com/default/create_payment_intent';
 const FETCH_HACKATHONS_ENDPOINT = 'https://zv6v6bsuie.execute-api.ap-south-2.amazonaws.com/default/get_hackathons_details';
+const UPDATE_SETTINGS_ENDPOINT = 'https://ydcdsqspm3.execute-api.ap-south-2.amazonaws.com/default/Update_userdetails_in_settings';
 // Course purchase Lambda endpoint
 const COURSE_PURCHASE_ENDPOINT = 'https://ukcbl5e5p7.execute-api.ap-south-2.amazonaws.com/default/course_purchase_handler';
 
@@ -129,6 +130,26 @@ export const fetchUserData = async (userId: string): Promise<UserData | null> =>
   }
 };
 
+/**
+ * Fetch githubData / driveData / freelancerProjects, which are stored apart from the user profile
+ */
+export const fetchIntegrations = async (userId: string): Promise<Record<string, any>> => {
+  try {
+    const response = await fetch(UPDATE_SETTINGS_ENDPOINT, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ action: 'getIntegrations', userId }),
+    });
+    const data = await response.json();
+    return data.success && data.data ? data.data : {};
+  } catch (error) {
+    console.error('Error fetching integrations:', error);
+    return {};
+  }
+};
+
 /**
  * Update project counters (wishlist, cart, likes)
  */
@@ -898,6 +919,7 @@ export interface VerifyCoursePaymentRequest {
 export interface VerifyCoursePaymentResponse {
   success: boolean;
   message?: string;
+  status?: string; // "PROCESSING" while the queued purchase is being fulfilled
   orderId?: string;
   courseId?: string;
   courseTitle?: string;
@@ -979,6 +1001,10 @@ export const verifyCoursePayment = async (
       };
     }
 
+    if (data.status === 'PROCESSING') {
+      return waitForCourseOrder(request.razorpay_order_id, request.userId, data);
+    }
+
     return data;
   } catch (error) {
     console.error('Error verifying course payment:', error);
@@ -990,6 +1016,46 @@ export const verifyCoursePayment = async (
   }
 };
 
+const COURSE_ORDER_POLL_INTERVAL_MS = 1000;
+const COURSE_ORDER_POLL_ATTEMPTS = 20;
+
+/**
+ * Poll a verified course order until the queued purchase has been recorded
+ */
+const waitForCourseOrder = async (
+  razorpayOrderId: string,
+  userId: string,
+  verified: VerifyCoursePaymentResponse
+): Promise<VerifyCoursePaymentResponse> => {
+  for (let attempt = 0; attempt < COURSE_ORDER_POLL_ATTEMPTS; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, COURSE_ORDER_POLL_INTERVAL_MS));
+    try {
+      const response = await fetch(COURSE_PURCHASE_ENDPOINT, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          action: 'GET_COURSE_ORDER_STATUS',
+          razorpayOrderId,
+          userId,
+        }),
+      });
+      const data = await response.json();
+      if (response.ok && data.status === 'SUCCESS') {
+        return { ...verified, success: true, status: 'SUCCESS', orderId: data.orderId };
+      }
+    } catch (error) {
+      console.error('Error polling course order:', error);
+    }
+  }
+  return {
+    ...verified,
+    success: false,
+    error: 'Payment received - your course will appear in My Courses shortly',
+  };
+};
+
 /**
  * Enroll in a free course
  */
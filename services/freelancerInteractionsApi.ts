@@ -188,6 +188,34 @@ export const getUserInteractions = async (userId: string): Promise<{
     }
 };
 
+/**
+ * Get one page of invitations sent to a user (newest first)
+ */
+export const getInvitations = async (userId: string, cursor?: string, limit = 50): Promise<{
+    interactions: Interaction[],
+    count: number,
+    nextCursor?: string | null
+}> => {
+    try {
+        const response = await apiRequest<{
+            interactions: Interaction[],
+            count: number,
+            nextCursor?: string | null
+        }>('GET_USER_INTERACTIONS', cursor
+            ? { userId, type: 'invitation', limit, cursor }
+            : { userId, type: 'invitation', limit });
+
+        if (response.success && response.data) {
+            return response.data;
+        }
+
+        throw new Error(response.error?.message || 'Failed to fetch invitations');
+    } catch (error) {
+        console.error('Error fetching invitations:', error);
+        return { interactions: [], count: 0 };
+    }
+};
+
 /**
  * Get interactions (messages, invitations) sent by the user
  */
@@ -217,12 +245,14 @@ export const getSentInteractions = async (userId: string): Promise<{
  */
 export const getConversation = async (userId: string, otherUserId: string): Promise<{
     messages: Interaction[],
-    count: number
+    count: number,
+    nextCursor?: string | null
 }> => {
     try {
         const response = await apiRequest<{
             messages: Interaction[],
-            count: number
+            count: number,
+            nextCursor?: string | null
         }>('GET_CONVERSATION', { userId, otherUserId });
 
         if (response.success && response.data) {
@@ -236,6 +266,61 @@ export const getConversation = async (userId: string, otherUserId: string): Prom
     }
 };
 
+export interface InboxConversation {
+    otherUserId: string;
+    conversationId?: string;
+    lastMessage: string;
+    lastAt: string;
+    lastSenderId?: string;
+    unreadCount: number;
+}
+
+/**
+ * Get the user's conversations (newest first) with unread counters
+ */
+export const getInbox = async (userId: string, cursor?: string): Promise<{
+    conversations: InboxConversation[],
+    count: number,
+    totalUnread: number,
+    nextCursor?: string | null
+}> => {
+    try {
+        const response = await apiRequest<{
+            conversations: InboxConversation[],
+            count: number,
+            totalUnread: number,
+            nextCursor?: string | null
+        }>('GET_INBOX', cursor ? { userId, cursor } : { userId });
+
+        if (response.success && response.data) {
+            return response.data;
+        }
+
+        throw new Error(response.error?.message || 'Failed to fetch inbox');
+    } catch (error) {
+        console.error('Error fetching inbox:', error);
+        return { conversations: [], count: 0, totalUnread: 0 };
+    }
+};
+
+/**
+ * Mark every unread message from otherUserId to userId as read
+ */
+export const markConversationRead = async (userId: string, otherUserId: string): Promise<boolean> => {
+    try {
+        const response = await apiRequest<any>('MARK_CONVERSATION_READ', { userId, otherUserId });
+
+        if (response.success) {
+            return true;
+        }
+
+        throw new Error(response.error?.message || 'Failed to mark conversation read');
+    } catch (error) {
+        console.error('Error marking conversation read:', error);
+        throw error;
+    }
+};
+
 /**
  * Update the status of a specific interaction
  */
@@ -63,6 +63,23 @@ io.on('connection', (socket) => {
 
 // API endpoint for Lambdas to trigger socket events
 app.post('/notify', (req, res) => {
+    // Batched form sent by the Lambda notification dispatcher: { events: [{ userId, event, data }] }
+    if (Array.isArray(req.body.events)) {
+        const results = req.body.events.map(({ userId, event, data }) => {
+            const socketId = userSockets.get(userId);
+            if (socketId) {
+                io.to(socketId).emit(event, data);
+                return { userId, delivered: true };
+            }
+            return { userId, delivered: false };
+        });
+        return res.json({
+            success: true,
+            delivered: results.filter((r) => r.delivered).length,
+            results
+        });
+    }
+
     const { userId, event, data } = req.body;
     const socketId = userSockets.get(userId);
 
@@ -78,11 +78,6 @@ describe('Bids Service', () => {
         json: () => Promise.resolve(mockResponse),
       });
 
-      // Mock incrementBidCount call
-      mockFetch.mockResolvedValueOnce({
-        json: () => Promise.resolve({ success: true }),
-      });
-
       const result = await saveBidAsync(
         validBidData,
         'project-123',
@@ -95,7 +90,7 @@ describe('Bids Service', () => {
       expect(result.bid).toBeDefined();
       expect(result.bid?.projectId).toBe('project-123');
       expect(result.bid?.freelancerId).toBe('freelancer-456');
-      expect(mockFetch).toHaveBeenCalledTimes(2); // CREATE_BID + INCREMENT_BIDS_COUNT
+      expect(mockFetch).toHaveBeenCalledTimes(1); // CREATE_BID maintains bidsCount
     });
 
     it('should fallback to localStorage when API fails', async () => {
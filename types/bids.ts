@@ -11,6 +11,12 @@ export interface Bid {
   proposal: string;
   submittedAt: string; // ISO date string
   status?: 'pending' | 'accepted' | 'rejected';
+  // Live freelancer card, filled in by GET_BIDS_BY_PROJECT
+  freelancerUsername?: string;
+  freelancerProfileImage?: string;
+  freelancerVerified?: boolean;
+  freelancerRating?: number;
+  freelancerReviewsCount?: number;
 }
 
 export interface BidFormData {